@@ -10,7 +10,9 @@ class CommunicationsConfig(AppConfig):
         # Import signals to activate them
         import apps.communications.signals
         
-        # Start scheduler in the main process (not in reloader or other processes)
+        # Start scheduler in the runserver main process (not in the reloader or
+        # other management commands). Web servers start it from wsgi.py/asgi.py;
+        # an advisory lock makes sure only one process acts on it.
         import os
         if os.environ.get('RUN_MAIN') == 'true' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
             from .scheduler import start_scheduler
@@ -0,0 +1,89 @@
+"""
+Postgres LISTEN/NOTIFY and advisory-lock helpers for the announcement scheduler
+and delivery workers.
+
+Notifications are sent on the regular Django connection once the surrounding
+transaction commits. Listening happens on a dedicated autocommit connection,
+so it survives close_old_connections() and can hold a session-level advisory
+lock for as long as the process is alive.
+"""
+import logging
+import select
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Channel names
+SCHEDULE_CHANGED = 'announcement_schedule_changed'
+DELIVERY_JOBS = 'announcement_delivery_jobs'
+
+
+def notify(channel, payload=''):
+    """Send NOTIFY on `channel` after the current transaction commits (immediately in autocommit)."""
+    def _send():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [channel, str(payload)])
+        except Exception as e:
+            # Listeners fall back to their poll interval, so a lost wakeup only adds latency
+            logger.warning(f"Could not notify {channel}: {e}")
+
+    transaction.on_commit(_send)
+
+
+class Listener:
+    """
+    Dedicated database connection that LISTENs on one or more channels.
+
+    Usage:
+        listener = Listener(DELIVERY_JOBS)
+        payloads = listener.wait(timeout=5)  # [] on timeout
+        listener.close()
+    """
+
+    def __init__(self, *channels):
+        self.channels = channels
+        self.conn = None
+
+    def connect(self):
+        if self.conn is not None and not self.conn.closed:
+            return self.conn
+
+        self.conn = connection.get_new_connection(connection.get_connection_params())
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            for channel in self.channels:
+                cursor.execute(f'LISTEN "{channel}"')
+        return self.conn
+
+    def try_advisory_lock(self, key):
+        """
+        Take a session-level advisory lock without blocking.
+        It is held until this listener's connection closes, so a crashed
+        process releases it automatically.
+        """
+        with self.connect().cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+            return cursor.fetchone()[0]
+
+    def wait(self, timeout):
+        """Block up to `timeout` seconds for notifications; returns their payloads."""
+        conn = self.connect()
+        if not conn.notifies:
+            readable, _, _ = select.select([conn], [], [], max(0.0, timeout))
+            if not readable:
+                return []
+        conn.poll()
+
+        payloads = [n.payload for n in conn.notifies]
+        conn.notifies.clear()
+        return payloads
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
@@ -0,0 +1,166 @@
+"""
+Per-recipient delivery ledger for announcement sends (announcement_deliveries).
+
+The first send of an announcement on a channel snapshots its recipients into
+the ledger. Every later attempt (job retries, a scheduler re-run) only delivers
+to rows that are still pending or failed, and the delivery report reads the
+same rows instead of recomputing recipients. A deliberate re-send first adds
+recipients who joined the announcement since (refresh=True), so it reaches
+them and anyone whose earlier delivery failed, never anyone twice.
+"""
+import logging
+
+from django.db import connection
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import AnnouncementDelivery
+
+logger = logging.getLogger(__name__)
+
+# Officer column holding the address for each channel
+ADDRESS_COLUMNS = {
+    'sms': 'mobile_number',
+    'e-mail': 'email',
+}
+
+OUTSTANDING_STATUSES = [AnnouncementDelivery.STATUS_PENDING, AnnouncementDelivery.STATUS_FAILED]
+
+
+def resolve_recipients(announcement_id, channel):
+    """
+    Resolve the officers an announcement goes to, one row per distinct address.
+    Covers both cooperative-level and officer-level recipients, like
+    sp_get_sms_recipients and the e-mail recipient query did.
+
+    Returns a list of (officer_id, fullname, coop_name, address) tuples.
+    """
+    column = ADDRESS_COLUMNS[channel]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT DISTINCT ON (r.address) r.officer_id, r.fullname, c.cooperative_name, r.address
+            FROM (
+                SELECT o.officer_id, o.fullname, o.coop_id, TRIM(o.{column}) AS address
+                FROM announcement_officer_recipients aor
+                JOIN officers o ON aor.officer_id = o.officer_id
+                WHERE aor.announcement_id = %s
+
+                UNION
+
+                SELECT o.officer_id, o.fullname, o.coop_id, TRIM(o.{column}) AS address
+                FROM announcement_recipients ar
+                JOIN officers o ON ar.coop_id = o.coop_id
+                WHERE ar.announcement_id = %s
+            ) r
+            LEFT JOIN cooperatives c ON r.coop_id = c.coop_id
+            WHERE r.address IS NOT NULL AND r.address != ''
+            ORDER BY r.address, r.officer_id
+        """, [announcement_id, announcement_id])
+        return cursor.fetchall()
+
+
+def snapshot_recipients(announcement_id, channel, refresh=False):
+    """
+    Write the recipient snapshot for this announcement/channel if it does not exist yet.
+    With refresh, an existing snapshot gets a pending row for each recipient it lacks.
+    Returns the number of ledger rows created (0 when resuming an earlier send).
+    """
+    existing = AnnouncementDelivery.objects.filter(announcement_id=announcement_id, channel=channel)
+    if refresh:
+        known = set(existing.values_list('address', flat=True))
+    elif existing.exists():
+        return 0
+    else:
+        known = set()
+
+    rows = [
+        AnnouncementDelivery(
+            announcement_id=announcement_id,
+            channel=channel,
+            officer_id=officer_id,
+            recipient_name=fullname,
+            coop_name=coop_name,
+            address=address,
+        )
+        for officer_id, fullname, coop_name, address in resolve_recipients(announcement_id, channel)
+        if address not in known
+    ]
+    if not rows:
+        return 0
+    # ignore_conflicts: a concurrent snapshot of the same send simply loses the race
+    AnnouncementDelivery.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+    logger.info(f"Snapshotted {len(rows)} {channel} recipient(s) for announcement {announcement_id}")
+    return len(rows)
+
+
+def get_outstanding_deliveries(announcement_id, channel):
+    """Ledger rows that still need to be sent (pending or failed)."""
+    return AnnouncementDelivery.objects.filter(
+        announcement_id=announcement_id,
+        channel=channel,
+        status__in=OUTSTANDING_STATUSES
+    ).order_by('delivery_id')
+
+
+def record_batch_result(delivery_ids, batch_number, success, provider_message_id=None, error=None):
+    """Mark the rows of one provider call as sent or failed and count the attempt."""
+    if not delivery_ids:
+        return
+
+    now = timezone.now()
+    fields = {
+        'batch_number': batch_number,
+        'attempts': F('attempts') + 1,
+        'updated_at': now,
+    }
+    if success:
+        fields.update(
+            status=AnnouncementDelivery.STATUS_SENT,
+            provider_message_id=provider_message_id,
+            last_error=None,
+            sent_at=now,
+        )
+    else:
+        fields.update(status=AnnouncementDelivery.STATUS_FAILED, last_error=error)
+
+    AnnouncementDelivery.objects.filter(delivery_id__in=delivery_ids).update(**fields)
+
+
+def mark_invalid(delivery_ids, error):
+    """
+    Take rows whose address can never be delivered to out of the outstanding set,
+    so retries do not keep re-sending (and re-failing) them.
+    """
+    if not delivery_ids:
+        return
+
+    AnnouncementDelivery.objects.filter(delivery_id__in=delivery_ids).update(
+        status=AnnouncementDelivery.STATUS_INVALID,
+        last_error=error,
+        updated_at=timezone.now(),
+    )
+
+
+def get_delivery_summary(announcement_id, channel=None):
+    """Counts of ledger rows by status: {'total', 'pending', 'sent', 'failed', 'invalid'}."""
+    queryset = AnnouncementDelivery.objects.filter(announcement_id=announcement_id)
+    if channel:
+        queryset = queryset.filter(channel=channel)
+
+    summary = {
+        'total': 0,
+        AnnouncementDelivery.STATUS_PENDING: 0,
+        AnnouncementDelivery.STATUS_SENT: 0,
+        AnnouncementDelivery.STATUS_FAILED: 0,
+        AnnouncementDelivery.STATUS_INVALID: 0,
+    }
+    for row in queryset.values('status').annotate(count=Count('delivery_id')):
+        summary[row['status']] = row['count']
+        summary['total'] += row['count']
+    return summary
+
+
+def count_outstanding(announcement_id, channel):
+    """Number of recipients not yet delivered on this channel."""
+    return get_outstanding_deliveries(announcement_id, channel).count()
@@ -0,0 +1,308 @@
+"""
+Durable delivery queue for announcement sends.
+
+Views enqueue an AnnouncementDeliveryJob and return immediately, waking idle
+workers with a NOTIFY; one or more `process_announcement_jobs` workers claim
+due jobs with SELECT ... FOR UPDATE SKIP LOCKED, call the SMS/e-mail service,
+and either mark the job succeeded, schedule a retry with exponential backoff, or
+dead-letter it once max_attempts is reached.
+"""
+import logging
+import os
+import random
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .db_events import DELIVERY_JOBS, notify
+from .delivery_ledger import count_outstanding, get_delivery_summary, snapshot_recipients
+from .models import AnnouncementDeliveryJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE_SECONDS': 30,
+    'BACKOFF_MAX_SECONDS': 3600,
+    'LEASE_SECONDS': 900,
+    'BATCH_SIZE': 5,
+    'POLL_INTERVAL_SECONDS': 5,
+}
+
+
+def get_delivery_setting(name):
+    """Read a value from settings.ANNOUNCEMENT_DELIVERY, falling back to DEFAULTS."""
+    return getattr(settings, 'ANNOUNCEMENT_DELIVERY', {}).get(name, DEFAULTS[name])
+
+
+def default_worker_id():
+    """Identify this worker process in locked_by (host:pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def compute_backoff(attempts, base=None, maximum=None):
+    """
+    Exponential backoff with full jitter for the given number of failed attempts.
+    Returns a timedelta: a random delay in [base * 2^(attempts-1) / 2, base * 2^(attempts-1)],
+    capped at maximum.
+    """
+    base = get_delivery_setting('BACKOFF_BASE_SECONDS') if base is None else base
+    maximum = get_delivery_setting('BACKOFF_MAX_SECONDS') if maximum is None else maximum
+
+    delay = min(maximum, base * (2 ** max(attempts - 1, 0)))
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+class AlreadyDelivered(ValueError):
+    """A re-send of an announcement that every recipient on the channel already has."""
+
+
+def _prepare_resend(announcement_id, channel):
+    """
+    Before a new job for an announcement that was sent on this channel before,
+    add recipients who joined since to the ledger. Raises AlreadyDelivered if
+    nobody is left to send to, instead of queueing a job that would do nothing.
+    """
+    if not get_delivery_summary(announcement_id, channel)['total']:
+        return
+
+    added = snapshot_recipients(announcement_id, channel, refresh=True)
+    if added:
+        logger.info(f"Re-send of announcement {announcement_id} adds {added} new {channel} recipient(s)")
+    elif not count_outstanding(announcement_id, channel):
+        summary = get_delivery_summary(announcement_id, channel)
+        raise AlreadyDelivered(f"Announcement already delivered to all {summary['sent']} recipient(s); "
+                               f"add recipients to send it again")
+
+
+def enqueue_announcement_delivery(announcement_id, channel, content, created_by_id=None,
+                                  created_by_role=None, idempotency_key=None):
+    """
+    Queue an announcement for delivery.
+
+    The client sends one idempotency key per submit, so a double-submitted or
+    retried send returns the existing job instead of sending twice, while a
+    deliberate re-send of the same announcement gets a new job. Without a key
+    every call queues a new job. A dead-lettered job is re-armed when the same
+    key is submitted again.
+
+    A re-send delivers to recipients added since the last send and to those
+    whose delivery failed; recipients who already have it are not sent it
+    again. If that leaves nobody, AlreadyDelivered is raised and no job queued.
+
+    Returns:
+        Tuple of (job: AnnouncementDeliveryJob, created: bool)
+    """
+    key = idempotency_key or f"announcement-{announcement_id}-{channel}-{uuid.uuid4().hex}"
+
+    if not AnnouncementDeliveryJob.objects.filter(idempotency_key=key).exists():
+        _prepare_resend(announcement_id, channel)
+
+    try:
+        with transaction.atomic():
+            job, created = AnnouncementDeliveryJob.objects.get_or_create(
+                idempotency_key=key,
+                defaults={
+                    'announcement_id': announcement_id,
+                    'channel': channel,
+                    'content': content,
+                    'max_attempts': get_delivery_setting('MAX_ATTEMPTS'),
+                    'next_attempt_at': timezone.now(),
+                    'created_by_id': created_by_id,
+                    'created_by_role': created_by_role,
+                }
+            )
+    except IntegrityError:
+        # Lost a race with a concurrent submit of the same key
+        job, created = AnnouncementDeliveryJob.objects.get(idempotency_key=key), False
+
+    if not created and job.status == AnnouncementDeliveryJob.STATUS_DEAD:
+        AnnouncementDeliveryJob.objects.filter(
+            pk=job.pk, status=AnnouncementDeliveryJob.STATUS_DEAD
+        ).update(
+            status=AnnouncementDeliveryJob.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            last_error=None,
+            completed_at=None,
+            updated_at=timezone.now(),
+        )
+        job.refresh_from_db()
+        logger.info(f"Re-queued dead delivery job {job.job_id} (key={key})")
+        notify(DELIVERY_JOBS, job.job_id)
+    elif created:
+        logger.info(f"Queued {channel} delivery job {job.job_id} for announcement {announcement_id}")
+        notify(DELIVERY_JOBS, job.job_id)
+
+    return job, created
+
+
+def claim_jobs(worker_id, batch_size=None):
+    """
+    Atomically claim up to batch_size due jobs for this worker.
+
+    Pending jobs whose next_attempt_at has passed are eligible, as are running
+    jobs whose lease expired (the worker holding them died mid-send).
+    Rows locked by another worker's claim are skipped rather than waited on.
+    """
+    batch_size = batch_size or get_delivery_setting('BATCH_SIZE')
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=get_delivery_setting('LEASE_SECONDS'))
+
+    with transaction.atomic():
+        job_ids = list(
+            AnnouncementDeliveryJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=AnnouncementDeliveryJob.STATUS_PENDING, next_attempt_at__lte=now) |
+                Q(status=AnnouncementDeliveryJob.STATUS_RUNNING, locked_at__lt=stale_before)
+            )
+            .order_by('next_attempt_at', 'job_id')
+            .values_list('job_id', flat=True)[:batch_size]
+        )
+        if not job_ids:
+            return []
+
+        AnnouncementDeliveryJob.objects.filter(job_id__in=job_ids).update(
+            status=AnnouncementDeliveryJob.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+
+    return list(AnnouncementDeliveryJob.objects.filter(job_id__in=job_ids).order_by('next_attempt_at', 'job_id'))
+
+
+def _send(job):
+    """Dispatch a job to the matching service. Returns (success, message)."""
+    if job.channel == 'sms':
+        from apps.core.services.sms_service import SmsService
+        return SmsService().send_bulk_announcement(job.announcement_id, job.content)
+    if job.channel == 'e-mail':
+        from apps.core.services.email_service import EmailService
+        return EmailService().send_bulk_announcement(job.announcement_id, job.content)
+    return False, f"Unsupported channel: {job.channel}"
+
+
+def _log_delivery(job):
+    """Record the send in the activity log once it has actually gone out."""
+    if not (job.created_by_id and job.created_by_role):
+        return
+    try:
+        from apps.core.utils.activity_logger import log_announcement_sent
+        from .models import Announcement
+
+        recipients = Announcement.get_recipients_for_announcement(job.announcement_id)
+        coop_names = recipients['coop_names']
+        officer_names = recipients['officer_names']
+        recipient_count = len(officer_names) or len(coop_names)
+        recipient_type = 'officers' if officer_names else 'cooperatives'
+
+        log_announcement_sent(
+            job.created_by_id, job.created_by_role,
+            'SMS' if job.channel == 'sms' else 'Email',
+            recipient_count, recipient_type, coop_names, officer_names
+        )
+    except Exception as e:
+        logger.error(f"Error logging delivery of job {job.job_id}: {e}")
+
+
+def process_job(job, worker_id):
+    """
+    Run one claimed job and record the outcome.
+    Only the worker that still holds the lease may write the result.
+    """
+    logger.info(f"Processing delivery job {job.job_id} (attempt {job.attempts}/{job.max_attempts})")
+
+    try:
+        success, message = _send(job)
+    except Exception as e:
+        success, message = False, f"Unexpected error: {e}"
+
+    # A partial send still leaves failed rows in the delivery ledger; retry
+    # them (only them) until the last attempt, which keeps the partial result.
+    if success and job.attempts < job.max_attempts:
+        outstanding = count_outstanding(job.announcement_id, job.channel)
+        if outstanding:
+            success = False
+            message = f"{message} ({outstanding} recipient(s) not yet delivered)"
+
+    now = timezone.now()
+    owned = AnnouncementDeliveryJob.objects.filter(
+        pk=job.pk, status=AnnouncementDeliveryJob.STATUS_RUNNING, locked_by=worker_id
+    )
+
+    if success:
+        owned.update(
+            status=AnnouncementDeliveryJob.STATUS_SUCCEEDED,
+            result_message=message,
+            last_error=None,
+            locked_by=None,
+            locked_at=None,
+            completed_at=now,
+            updated_at=now,
+        )
+        logger.info(f"✓ Delivery job {job.job_id} succeeded: {message}")
+        _log_delivery(job)
+        return True
+
+    if job.attempts >= job.max_attempts:
+        owned.update(
+            status=AnnouncementDeliveryJob.STATUS_DEAD,
+            last_error=message,
+            locked_by=None,
+            locked_at=None,
+            completed_at=now,
+            updated_at=now,
+        )
+        logger.error(f"✗ Delivery job {job.job_id} dead-lettered after {job.attempts} attempts: {message}")
+        return False
+
+    retry_at = now + compute_backoff(job.attempts)
+    owned.update(
+        status=AnnouncementDeliveryJob.STATUS_PENDING,
+        last_error=message,
+        next_attempt_at=retry_at,
+        locked_by=None,
+        locked_at=None,
+        updated_at=now,
+    )
+    logger.warning(f"Delivery job {job.job_id} failed (attempt {job.attempts}), retrying at {retry_at}: {message}")
+    return False
+
+
+def run_pending_jobs(worker_id=None, batch_size=None):
+    """
+    Claim and process one batch of due jobs.
+    Returns the number of jobs processed (0 when the queue is idle).
+    """
+    worker_id = worker_id or default_worker_id()
+    jobs = claim_jobs(worker_id, batch_size)
+    for job in jobs:
+        process_job(job, worker_id)
+    return len(jobs)
+
+
+def get_job_progress(job):
+    """Serialize a job for the progress endpoint."""
+    return {
+        'job_id': job.job_id,
+        'announcement_id': job.announcement_id,
+        'channel': job.channel,
+        'status': job.status,
+        'is_finished': job.is_finished,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'next_attempt_at': job.next_attempt_at.isoformat() if job.next_attempt_at else None,
+        'last_error': job.last_error,
+        'result_message': job.result_message,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'completed_at': job.completed_at.isoformat() if job.completed_at else None,
+        'deliveries': get_delivery_summary(job.announcement_id, job.channel),
+    }
@@ -0,0 +1,73 @@
+"""
+Management command that drains the announcement delivery queue.
+Run one or more of these alongside the web server; workers coordinate
+through row locks so several can run at once without double-sending.
+Idle workers wake as soon as a job is queued (LISTEN announcement_delivery_jobs)
+and otherwise re-check every poll interval for retries that became due.
+
+Usage:
+    python manage.py process_announcement_jobs          # run forever
+    python manage.py process_announcement_jobs --once   # drain due jobs and exit
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.communications.db_events import DELIVERY_JOBS, Listener
+from apps.communications.delivery_queue import (
+    default_worker_id,
+    get_delivery_setting,
+    run_pending_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Processes queued announcement deliveries (SMS and e-mail)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process all currently due jobs, then exit')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Jobs claimed per round (default: ANNOUNCEMENT_DELIVERY BATCH_SIZE)')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to wait for a new job when the queue is idle')
+        parser.add_argument('--worker-id', default=None,
+                            help='Identifier stored in locked_by (default: host:pid)')
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        batch_size = options['batch_size'] or get_delivery_setting('BATCH_SIZE')
+        poll_interval = options['poll_interval'] or get_delivery_setting('POLL_INTERVAL_SECONDS')
+
+        self.stdout.write(f"Delivery worker {worker_id} started (batch size {batch_size})")
+        total = 0
+        listener = None if options['once'] else Listener(DELIVERY_JOBS)
+
+        try:
+            while True:
+                close_old_connections()
+                processed = run_pending_jobs(worker_id=worker_id, batch_size=batch_size)
+                total += processed
+
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                self._wait_for_jobs(listener, poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping delivery worker...")
+        finally:
+            if listener:
+                listener.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} delivery job(s)"))
+
+    def _wait_for_jobs(self, listener, timeout):
+        """Wait for a NOTIFY from enqueue, falling back to a plain sleep if listening fails."""
+        try:
+            listener.wait(timeout)
+        except Exception as e:
+            self.stderr.write(f"Listen failed ({e}); polling instead")
+            listener.close()
+            time.sleep(timeout)
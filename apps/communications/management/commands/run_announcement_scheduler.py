@@ -0,0 +1,31 @@
+"""
+Management command that runs the announcement scheduler as its own process.
+
+Use this when the web server should not host the scheduler thread
+(set ANNOUNCEMENT_SCHEDULER_AUTOSTART=False). Several copies may run for
+redundancy: a Postgres advisory lock keeps exactly one of them active, and
+a standby takes over within LEADER_RETRY_SECONDS if the leader dies.
+
+Usage:
+    python manage.py run_announcement_scheduler
+"""
+from django.core.management.base import BaseCommand
+
+from apps.communications.scheduler import AnnouncementScheduler
+
+
+class Command(BaseCommand):
+    help = 'Runs the scheduled-announcement scheduler (leader-elected) in the foreground'
+
+    def handle(self, *args, **options):
+        scheduler = AnnouncementScheduler()
+        self.stdout.write("Announcement scheduler running (Ctrl+C to stop)")
+
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping announcement scheduler...")
+        finally:
+            scheduler.running = False
+            if scheduler.listener:
+                scheduler.listener.close()
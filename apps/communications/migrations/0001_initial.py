@@ -0,0 +1,194 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Admin',
+            fields=[
+                ('admin_id', models.AutoField(db_column='admin_id', primary_key=True, serialize=False)),
+                ('fullname', models.CharField(blank=True, max_length=100, null=True)),
+                ('position', models.CharField(blank=True, max_length=50, null=True)),
+                ('gender', models.CharField(blank=True, max_length=10, null=True)),
+                ('mobile_number', models.CharField(blank=True, db_column='mobile_number', max_length=20, null=True)),
+                ('email', models.EmailField(blank=True, max_length=100, null=True, unique=True)),
+            ],
+            options={
+                'db_table': 'admin',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Announcement',
+            fields=[
+                ('announcement_id', models.AutoField(db_column='announcement_id', primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('status_classification', models.CharField(choices=[('sent', 'Sent'), ('draft', 'Draft'), ('scheduled', 'Scheduled')], db_column='status_classification', default='draft', max_length=20)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('type', models.CharField(blank=True, max_length=10, null=True)),
+                ('attachment', models.BinaryField(blank=True, null=True)),
+                ('attachment_filename', models.CharField(blank=True, db_column='attachment_filename', max_length=255, null=True)),
+                ('attachment_content_type', models.CharField(blank=True, db_column='attachment_content_type', max_length=255, null=True)),
+                ('attachment_size', models.BigIntegerField(blank=True, db_column='attachment_size', null=True)),
+                ('sent_at', models.DateTimeField(blank=True, db_column='sent_at', null=True)),
+                ('scope', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+            ],
+            options={
+                'db_table': 'announcements',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementAttachment',
+            fields=[
+                ('attachment_id', models.AutoField(db_column='attachment_id', primary_key=True, serialize=False)),
+                ('filename', models.CharField(db_column='filename', max_length=255)),
+                ('original_filename', models.CharField(db_column='original_filename', max_length=255)),
+                ('content_type', models.CharField(db_column='content_type', max_length=100)),
+                ('file_size', models.BigIntegerField(db_column='file_size')),
+                ('file_data', models.BinaryField(db_column='file_data')),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True, db_column='uploaded_at')),
+                ('display_order', models.IntegerField(db_column='display_order', default=0)),
+            ],
+            options={
+                'db_table': 'announcement_attachments',
+                'ordering': ['display_order', 'attachment_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Cooperative',
+            fields=[
+                ('coop_id', models.AutoField(db_column='coop_id', primary_key=True, serialize=False)),
+                ('cooperative_name', models.CharField(db_column='cooperative_name', max_length=200, unique=True)),
+                ('category', models.CharField(blank=True, db_column='category', max_length=255, null=True)),
+                ('district', models.CharField(blank=True, db_column='district', max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+            ],
+            options={
+                'db_table': 'cooperatives',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Message',
+            fields=[
+                ('message_id', models.AutoField(db_column='message_id', primary_key=True, serialize=False)),
+                ('message', models.TextField()),
+                ('attachment', models.BinaryField(blank=True, db_column='attachment', null=True)),
+                ('attachment_filename', models.CharField(blank=True, db_column='attachment_filename', max_length=255, null=True)),
+                ('attachment_content_type', models.CharField(blank=True, db_column='attachment_content_type', max_length=255, null=True)),
+                ('attachment_size', models.BigIntegerField(blank=True, db_column='attachment_size', null=True)),
+                ('sent_at', models.DateTimeField(auto_now_add=True, db_column='sent_at')),
+            ],
+            options={
+                'db_table': 'messages',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Officer',
+            fields=[
+                ('officer_id', models.AutoField(db_column='officer_id', primary_key=True, serialize=False)),
+                ('fullname', models.CharField(blank=True, max_length=100, null=True)),
+                ('position', models.CharField(blank=True, max_length=50, null=True)),
+                ('gender', models.CharField(blank=True, max_length=10, null=True)),
+                ('mobile_number', models.CharField(blank=True, db_column='mobile_number', max_length=20, null=True)),
+                ('email', models.EmailField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+            ],
+            options={
+                'db_table': 'officers',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Staff',
+            fields=[
+                ('staff_id', models.AutoField(db_column='staff_id', primary_key=True, serialize=False)),
+                ('fullname', models.CharField(blank=True, max_length=100, null=True)),
+                ('position', models.CharField(blank=True, max_length=50, null=True)),
+                ('gender', models.CharField(blank=True, max_length=10, null=True)),
+                ('mobile_number', models.CharField(blank=True, db_column='mobile_number', max_length=20, null=True)),
+                ('email', models.EmailField(blank=True, max_length=100, null=True, unique=True)),
+            ],
+            options={
+                'db_table': 'staff',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementOfficerRecipient',
+            fields=[
+                ('announcement', models.OneToOneField(db_column='announcement_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='communications.announcement')),
+            ],
+            options={
+                'db_table': 'announcement_officer_recipients',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementRecipient',
+            fields=[
+                ('announcement', models.OneToOneField(db_column='announcement_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='communications.announcement')),
+            ],
+            options={
+                'db_table': 'announcement_recipients',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MessageRecipient',
+            fields=[
+                ('message', models.ForeignKey(db_column='message_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='communications.message')),
+                ('received_at', models.DateTimeField(blank=True, db_column='received_at', null=True)),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('delivered', 'Delivered'), ('seen', 'Seen')], db_column='status', default='sent', max_length=20)),
+                ('seen_at', models.DateTimeField(blank=True, db_column='seen_at', null=True)),
+            ],
+            options={
+                'db_table': 'message_recipients',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementDeliveryJob',
+            fields=[
+                ('job_id', models.AutoField(db_column='job_id', primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('e-mail', 'E-mail')], db_column='channel', max_length=10)),
+                ('content', models.TextField(db_column='content')),
+                ('idempotency_key', models.CharField(db_column='idempotency_key', max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('dead', 'Dead')], db_column='status', default='pending', max_length=20)),
+                ('attempts', models.IntegerField(db_column='attempts', default=0)),
+                ('max_attempts', models.IntegerField(db_column='max_attempts', default=5)),
+                ('next_attempt_at', models.DateTimeField(db_column='next_attempt_at')),
+                ('locked_by', models.CharField(blank=True, db_column='locked_by', max_length=100, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, db_column='locked_at', null=True)),
+                ('last_error', models.TextField(blank=True, db_column='last_error', null=True)),
+                ('result_message', models.TextField(blank=True, db_column='result_message', null=True)),
+                ('created_by_id', models.IntegerField(blank=True, db_column='created_by_id', null=True)),
+                ('created_by_role', models.CharField(blank=True, db_column='created_by_role', max_length=20, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+                ('completed_at', models.DateTimeField(blank=True, db_column='completed_at', null=True)),
+                ('announcement', models.ForeignKey(db_column='announcement_id', on_delete=django.db.models.deletion.CASCADE, related_name='delivery_jobs', to='communications.announcement')),
+            ],
+            options={
+                'db_table': 'announcement_delivery_jobs',
+                'ordering': ['next_attempt_at', 'job_id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='idx_ann_job_status_due')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnnouncementDelivery',
+            fields=[
+                ('delivery_id', models.AutoField(db_column='delivery_id', primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('e-mail', 'E-mail')], db_column='channel', max_length=10)),
+                ('officer_id', models.IntegerField(blank=True, db_column='officer_id', null=True)),
+                ('recipient_name', models.CharField(blank=True, db_column='recipient_name', max_length=100, null=True)),
+                ('coop_name', models.CharField(blank=True, db_column='coop_name', max_length=200, null=True)),
+                ('address', models.CharField(db_column='address', max_length=255)),
+                ('batch_number', models.IntegerField(blank=True, db_column='batch_number', null=True)),
+                ('provider_message_id', models.CharField(blank=True, db_column='provider_message_id', max_length=255, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], db_column='status', default='pending', max_length=20)),
+                ('attempts', models.IntegerField(db_column='attempts', default=0)),
+                ('last_error', models.TextField(blank=True, db_column='last_error', null=True)),
+                ('sent_at', models.DateTimeField(blank=True, db_column='sent_at', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_column='created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_column='updated_at')),
+                ('announcement', models.ForeignKey(db_column='announcement_id', on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='communications.announcement')),
+            ],
+            options={
+                'db_table': 'announcement_deliveries',
+                'ordering': ['delivery_id'],
+                'indexes': [models.Index(fields=['announcement', 'channel', 'status'], name='idx_ann_delivery_status')],
+                'unique_together': {('announcement', 'channel', 'address')},
+            },
+        ),
+    ]
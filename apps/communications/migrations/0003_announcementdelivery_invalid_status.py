@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('communications', '0002_announcementdelivery'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='announcementdelivery',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed'), ('invalid', 'Invalid address')], db_column='status', default='pending', max_length=20),
+        ),
+    ]
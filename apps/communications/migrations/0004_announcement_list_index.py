@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    announcements is an unmanaged table, so the index backing the keyset-paginated
+    list API (status, then newest updated_at first) is created with raw SQL.
+    """
+
+    dependencies = [
+        ('communications', '0003_announcementdelivery_invalid_status'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX IF NOT EXISTS idx_announcements_status_updated
+                ON announcements (status_classification, updated_at DESC, announcement_id DESC);
+            """,
+            reverse_sql="DROP INDEX IF EXISTS idx_announcements_status_updated;",
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Backing objects for the recipient directory API (apps/communications/recipient_directory.py):
+
+    - recipient_directory_version, a sequence advanced by triggers on cooperatives
+      and officers whenever a row is inserted, deleted, truncated, renamed or (for
+      officers) moved to another cooperative. It is the directory's ETag.
+    - prefix indexes on lower(name) for both tables, an officers (coop_id, fullname)
+      index for per-cooperative expansion and, when pg_trgm can be installed,
+      trigram indexes for fuzzy search.
+    """
+
+    dependencies = [
+        ('communications', '0004_announcement_list_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE SEQUENCE IF NOT EXISTS recipient_directory_version;
+
+                CREATE OR REPLACE FUNCTION bump_recipient_directory_version() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM nextval('recipient_directory_version');
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                DROP TRIGGER IF EXISTS trg_cooperatives_directory_change ON cooperatives;
+                CREATE TRIGGER trg_cooperatives_directory_change
+                    AFTER INSERT OR DELETE OR TRUNCATE ON cooperatives
+                    FOR EACH STATEMENT EXECUTE FUNCTION bump_recipient_directory_version();
+
+                DROP TRIGGER IF EXISTS trg_cooperatives_directory_rename ON cooperatives;
+                CREATE TRIGGER trg_cooperatives_directory_rename
+                    AFTER UPDATE OF cooperative_name ON cooperatives
+                    FOR EACH ROW WHEN (OLD.cooperative_name IS DISTINCT FROM NEW.cooperative_name)
+                    EXECUTE FUNCTION bump_recipient_directory_version();
+
+                DROP TRIGGER IF EXISTS trg_officers_directory_change ON officers;
+                CREATE TRIGGER trg_officers_directory_change
+                    AFTER INSERT OR DELETE OR TRUNCATE ON officers
+                    FOR EACH STATEMENT EXECUTE FUNCTION bump_recipient_directory_version();
+
+                DROP TRIGGER IF EXISTS trg_officers_directory_update ON officers;
+                CREATE TRIGGER trg_officers_directory_update
+                    AFTER UPDATE OF fullname, coop_id ON officers
+                    FOR EACH ROW WHEN (OLD.fullname IS DISTINCT FROM NEW.fullname
+                                       OR OLD.coop_id IS DISTINCT FROM NEW.coop_id)
+                    EXECUTE FUNCTION bump_recipient_directory_version();
+
+                CREATE INDEX IF NOT EXISTS idx_officers_coop_fullname ON officers (coop_id, fullname);
+                CREATE INDEX IF NOT EXISTS idx_officers_fullname_prefix
+                    ON officers (lower(fullname) text_pattern_ops);
+                CREATE INDEX IF NOT EXISTS idx_cooperatives_name_prefix
+                    ON cooperatives (lower(cooperative_name) text_pattern_ops);
+
+                -- pg_trgm needs CREATE privilege on the database; without it search
+                -- falls back to prefix/substring matching.
+                DO $$
+                BEGIN
+                    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+                    RAISE NOTICE 'pg_trgm unavailable; recipient search will not use trigrams';
+                END;
+                $$;
+
+                DO $$
+                BEGIN
+                    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+                        CREATE INDEX IF NOT EXISTS idx_officers_fullname_trgm
+                            ON officers USING gin (fullname gin_trgm_ops);
+                        CREATE INDEX IF NOT EXISTS idx_cooperatives_name_trgm
+                            ON cooperatives USING gin (cooperative_name gin_trgm_ops);
+                    END IF;
+                END;
+                $$;
+            """,
+            reverse_sql="""
+                DROP INDEX IF EXISTS idx_cooperatives_name_trgm;
+                DROP INDEX IF EXISTS idx_officers_fullname_trgm;
+                DROP INDEX IF EXISTS idx_cooperatives_name_prefix;
+                DROP INDEX IF EXISTS idx_officers_fullname_prefix;
+                DROP INDEX IF EXISTS idx_officers_coop_fullname;
+                DROP TRIGGER IF EXISTS trg_officers_directory_update ON officers;
+                DROP TRIGGER IF EXISTS trg_officers_directory_change ON officers;
+                DROP TRIGGER IF EXISTS trg_cooperatives_directory_rename ON cooperatives;
+                DROP TRIGGER IF EXISTS trg_cooperatives_directory_change ON cooperatives;
+                DROP FUNCTION IF EXISTS bump_recipient_directory_version();
+                DROP SEQUENCE IF EXISTS recipient_directory_version;
+            """,
+        ),
+    ]
@@ -337,6 +337,144 @@ class Announcement(models.Model):
             print(f"Database error in get_recipients_for_announcement: {e}")
             return {'coop_names': [], 'officer_names': []}
 
+    @classmethod
+    def count_by_status(cls):
+        """Number of announcements per status, e.g. {'sent': 120, 'draft': 4, 'scheduled': 2}."""
+        counts = {'sent': 0, 'draft': 0, 'scheduled': 0}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT status_classification::text, COUNT(*)
+                    FROM announcements
+                    GROUP BY status_classification
+                """)
+                for status, count in cursor.fetchall():
+                    counts[status] = count
+        except DatabaseError as e:
+            print(f"Database error in count_by_status: {e}")
+        return counts
+
+    @classmethod
+    def get_page(cls, status, limit=20, after=None, search=None, ann_type=None, date_from=None, date_to=None):
+        """
+        One page of announcements with a given status, newest first, with
+        recipient names aggregated in the same query.
+
+        Keyset pagination on (updated_at, announcement_id): pass the last row's
+        values as `after` to get the next page. `search` matches the title,
+        content, or any recipient cooperative/officer name (case-insensitive).
+        Dates filter on sent_at (updated_at for drafts).
+
+        Returns:
+            (rows: list of dicts like sp_get_announcements_by_statuses plus
+             'recipients_info', has_more: bool)
+        """
+        date_column = 'a.updated_at' if status == 'draft' else 'a.sent_at'
+        conditions = ["a.status_classification = %s"]
+        params = [status]
+
+        if after:
+            conditions.append("(a.updated_at, a.announcement_id) < (%s, %s)")
+            params.extend(after)
+        if ann_type:
+            conditions.append("a.type::text = %s")
+            params.append(ann_type)
+        if date_from:
+            conditions.append(f"{date_column}::date >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append(f"{date_column}::date <= %s")
+            params.append(date_to)
+        if search:
+            pattern = f"%{search}%"
+            conditions.append("""(
+                a.title ILIKE %s
+                OR a.description ILIKE %s
+                OR EXISTS (
+                    SELECT 1 FROM announcement_recipients ar
+                    JOIN cooperatives c ON ar.coop_id = c.coop_id
+                    WHERE ar.announcement_id = a.announcement_id AND c.cooperative_name ILIKE %s
+                )
+                OR EXISTS (
+                    SELECT 1 FROM announcement_officer_recipients aor
+                    JOIN officers o ON aor.officer_id = o.officer_id
+                    WHERE aor.announcement_id = a.announcement_id AND o.fullname ILIKE %s
+                )
+            )""")
+            params.extend([pattern] * 4)
+
+        params.append(limit + 1)
+
+        try:
+            with connection.cursor() as cursor:
+                # The page is picked first (index-ordered, LIMIT n+1), then only
+                # those rows get their creator, attachment count and recipients.
+                cursor.execute(f"""
+                    WITH page AS (
+                        SELECT a.*
+                        FROM announcements a
+                        WHERE {' AND '.join(conditions)}
+                        ORDER BY a.updated_at DESC, a.announcement_id DESC
+                        LIMIT %s
+                    )
+                    SELECT
+                        a.announcement_id,
+                        a.title,
+                        a.description,
+                        a.type,
+                        a.status_classification,
+                        a.scope,
+                        a.sent_at,
+                        a.created_at,
+                        a.updated_at,
+                        COALESCE(s.fullname, adm.fullname, 'Unknown') AS creator_name,
+                        COALESCE(att.attachment_count, 0) AS attachment_count,
+                        CASE WHEN a.attachment_filename IS NOT NULL
+                            THEN array_length(string_to_array(a.attachment_filename, ';'), 1)
+                            ELSE 0 END AS legacy_attachment_count,
+                        COALESCE(rc.coop_names, '[]'::json) AS coop_names,
+                        COALESCE(ro.officer_names, '[]'::json) AS officer_names
+                    FROM page a
+                    LEFT JOIN staff s ON a.staff_id = s.staff_id
+                    LEFT JOIN admin adm ON a.admin_id = adm.admin_id
+                    LEFT JOIN LATERAL (
+                        SELECT COUNT(*) AS attachment_count
+                        FROM announcement_attachments aa
+                        WHERE aa.announcement_id = a.announcement_id
+                    ) att ON TRUE
+                    LEFT JOIN LATERAL (
+                        SELECT json_agg(DISTINCT c.cooperative_name) AS coop_names
+                        FROM announcement_recipients ar
+                        JOIN cooperatives c ON ar.coop_id = c.coop_id
+                        WHERE ar.announcement_id = a.announcement_id
+                    ) rc ON TRUE
+                    LEFT JOIN LATERAL (
+                        SELECT json_agg(DISTINCT o.fullname) FILTER (WHERE o.fullname IS NOT NULL) AS officer_names
+                        FROM announcement_officer_recipients aor
+                        JOIN officers o ON aor.officer_id = o.officer_id
+                        WHERE aor.announcement_id = a.announcement_id
+                    ) ro ON TRUE
+                    ORDER BY a.updated_at DESC, a.announcement_id DESC
+                """, params)
+                columns = [col[0] for col in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except DatabaseError as e:
+            print(f"Database error in get_page: {e}")
+            return [], False
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        for row in rows:
+            # Attachment table first, deprecated single-blob column as fallback
+            legacy_count = row.pop('legacy_attachment_count')
+            row['attachment_count'] = row['attachment_count'] or legacy_count or 0
+            row['has_attachment'] = row['attachment_count'] > 0
+            row['recipients_info'] = {
+                'coop_names': row.pop('coop_names') or [],
+                'officer_names': row.pop('officer_names') or [],
+            }
+        return rows, has_more
+
 # ======================================================
 # 10.1) ANNOUNCEMENT RECIPIENTS
 # ======================================================
@@ -406,4 +544,136 @@ class AnnouncementAttachment(models.Model):
         ]
     
     def __str__(self):
-        return f"{self.original_filename} ({self.announcement.title})"
\ No newline at end of file
+        return f"{self.original_filename} ({self.announcement.title})"
+
+# ======================================================
+# 11) ANNOUNCEMENT DELIVERY JOBS (QUEUE)
+# ======================================================
+class AnnouncementDeliveryJob(models.Model):
+    """
+    Durable queue entry for sending an announcement over SMS or e-mail.
+    Jobs are claimed by the process_announcement_jobs worker command.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_DEAD = 'dead'
+
+    job_id = models.AutoField(primary_key=True, db_column='job_id')
+    announcement = models.ForeignKey(
+        Announcement,
+        on_delete=models.CASCADE,
+        db_column='announcement_id',
+        related_name='delivery_jobs'
+    )
+    channel = models.CharField(
+        max_length=10,
+        choices=[('sms', 'SMS'), ('e-mail', 'E-mail')],
+        db_column='channel'
+    )
+    content = models.TextField(db_column='content')
+    idempotency_key = models.CharField(max_length=100, unique=True, db_column='idempotency_key')
+
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDING, 'Pending'),
+            (STATUS_RUNNING, 'Running'),
+            (STATUS_SUCCEEDED, 'Succeeded'),
+            (STATUS_DEAD, 'Dead'),
+        ],
+        default=STATUS_PENDING,
+        db_column='status'
+    )
+    attempts = models.IntegerField(default=0, db_column='attempts')
+    max_attempts = models.IntegerField(default=5, db_column='max_attempts')
+    next_attempt_at = models.DateTimeField(db_column='next_attempt_at')
+    locked_by = models.CharField(max_length=100, blank=True, null=True, db_column='locked_by')
+    locked_at = models.DateTimeField(blank=True, null=True, db_column='locked_at')
+    last_error = models.TextField(blank=True, null=True, db_column='last_error')
+    result_message = models.TextField(blank=True, null=True, db_column='result_message')
+
+    # Who queued the send (used for activity logging once delivered)
+    created_by_id = models.IntegerField(blank=True, null=True, db_column='created_by_id')
+    created_by_role = models.CharField(max_length=20, blank=True, null=True, db_column='created_by_role')
+
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+    completed_at = models.DateTimeField(blank=True, null=True, db_column='completed_at')
+
+    class Meta:
+        db_table = 'announcement_delivery_jobs'
+        ordering = ['next_attempt_at', 'job_id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='idx_ann_job_status_due'),
+        ]
+
+    def __str__(self):
+        return f"Delivery job {self.job_id} ({self.channel}) for announcement {self.announcement_id}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_DEAD)
+
+
+# ======================================================
+# 12) ANNOUNCEMENT DELIVERIES (PER-RECIPIENT LEDGER)
+# ======================================================
+class AnnouncementDelivery(models.Model):
+    """
+    One row per recipient address of an announcement send.
+    The recipient list is snapshotted once when the send starts; retries only
+    touch pending/failed rows and the delivery report reads straight from here.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_INVALID = 'invalid'  # Address cannot be delivered to (e.g. malformed mobile number)
+
+    delivery_id = models.AutoField(primary_key=True, db_column='delivery_id')
+    announcement = models.ForeignKey(
+        Announcement,
+        on_delete=models.CASCADE,
+        db_column='announcement_id',
+        related_name='deliveries'
+    )
+    channel = models.CharField(
+        max_length=10,
+        choices=[('sms', 'SMS'), ('e-mail', 'E-mail')],
+        db_column='channel'
+    )
+    # Snapshot of the officer at send time (not a FK so history survives officer edits/deletes)
+    officer_id = models.IntegerField(blank=True, null=True, db_column='officer_id')
+    recipient_name = models.CharField(max_length=100, blank=True, null=True, db_column='recipient_name')
+    coop_name = models.CharField(max_length=200, blank=True, null=True, db_column='coop_name')
+    address = models.CharField(max_length=255, db_column='address')
+
+    batch_number = models.IntegerField(blank=True, null=True, db_column='batch_number')
+    provider_message_id = models.CharField(max_length=255, blank=True, null=True, db_column='provider_message_id')
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDING, 'Pending'),
+            (STATUS_SENT, 'Sent'),
+            (STATUS_FAILED, 'Failed'),
+            (STATUS_INVALID, 'Invalid address'),
+        ],
+        default=STATUS_PENDING,
+        db_column='status'
+    )
+    attempts = models.IntegerField(default=0, db_column='attempts')
+    last_error = models.TextField(blank=True, null=True, db_column='last_error')
+    sent_at = models.DateTimeField(blank=True, null=True, db_column='sent_at')
+    created_at = models.DateTimeField(auto_now_add=True, db_column='created_at')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    class Meta:
+        db_table = 'announcement_deliveries'
+        ordering = ['delivery_id']
+        unique_together = (('announcement', 'channel', 'address'),)
+        indexes = [
+            models.Index(fields=['announcement', 'channel', 'status'], name='idx_ann_delivery_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.address} ({self.status})"
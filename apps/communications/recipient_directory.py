@@ -0,0 +1,169 @@
+"""
+Recipient directory for the announcement composer (cooperatives and their officers).
+
+The composer no longer receives every cooperative and officer inline. It loads
+the cooperative list once, expands a cooperative's officers when that
+cooperative is picked, and searches names through the API.
+
+Every response carries the directory version: a Postgres sequence that
+triggers on `cooperatives` and `officers` advance whenever a row is added,
+removed or renamed, or an officer moves to another cooperative (migration
+0005). Views use it as the ETag, so unchanged lists are answered with
+304 Not Modified. Server-side caches are keyed by it, so they never need
+explicit invalidation.
+"""
+import logging
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
+
+VERSION_SEQUENCE = 'recipient_directory_version'
+CACHE_TIMEOUT = 60 * 60
+SEARCH_LIMIT = 20
+# Below this similarity a trigram match is noise for short names
+MIN_SIMILARITY = 0.2
+
+_trigram_available = None
+
+
+def get_directory_version():
+    """Current directory version; changes only when cooperatives or officers change."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT last_value, is_called FROM {VERSION_SEQUENCE}")
+        last_value, is_called = cursor.fetchone()
+    return last_value if is_called else 0
+
+
+def trigram_available():
+    """Whether pg_trgm is installed (migration 0005 installs it when permitted)."""
+    global _trigram_available
+    if _trigram_available is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigram_available = cursor.fetchone()[0]
+    return _trigram_available
+
+
+def list_cooperatives(version=None):
+    """
+    Cooperatives that have at least one officer, ordered by name.
+
+    Returns a list of {'id', 'name', 'officer_count'} dicts, cached per version.
+    """
+    version = get_directory_version() if version is None else version
+
+    def _load():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.coop_id, c.cooperative_name, COUNT(*) AS officer_count
+                FROM cooperatives c
+                JOIN officers o ON o.coop_id = c.coop_id
+                GROUP BY c.coop_id, c.cooperative_name
+                ORDER BY c.cooperative_name
+            """)
+            return [
+                {'id': coop_id, 'name': name, 'officer_count': officer_count}
+                for coop_id, name, officer_count in cursor.fetchall()
+            ]
+
+    return cache.get_or_set(f'recipient_directory:coops:{version}', _load, CACHE_TIMEOUT)
+
+
+def get_officers_by_coop(coop_ids):
+    """
+    Officers of the given cooperatives, ordered by name.
+
+    Returns {coop_id: [{'id', 'name'}, ...]}; cooperatives without officers are omitted.
+    """
+    if not coop_ids:
+        return {}
+
+    officers_by_coop = {}
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT o.coop_id, o.officer_id, o.fullname
+            FROM officers o
+            WHERE o.coop_id = ANY(%s)
+            ORDER BY o.coop_id, o.fullname, o.officer_id
+        """, [list(coop_ids)])
+        for coop_id, officer_id, fullname in cursor.fetchall():
+            officers_by_coop.setdefault(coop_id, []).append({'id': officer_id, 'name': fullname})
+    return officers_by_coop
+
+
+def _like_prefix(term):
+    """Escape LIKE wildcards in a user-supplied term and turn it into a prefix pattern."""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{escaped.lower()}%"
+
+
+def search_directory(term, limit=SEARCH_LIMIT):
+    """
+    Search cooperative and officer names.
+
+    Names starting with the term, or with a word starting with it, rank first.
+    Trigram similarity (when pg_trgm is installed) then catches typos and
+    partial matches. Returns {'cooperatives': [...], 'officers': [...]}, at
+    most `limit` of each.
+    """
+    prefix = _like_prefix(term)
+    word_prefix = f"% {prefix}"
+    use_trigram = trigram_available()
+
+    if use_trigram:
+        fuzzy_match = "OR (name %% %s AND similarity(name, %s) >= %s)"
+        fuzzy_score = "similarity(name, %s)"
+        fuzzy_params = [term, term, MIN_SIMILARITY]
+    else:
+        fuzzy_match = "OR lower(name) LIKE %s"
+        fuzzy_score = "0"
+        fuzzy_params = [f"%{prefix}"]
+
+    ranking = f"""
+        WHERE lower(name) LIKE %s OR lower(name) LIKE %s {fuzzy_match}
+        ORDER BY (lower(name) LIKE %s) DESC, (lower(name) LIKE %s) DESC,
+                 {fuzzy_score} DESC, name
+        LIMIT %s
+    """
+    ranking_params = [prefix, word_prefix, *fuzzy_params, prefix, word_prefix]
+    if use_trigram:
+        ranking_params.append(term)
+    ranking_params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT coop_id, name FROM (
+                SELECT c.coop_id, c.cooperative_name AS name
+                FROM cooperatives c
+                WHERE EXISTS (SELECT 1 FROM officers o WHERE o.coop_id = c.coop_id)
+            ) coops
+            {ranking}
+        """, ranking_params)
+        cooperatives = [{'id': coop_id, 'name': name} for coop_id, name in cursor.fetchall()]
+
+        cursor.execute(f"""
+            SELECT officer_id, name, coop_id, cooperative_name FROM (
+                SELECT o.officer_id, o.fullname AS name, o.coop_id, c.cooperative_name
+                FROM officers o
+                JOIN cooperatives c ON c.coop_id = o.coop_id
+                WHERE o.fullname IS NOT NULL
+            ) officers
+            {ranking}
+        """, ranking_params)
+        officers = [
+            {'id': officer_id, 'name': name, 'coop_id': coop_id, 'coop_name': coop_name}
+            for officer_id, name, coop_id, coop_name in cursor.fetchall()
+        ]
+
+    return {'cooperatives': cooperatives, 'officers': officers}
+
+
+def safe_directory_version():
+    """Directory version for ETags, or None if it cannot be read (no ETag is sent then)."""
+    try:
+        return get_directory_version()
+    except DatabaseError as e:
+        logger.warning(f"Could not read recipient directory version: {e}")
+        return None
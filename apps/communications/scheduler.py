@@ -1,143 +1,222 @@
 """
-Automatic scheduler for sending scheduled announcements and checking yearly profile updates.
-This runs in the background as long as the Django server is running.
+Automatic scheduler for sending scheduled announcements, checking yearly profile updates and purging expired OCR scans.
+
+Any number of processes may run it (a thread in each web worker, or the
+standalone `run_announcement_scheduler` command); only the one holding the
+Postgres advisory lock acts as leader. The leader:
+
+- claims due announcements atomically (UPDATE ... WHERE ... FOR UPDATE SKIP LOCKED)
+  and queues them on the delivery queue in the same transaction,
+- sleeps until the next scheduled sent_at instead of polling every minute,
+- wakes early when a NOTIFY on announcement_schedule_changed says a schedule changed.
 """
 import threading
 import time
+from datetime import timedelta
+from django.conf import settings
 from django.utils import timezone
-from django.db import connection
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Min
 from apps.communications.models import Announcement
-from apps.core.services.sms_service import SmsService
+from apps.communications.db_events import SCHEDULE_CHANGED, Listener
+from apps.communications.delivery_queue import AlreadyDelivered, enqueue_announcement_delivery
 import logging
 
 logger = logging.getLogger(__name__)
 
+# pg_try_advisory_lock key shared by every scheduler process ('KOOP' as an int)
+SCHEDULER_LOCK_KEY = 0x4B4F4F50
+
+DEFAULTS = {
+    'AUTOSTART': True,
+    'MAX_SLEEP_SECONDS': 300,
+    'LEADER_RETRY_SECONDS': 30,
+    'PROFILE_CHECK_HOURS': 24,
+    'OCR_PURGE_MINUTES': 60,
+}
+
+SUPPORTED_CHANNELS = ('sms', 'e-mail')
+
+
+def get_scheduler_setting(name):
+    """Read a value from settings.ANNOUNCEMENT_SCHEDULER, falling back to DEFAULTS."""
+    return getattr(settings, 'ANNOUNCEMENT_SCHEDULER', {}).get(name, DEFAULTS[name])
+
+
+def claim_due_announcements(now=None):
+    """
+    Flip every due scheduled announcement to 'sent' and queue its delivery job,
+    in one transaction. Rows another claimer already holds are skipped, so
+    concurrent schedulers (or a cron run of send_scheduled_announcements)
+    never queue the same announcement twice.
+
+    Returns:
+        List of (announcement_id, channel, job) for the announcements claimed.
+    """
+    now = now or timezone.now()
+    claimed = []
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE announcements
+                SET status_classification = 'sent', updated_at = NOW()
+                WHERE announcement_id IN (
+                    SELECT announcement_id
+                    FROM announcements
+                    WHERE status_classification = 'scheduled' AND sent_at <= %s
+                    ORDER BY sent_at
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING announcement_id, type, title, description
+            """, [now])
+            rows = cursor.fetchall()
+
+        for announcement_id, channel, title, description in rows:
+            if channel not in SUPPORTED_CHANNELS:
+                logger.warning(f"Scheduled announcement {announcement_id} has unsupported type {channel!r}; not queued")
+                continue
+
+            try:
+                job, _ = enqueue_announcement_delivery(
+                    announcement_id=announcement_id,
+                    channel=channel,
+                    content=description or ''
+                )
+            except AlreadyDelivered as e:
+                logger.warning(f"Scheduled announcement {announcement_id} not queued: {e}")
+                continue
+            claimed.append((announcement_id, channel, job))
+            logger.info(f"Queued scheduled announcement: {title} (ID: {announcement_id}, job {job.job_id})")
+
+    return claimed
+
+
+def get_next_due_time():
+    """sent_at of the earliest announcement still waiting to go out, or None."""
+    return Announcement.objects.filter(
+        status_classification='scheduled'
+    ).aggregate(next_due=Min('sent_at'))['next_due']
+
+
+def seconds_until(next_due, now, maximum):
+    """
+    How long the leader may sleep: until next_due, at most `maximum`.
+    An overdue row that could not be claimed (held by another claimer)
+    is retried after a second rather than in a tight loop.
+    """
+    if next_due is None:
+        return maximum
+    delay = (next_due - now).total_seconds()
+    if delay <= 0:
+        return 1.0
+    return min(delay, maximum)
+
 
 class AnnouncementScheduler:
-    """Background scheduler that checks and sends scheduled announcements every minute."""
-    
+    """Leader-elected scheduler that queues scheduled announcements at their due time."""
+
     def __init__(self):
         self.running = False
         self.thread = None
-    
+        self.is_leader = False
+        self.listener = None
+        self.next_profile_check = None
+        self.next_ocr_purge = None
+
     def start(self):
-        """Start the background scheduler thread."""
+        """Start the scheduler in a background daemon thread."""
         if self.running:
             return
-        
+
         self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread = threading.Thread(target=self.run_forever, daemon=True, name='announcement-scheduler')
         self.thread.start()
         logger.info("Announcement scheduler started")
-    
+
     def stop(self):
-        """Stop the background scheduler thread."""
+        """Stop the scheduler loop (and release leadership)."""
         self.running = False
         if self.thread:
             self.thread.join(timeout=5)
+        if self.listener:
+            self.listener.close()
+        self.is_leader = False
         logger.info("Announcement scheduler stopped")
-    
-    def _run(self):
-        """Main scheduler loop - runs every minute."""
-        # Track last profile check time (check once per day)
-        last_profile_check = None
-        
+
+    def run_forever(self):
+        """Main loop: wait for leadership, then claim due announcements and sleep until the next one."""
+        self.running = True
+        self.listener = Listener(SCHEDULE_CHANGED)
+
         while self.running:
             try:
-                self._check_and_send_scheduled()
-                
-                # Check for yearly profile updates once per day
-                # Check at midnight (00:00) or if 24 hours have passed
-                now = timezone.now()
-                should_check_profiles = False
-                
-                if last_profile_check is None:
-                    # First run - check immediately
-                    should_check_profiles = True
-                    last_profile_check = now
-                else:
-                    # Check if 24 hours have passed
-                    hours_since_check = (now - last_profile_check).total_seconds() / 3600
-                    if hours_since_check >= 24:
-                        should_check_profiles = True
-                        last_profile_check = now
-                
-                if should_check_profiles:
-                    try:
-                        from apps.cooperatives.signals import check_and_notify_yearly_profile_updates
-                        notified_count = check_and_notify_yearly_profile_updates()
-                        if notified_count > 0:
-                            logger.info(f"Yearly profile update check: Notified {notified_count} cooperatives")
-                    except Exception as e:
-                        logger.error(f"Error checking yearly profile updates: {str(e)}")
-                        
+                if not self._ensure_leadership():
+                    time.sleep(get_scheduler_setting('LEADER_RETRY_SECONDS'))
+                    continue
+
+                close_old_connections()
+                self.run_once()
+                self.listener.wait(self._sleep_seconds())
+
             except Exception as e:
                 logger.error(f"Error in scheduler: {str(e)}")
-            
-            # Sleep for 60 seconds (check every minute)
-            time.sleep(60)
-    
-    def _check_and_send_scheduled(self):
-        """Check for scheduled announcements that are due and send them."""
-        try:
-            # Close old database connections to avoid "connection already closed" errors
-            connection.close()
-            
-            now = timezone.now()
-            
-            # Find scheduled announcements that are due
-            scheduled_announcements = Announcement.objects.filter(
-                status_classification='scheduled',
-                sent_at__lte=now
-            )
-            
-            for announcement in scheduled_announcements:
-                try:
-                    logger.info(f"Processing scheduled announcement: {announcement.title} (ID: {announcement.announcement_id})")
-                    
-                    # Send based on type
-                    if announcement.type == 'sms':
-                        sms_service = SmsService()
-                        success, message = sms_service.send_bulk_announcement(
-                            announcement.announcement_id,
-                            announcement.description
-                        )
-                        
-                        if success:
-                            # Update status to sent
-                            announcement.status_classification = 'sent'
-                            announcement.save()
-                            logger.info(f"✓ Sent SMS announcement: {announcement.title}")
-                        else:
-                            # Log technical error for admins
-                            logger.error(f"✗ Failed to send SMS announcement: {announcement.title} - Technical Error: {message}")
-                            # Could store user-friendly message for future UI display
-                            logger.warning(f"User-friendly message: SMS service temporarily unavailable. Contact support for assistance.")
-                    
-                    elif announcement.type == 'e-mail':
-                        from apps.core.services.email_service import EmailService
-                        email_service = EmailService()
-                        success, message = email_service.send_bulk_announcement(
-                            announcement.announcement_id,
-                            announcement.description
-                        )
-                        
-                        if success:
-                            # Update status to sent
-                            announcement.status_classification = 'sent'
-                            announcement.save()
-                            logger.info(f"✓ Sent Email announcement: {announcement.title}")
-                        else:
-                            # Log technical error for admins
-                            logger.error(f"✗ Failed to send Email announcement: {announcement.title} - Technical Error: {message}")
-                            # Could store user-friendly message for future UI display
-                            logger.warning(f"User-friendly message: Email service temporarily unavailable. Contact support for assistance.")
-                
-                except Exception as e:
-                    logger.error(f"Error processing announcement {announcement.announcement_id}: {str(e)}")
-        
-        except Exception as e:
-            logger.error(f"Error checking scheduled announcements: {str(e)}")
+                # The listener connection (and with it the advisory lock) may be gone
+                self.listener.close()
+                self.is_leader = False
+                time.sleep(5)
+
+        self.listener.close()
+
+    def _ensure_leadership(self):
+        """Acquire (or confirm we still hold) the scheduler advisory lock."""
+        if self.is_leader and self.listener.conn is not None and not self.listener.conn.closed:
+            return True
+
+        self.listener.close()
+        self.is_leader = self.listener.try_advisory_lock(SCHEDULER_LOCK_KEY)
+        if self.is_leader:
+            logger.info("This process is now the announcement scheduler leader")
+        else:
+            # Keep the connection closed while following so idle followers hold no slot
+            self.listener.close()
+        return self.is_leader
+
+    def run_once(self):
+        """Queue every due announcement, and run the profile-update check and OCR purge when they are due."""
+        claimed = claim_due_announcements()
+        if claimed:
+            logger.info(f"Queued {len(claimed)} scheduled announcement(s) for delivery")
+
+        now = timezone.now()
+        if self.next_profile_check is None or now >= self.next_profile_check:
+            self.next_profile_check = now + timedelta(hours=get_scheduler_setting('PROFILE_CHECK_HOURS'))
+            try:
+                from apps.cooperatives.signals import check_and_notify_yearly_profile_updates
+                notified_count = check_and_notify_yearly_profile_updates()
+                if notified_count > 0:
+                    logger.info(f"Yearly profile update check: Reminding {notified_count} cooperatives")
+            except Exception as e:
+                logger.error(f"Error checking yearly profile updates: {str(e)}")
+
+        if self.next_ocr_purge is None or now >= self.next_ocr_purge:
+            self.next_ocr_purge = now + timedelta(minutes=get_scheduler_setting('OCR_PURGE_MINUTES'))
+            try:
+                from apps.databank.ocr_cleanup import purge_expired_ocr_sessions
+                purge_expired_ocr_sessions()
+            except Exception as e:
+                logger.error(f"Error purging expired OCR sessions: {str(e)}")
+
+        return claimed
+
+    def _sleep_seconds(self):
+        """Sleep until the next due announcement, profile check or OCR purge, whichever is first."""
+        now = timezone.now()
+        delay = seconds_until(get_next_due_time(), now, get_scheduler_setting('MAX_SLEEP_SECONDS'))
+        for next_task in (self.next_profile_check, self.next_ocr_purge):
+            if next_task is not None:
+                delay = min(delay, max(0.0, (next_task - now).total_seconds()))
+        return delay
 
 
 # Global scheduler instance
@@ -153,7 +232,9 @@ def get_scheduler():
 
 
 def start_scheduler():
-    """Start the announcement scheduler."""
+    """Start the announcement scheduler thread, unless disabled with ANNOUNCEMENT_SCHEDULER['AUTOSTART']."""
+    if not get_scheduler_setting('AUTOSTART'):
+        return
     scheduler = get_scheduler()
     scheduler.start()
 
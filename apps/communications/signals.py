@@ -1,12 +1,13 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Message, MessageRecipient
-from apps.core.notification_utils import send_push_notification
+from apps.core.services.push_dispatcher import enqueue_push_notification
 
 def send_push_notification_for_message(message, receiver_user):
     """
-    Helper function to send push notification for a message.
-    Can be called from signals or directly from views.
+    Helper function to queue a push notification for a message.
+    Can be called from signals or directly from views; the push dispatcher
+    sends it once the current transaction commits.
     """
     try:
         # 1. Define the Notification Content
@@ -55,13 +56,17 @@ def send_push_notification_for_message(message, receiver_user):
         
         sender_name = get_fullname(message.sender)
 
-        # Use the centralized notification utility
-        return send_push_notification(
-            user=receiver_user,
+        # Hand off to the dispatcher; the request does not wait on the push services.
+        # A burst from the same sender is coalesced into one "N new messages" push.
+        enqueue_push_notification(
+            user_ids=[receiver_user.user_id],
             title=f"New message from {sender_name}",
             body=message_preview,
-            url="/communications/message/"
+            url="/communications/message/",
+            topic=f"message:{message.sender_id}",
+            digest_title=f"{{count}} new messages from {sender_name}",
         )
+        return True
                 
     except Exception as e:
         # Log error but don't stop the message from saving
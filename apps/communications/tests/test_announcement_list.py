@@ -0,0 +1,92 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.communications import views
+
+UPDATED = datetime(2026, 3, 2, 8, 30, 0, tzinfo=dt_timezone.utc)
+
+
+def make_row(announcement_id, status='sent'):
+    return {
+        'announcement_id': announcement_id,
+        'title': f'Announcement {announcement_id}',
+        'description': 'General assembly on Friday',
+        'type': 'sms',
+        'status_classification': status,
+        'scope': 'cooperative',
+        'creator_name': 'Staff One',
+        'sent_at': None if status == 'draft' else UPDATED,
+        'updated_at': UPDATED,
+        'has_attachment': False,
+        'attachment_count': 0,
+        'recipients_info': {'coop_names': ['Coop A'], 'officer_names': []},
+    }
+
+
+class CursorTest(SimpleTestCase):
+    def test_cursor_round_trips(self):
+        cursor = views._encode_announcement_cursor(make_row(42))
+        self.assertEqual(views._decode_announcement_cursor(cursor), (UPDATED, 42))
+
+    def test_malformed_cursor_is_rejected(self):
+        with self.assertRaises(ValueError):
+            views._decode_announcement_cursor('not-a-cursor')
+
+
+class AnnouncementListViewTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, role='staff', **params):
+        request = self.factory.get('/communications/api/announcement/list/', params)
+        request.session = {'user_id': 1, 'role': role}
+        response = views.get_announcement_list(request)
+        return response.status_code, json.loads(response.content)
+
+    @patch('apps.communications.views.Announcement.get_page')
+    def test_page_with_more_rows_returns_cursor(self, mock_page):
+        mock_page.return_value = ([make_row(9), make_row(8)], True)
+
+        status_code, body = self.get(status='sent', limit='2', q=' assembly ', type='sms')
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual([a['announcement_id'] for a in body['data']['announcements']], [9, 8])
+        self.assertEqual(views._decode_announcement_cursor(body['data']['next_cursor']), (UPDATED, 8))
+        self.assertTrue(body['data']['has_more'])
+        self.assertEqual(mock_page.call_args.kwargs['limit'], 2)
+        self.assertEqual(mock_page.call_args.kwargs['search'], 'assembly')
+
+    @patch('apps.communications.views.Announcement.get_page', return_value=([], False))
+    def test_cursor_and_dates_are_passed_through(self, mock_page):
+        cursor = views._encode_announcement_cursor(make_row(5))
+        status_code, body = self.get(status='draft', cursor=cursor, date_from='2026-03-01')
+
+        self.assertEqual(status_code, 200)
+        self.assertIsNone(body['data']['next_cursor'])
+        self.assertEqual(mock_page.call_args.kwargs['after'], (UPDATED, 5))
+        self.assertEqual(str(mock_page.call_args.kwargs['date_from']), '2026-03-01')
+
+    def test_limit_is_capped(self):
+        with patch('apps.communications.views.Announcement.get_page', return_value=([], False)) as mock_page:
+            self.get(status='sent', limit='5000')
+        self.assertEqual(mock_page.call_args.kwargs['limit'], views.ANNOUNCEMENT_MAX_PAGE_SIZE)
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({'status': 'archived'}, {'status': 'sent', 'cursor': '???'},
+                       {'status': 'sent', 'type': 'fax'}, {'status': 'sent', 'date_to': '03/02/2026'}):
+            status_code, body = self.get(**params)
+            self.assertEqual(status_code, 400, params)
+            self.assertEqual(body['status'], 'error')
+
+    def test_officers_are_not_allowed(self):
+        status_code, _ = self.get(role='officer', status='sent')
+        self.assertEqual(status_code, 403)
+
+    def test_draft_rows_are_dated_by_last_edit(self):
+        item = views._serialize_announcement_row(make_row(3, status='draft'))
+        self.assertIsNone(item['sent_at'])
+        self.assertTrue(item['date'])
+        self.assertEqual(item['recipients_info']['coop_names'], ['Coop A'])
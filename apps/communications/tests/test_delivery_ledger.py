@@ -0,0 +1,113 @@
+import json
+from unittest.mock import patch
+
+from django.test import RequestFactory, TestCase
+
+from apps.account_management.models import Admin, Users
+from apps.communications import delivery_ledger, views
+from apps.communications.models import Announcement, AnnouncementDelivery
+
+RECIPIENTS = [
+    (1, 'Ana Cruz', 'Lipa Coop', 'ana@example.com'),
+    (2, 'Ben Reyes', 'Lipa Coop', 'ben@example.com'),
+    (3, 'Cora Lim', 'Tanauan Coop', 'not-an-address'),
+]
+
+
+class DeliveryLedgerTest(TestCase):
+    """Runs against the database; needs the unmanaged schema (db/schema.sql) in the test database."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = Users.objects.create(username='ledger-admin', password_hash='x', role='admin')
+        admin = Admin.objects.create(user=user, fullname='Ledger Admin')
+        cls.announcement = Announcement.objects.create(title='General assembly', admin_id=admin.admin_id)
+
+    def snapshot(self, channel='e-mail', recipients=RECIPIENTS, refresh=False):
+        with patch.object(delivery_ledger, 'resolve_recipients', return_value=recipients) as resolve:
+            created = delivery_ledger.snapshot_recipients(self.announcement.announcement_id, channel, refresh=refresh)
+        return created, resolve
+
+    def deliveries(self, channel='e-mail'):
+        return {d.address: d for d in AnnouncementDelivery.objects.filter(
+            announcement=self.announcement, channel=channel)}
+
+    def outstanding(self, channel='e-mail'):
+        return [d.address for d in delivery_ledger.get_outstanding_deliveries(
+            self.announcement.announcement_id, channel)]
+
+    def test_snapshot_is_taken_once_per_channel(self):
+        created, _ = self.snapshot()
+        again, resolve = self.snapshot(recipients=RECIPIENTS + [(4, 'Dan', 'Lipa Coop', 'dan@example.com')])
+
+        self.assertEqual((created, again), (3, 0))
+        resolve.assert_not_called()
+        self.assertEqual(sorted(self.deliveries()), ['ana@example.com', 'ben@example.com', 'not-an-address'])
+        self.assertEqual(self.snapshot(channel='sms', recipients=RECIPIENTS[:1])[0], 1)
+
+    def test_refresh_adds_only_new_recipients(self):
+        self.snapshot()
+        rows = self.deliveries()
+        delivery_ledger.record_batch_result([rows['ana@example.com'].delivery_id], 1, True)
+
+        added, _ = self.snapshot(recipients=RECIPIENTS + [(4, 'Dan', 'Lipa Coop', 'dan@example.com')], refresh=True)
+
+        self.assertEqual(added, 1)
+        self.assertEqual(self.deliveries()['ana@example.com'].status, AnnouncementDelivery.STATUS_SENT)
+        self.assertEqual(self.outstanding(), ['ben@example.com', 'not-an-address', 'dan@example.com'])
+        self.assertEqual(self.snapshot(refresh=True)[0], 0)
+
+    def test_resume_sends_only_failed_and_pending_rows(self):
+        self.snapshot()
+        rows = self.deliveries()
+        delivery_ledger.record_batch_result([rows['ana@example.com'].delivery_id], 1, True, provider_message_id='m-1')
+        delivery_ledger.record_batch_result([rows['ben@example.com'].delivery_id], 1, False, error='timeout')
+
+        self.assertEqual(self.outstanding(), ['ben@example.com', 'not-an-address'])
+        rows = self.deliveries()
+        self.assertEqual((rows['ana@example.com'].status, rows['ana@example.com'].provider_message_id),
+                         (AnnouncementDelivery.STATUS_SENT, 'm-1'))
+        self.assertEqual((rows['ben@example.com'].attempts, rows['ben@example.com'].last_error), (1, 'timeout'))
+
+        delivery_ledger.record_batch_result([rows['ben@example.com'].delivery_id], 2, True, provider_message_id='m-2')
+        ben = self.deliveries()['ben@example.com']
+        self.assertEqual((ben.status, ben.attempts, ben.batch_number, ben.last_error),
+                         (AnnouncementDelivery.STATUS_SENT, 2, 2, None))
+
+    def test_invalid_rows_leave_the_outstanding_set(self):
+        self.snapshot()
+        invalid = self.deliveries()['not-an-address']
+
+        delivery_ledger.mark_invalid([invalid.delivery_id], 'Invalid e-mail address')
+
+        self.assertNotIn('not-an-address', self.outstanding())
+        invalid.refresh_from_db()
+        self.assertEqual((invalid.status, invalid.last_error),
+                         (AnnouncementDelivery.STATUS_INVALID, 'Invalid e-mail address'))
+
+    def test_summary_counts_rows_by_status(self):
+        self.snapshot()
+        self.snapshot(channel='sms', recipients=[(1, 'Ana Cruz', 'Lipa Coop', '09171234567')])
+        rows = self.deliveries()
+        delivery_ledger.record_batch_result([rows['ana@example.com'].delivery_id], 1, True)
+        delivery_ledger.record_batch_result([rows['ben@example.com'].delivery_id], 1, False, error='bounced')
+        delivery_ledger.mark_invalid([rows['not-an-address'].delivery_id], 'Invalid e-mail address')
+
+        announcement_id = self.announcement.announcement_id
+        self.assertEqual(delivery_ledger.get_delivery_summary(announcement_id, 'e-mail'),
+                         {'total': 3, 'pending': 0, 'sent': 1, 'failed': 1, 'invalid': 1})
+        self.assertEqual(delivery_ledger.get_delivery_summary(announcement_id)['total'], 4)
+        self.assertEqual(delivery_ledger.count_outstanding(announcement_id, 'sms'), 1)
+
+    def test_delivery_report_reads_the_ledger(self):
+        self.snapshot()
+        request = RequestFactory().get('/', {'status': 'pending'})
+        request.session = {'user_id': 1, 'role': 'admin'}
+
+        with patch.object(delivery_ledger, 'resolve_recipients') as resolve:
+            response = views.get_announcement_delivery_report(request, self.announcement.announcement_id)
+
+        resolve.assert_not_called()
+        data = json.loads(response.content)['data']
+        self.assertEqual(data['summary']['pending'], 3)
+        self.assertEqual([d['recipient_name'] for d in data['deliveries']], ['Ana Cruz', 'Ben Reyes', 'Cora Lim'])
@@ -0,0 +1,124 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.communications import delivery_queue
+from apps.communications.models import AnnouncementDeliveryJob
+
+
+class ComputeBackoffTest(SimpleTestCase):
+    def test_backoff_grows_exponentially(self):
+        with patch('apps.communications.delivery_queue.random.uniform', side_effect=lambda low, high: high):
+            delays = [delivery_queue.compute_backoff(n, base=30, maximum=3600) for n in range(1, 5)]
+        self.assertEqual(delays, [timedelta(seconds=s) for s in (30, 60, 120, 240)])
+
+    def test_backoff_is_capped(self):
+        delay = delivery_queue.compute_backoff(20, base=30, maximum=600)
+        self.assertLessEqual(delay, timedelta(seconds=600))
+        self.assertGreaterEqual(delay, timedelta(seconds=300))
+
+
+class ProcessJobTest(SimpleTestCase):
+    def make_job(self, attempts, max_attempts=3):
+        return SimpleNamespace(
+            pk=1, job_id=1, announcement_id=10, channel='sms', content='Hello',
+            attempts=attempts, max_attempts=max_attempts,
+            created_by_id=None, created_by_role=None,
+        )
+
+    @patch('apps.communications.delivery_queue.AnnouncementDeliveryJob.objects')
+    @patch('apps.communications.delivery_queue._send', return_value=(False, 'HTTP 503'))
+    def test_failure_schedules_retry(self, mock_send, mock_objects):
+        delivery_queue.process_job(self.make_job(attempts=1), 'worker-1')
+        fields = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual(fields['status'], AnnouncementDeliveryJob.STATUS_PENDING)
+        self.assertEqual(fields['last_error'], 'HTTP 503')
+        self.assertIn('next_attempt_at', fields)
+
+    @patch('apps.communications.delivery_queue.AnnouncementDeliveryJob.objects')
+    @patch('apps.communications.delivery_queue._send', return_value=(False, 'HTTP 503'))
+    def test_last_attempt_is_dead_lettered(self, mock_send, mock_objects):
+        delivery_queue.process_job(self.make_job(attempts=3), 'worker-1')
+        fields = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual(fields['status'], AnnouncementDeliveryJob.STATUS_DEAD)
+
+    @patch('apps.communications.delivery_queue.count_outstanding', return_value=0)
+    @patch('apps.communications.delivery_queue.AnnouncementDeliveryJob.objects')
+    @patch('apps.communications.delivery_queue._send', return_value=(True, 'SMS queued successfully.'))
+    def test_success_marks_job_succeeded(self, mock_send, mock_objects, mock_outstanding):
+        self.assertTrue(delivery_queue.process_job(self.make_job(attempts=1), 'worker-1'))
+        fields = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual(fields['status'], AnnouncementDeliveryJob.STATUS_SUCCEEDED)
+        mock_objects.filter.assert_called_with(
+            pk=1, status=AnnouncementDeliveryJob.STATUS_RUNNING, locked_by='worker-1'
+        )
+
+    @patch('apps.communications.delivery_queue.count_outstanding', return_value=7)
+    @patch('apps.communications.delivery_queue.AnnouncementDeliveryJob.objects')
+    @patch('apps.communications.delivery_queue._send', return_value=(True, 'Partially sent to 93/100 recipients'))
+    def test_partial_send_retries_outstanding_recipients(self, mock_send, mock_objects, mock_outstanding):
+        self.assertFalse(delivery_queue.process_job(self.make_job(attempts=1), 'worker-1'))
+        fields = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual(fields['status'], AnnouncementDeliveryJob.STATUS_PENDING)
+        self.assertIn('7 recipient(s) not yet delivered', fields['last_error'])
+
+    @patch('apps.communications.delivery_queue.count_outstanding', return_value=7)
+    @patch('apps.communications.delivery_queue.AnnouncementDeliveryJob.objects')
+    @patch('apps.communications.delivery_queue._send', return_value=(True, 'Partially sent to 93/100 recipients'))
+    def test_partial_send_on_last_attempt_is_kept(self, mock_send, mock_objects, mock_outstanding):
+        self.assertTrue(delivery_queue.process_job(self.make_job(attempts=3), 'worker-1'))
+        fields = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual(fields['status'], AnnouncementDeliveryJob.STATUS_SUCCEEDED)
+
+
+@patch('apps.communications.delivery_queue.transaction.atomic')
+@patch('apps.communications.delivery_queue.notify')
+@patch('apps.communications.delivery_queue.AnnouncementDeliveryJob.objects')
+class EnqueueTest(SimpleTestCase):
+    def enqueue(self, key=None):
+        return delivery_queue.enqueue_announcement_delivery(10, 'sms', 'Hello', idempotency_key=key)
+
+    def test_same_submit_key_returns_existing_job(self, mock_objects, mock_notify, mock_atomic):
+        job = SimpleNamespace(job_id=1, status=AnnouncementDeliveryJob.STATUS_SUCCEEDED)
+        mock_objects.get_or_create.return_value = (job, False)
+
+        self.assertEqual(self.enqueue('submit-1'), (job, False))
+        self.assertEqual(mock_objects.get_or_create.call_args.kwargs['idempotency_key'], 'submit-1')
+        mock_notify.assert_not_called()
+
+    @patch('apps.communications.delivery_queue.get_delivery_summary', return_value={'total': 0})
+    def test_re_send_without_key_queues_a_new_job(self, mock_summary, mock_objects, mock_notify, mock_atomic):
+        mock_objects.filter.return_value.exists.return_value = False
+        mock_objects.get_or_create.side_effect = lambda **kwargs: (SimpleNamespace(job_id=1), True)
+
+        self.enqueue()
+        self.enqueue()
+
+        keys = [call.kwargs['idempotency_key'] for call in mock_objects.get_or_create.call_args_list]
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertTrue(all(key.startswith('announcement-10-sms-') for key in keys))
+
+    @patch('apps.communications.delivery_queue.count_outstanding', return_value=0)
+    @patch('apps.communications.delivery_queue.snapshot_recipients', return_value=0)
+    @patch('apps.communications.delivery_queue.get_delivery_summary', return_value={'total': 3, 'sent': 3})
+    def test_re_send_delivered_to_everyone_is_rejected(self, mock_summary, mock_snapshot, mock_outstanding,
+                                                       mock_objects, mock_notify, mock_atomic):
+        mock_objects.filter.return_value.exists.return_value = False
+
+        with self.assertRaisesMessage(delivery_queue.AlreadyDelivered, 'all 3 recipient(s)'):
+            self.enqueue('submit-2')
+        mock_snapshot.assert_called_once_with(10, 'sms', refresh=True)
+        mock_objects.get_or_create.assert_not_called()
+
+    @patch('apps.communications.delivery_queue.snapshot_recipients', return_value=2)
+    @patch('apps.communications.delivery_queue.get_delivery_summary', return_value={'total': 3, 'sent': 3})
+    def test_re_send_goes_to_recipients_added_since(self, mock_summary, mock_snapshot,
+                                                   mock_objects, mock_notify, mock_atomic):
+        mock_objects.filter.return_value.exists.return_value = False
+        mock_objects.get_or_create.return_value = (SimpleNamespace(job_id=2), True)
+
+        self.assertEqual(self.enqueue('submit-2')[1], True)
+        mock_snapshot.assert_called_once_with(10, 'sms', refresh=True)
+        mock_notify.assert_called_once()
@@ -0,0 +1,126 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.communications import recipient_directory, views
+
+
+class FakeCursor:
+    """Records executed SQL and checks every %s placeholder has a parameter."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        params = params or []
+        placeholders = sql.replace('%%', '').count('%s')
+        assert placeholders == len(params), f"{placeholders} placeholders, {len(params)} params"
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows.pop(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class SearchDirectoryTest(SimpleTestCase):
+    def search(self, term, trigram):
+        cursor = FakeCursor([
+            [(3, 'Bagong Pag-asa MPC')],
+            [(11, 'Ana Bautista', 3, 'Bagong Pag-asa MPC')],
+        ])
+        with patch.object(recipient_directory, 'trigram_available', return_value=trigram), \
+                patch.object(recipient_directory, 'connection', MagicMock(**{'cursor.return_value': cursor})):
+            return recipient_directory.search_directory(term), cursor
+
+    def test_results_with_trigram_search(self):
+        result, cursor = self.search('Bag', trigram=True)
+        self.assertEqual(result['cooperatives'], [{'id': 3, 'name': 'Bagong Pag-asa MPC'}])
+        self.assertEqual(result['officers'][0]['coop_name'], 'Bagong Pag-asa MPC')
+        self.assertIn('similarity(name', cursor.executed[0][0])
+        self.assertEqual(cursor.executed[0][1][0], 'bag%')
+
+    def test_without_trigram_falls_back_to_substring(self):
+        _, cursor = self.search('Bag', trigram=False)
+        self.assertNotIn('similarity', cursor.executed[0][0])
+        self.assertIn('%bag%', cursor.executed[0][1])
+
+    def test_like_wildcards_in_term_are_escaped(self):
+        self.assertEqual(recipient_directory._like_prefix('50%_Co'), '50\\%\\_co%')
+
+
+class OfficersByCoopTest(SimpleTestCase):
+    def test_rows_are_grouped_by_cooperative(self):
+        cursor = FakeCursor([[(1, 10, 'Ana'), (1, 11, 'Ben'), (2, 20, 'Cora')]])
+        with patch.object(recipient_directory, 'connection', MagicMock(**{'cursor.return_value': cursor})):
+            result = recipient_directory.get_officers_by_coop([1, 2])
+        self.assertEqual(result, {1: [{'id': 10, 'name': 'Ana'}, {'id': 11, 'name': 'Ben'}],
+                                  2: [{'id': 20, 'name': 'Cora'}]})
+
+    def test_no_cooperatives_skips_the_query(self):
+        with patch.object(recipient_directory, 'connection') as mock_connection:
+            self.assertEqual(recipient_directory.get_officers_by_coop([]), {})
+        mock_connection.cursor.assert_not_called()
+
+
+@patch.object(recipient_directory, 'get_directory_version', return_value=7)
+@patch.object(recipient_directory, 'safe_directory_version', return_value=7)
+class RecipientDirectoryViewTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def get(self, view, path, role='staff', headers=None, **params):
+        request = self.factory.get(path, params, headers=headers or {})
+        request.session = {'user_id': 1, 'role': role}
+        return view(request)
+
+    @patch.object(recipient_directory, 'list_cooperatives',
+                  return_value=[{'id': 3, 'name': 'Bagong Pag-asa MPC', 'officer_count': 4}])
+    def test_directory_is_revalidated_with_etag(self, mock_list, mock_safe, mock_version):
+        response = self.get(views.get_recipient_directory, '/communications/api/recipients/')
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body['data']['cooperatives'][0]['officer_count'], 4)
+        self.assertEqual(body['data']['version'], 7)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        etag = response['ETag']
+        response = self.get(views.get_recipient_directory, '/communications/api/recipients/',
+                            headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        mock_list.assert_called_once()
+
+    def test_changed_version_returns_fresh_directory(self, mock_safe, mock_version):
+        with patch.object(recipient_directory, 'list_cooperatives', return_value=[]):
+            response = self.get(views.get_recipient_directory, '/communications/api/recipients/',
+                                headers={'If-None-Match': '"recipients-6"'})
+        self.assertEqual(response.status_code, 200)
+
+    @patch.object(recipient_directory, 'search_directory', return_value={'cooperatives': [], 'officers': []})
+    def test_query_searches_names(self, mock_search, mock_safe, mock_version):
+        self.get(views.get_recipient_directory, '/communications/api/recipients/', q='  ana ')
+        mock_search.assert_called_once_with('ana')
+
+    @patch.object(recipient_directory, 'get_officers_by_coop', return_value={3: [{'id': 11, 'name': 'Ana'}]})
+    def test_officers_are_expanded_per_cooperative(self, mock_officers, mock_safe, mock_version):
+        response = self.get(views.get_recipient_officers, '/communications/api/recipients/officers/',
+                            coop_ids='3,5,3')
+        self.assertEqual(json.loads(response.content)['data']['officers_by_coop'], {'3': [{'id': 11, 'name': 'Ana'}]})
+        mock_officers.assert_called_once_with([3, 5])
+
+    def test_bad_coop_ids_are_rejected(self, mock_safe, mock_version):
+        for coop_ids in ('', 'a,b'):
+            response = self.get(views.get_recipient_officers, '/communications/api/recipients/officers/',
+                                coop_ids=coop_ids)
+            self.assertEqual(response.status_code, 400, coop_ids)
+
+    def test_officers_cannot_browse_the_directory(self, mock_safe, mock_version):
+        response = self.get(views.get_recipient_directory, '/communications/api/recipients/', role='officer')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from apps.communications import scheduler
+from apps.communications.scheduler import AnnouncementScheduler, SCHEDULER_LOCK_KEY, seconds_until
+
+NOW = datetime(2026, 3, 2, 8, 0, 0, tzinfo=dt_timezone.utc)
+
+
+class SecondsUntilTest(SimpleTestCase):
+    def test_sleeps_until_next_due_time(self):
+        self.assertEqual(seconds_until(NOW + timedelta(seconds=42.5), NOW, 300), 42.5)
+
+    def test_sleep_is_capped(self):
+        self.assertEqual(seconds_until(NOW + timedelta(hours=3), NOW, 300), 300)
+
+    def test_nothing_scheduled_sleeps_the_maximum(self):
+        self.assertEqual(seconds_until(None, NOW, 300), 300)
+
+    def test_overdue_row_held_elsewhere_is_retried_shortly(self):
+        self.assertEqual(seconds_until(NOW - timedelta(seconds=5), NOW, 300), 1.0)
+
+
+class LeadershipTest(SimpleTestCase):
+    def make_scheduler(self, lock_result):
+        instance = AnnouncementScheduler()
+        instance.listener = MagicMock()
+        instance.listener.conn = SimpleNamespace(closed=0)
+        instance.listener.try_advisory_lock.return_value = lock_result
+        return instance
+
+    def test_follower_does_not_hold_a_connection(self):
+        instance = self.make_scheduler(lock_result=False)
+        self.assertFalse(instance._ensure_leadership())
+        instance.listener.try_advisory_lock.assert_called_once_with(SCHEDULER_LOCK_KEY)
+        self.assertEqual(instance.listener.close.call_count, 2)
+
+    def test_leader_keeps_lock_while_connection_is_open(self):
+        instance = self.make_scheduler(lock_result=True)
+        self.assertTrue(instance._ensure_leadership())
+        self.assertTrue(instance._ensure_leadership())
+        instance.listener.try_advisory_lock.assert_called_once()
+
+    def test_lost_connection_means_lost_leadership(self):
+        instance = self.make_scheduler(lock_result=True)
+        instance._ensure_leadership()
+        instance.listener.conn = SimpleNamespace(closed=1)
+        instance.listener.try_advisory_lock.return_value = False
+        self.assertFalse(instance._ensure_leadership())
+
+
+class SleepPlanningTest(SimpleTestCase):
+    @patch('apps.communications.scheduler.timezone.now', return_value=NOW)
+    @patch('apps.communications.scheduler.get_next_due_time', return_value=NOW + timedelta(seconds=90))
+    def test_wakes_for_next_announcement(self, mock_next_due, mock_now):
+        instance = AnnouncementScheduler()
+        instance.next_profile_check = NOW + timedelta(hours=24)
+        self.assertEqual(instance._sleep_seconds(), 90)
+
+    @patch('apps.communications.scheduler.timezone.now', return_value=NOW)
+    @patch('apps.communications.scheduler.get_next_due_time', return_value=None)
+    def test_wakes_for_profile_check(self, mock_next_due, mock_now):
+        instance = AnnouncementScheduler()
+        instance.next_profile_check = NOW + timedelta(seconds=30)
+        self.assertEqual(instance._sleep_seconds(), 30)
+
+    @patch.object(scheduler, 'claim_due_announcements', return_value=[])
+    @patch('apps.databank.ocr_cleanup.purge_expired_ocr_sessions')
+    @patch('apps.cooperatives.signals.check_and_notify_yearly_profile_updates', return_value=0)
+    def test_profile_check_runs_once_per_interval(self, mock_check, mock_purge, mock_claim):
+        instance = AnnouncementScheduler()
+        instance.run_once()
+        instance.run_once()
+        self.assertEqual(mock_check.call_count, 1)
+        self.assertEqual(mock_purge.call_count, 1)
+        self.assertEqual(mock_claim.call_count, 2)
+
+    @patch('apps.communications.scheduler.timezone.now', return_value=NOW)
+    @patch('apps.communications.scheduler.get_next_due_time', return_value=None)
+    def test_wakes_for_ocr_purge(self, mock_next_due, mock_now):
+        instance = AnnouncementScheduler()
+        instance.next_profile_check = NOW + timedelta(hours=24)
+        instance.next_ocr_purge = NOW + timedelta(seconds=45)
+        self.assertEqual(instance._sleep_seconds(), 45)
@@ -15,12 +15,17 @@ urlpatterns = [
     # Announcements
     path('announcement/', views.announcement_view, name='announcement_form'),
     path('announcement/send/', views.handle_announcement, name='handle_announcement'),  # Added trailing slash
+    path('api/announcement/list/', views.get_announcement_list, name='get_announcement_list'),
+    path('api/recipients/', views.get_recipient_directory, name='get_recipient_directory'),
+    path('api/recipients/officers/', views.get_recipient_officers, name='get_recipient_officers'),
     path('api/announcement/draft/<int:announcement_id>/', views.get_draft_announcement, name='get_draft_announcement'),
     path('api/announcement/<int:announcement_id>/', views.get_announcement_details, name='get_announcement_details'),
     path('api/announcement/<int:announcement_id>/attachment/', views.download_announcement_attachment, name='download_announcement_attachment'),
     path('api/announcement/<int:announcement_id>/attachment/convert-pdf/', views.convert_announcement_attachment_to_pdf, name='convert_announcement_to_pdf'),
     path('api/announcement/cancel-schedule/<int:announcement_id>/', views.cancel_scheduled_announcement, name='cancel_scheduled_announcement'),
     path('api/announcement/<int:announcement_id>/delete/', views.delete_announcement, name='delete_announcement'),
+    path('api/announcement/jobs/<int:job_id>/', views.get_delivery_job_status, name='get_delivery_job_status'),
+    path('api/announcement/<int:announcement_id>/deliveries/', views.get_announcement_delivery_report, name='get_announcement_delivery_report'),
 
     path('api/activity/recent/', views.get_recent_activity, name='api_recent_activity'),
 ]
\ No newline at end of file
@@ -1,22 +1,26 @@
 from io import BytesIO
+import base64
 import json
 from datetime import timedelta
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
 from django.http import HttpResponse, JsonResponse, FileResponse
-from django.views.decorators.http import require_POST, require_http_methods
+from django.views.decorators.http import condition, require_POST, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.db import DatabaseError, connection
-from django.utils import timezone
+from django.utils import dateformat, timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.contrib.auth.decorators import login_required
 from django.utils.timesince import timesince
-from .models import Message
 
 # Import services and utils
-from apps.core.services.sms_service import SmsService
 from .utils import process_attachment, MAX_ATTACHMENT_SIZE
+from .delivery_queue import AlreadyDelivered, enqueue_announcement_delivery, get_job_progress
+from .delivery_ledger import get_delivery_summary
+from .db_events import SCHEDULE_CHANGED, notify
+from . import recipient_directory
 # from apps.core.services.email_service import EmailService
 from datetime import datetime
-from apps.core.utils.activity_logger import log_announcement_sent
 
 def get_user_friendly_error_message(service_type, technical_error):
     """
@@ -46,7 +50,7 @@ def get_user_friendly_error_message(service_type, technical_error):
         return f"{service_type} service is temporarily unavailable. Please try again later or contact support for assistance."
 
 # Import your models
-from .models import Cooperative, Officer, Announcement, Message, MessageRecipient
+from .models import Cooperative, Officer, Announcement, AnnouncementDelivery, AnnouncementDeliveryJob, Message, MessageRecipient
 from apps.users.models import User
 from apps.account_management.models import Admin, Staff
 from django.db.models import Q
@@ -105,6 +109,7 @@ def cancel_scheduled_announcement(request, announcement_id):
         announcement.status_classification = 'draft'
         announcement.sent_at = None
         announcement.save()
+        notify(SCHEDULE_CHANGED, announcement_id)
         
         return JsonResponse({
             'status': 'success',
@@ -305,6 +310,7 @@ def handle_announcement(request):
             recipients = json.loads(data.get('recipients', '[]'))
             scheduled_time = data.get('scheduled_time')
             announcement_id = data.get('announcement_id')
+            idempotency_key = data.get('idempotency_key')
             attachments = request.FILES.getlist('attachments')
         else:
             # Handle JSON (backward compatibility)
@@ -316,6 +322,7 @@ def handle_announcement(request):
             recipients = data.get('recipients', [])
             scheduled_time = data.get('scheduled_time')
             announcement_id = data.get('announcement_id')
+            idempotency_key = data.get('idempotency_key')
             attachments = []
 
         # --- 2. Get creator info from session ---
@@ -327,6 +334,9 @@ def handle_announcement(request):
         
         if creator_role not in ['admin', 'staff']:
              return JsonResponse({'status': 'error', 'message': 'Invalid user role.'}, status=403)
+
+        if idempotency_key and len(idempotency_key) > 100:
+            return JsonResponse({'status': 'error', 'message': 'Invalid idempotency key.'}, status=400)
         
         # --- 3. Validate scheduled time if scheduling ---
         if action == 'schedule_send':
@@ -390,6 +400,10 @@ def handle_announcement(request):
         if not saved_announcement_id:
              return JsonResponse({'status': 'error', 'message': 'Failed to save announcement.'}, status=500)
 
+        if status == 'scheduled':
+            # Wake the scheduler leader so it re-plans its sleep around the new time
+            notify(SCHEDULE_CHANGED, saved_announcement_id)
+
         # --- 6.5. Handle attachments using new structure ---
         if ann_type == 'e-mail' and attachments:
             try:
@@ -420,52 +434,40 @@ def handle_announcement(request):
                     'message': f'Error processing attachments: {str(e)}'
                 }, status=500)
 
-        # --- 7. Send via appropriate service ---
-        recipient_count = len(coop_ids) if coop_ids else len(officer_ids) if officer_ids else 0
-        recipient_type = 'cooperatives' if coop_ids else 'officers' if officer_ids else 'recipients'
-        
-        # Get recipient names for logging
-        coop_names = []
-        officer_names = []
-        if coop_ids:
-            from apps.account_management.models import Cooperatives
-            cooperatives = Cooperatives.objects.filter(coop_id__in=coop_ids)
-            coop_names = [c.cooperative_name for c in cooperatives]
-        if officer_ids:
-            from apps.cooperatives.models import Officer
-            officers = Officer.objects.filter(officer_id__in=officer_ids)
-            officer_names = [o.fullname for o in officers if o.fullname]
-            # Also get cooperative names for officers
-            if not coop_names:
-                coop_names = [o.coop.cooperative_name for o in officers if o.coop and o.coop.cooperative_name]
-        
+        # --- 7. Queue delivery via the appropriate service ---
+        # Sending happens in the process_announcement_jobs worker so large
+        # blasts don't hold this request open; the client polls the job.
+        channel = None
         if action == 'send_sms' and ann_type == 'sms':
-            sms_service = SmsService()
-            success, message = sms_service.send_bulk_announcement(saved_announcement_id, content)
-            
-            if not success:
-                user_friendly_msg = get_user_friendly_error_message('SMS', message)
-                return JsonResponse({'status': 'error', 'message': user_friendly_msg}, status=500)
-            
-            # Log activity
-            if creator_id and creator_role:
-                log_announcement_sent(creator_id, creator_role, 'SMS', recipient_count, recipient_type, coop_names, officer_names)
-        
+            channel = 'sms'
         elif action == 'send_email' and ann_type == 'e-mail':
-            from apps.core.services.email_service import EmailService
-            email_service = EmailService()
-            success, message = email_service.send_bulk_announcement(
-                saved_announcement_id, 
-                content
-            )
-            
-            if not success:
-                user_friendly_msg = get_user_friendly_error_message('Email', message)
-                return JsonResponse({'status': 'error', 'message': user_friendly_msg}, status=500)
-            
-            # Log activity
-            if creator_id and creator_role:
-                log_announcement_sent(creator_id, creator_role, 'Email', recipient_count, recipient_type, coop_names, officer_names)
+            channel = 'e-mail'
+
+        if channel:
+            try:
+                job, created = enqueue_announcement_delivery(
+                    announcement_id=saved_announcement_id,
+                    channel=channel,
+                    content=content,
+                    created_by_id=creator_id,
+                    created_by_role=creator_role,
+                    idempotency_key=idempotency_key
+                )
+            except AlreadyDelivered as e:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': str(e),
+                    'announcement_id': saved_announcement_id
+                }, status=409)
+
+            return JsonResponse({
+                'status': 'success',
+                'message': 'Announcement queued for delivery.' if created else 'Announcement has already been queued for delivery.',
+                'announcement_id': saved_announcement_id,
+                'job_id': job.job_id,
+                'job_status': job.status,
+                'progress_url': reverse('communications:get_delivery_job_status', args=[job.job_id])
+            }, status=202)
         
         return JsonResponse({
             'status': 'success', 
@@ -478,58 +480,264 @@ def handle_announcement(request):
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': f'An unexpected error occurred: {e}'}, status=500)
     
-def announcement_view(request):
+@require_http_methods(["GET"])
+def get_delivery_job_status(request, job_id):
     """
-    Renders the announcement form, passing all cooperative, officer,
-    and announcement list data to the template.
+    Returns the progress of a queued announcement delivery job.
+    handle_announcement hands out this URL as progress_url.
     """
-    # 1. Get Cooperatives that have at least one officer
-    from django.db.models import Count
-    cooperatives = Cooperative.objects.annotate(
-        officer_count=Count('officer')
-    ).filter(officer_count__gt=0).order_by('cooperative_name')
-    
-    cooperatives_list = [
-        {'id': coop.coop_id, 'name': coop.cooperative_name}
-        for coop in cooperatives
+    user_id = request.session.get('user_id')
+    role = request.session.get('role')
+
+    if not user_id or role not in ['admin', 'staff']:
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+
+    try:
+        job = AnnouncementDeliveryJob.objects.get(job_id=job_id)
+    except AnnouncementDeliveryJob.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Delivery job not found'}, status=404)
+
+    data = get_job_progress(job)
+    if job.status == AnnouncementDeliveryJob.STATUS_DEAD and job.last_error:
+        service_type = 'SMS' if job.channel == 'sms' else 'Email'
+        data['user_message'] = get_user_friendly_error_message(service_type, job.last_error)
+
+    return JsonResponse({'status': 'success', 'data': data})
+
+
+@require_http_methods(["GET"])
+def get_announcement_delivery_report(request, announcement_id):
+    """
+    Per-recipient delivery report for an announcement, read from the
+    announcement_deliveries ledger snapshotted at send time.
+    Optional filters: ?channel=sms|e-mail and ?status=pending|sent|failed|invalid
+    """
+    user_id = request.session.get('user_id')
+    role = request.session.get('role')
+
+    if not user_id or role not in ['admin', 'staff']:
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+
+    channel = request.GET.get('channel') or None
+    status_filter = request.GET.get('status') or None
+
+    deliveries = AnnouncementDelivery.objects.filter(announcement_id=announcement_id)
+    if channel:
+        deliveries = deliveries.filter(channel=channel)
+    if status_filter:
+        deliveries = deliveries.filter(status=status_filter)
+
+    rows = [
+        {
+            'delivery_id': d.delivery_id,
+            'channel': d.channel,
+            'officer_id': d.officer_id,
+            'recipient_name': d.recipient_name,
+            'coop_name': d.coop_name,
+            'address': d.address,
+            'batch_number': d.batch_number,
+            'provider_message_id': d.provider_message_id,
+            'status': d.status,
+            'attempts': d.attempts,
+            'last_error': d.last_error,
+            'sent_at': d.sent_at.isoformat() if d.sent_at else None,
+        }
+        for d in deliveries.order_by('status', 'recipient_name', 'delivery_id')
     ]
 
-    # 2. Get Officers, grouped by coop_id
-    officers = Officer.objects.select_related('coop').all().order_by('fullname')
-    officers_by_coop = {}
-    for officer in officers:
-        if officer.coop:
-            coop_id_str = str(officer.coop.coop_id) # JS keys should be strings
-            if coop_id_str not in officers_by_coop:
-                officers_by_coop[coop_id_str] = []
-            officers_by_coop[coop_id_str].append({
-                'id': officer.officer_id,
-                'name': officer.fullname
-            })
+    return JsonResponse({
+        'status': 'success',
+        'data': {
+            'announcement_id': announcement_id,
+            'summary': get_delivery_summary(announcement_id, channel),
+            'deliveries': rows,
+        }
+    })
 
-    # 3. Get Announcement Lists using the Model Methods
-    sent_list = Announcement.get_by_status('sent')
-    draft_list = Announcement.get_by_status('draft')
-    scheduled_list = Announcement.get_by_status('scheduled')
-    
-    # 4. Add recipient information to each announcement for filtering
-    def add_recipients_info(announcements):
-        """Add recipient names to announcements for search/filter"""
-        for announcement in announcements:
-            recipients_data = Announcement.get_recipients_for_announcement(announcement['announcement_id'])
-            announcement['recipients_info'] = recipients_data
-        return announcements
-    
-    sent_list = add_recipients_info(sent_list)
-    draft_list = add_recipients_info(draft_list)
-    scheduled_list = add_recipients_info(scheduled_list)
-    
+
+ANNOUNCEMENT_PAGE_SIZE = 20
+ANNOUNCEMENT_MAX_PAGE_SIZE = 100
+
+
+def _encode_announcement_cursor(row):
+    """Opaque keyset cursor for the row a page ended on: (updated_at, announcement_id)."""
+    raw = f"{row['updated_at'].isoformat()}|{row['announcement_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_announcement_cursor(cursor):
+    """Inverse of _encode_announcement_cursor; raises ValueError on a malformed cursor."""
+    try:
+        updated_at, announcement_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(updated_at), int(announcement_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _serialize_announcement_row(row):
+    """JSON shape of one list item, with dates pre-formatted the way the list shows them."""
+    def fmt(value, pattern):
+        return dateformat.format(timezone.localtime(value), pattern) if value else ''
+
+    list_date = row['updated_at'] if row['status_classification'] == 'draft' else row['sent_at']
+    return {
+        'announcement_id': row['announcement_id'],
+        'title': row['title'],
+        'description': row['description'],
+        'type': row['type'],
+        'status': row['status_classification'],
+        'scope': row['scope'],
+        'creator_name': row['creator_name'],
+        'sent_at': row['sent_at'].isoformat() if row['sent_at'] else None,
+        'updated_at': row['updated_at'].isoformat() if row['updated_at'] else None,
+        'date': fmt(list_date, 'Y-m-d'),
+        'display_date': fmt(list_date, 'M d, Y'),
+        'display_datetime': fmt(list_date, 'M d, Y @ g:i A'),
+        'has_attachment': row['has_attachment'],
+        'attachment_count': row['attachment_count'],
+        'recipients_info': row['recipients_info'],
+    }
+
+
+@require_http_methods(["GET"])
+def get_announcement_list(request):
+    """
+    One page of announcements for the list tabs.
+
+    Query params:
+        status: sent | draft | scheduled (required)
+        cursor: next_cursor from the previous page
+        limit: page size (default 20, max 100)
+        q: search title, content and recipient cooperative/officer names
+        type: sms | e-mail
+        date_from / date_to: YYYY-MM-DD
+    """
+    user_id = request.session.get('user_id')
+    role = request.session.get('role')
+
+    if not user_id or role not in ['admin', 'staff']:
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+
+    status = request.GET.get('status')
+    if status not in ('sent', 'draft', 'scheduled'):
+        return JsonResponse({'status': 'error', 'message': 'status must be sent, draft or scheduled'}, status=400)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', ANNOUNCEMENT_PAGE_SIZE)), 1), ANNOUNCEMENT_MAX_PAGE_SIZE)
+        after = _decode_announcement_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    try:
+        date_from = datetime.strptime(request.GET['date_from'], '%Y-%m-%d').date() if request.GET.get('date_from') else None
+        date_to = datetime.strptime(request.GET['date_to'], '%Y-%m-%d').date() if request.GET.get('date_to') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Dates must be YYYY-MM-DD'}, status=400)
+
+    ann_type = request.GET.get('type') or None
+    if ann_type not in (None, 'sms', 'e-mail'):
+        return JsonResponse({'status': 'error', 'message': 'type must be sms or e-mail'}, status=400)
+
+    rows, has_more = Announcement.get_page(
+        status,
+        limit=limit,
+        after=after,
+        search=(request.GET.get('q') or '').strip() or None,
+        ann_type=ann_type,
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+    return JsonResponse({
+        'status': 'success',
+        'data': {
+            'announcements': [_serialize_announcement_row(row) for row in rows],
+            'next_cursor': _encode_announcement_cursor(rows[-1]) if has_more else None,
+            'has_more': has_more,
+        }
+    })
+
+
+def _is_announcement_staff(request):
+    return bool(request.session.get('user_id')) and request.session.get('role') in ['admin', 'staff']
+
+
+def _recipient_directory_etag(request, *args, **kwargs):
+    """Directory version as the ETag; none for callers who would get a 403 anyway."""
+    if not _is_announcement_staff(request):
+        return None
+    version = recipient_directory.safe_directory_version()
+    return None if version is None else f"recipients-{version}"
+
+
+def _directory_response(data):
+    """JSON response the browser must revalidate (cheaply, via the ETag) before reusing."""
+    response = JsonResponse({'status': 'success', 'data': data})
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+@require_http_methods(["GET"])
+@condition(etag_func=_recipient_directory_etag)
+def get_recipient_directory(request):
+    """
+    Recipient picker directory.
+
+    Without `q`: every cooperative that has officers, as {id, name, officer_count}.
+    With `q`: cooperatives and officers whose names match, prefix matches first.
+    Officers of a cooperative are loaded separately with get_recipient_officers.
+    Responds 304 while the directory version matches If-None-Match.
+    """
+    if not _is_announcement_staff(request):
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+
+    version = recipient_directory.get_directory_version()
+    term = (request.GET.get('q') or '').strip()
+    if term:
+        data = recipient_directory.search_directory(term)
+    else:
+        data = {'cooperatives': recipient_directory.list_cooperatives(version)}
+    data['version'] = version
+    return _directory_response(data)
+
+
+@require_http_methods(["GET"])
+@condition(etag_func=_recipient_directory_etag)
+def get_recipient_officers(request):
+    """
+    Officers of one or more cooperatives, for expanding a cooperative in the picker.
+
+    Query params:
+        coop_ids: comma-separated cooperative IDs
+    Returns {'officers_by_coop': {coop_id: [{id, name}, ...]}}.
+    """
+    if not _is_announcement_staff(request):
+        return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=403)
+
+    try:
+        coop_ids = sorted({int(value) for value in request.GET.get('coop_ids', '').split(',') if value.strip()})
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'coop_ids must be comma-separated integers'}, status=400)
+    if not coop_ids:
+        return JsonResponse({'status': 'error', 'message': 'coop_ids is required'}, status=400)
+
+    officers_by_coop = recipient_directory.get_officers_by_coop(coop_ids)
+    return _directory_response({
+        'version': recipient_directory.get_directory_version(),
+        'officers_by_coop': {str(coop_id): officers for coop_id, officers in officers_by_coop.items()},
+    })
+
+
+def announcement_view(request):
+    """
+    Renders the announcement form with the tab counts. The announcement lists
+    (get_announcement_list) and the recipient directory (get_recipient_directory)
+    are fetched by the page itself.
+    """
     context = {
-        'cooperatives_json': json.dumps(cooperatives_list),
-        'officers_by_coop_json': json.dumps(officers_by_coop),
-        'sent_announcements': sent_list,
-        'draft_announcements': draft_list,
-        'scheduled_announcements': scheduled_list,
+        'announcement_counts': Announcement.count_by_status(),
+        'announcement_page_size': ANNOUNCEMENT_PAGE_SIZE,
     }
     
     return render(request, 'communications/announcement_form.html', context)
@@ -871,7 +1079,7 @@ def send_message(request):
                 message = Message.objects.get(message_id=message_id)
                 receiver_user = User.objects.get(user_id=receiver_id)
                 
-                # Send push notification (function handles User mapping internally)
+                # Queue push notification (sent off-request by the push dispatcher)
                 send_push_notification_for_message(message, receiver_user)
             except Exception as e:
                 # Don't fail the request if notification fails
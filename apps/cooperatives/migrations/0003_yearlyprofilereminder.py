@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_management', '__first__'),
+        ('cooperatives', '0002_activitylog_financialdata_member_profiledata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearlyProfileReminder',
+            fields=[
+                ('reminder_id', models.AutoField(primary_key=True, serialize=False)),
+                ('report_year', models.IntegerField()),
+                ('officers_notified', models.IntegerField(default=0)),
+                ('claimed_at', models.DateTimeField()),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('coop', models.ForeignKey(db_column='coop_id', on_delete=django.db.models.deletion.CASCADE, related_name='yearly_profile_reminders', to='account_management.cooperatives')),
+            ],
+            options={
+                'db_table': 'yearly_profile_reminders',
+                'unique_together': {('coop', 'report_year')},
+            },
+        ),
+    ]
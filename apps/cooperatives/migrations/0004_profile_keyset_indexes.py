@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:50
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account_management', '__first__'),
+        ('cooperatives', '0003_yearlyprofilereminder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profiledata',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('report_year', models.Value(0)), descending=True), models.OrderBy(models.F('profile_id'), descending=True), name='profile_year_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profiledata',
+            index=models.Index(fields=['-created_at', '-profile_id'], name='profile_created_keyset_idx'),
+        ),
+    ]
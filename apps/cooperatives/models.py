@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from apps.users.models import User  # Use custom User model, not Django's default
 from apps.account_management.models import Cooperatives
 
@@ -62,6 +64,12 @@ class ProfileData(models.Model):
         # Remove unique constraint - allow multiple profiles per coop (one per year)
         # Add unique constraint on coop_id + report_year combination
         unique_together = [['coop', 'report_year']]
+        # Keyset pagination of the databank profile list (apps/databank/listing.py)
+        indexes = [
+            models.Index(Coalesce('report_year', Value(0)).desc(), F('profile_id').desc(),
+                         name='profile_year_keyset_idx'),
+            models.Index(fields=['-created_at', '-profile_id'], name='profile_created_keyset_idx'),
+        ]
 
 class FinancialData(models.Model):
     financial_id = models.AutoField(primary_key=True)
@@ -167,4 +175,27 @@ class ActivityLog(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.action_type} - {self.user_fullname or 'Unknown'} - {self.created_at}"
\ No newline at end of file
+        return f"{self.action_type} - {self.user_fullname or 'Unknown'} - {self.created_at}"
+
+# ======================================================
+# YEARLY PROFILE REMINDER MARKERS
+# ======================================================
+class YearlyProfileReminder(models.Model):
+    """
+    One row per cooperative and report year once the yearly "update your profile"
+    reminder has been claimed, so the daily check never notifies a coop twice.
+    notified_at stays empty until the push fan-out for the coop has finished.
+    """
+    reminder_id = models.AutoField(primary_key=True)
+    coop = models.ForeignKey(Cooperatives, on_delete=models.CASCADE, db_column='coop_id', related_name='yearly_profile_reminders')
+    report_year = models.IntegerField()
+    officers_notified = models.IntegerField(default=0)
+    claimed_at = models.DateTimeField()
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'yearly_profile_reminders'
+        unique_together = [['coop', 'report_year']]
+
+    def __str__(self):
+        return f"Reminder {self.report_year} - coop {self.coop_id}"
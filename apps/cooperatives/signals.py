@@ -4,11 +4,17 @@ Sends push notifications for profile updates and yearly reminders.
 """
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
+from django.db import connection
 from django.utils import timezone
 from datetime import date
 import logging
+import threading
 from .models import ProfileData
-from apps.core.notification_utils import send_notification_to_cooperative_officers
+from apps.core.notification_utils import (
+    get_officer_users_by_coop,
+    send_push_notifications_in_batches,
+)
+from apps.core.services.push_dispatcher import enqueue_cooperative_notification
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +22,8 @@ logger = logging.getLogger(__name__)
 @receiver(post_save, sender=ProfileData, dispatch_uid='profile_data_post_save_notification')
 def send_profile_update_notification(sender, instance, created, **kwargs):
     """
-    Send push notification when a profile is created or updated.
+    Queue a push notification to the cooperative's officers when a profile is
+    created or updated; it is sent off-request once the save commits.
     Only sends for current year profiles to avoid spam.
     """
     try:
@@ -29,14 +36,10 @@ def send_profile_update_notification(sender, instance, created, **kwargs):
             logger.debug(f"Skipping notification for profile year {instance.report_year} (current year is {current_year})")
             return
         
-        # Get the cooperative
-        coop = instance.coop
-        if not coop:
+        if not instance.coop_id:
             logger.warning(f"Profile {instance.profile_id} has no cooperative associated")
             return
         
-        logger.info(f"Sending notification for cooperative: {coop.cooperative_name}")
-        
         if created:
             # New profile created
             title = "Profile Created Successfully"
@@ -48,75 +51,141 @@ def send_profile_update_notification(sender, instance, created, **kwargs):
             body = f"Your cooperative profile for {instance.report_year} has been updated."
             url = f"/cooperatives/profile_form/"
         
-        # Send notification to all officers
-        sent_count = send_notification_to_cooperative_officers(
-            coop=coop,
+        # Officers are resolved and notified by the push dispatcher; repeated
+        # saves within the coalescing window are sent as one notification
+        enqueue_cooperative_notification(
+            coop_id=instance.coop_id,
             title=title,
             body=body,
-            url=url
+            url=url,
+            topic=f"profile:{instance.report_year}",
+            digest_title="Profile Updated ({count} changes)",
         )
         
-        logger.info(f"Profile notification sent to {sent_count} officer(s)")
+        logger.info(f"Profile notification queued for cooperative {instance.coop_id}")
         
     except Exception as e:
         logger.error(f"Error sending profile update notification: {e}", exc_info=True)
 
 
-def check_and_notify_yearly_profile_updates():
+def claim_yearly_profile_reminders(current_year):
+    """
+    Find every cooperative that has last year's profile but not this year's and
+    claim its reminder marker, in one set-based statement (two anti-joins plus
+    ON CONFLICT against yearly_profile_reminders).
+
+    Markers claimed more than an hour ago whose fan-out never finished (the
+    process died mid-send) are re-claimed as well.
+
+    Returns:
+        list[int]: coop_ids whose officers should be notified now
+    """
+    previous_year = current_year - 1
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            WITH claimed AS (
+                INSERT INTO yearly_profile_reminders (coop_id, report_year, officers_notified, claimed_at)
+                SELECT c.coop_id, %s, 0, NOW()
+                FROM cooperatives c
+                WHERE EXISTS (
+                    SELECT 1 FROM profile_data p
+                    WHERE p.coop_id = c.coop_id AND p.report_year = %s
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM profile_data p
+                    WHERE p.coop_id = c.coop_id AND p.report_year = %s
+                )
+                ON CONFLICT (coop_id, report_year) DO NOTHING
+                RETURNING coop_id
+            ),
+            stalled AS (
+                UPDATE yearly_profile_reminders
+                SET claimed_at = NOW()
+                WHERE report_year = %s
+                  AND notified_at IS NULL
+                  AND claimed_at < NOW() - INTERVAL '1 hour'
+                RETURNING coop_id
+            )
+            SELECT coop_id FROM claimed
+            UNION
+            SELECT coop_id FROM stalled
+        """, [current_year, previous_year, current_year, current_year])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def send_yearly_profile_reminders(coop_ids, current_year):
+    """
+    Fan the reminder out to the officers of the claimed cooperatives in batches,
+    then record per coop how many officers were reached.
+    """
+    from apps.cooperatives.models import YearlyProfileReminder
+
+    try:
+        title = "Yearly Profile Update Required"
+        body = f"Please update your cooperative profile for {current_year}. Your {current_year - 1} profile is on file."
+        url = "/cooperatives/profile_form/"
+
+        users_by_coop = get_officer_users_by_coop(coop_ids)
+        recipients = [(coop_id, user) for coop_id, users in users_by_coop.items() for user in users]
+        results = send_push_notifications_in_batches([user for _, user in recipients], title, body, url)
+
+        sent_by_coop = {coop_id: 0 for coop_id in coop_ids}
+        for (coop_id, _), sent in zip(recipients, results):
+            sent_by_coop[coop_id] += int(sent)
+
+        now = timezone.now()
+        reminders = list(YearlyProfileReminder.objects.filter(coop_id__in=coop_ids, report_year=current_year))
+        for reminder in reminders:
+            reminder.officers_notified = sent_by_coop.get(reminder.coop_id, 0)
+            reminder.notified_at = now
+        YearlyProfileReminder.objects.bulk_update(reminders, ['officers_notified', 'notified_at'], batch_size=500)
+
+        reached = sum(1 for count in sent_by_coop.values() if count)
+        logger.info(f"Yearly profile reminders sent: {reached}/{len(coop_ids)} cooperatives reached, "
+                    f"{sum(results)}/{len(recipients)} officer notification(s) delivered.")
+        return reached
+
+    except Exception as e:
+        logger.error(f"Error sending yearly profile reminders: {e}", exc_info=True)
+        return 0
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def check_and_notify_yearly_profile_updates(background=True):
     """
     Check for cooperatives that need to update their profile for the new year.
     This should be called by a scheduled task (e.g., daily or weekly).
+
+    Each cooperative is reminded at most once per year (yearly_profile_reminders),
+    so running this more often is safe. The push fan-out runs in a background
+    thread unless background=False.
+
+    Returns:
+        int: Number of cooperatives claimed for a reminder in this run
     """
     try:
-        from apps.account_management.models import Cooperatives
-        from apps.cooperatives.models import ProfileData
-        
         current_year = date.today().year
-        previous_year = current_year - 1
-        
-        # Find all active cooperatives
-        cooperatives = Cooperatives.objects.all()
-        
-        notified_count = 0
-        for coop in cooperatives:
-            try:
-                # Check if they have a profile for the current year
-                current_profile = ProfileData.objects.filter(
-                    coop=coop,
-                    report_year=current_year
-                ).first()
-                
-                # If they don't have a current year profile, but have a previous year profile
-                if not current_profile:
-                    previous_profile = ProfileData.objects.filter(
-                        coop=coop,
-                        report_year=previous_year
-                    ).first()
-                    
-                    if previous_profile:
-                        # Send reminder notification
-                        title = "Yearly Profile Update Required"
-                        body = f"Please update your cooperative profile for {current_year}. Your {previous_year} profile is on file."
-                        url = "/cooperatives/profile_form/"
-                        
-                        sent = send_notification_to_cooperative_officers(
-                            coop=coop,
-                            title=title,
-                            body=body,
-                            url=url
-                        )
-                        
-                        if sent > 0:
-                            notified_count += 1
-                            logger.info(f"Sent yearly update reminder to {coop.cooperative_name}")
-            
-            except Exception as e:
-                logger.error(f"Error checking profile for {coop.cooperative_name}: {e}")
-        
-        logger.info(f"Yearly profile update check completed. Notified {notified_count} cooperatives.")
-        return notified_count
-        
+        coop_ids = claim_yearly_profile_reminders(current_year)
+
+        if not coop_ids:
+            logger.info("Yearly profile update check completed. No new cooperatives to remind.")
+            return 0
+
+        logger.info(f"Yearly profile update check: reminding {len(coop_ids)} cooperative(s).")
+        if background:
+            threading.Thread(
+                target=send_yearly_profile_reminders,
+                args=(coop_ids, current_year),
+                daemon=True,
+                name='yearly-profile-reminders'
+            ).start()
+        else:
+            send_yearly_profile_reminders(coop_ids, current_year)
+        return len(coop_ids)
+
     except Exception as e:
         logger.error(f"Error in yearly profile update check: {e}", exc_info=True)
         return 0
-
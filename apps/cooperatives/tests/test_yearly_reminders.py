@@ -0,0 +1,101 @@
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.account_management.models import Cooperatives
+from apps.cooperatives import signals
+from apps.cooperatives.models import ProfileData, YearlyProfileReminder
+from apps.core import notification_utils
+
+
+def make_users(count):
+    return [SimpleNamespace(user_id=i, username=f'officer{i}') for i in range(count)]
+
+
+def fake_fan_out(users, payload, ttl=1000, max_workers=None):
+    """Even user ids have a working subscription, odd ones none."""
+    delivered = {user.user_id for user in users if user.user_id % 2 == 0}
+    return {'users': len(users), 'subscriptions': len(delivered), 'sent': len(delivered), 'failed': 0,
+            'pruned': 0, 'unsubscribed': len(users) - len(delivered), 'delivered_user_ids': delivered}
+
+
+class PushFanOutTest(SimpleTestCase):
+    def test_users_are_sent_in_batches_and_results_keep_order(self):
+        users = make_users(230)
+        with patch.object(notification_utils, 'fan_out_push', side_effect=fake_fan_out) as mock_fan_out:
+            results = notification_utils.send_push_notifications_in_batches(
+                users, 'Title', 'Body', batch_size=50, max_workers=4
+            )
+
+        # One subscription lookup per batch
+        self.assertEqual(mock_fan_out.call_count, 5)
+        self.assertEqual(results, [i % 2 == 0 for i in range(230)])
+
+    def test_no_users_sends_nothing(self):
+        self.assertEqual(notification_utils.send_push_notifications_in_batches([], 'Title', 'Body'), [])
+
+
+class YearlyProfileReminderTest(SimpleTestCase):
+    @patch.object(signals, 'send_yearly_profile_reminders')
+    @patch.object(signals, 'claim_yearly_profile_reminders', return_value=[])
+    def test_nothing_to_claim_sends_nothing(self, mock_claim, mock_send):
+        self.assertEqual(signals.check_and_notify_yearly_profile_updates(background=False), 0)
+        mock_send.assert_not_called()
+
+    @patch.object(signals, 'send_yearly_profile_reminders')
+    @patch.object(signals, 'claim_yearly_profile_reminders', return_value=[3, 7])
+    def test_claimed_coops_are_fanned_out(self, mock_claim, mock_send):
+        self.assertEqual(signals.check_and_notify_yearly_profile_updates(background=False), 2)
+        mock_send.assert_called_once()
+        self.assertEqual(mock_send.call_args.args[0], [3, 7])
+
+    @patch('apps.cooperatives.models.YearlyProfileReminder.objects')
+    @patch.object(signals, 'send_push_notifications_in_batches', return_value=[True, False, False])
+    @patch.object(signals, 'get_officer_users_by_coop')
+    def test_markers_record_officers_reached(self, mock_users, mock_fan_out, mock_objects):
+        users = make_users(3)
+        mock_users.return_value = {3: users[:2], 7: users[2:], 9: []}
+        reminders = [SimpleNamespace(coop_id=c, officers_notified=0, notified_at=None) for c in (3, 7, 9)]
+        mock_objects.filter.return_value = reminders
+
+        reached = signals.send_yearly_profile_reminders([3, 7, 9], 2026)
+
+        self.assertEqual(reached, 1)
+        self.assertEqual(mock_fan_out.call_args.args[0], users)
+        self.assertEqual([r.officers_notified for r in reminders], [1, 0, 0])
+        self.assertTrue(all(r.notified_at for r in reminders))
+        mock_objects.bulk_update.assert_called_once()
+
+
+class ClaimYearlyProfileRemindersTest(TestCase):
+    """Runs against the database: the claim is a single PostgreSQL statement."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.coops = {}
+        for name in ('due', 'stalled', 'fresh', 'notified', 'updated'):
+            coop = Cooperatives.objects.create(cooperative_name=f'{name} coop')
+            ProfileData.objects.create(coop=coop, report_year=2025)
+            cls.coops[name] = coop.coop_id
+        ProfileData.objects.create(coop_id=cls.coops['updated'], report_year=2026)
+
+        YearlyProfileReminder.objects.create(coop_id=cls.coops['stalled'], report_year=2026,
+                                             claimed_at=now - timedelta(hours=2))
+        YearlyProfileReminder.objects.create(coop_id=cls.coops['fresh'], report_year=2026,
+                                             claimed_at=now - timedelta(minutes=5))
+        YearlyProfileReminder.objects.create(coop_id=cls.coops['notified'], report_year=2026, officers_notified=2,
+                                             claimed_at=now - timedelta(hours=2), notified_at=now - timedelta(hours=1))
+
+    def test_claims_due_coops_and_stalled_markers_once(self):
+        claimed = signals.claim_yearly_profile_reminders(2026)
+
+        self.assertCountEqual(claimed, [self.coops['due'], self.coops['stalled']])
+        self.assertEqual(signals.claim_yearly_profile_reminders(2026), [])
+        self.assertTrue(YearlyProfileReminder.objects.filter(coop_id=self.coops['due'], report_year=2026,
+                                                             notified_at__isnull=True).exists())
+        stalled = YearlyProfileReminder.objects.get(coop_id=self.coops['stalled'], report_year=2026)
+        self.assertGreater(stalled.claimed_at, timezone.now() - timedelta(hours=1))
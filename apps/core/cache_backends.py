@@ -0,0 +1,222 @@
+"""
+Two-tier cache: a per-process LRU in front of a shared cache.
+
+DatabaseCache turned every OTP check, login-attempt counter and lockout
+lookup into a SQL round trip and periodically culled cache_table. The
+default cache is now a TieredCache:
+
+- The shared tier is another cache alias (OPTIONS['SHARED']). Outside DEBUG
+  it must be Redis (see settings.CACHES): shared by every process, one round
+  trip per operation and no cache table to cull. All reads and writes go
+  through it, so counters, OTPs and lockouts are consistent across
+  processes. incr()/decr() use Redis's INCRBY, which is atomic and keeps the
+  key's expiry. Django's fallback increment for other backends (the database
+  cache) is a get then a set that resets the expiry to the default timeout;
+  counters that must outlive it touch() the key afterwards.
+- The local tier holds only keys that start with one of
+  OPTIONS['LOCAL_PREFIXES']. Those are keys that never change (versioned
+  keys such as recipient_directory:coops:<version>) or that may be served a
+  little stale. A process keeps them for at most OPTIONS['LOCAL_TIMEOUT']
+  seconds and at most OPTIONS['LOCAL_MAX_ENTRIES'] of them, least recently
+  used first out. Writes and deletes through this process update both tiers.
+
+stats() reports hit ratios per tier for the current process.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+# Local stores and their stats, shared by every thread's instance of the same
+# LOCATION (django.core.cache hands each thread its own backend object)
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class _LocalStore:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            self.local_hits += 1
+            return value
+
+    def set(self, key, value, expires_at):
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_prefixes = tuple(options.get('LOCAL_PREFIXES', ()))
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 30)
+        with _stores_lock:
+            self._store = _stores.setdefault(location, _LocalStore(options.get('LOCAL_MAX_ENTRIES', 1000)))
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        """Key in the local tier, or None if `key` is not cached locally."""
+        if self.local_prefixes and key.startswith(self.local_prefixes):
+            return self.make_and_validate_key(key, version=version)
+        return None
+
+    def _local_expiry(self, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        lifetime = self.local_timeout if timeout is None else min(timeout - time.time(), self.local_timeout)
+        return time.monotonic() + lifetime
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        if local_key:
+            value = self._store.get(local_key)
+            if value is not _MISSING:
+                return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        with self._store.lock:
+            if value is _MISSING:
+                self._store.misses += 1
+            else:
+                self._store.shared_hits += 1
+        if value is _MISSING:
+            return default
+        if local_key:
+            self._store.set(local_key, value, self._local_expiry(None))
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            local_key = self._local_key(key, version)
+            value = self._store.get(local_key) if local_key else _MISSING
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            with self._store.lock:
+                self._store.shared_hits += len(fetched)
+                self._store.misses += len(remote) - len(fetched)
+            for key, value in fetched.items():
+                local_key = self._local_key(key, version)
+                if local_key:
+                    self._store.set(local_key, value, self._local_expiry(None))
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if local_key:
+            self._store.set(local_key, value, self._local_expiry(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        local_key = self._local_key(key, version)
+        if added and local_key:
+            self._store.set(local_key, value, self._local_expiry(timeout))
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            local_key = self._local_key(key, version)
+            if local_key and key not in failed:
+                self._store.set(local_key, value, self._local_expiry(timeout))
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key:
+            self._store.delete(local_key)
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            local_key = self._local_key(key, version)
+            if local_key:
+                self._store.delete(local_key)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        local_key = self._local_key(key, version)
+        if local_key and self._store.get(local_key) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        """
+        Increment on the shared tier; raises ValueError if the key doesn't
+        exist. Atomic and expiry-preserving on Redis only (see the module docstring).
+        """
+        value = self.shared.incr(key, delta, version=version)
+        local_key = self._local_key(key, version)
+        if local_key:
+            self._store.delete(local_key)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self._store.clear()
+        self.shared.clear()
+
+    def stats(self):
+        """Hit counts and ratios of this process since it started."""
+        store = self._store
+        with store.lock:
+            local_hits, shared_hits, misses = store.local_hits, store.shared_hits, store.misses
+            entries = len(store.entries)
+        lookups = local_hits + shared_hits + misses
+        return {
+            'lookups': lookups,
+            'local_hits': local_hits,
+            'shared_hits': shared_hits,
+            'misses': misses,
+            'hit_ratio': round((local_hits + shared_hits) / lookups, 4) if lookups else None,
+            'local_hit_ratio': round(local_hits / lookups, 4) if lookups else None,
+            'local_entries': entries,
+            'local_max_entries': store.max_entries,
+        }
@@ -1,9 +1,29 @@
+import re
+import time
+from collections import namedtuple
+from functools import lru_cache, partial
+
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
 from django.urls import resolve
 from django.http import HttpResponseRedirect, JsonResponse
 from django.apps import apps
-from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import SimpleLazyObject
+
+# Session key of the cached user snapshot (see AuthenticationMiddleware.get_user_snapshot)
+USER_SNAPSHOT_KEY = '_auth_user_snapshot'
+
+URLClass = namedtuple('URLClass', [
+    'is_public_prefix', 'is_api_endpoint', 'is_file_endpoint', 'is_conversion_endpoint',
+    'is_public_url', 'is_pending_verification_url',
+])
+
+
+def _prefix_pattern(prefixes):
+    return re.compile('|'.join(re.escape(prefix) for prefix in prefixes))
+
 
 class AuthenticationMiddleware:
     """
@@ -11,6 +31,13 @@ class AuthenticationMiddleware:
     Shows access denied page for unauthenticated users.
     Prevents manual URL typing by keeping users on their current page.
     Checks strictly for Account Deactivation status.
+
+    Per request this costs no user query in the common case: the account
+    status comes from a snapshot cached in the session (one query every
+    AUTH_USER_RECHECK_SECONDS), request.user is loaded only if used, URL
+    rules are precompiled and cached per path, and current_page is only
+    written when it changes. last_activity changes on every request; the
+    session backend keeps such writes out of the database.
     """
     
     # URLs that don't require authentication
@@ -65,46 +92,75 @@ class AuthenticationMiddleware:
     
     def __init__(self, get_response):
         self.get_response = get_response
-    
+        self.user_model = apps.get_model('users', 'User')
+        # URL classification is compiled once; resolve() results are cached per path
+        self.public_prefix_re = _prefix_pattern(self.PUBLIC_PREFIXES)
+        self.api_prefix_re = _prefix_pattern(self.API_PREFIXES)
+        self.file_endpoint_re = _prefix_pattern(self.FILE_ENDPOINTS)
+        self.conversion_endpoint_re = _prefix_pattern(self.CONVERSION_ENDPOINTS)
+        self.public_urls = frozenset(self.PUBLIC_URLS)
+        self.pending_verification_urls = frozenset(self.PENDING_VERIFICATION_URLS)
+        self.classify = lru_cache(maxsize=2048)(self._classify)
+
+    def _classify(self, path):
+        """Resolve `path` once and work out which access rules apply to it."""
+        try:
+            match = resolve(path)
+            current_url = match.url_name
+            # Build full URL name with namespace
+            full_url_name = f"{match.namespace}:{current_url}" if match.namespace else current_url
+        except Exception:
+            current_url = None
+            full_url_name = None
+
+        return URLClass(
+            is_public_prefix=bool(self.public_prefix_re.match(path)),
+            is_api_endpoint=bool(self.api_prefix_re.match(path)),
+            is_file_endpoint=bool(self.file_endpoint_re.match(path)),
+            is_conversion_endpoint='/convert-pdf/' in path and bool(self.conversion_endpoint_re.match(path)),
+            is_public_url=current_url in self.public_urls or full_url_name in self.public_urls,
+            is_pending_verification_url=(current_url in self.pending_verification_urls or
+                                         full_url_name in self.pending_verification_urls),
+        )
+
+    def get_user_snapshot(self, request, user_id):
+        """
+        The session's cached {id, role, is_active, version} for `user_id`,
+        reloaded with a single query once it is older than
+        AUTH_USER_RECHECK_SECONDS. Returns None if the user no longer exists.
+        """
+        now = time.time()
+        snapshot = request.session.get(USER_SNAPSHOT_KEY)
+        recheck = getattr(settings, 'AUTH_USER_RECHECK_SECONDS', 60)
+        if snapshot and snapshot['key'] == user_id and now - snapshot['checked_at'] < recheck:
+            return snapshot
+
+        if isinstance(user_id, str) and not user_id.isdigit():
+            lookup = {'username': user_id}
+        else:
+            lookup = {'user_id': int(user_id)}
+        row = self.user_model.objects.filter(**lookup).values('user_id', 'role', 'is_active', 'updated_at').first()
+        if row is None:
+            request.session.pop(USER_SNAPSHOT_KEY, None)
+            return None
+
+        snapshot = {
+            'key': user_id,
+            'id': row['user_id'],
+            'role': row['role'],
+            'is_active': row['is_active'],
+            # Changes whenever the users row does
+            'version': row['updated_at'].isoformat() if row['updated_at'] else None,
+            'checked_at': now,
+        }
+        request.session[USER_SNAPSHOT_KEY] = snapshot
+        return snapshot
+
     def __call__(self, request):
         # Check session validity and freshness
         user_id = request.session.get('user_id')
-        
-        # Set request.user for compatibility with Django auth (needed for webpush)
-        if user_id:
-            try:
-                UserModel = apps.get_model('users', 'User')
-                
-                # Handle string user_id
-                if isinstance(user_id, str):
-                    try:
-                        user_id = int(user_id)
-                    except ValueError:
-                        # Try username lookup if it's not a number
-                        try:
-                            request.user = UserModel.objects.get(username=user_id)
-                        except UserModel.DoesNotExist:
-                            from django.contrib.auth.models import AnonymousUser
-                            request.user = AnonymousUser()
-                        except Exception:
-                            from django.contrib.auth.models import AnonymousUser
-                            request.user = AnonymousUser()
-                    else:
-                        # Conversion succeeded, fetch by user_id
-                        request.user = UserModel.objects.get(user_id=user_id)
-                else:
-                    # user_id is already an int
-                    request.user = UserModel.objects.get(user_id=user_id)
-                
-                # Note: is_authenticated is a property defined in User model, no need to set it
-            except (LookupError, ImportError, ObjectDoesNotExist, ValueError, TypeError):
-                # If user model not found or user doesn't exist, use AnonymousUser
-                from django.contrib.auth.models import AnonymousUser
-                request.user = AnonymousUser()
-        else:
-            from django.contrib.auth.models import AnonymousUser
-            request.user = AnonymousUser()
-        
+        snapshot = None
+
         # ---------------------------------------------------------
         # 1. SESSION FRESHNESS CHECK
         # ---------------------------------------------------------
@@ -112,11 +168,10 @@ class AuthenticationMiddleware:
         if user_id:
             # Check if session has last_activity timestamp
             last_activity = request.session.get('last_activity')
-            current_time = __import__('time').time()
+            current_time = time.time()
             
             # Validate session freshness
             if last_activity:
-                from django.conf import settings
                 session_age = getattr(settings, 'SESSION_COOKIE_AGE', 900) #15 minutes
                 
                 if (current_time - last_activity) > session_age:
@@ -127,89 +182,50 @@ class AuthenticationMiddleware:
                         return redirect('login')
                     # Re-check user_id after flush
                     user_id = None
-            else:
-                # No last_activity means this is a stale/restored session
-                # This can happen if session was created before last_activity tracking was added
-                # Initialize it instead of flushing for backward compatibility
-                request.session['last_activity'] = current_time
             
-            # Update last activity timestamp on every request (if session still valid)
-            if user_id:
+            # Update last activity timestamp (if session still valid). No last_activity means
+            # a session from before it was tracked; initialize it instead of flushing. With
+            # AUTH_ACTIVITY_WRITE_SECONDS > 0 it is refreshed at most that often.
+            write_every = getattr(settings, 'AUTH_ACTIVITY_WRITE_SECONDS', 0)
+            if user_id and (not last_activity or current_time - last_activity >= write_every):
                 request.session['last_activity'] = current_time
 
+        if user_id:
             # ---------------------------------------------------------
-            # 2. ACCOUNT STATUS CHECK (NEW LOGIC)
+            # 2. ACCOUNT STATUS CHECK
             # ---------------------------------------------------------
             try:
-                UserModel = apps.get_model('users', 'Users') 
-                user = UserModel.objects.get(pk=user_id)
+                snapshot = self.get_user_snapshot(request, user_id)
+            except (ValueError, TypeError):
+                snapshot = None
 
-                if not user.is_active: 
-                    request.session.flush()
-                    messages.error(request, 'Your account has been deactivated. Access denied.')
-                    return redirect('access_denied')
-            
-            except (LookupError, ImportError):
-                pass
-                
-            except ObjectDoesNotExist: 
+            if snapshot is None:
                 request.session.flush()
+                request.user = AnonymousUser()
                 return redirect('login')
 
+            if not snapshot['is_active']:
+                request.session.flush()
+                request.user = AnonymousUser()
+                messages.error(request, 'Your account has been deactivated. Access denied.')
+                return redirect('access_denied')
+
+            # Set request.user for compatibility with Django auth (needed for webpush);
+            # the User row is only loaded if something actually uses it
+            request.user = SimpleLazyObject(partial(self._load_user, snapshot['id']))
+        else:
+            request.user = AnonymousUser()
+
         # ---------------------------------------------------------
         # 3. URL ACCESS CONTROL
         # ---------------------------------------------------------
-        
-        # Get the current URL name
-        try:
-            current_url = resolve(request.path_info).url_name
-            current_namespace = resolve(request.path_info).namespace
-            
-            # Build full URL name with namespace
-            if current_namespace:
-                full_url_name = f"{current_namespace}:{current_url}"
-            else:
-                full_url_name = current_url
-                
-        except:
-            current_url = None
-            full_url_name = None
-        
-        # Check if URL starts with public prefix
-        is_public_prefix = any(
-            request.path_info.startswith(prefix) 
-            for prefix in self.PUBLIC_PREFIXES
-        )
-        
-        # Check if URL is an API endpoint
-        is_api_endpoint = any(
-            request.path_info.startswith(prefix)
-            for prefix in self.API_PREFIXES
-        )
-        
-        # Check if URL is a file/attachment endpoint
-        is_file_endpoint = any(
-            request.path_info.startswith(prefix)
-            for prefix in self.FILE_ENDPOINTS
-        )
-        
-        # Check if URL is a conversion endpoint
-        is_conversion_endpoint = any(
-            '/convert-pdf/' in request.path_info and request.path_info.startswith(prefix)
-            for prefix in self.CONVERSION_ENDPOINTS
-        )
-        
-        # Check if URL is in public list
-        is_public_url = (
-            current_url in self.PUBLIC_URLS or 
-            full_url_name in self.PUBLIC_URLS
-        )
-        
-        # Check if URL requires pending verification
-        is_pending_verification_url = (
-            current_url in self.PENDING_VERIFICATION_URLS or
-            full_url_name in self.PENDING_VERIFICATION_URLS
-        )
+        url = self.classify(request.path_info)
+        is_public_prefix = url.is_public_prefix
+        is_api_endpoint = url.is_api_endpoint
+        is_file_endpoint = url.is_file_endpoint
+        is_conversion_endpoint = url.is_conversion_endpoint
+        is_public_url = url.is_public_url
+        is_pending_verification_url = url.is_pending_verification_url
         
         # Check if user is authenticated (variable might have been cleared by flush above)
         user_id = request.session.get('user_id')
@@ -310,8 +326,9 @@ class AuthenticationMiddleware:
         # If user IS logged in on regular pages (not API)
         if user_id and not is_public_prefix and not is_public_url and not is_api_endpoint:
             # Allow logged-in users to access any page directly (no referer check)
-            # Just update current_page for navigation tracking
-            request.session['current_page'] = request.path_info
+            # Just update current_page for navigation tracking (saving the session only if it changed)
+            if request.session.get('current_page') != request.path_info:
+                request.session['current_page'] = request.path_info
         
         # Continue with request
         response = self.get_response(request)
@@ -322,4 +339,10 @@ class AuthenticationMiddleware:
             response['Pragma'] = 'no-cache'
             response['Expires'] = '0'
         
-        return response
\ No newline at end of file
+        return response
+
+    def _load_user(self, user_id):
+        try:
+            return self.user_model.objects.get(user_id=user_id)
+        except self.user_model.DoesNotExist:
+            return AnonymousUser()
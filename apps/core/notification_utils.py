@@ -2,16 +2,183 @@
 Utility functions for sending push notifications.
 Provides a centralized way to send notifications to users.
 """
+import json
 import logging
-from webpush import send_user_notification
-from django.contrib.auth.models import User as DjangoUser
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from pywebpush import WebPushException, webpush
+from apps.core.services.batch_sender import get_pooled_session
 
 logger = logging.getLogger(__name__)
 
 
-def send_push_notification(user, title, body, url="/", icon="/static/frontend/images/Logo.png", ttl=1000):
+DEFAULT_ICON = "/static/frontend/images/Logo.png"
+
+
+def build_push_payload(title, body, url="/", icon=DEFAULT_ICON):
+    """Notification payload as the service worker expects it; body truncated to 50 chars."""
+    body = body or ""
+    # Truncate body to 50 chars to keep popup clean
+    body_preview = body[:50] + "..." if len(body) > 50 else body
+    return {
+        "head": title,
+        "body": body_preview,
+        "icon": icon,
+        "url": url
+    }
+
+
+def _vapid_kwargs():
+    """VAPID key and claims from WEBPUSH_SETTINGS (optional, but Chrome requires them)."""
+    webpush_settings = getattr(settings, 'WEBPUSH_SETTINGS', {})
+    vapid_private_key = webpush_settings.get('VAPID_PRIVATE_KEY')
+    if not vapid_private_key:
+        return {}
+    return {
+        'vapid_private_key': vapid_private_key,
+        'vapid_claims': {"sub": f"mailto:{webpush_settings.get('VAPID_ADMIN_EMAIL')}"},
+    }
+
+
+# Push service answers meaning the subscription no longer exists
+GONE_STATUS_CODES = (404, 410)
+
+SENT = 'sent'
+FAILED = 'failed'
+GONE = 'gone'
+
+
+def _fan_out_workers():
+    return getattr(settings, 'PUSH_NOTIFICATION_SEND_CONCURRENCY', 8)
+
+
+def _deliver(subscription, payload, ttl):
+    """
+    POST one payload to one subscription over the shared keep-alive session.
+    Touches no database, so it is safe to run on pool threads.
+
+    Returns:
+        str: SENT, GONE (404/410, the subscription should be deleted) or FAILED
+    """
+    subscription_info = {
+        "endpoint": subscription.endpoint,
+        "keys": {"p256dh": subscription.p256dh, "auth": subscription.auth},
+    }
+    try:
+        webpush(
+            subscription_info=subscription_info,
+            data=json.dumps(payload),
+            ttl=ttl,
+            timeout=getattr(settings, 'PUSH_NOTIFICATION_TIMEOUT', 10),
+            requests_session=get_pooled_session('webpush', pool_size=_fan_out_workers()),
+            **_vapid_kwargs()
+        )
+        return SENT
+    except WebPushException as e:
+        if getattr(e.response, 'status_code', None) in GONE_STATUS_CODES:
+            return GONE
+        logger.warning(f"Push service rejected subscription {subscription.id}: {e}")
+        return FAILED
+    except Exception as e:
+        logger.warning(f"Error sending to push subscription {subscription.id}: {e}")
+        return FAILED
+
+
+def prune_subscriptions(subscription_ids):
+    """Delete subscriptions the push service reported gone (their user mappings cascade)."""
+    from webpush.models import SubscriptionInfo
+
+    if not subscription_ids:
+        return 0
+    SubscriptionInfo.objects.filter(id__in=subscription_ids).delete()
+    logger.info(f"Pruned {len(subscription_ids)} expired push subscription(s)")
+    return len(subscription_ids)
+
+
+def send_to_subscription(subscription, payload, ttl=1000):
+    """
+    Deliver one payload to one browser subscription, deleting it if the push
+    service reports it gone.
+
+    Returns:
+        bool: True if the push service accepted the message
+    """
+    outcome = _deliver(subscription, payload, ttl)
+    if outcome == GONE:
+        prune_subscriptions([subscription.id])
+    return outcome == SENT
+
+
+def resolve_push_subscriptions(users):
+    """
+    Push subscriptions of many custom users in one indexed query.
+
+    Returns:
+        dict: {user_id: [SubscriptionInfo, ...]}; users without subscriptions are omitted
+    """
+    from apps.users.models import PushSubscription
+
+    user_ids = {user.user_id for user in users}
+    if not user_ids:
+        return {}
+
+    subscriptions_by_user = {}
+    for push_subscription in PushSubscription.objects.filter(user_id__in=user_ids).select_related('subscription'):
+        subscriptions_by_user.setdefault(push_subscription.user_id, []).append(push_subscription.subscription)
+    return subscriptions_by_user
+
+
+def fan_out_push(users, payload, ttl=1000, max_workers=None):
+    """
+    Send one payload to every subscription of every user:
+    one query to resolve subscriptions, concurrent delivery over the pooled
+    session, then one DELETE for the subscriptions the push service reported
+    gone.
+
+    Returns:
+        dict: per-run summary with users, subscriptions, sent, failed, pruned,
+        unsubscribed (users with no subscription) and delivered_user_ids
     """
-    Send a push notification to a user.
+    users = list(users)
+    subscriptions_by_user = resolve_push_subscriptions(users)
+    targets = [
+        (user_id, subscription)
+        for user_id, subscriptions in subscriptions_by_user.items()
+        for subscription in subscriptions
+    ]
+
+    outcomes = []
+    if targets:
+        workers = min(max_workers or _fan_out_workers(), len(targets))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(lambda target: _deliver(target[1], payload, ttl), targets))
+
+    gone_ids = [subscription.id for (_, subscription), outcome in zip(targets, outcomes) if outcome == GONE]
+    summary = {
+        'users': len({user.user_id for user in users}),
+        'subscriptions': len(targets),
+        'sent': outcomes.count(SENT),
+        'failed': outcomes.count(FAILED),
+        'pruned': prune_subscriptions(gone_ids),
+        'unsubscribed': len({user.user_id for user in users} - set(subscriptions_by_user)),
+        'delivered_user_ids': {user_id for (user_id, _), outcome in zip(targets, outcomes) if outcome == SENT},
+    }
+    return summary
+
+
+def log_push_summary(label, summary):
+    logger.info(
+        f"{label}: {summary['sent']}/{summary['subscriptions']} subscription(s) sent, "
+        f"{summary['failed']} failed, {summary['pruned']} pruned, "
+        f"{summary['unsubscribed']}/{summary['users']} user(s) not subscribed"
+    )
+
+
+def send_push_notification(user, title, body, url="/", icon=DEFAULT_ICON, ttl=1000):
+    """
+    Send a push notification to a user, synchronously.
+    Request-path code should queue it with
+    apps.core.services.push_dispatcher.enqueue_push_notification instead.
     
     Args:
         user: Custom User instance (apps.users.models.User)
@@ -28,47 +195,20 @@ def send_push_notification(user, title, body, url="/", icon="/static/frontend/im
         if not user:
             logger.warning("Cannot send notification: user is None")
             return False
-        
-        # Truncate body to 50 chars to keep popup clean
-        body_preview = body[:50] + "..." if len(body) > 50 else body
-        
-        payload = {
-            "head": title,
-            "body": body_preview,
-            "icon": icon,
-            "url": url
-        }
-        
-        # Map custom User to Django User for webpush
-        try:
-            django_user = DjangoUser.objects.get(username=user.username)
-            
-            # Check if user has any push subscriptions
-            from webpush.models import PushInformation
-            subscription_count = PushInformation.objects.filter(user=django_user).count()
-            
-            if subscription_count == 0:
-                logger.warning(f"User {user.username} has no push subscriptions (Django User exists but not subscribed)")
-                return False
-            
-            # Send the notification
-            send_user_notification(user=django_user, payload=payload, ttl=ttl)
-            logger.info(f"Push notification sent to {user.username}: {title} ({subscription_count} subscription(s))")
-            return True
-        except DjangoUser.DoesNotExist:
-            # Django User doesn't exist yet - user hasn't subscribed to push
-            logger.warning(f"User {user.username} has not subscribed to push notifications (no Django User found)")
-            return False
-        except Exception as e:
-            logger.error(f"Error sending push notification to {user.username}: {e}", exc_info=True)
-            return False
+
+        summary = fan_out_push([user], build_push_payload(title, body, url, icon), ttl)
+        if summary['sent']:
+            logger.info(f"Push notification sent to {user.username}: {title} ({summary['sent']} subscription(s))")
+        elif summary['unsubscribed']:
+            logger.warning(f"User {user.username} has no push subscriptions")
+        return summary['sent'] > 0
                 
     except Exception as e:
         logger.error(f"Error sending push notification: {e}", exc_info=True)
         return False
 
 
-def send_notification_to_cooperative_officers(coop, title, body, url="/", icon="/static/frontend/images/Logo.png"):
+def send_notification_to_cooperative_officers(coop, title, body, url="/", icon=DEFAULT_ICON):
     """
     Send push notification to all officers of a cooperative.
     
@@ -80,43 +220,67 @@ def send_notification_to_cooperative_officers(coop, title, body, url="/", icon="
         icon: Icon URL
     
     Returns:
-        int: Number of notifications sent successfully
+        int: Number of officers reached on at least one subscription
     """
-    from apps.cooperatives.models import Officer
-    from apps.users.models import User as CustomUser
-    
     try:
-        # Get all officers for this cooperative
-        officers = Officer.objects.filter(coop=coop)
-        total_officers = officers.count()
-        
-        logger.info(f"Attempting to send notifications to {total_officers} officer(s) of {coop.cooperative_name}")
-        
-        if total_officers == 0:
-            logger.warning(f"No officers found for cooperative {coop.cooperative_name}")
+        users = get_officer_users_by_coop([coop.coop_id])[coop.coop_id]
+        if not users:
+            logger.warning(f"No officers with accounts found for cooperative {coop.cooperative_name}")
             return 0
-        
-        sent_count = 0
-        for officer in officers:
-            try:
-                # Get the user associated with this officer
-                user = CustomUser.objects.get(user_id=officer.user_id)
-                logger.debug(f"Sending notification to officer: {user.username}")
-                
-                if send_push_notification(user, title, body, url, icon):
-                    sent_count += 1
-                    logger.debug(f"Successfully sent notification to {user.username}")
-                else:
-                    logger.debug(f"Failed to send notification to {user.username} (user may not be subscribed)")
-            except CustomUser.DoesNotExist:
-                logger.warning(f"Officer {officer.officer_id} has no associated user")
-            except Exception as e:
-                logger.error(f"Error sending notification to officer {officer.officer_id}: {e}", exc_info=True)
-        
-        logger.info(f"Sent {sent_count}/{total_officers} notifications to officers of {coop.cooperative_name}")
-        return sent_count
+
+        summary = fan_out_push(users, build_push_payload(title, body, url, icon))
+        log_push_summary(f"Officers of {coop.cooperative_name}", summary)
+        return len(summary['delivered_user_ids'])
         
     except Exception as e:
         logger.error(f"Error sending notifications to cooperative officers: {e}", exc_info=True)
         return 0
 
+
+def get_officer_users_by_coop(coop_ids):
+    """
+    Officer login accounts for many cooperatives in a single query.
+
+    Returns:
+        dict: {coop_id: [User, ...]} (officers without a user account are left out)
+    """
+    from apps.cooperatives.models import Officer
+
+    users_by_coop = {coop_id: [] for coop_id in coop_ids}
+    officers = Officer.objects.filter(coop_id__in=coop_ids, user__isnull=False).select_related('user')
+    for officer in officers:
+        users_by_coop[officer.coop_id].append(officer.user)
+    return users_by_coop
+
+
+def send_push_notifications_in_batches(users, title, body, url="/", icon=DEFAULT_ICON,
+                                       batch_size=None, max_workers=None):
+    """
+    Send the same push notification to many users. Each batch costs one
+    subscription query, and its subscriptions are sent to concurrently.
+
+    Args:
+        users: list of custom User instances
+        batch_size: users per batch (default PUSH_NOTIFICATION_BATCH_SIZE)
+        max_workers: concurrent sends (default PUSH_NOTIFICATION_SEND_CONCURRENCY)
+
+    Returns:
+        list[bool]: delivery result per user, in the same order as `users`
+    """
+    if not users:
+        return []
+
+    batch_size = batch_size or getattr(settings, 'PUSH_NOTIFICATION_BATCH_SIZE', 50)
+    payload = build_push_payload(title, body, url, icon)
+    totals = {'users': 0, 'subscriptions': 0, 'sent': 0, 'failed': 0, 'pruned': 0, 'unsubscribed': 0}
+
+    batches = [users[i:i + batch_size] for i in range(0, len(users), batch_size)]
+    results = []
+    for batch in batches:
+        summary = fan_out_push(batch, payload, max_workers=max_workers)
+        for key in totals:
+            totals[key] += summary[key]
+        results.extend(user.user_id in summary['delivered_user_ids'] for user in batch)
+
+    log_push_summary(f"Push fan-out ({len(batches)} batch(es))", totals)
+    return results
@@ -0,0 +1,185 @@
+# apps/core/services/batch_sender.py
+"""
+Shared plumbing for sending many HTTP requests to a rate-limited provider.
+
+- A pooled keep-alive requests.Session per provider, reused across calls,
+  so each batch does not pay for a new TCP/TLS handshake.
+- A thread-safe token bucket that paces requests to the provider quota.
+- A BatchSender that dispatches batches on a bounded thread pool and retries
+  429/5xx responses and connection errors per batch with jittered backoff.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_pooled_session(name, pool_size=10):
+    """
+    Return the process-wide keep-alive session for a provider, creating it on first use.
+    The connection pool is sized so every worker thread can hold a connection.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[name] = session
+        return session
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("TokenBucket rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            self._sleep(wait)
+
+
+class BatchSender:
+    """
+    Sends a list of batches concurrently through `send_fn(session, batch)`,
+    which must return a requests.Response.
+
+    Each batch result is a dict with:
+        index, batch, success, status_code, attempts, latency, error, response
+    Results are returned in the same order as the input batches.
+    """
+
+    def __init__(self, session, rate_limiter=None, max_workers=4, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, retry_statuses=RETRYABLE_STATUS_CODES,
+                 sleep=time.sleep):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = retry_statuses
+        self._sleep = sleep
+
+    def _retry_delay(self, attempt, response=None):
+        """Honor Retry-After when the provider sends one, otherwise use full-jitter backoff."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _send_one(self, index, batch, send_fn):
+        started = time.perf_counter()
+        response = None
+        error = None
+        attempts = 0
+
+        for attempt in range(self.max_retries + 1):
+            attempts = attempt + 1
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            response = None
+            try:
+                response = send_fn(self.session, batch)
+            except requests.exceptions.RequestException as e:
+                error = f"Request error: {e}"
+            else:
+                if response.status_code < 400:
+                    error = None
+                    break
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in self.retry_statuses:
+                    break
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt, response)
+                logger.warning(f"Batch {index} failed ({error}), retrying in {delay:.2f}s")
+                self._sleep(delay)
+
+        return {
+            'index': index,
+            'batch': batch,
+            'success': error is None,
+            'status_code': response.status_code if response is not None else None,
+            'attempts': attempts,
+            'latency': time.perf_counter() - started,
+            'error': error,
+            'response': response,
+        }
+
+    def send(self, batches, send_fn):
+        """Send all batches and return (results, stats)."""
+        started = time.perf_counter()
+        if not batches:
+            return [], summarize_results([], 0.0)
+
+        workers = min(self.max_workers, len(batches))
+        if workers == 1:
+            results = [self._send_one(i, b, send_fn) for i, b in enumerate(batches)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._send_one, i, b, send_fn) for i, b in enumerate(batches)]
+                results = [f.result() for f in futures]
+
+        return results, summarize_results(results, time.perf_counter() - started)
+
+
+def summarize_results(results, elapsed):
+    """Throughput and latency figures for a send, suitable for logging."""
+    latencies = sorted(r['latency'] for r in results)
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(round(p * (len(latencies) - 1))))]
+
+    return {
+        'batches': len(results),
+        'succeeded': sum(1 for r in results if r['success']),
+        'retries': sum(r['attempts'] - 1 for r in results),
+        'elapsed': elapsed,
+        'batches_per_second': (len(results) / elapsed) if elapsed > 0 else 0.0,
+        'latency_p50': percentile(0.50),
+        'latency_p95': percentile(0.95),
+        'latency_max': latencies[-1] if latencies else 0.0,
+    }
@@ -0,0 +1,94 @@
+# apps/core/services/email_payload.py
+"""
+Builds the Brevo request body for a bulk announcement once per send.
+
+Everything except the recipient list (sender, subject, HTML, the inline header
+image and the base64 attachments) is identical for every batch, so it is
+encoded and JSON-serialized a single time. Each batch then only serializes its
+own 'to' list and splices it onto the shared prefix.
+"""
+import base64
+import json
+import os
+from functools import lru_cache
+
+from django.conf import settings
+
+HEADER_IMAGE_CID = 'header_image'  # Matches cid:header_image in the HTML template
+
+
+@lru_cache(maxsize=1)
+def get_header_inline_attachment():
+    """
+    The e-mail header image as a Brevo inline attachment, read and
+    base64-encoded once per process. Returns None if the image is missing.
+    """
+    header_image_path = os.path.join(settings.BASE_DIR, 'static', 'frontend', 'images', 'header.png')
+    if not os.path.exists(header_image_path):
+        return None
+
+    with open(header_image_path, 'rb') as img:
+        return {
+            'content': base64.b64encode(img.read()).decode('ascii'),
+            'name': 'header.png',
+            'cid': HEADER_IMAGE_CID
+        }
+
+
+def encode_attachments(files):
+    """
+    Base64-encode each attachment exactly once.
+
+    Args:
+        files: iterable of (filename, bytes-like content) in display order
+    Returns:
+        List of Brevo attachment dicts ({'name', 'content'})
+    """
+    return [
+        {'name': filename, 'content': base64.b64encode(content).decode('ascii')}
+        for filename, content in files
+        if content
+    ]
+
+
+class BrevoPayloadBuilder:
+    """
+    Pre-serialized Brevo /smtp/email body shared by every batch of one send.
+
+    Usage:
+        builder = BrevoPayloadBuilder(subject, html_content, attachments=encode_attachments(files))
+        session.post(url, data=builder.body_for(chunk), headers=...)
+    """
+
+    def __init__(self, subject, html_content, attachments=None, inline_attachments=None,
+                 sender_name=None, sender_email=None):
+        payload = {
+            'sender': {
+                'name': sender_name or settings.BREVO_SENDER_NAME,
+                'email': sender_email or settings.BREVO_SENDER_EMAIL
+            },
+            'subject': subject,
+            'htmlContent': html_content
+        }
+
+        if inline_attachments is None:
+            header = get_header_inline_attachment()
+            inline_attachments = [header] if header else []
+        if inline_attachments:
+            payload['inlineAttachments'] = inline_attachments
+        if attachments:
+            payload['attachment'] = attachments
+
+        # '{...}' -> '{...,"to":' so each batch appends its recipients and the closing brace
+        serialized = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self._prefix = serialized[:-1] + b',"to":'
+
+    @property
+    def shared_size(self):
+        """Bytes of the body shared by every batch (attachments, HTML, etc.)."""
+        return len(self._prefix)
+
+    def body_for(self, recipients):
+        """Full JSON body for one batch of {'email', 'name'} recipients."""
+        to = [{'email': r['email'], 'name': r.get('name')} for r in recipients]
+        return self._prefix + json.dumps(to, separators=(',', ':')).encode('utf-8') + b'}'
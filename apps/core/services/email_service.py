@@ -1,10 +1,50 @@
 # apps/core/services/email_service.py
-import requests
 from django.conf import settings
 from django.db import connection
 from django.template.loader import render_to_string
 from typing import Tuple
 import html
+import logging
+import threading
+
+from .batch_sender import BatchSender, TokenBucket, get_pooled_session
+from .email_payload import BrevoPayloadBuilder, encode_attachments
+from apps.communications.models import AnnouncementAttachment
+from apps.communications.delivery_ledger import (
+    get_delivery_summary,
+    get_outstanding_deliveries,
+    record_batch_result,
+    snapshot_recipients,
+)
+
+logger = logging.getLogger(__name__)
+
+_brevo_rate_limiter = None
+_brevo_rate_limiter_lock = threading.Lock()
+
+
+def get_brevo_sender() -> BatchSender:
+    """
+    Build a BatchSender for the Brevo API.
+    The session and token bucket are shared by every send in this process,
+    so concurrent announcements stay within the provider quota together.
+    """
+    global _brevo_rate_limiter
+    max_workers = getattr(settings, 'BREVO_MAX_CONCURRENCY', 4)
+    
+    with _brevo_rate_limiter_lock:
+        if _brevo_rate_limiter is None:
+            _brevo_rate_limiter = TokenBucket(
+                rate=getattr(settings, 'BREVO_RATE_LIMIT_PER_SECOND', 10),
+                capacity=getattr(settings, 'BREVO_RATE_LIMIT_BURST', None)
+            )
+    
+    return BatchSender(
+        session=get_pooled_session('brevo', pool_size=max_workers),
+        rate_limiter=_brevo_rate_limiter,
+        max_workers=max_workers,
+        max_retries=getattr(settings, 'BREVO_MAX_RETRIES', 3)
+    )
 
 
 class EmailService:
@@ -30,10 +70,14 @@ class EmailService:
             if not announcement_data:
                 return False, "Announcement not found"
             
-            # Get all officer emails for this announcement
+            # Snapshot recipients into the delivery ledger on the first attempt,
+            # then only send to officers who have not received it yet
             recipients_list = self._get_announcement_recipients(announcement_id)
             
             if not recipients_list:
+                summary = get_delivery_summary(announcement_id, 'e-mail')
+                if summary['sent']:
+                    return True, f"Email already delivered to all {summary['sent']} recipient(s)"
                 return False, "No valid email recipients found"
             
             # Format content as HTML
@@ -48,24 +92,20 @@ class EmailService:
                 subject=announcement_data['title'],
                 html_content=html_content,
                 recipients_list=recipients_list,
-                attachment_data=announcement_data.get('attachment_data')
+                attachments=self._get_announcement_attachments(announcement_id)
             )
             
         except Exception as e:
             return False, f"Error sending bulk email: {str(e)}"
     
     def _get_announcement_data(self, announcement_id: int) -> dict:
-        """Get announcement title, sender information, and attachments."""
+        """Get announcement title and sender information."""
         try:
             with connection.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
                         a.title,
-                        COALESCE(s.fullname, adm.fullname, 'System') as sender_name,
-                        a.attachment,
-                        a.attachment_filename,
-                        a.attachment_content_type,
-                        a.attachment_size
+                        COALESCE(s.fullname, adm.fullname, 'System') as sender_name
                     FROM announcements a
                     LEFT JOIN staff s ON a.staff_id = s.staff_id
                     LEFT JOIN admin adm ON a.admin_id = adm.admin_id
@@ -74,70 +114,78 @@ class EmailService:
                 
                 row = cursor.fetchone()
                 if row:
-                    result = {
+                    return {
                         'title': row[0],
                         'sender_name': row[1]
                     }
-                    
-                    # Add attachment data if exists
-                    if row[2] and row[3]:  # attachment and attachment_filename
-                        result['attachment_data'] = {
-                            'content': row[2],
-                            'filenames': row[3],
-                            'content_type': row[4],
-                            'size': row[5]
-                        }
-                    
-                    return result
             return None
         except Exception as e:
             print(f"Error retrieving announcement data: {e}")
             return None
     
-    def _get_announcement_recipients(self, announcement_id: int) -> list:
+    def _get_announcement_attachments(self, announcement_id: int) -> list:
         """
-        Retrieve all officer email addresses for a given announcement.
-        Handles both cooperative-level and officer-level recipients.
-        Returns list of dicts with 'email' and 'name' keys.
+        Get the announcement's files as (filename, content) pairs in display order.
+        Reads the announcement_attachments table, falling back to the deprecated
+        single-blob announcements.attachment column for older announcements.
         """
         try:
+            files = list(
+                AnnouncementAttachment.objects
+                .filter(announcement_id=announcement_id)
+                .order_by('display_order', 'attachment_id')
+                .values_list('original_filename', 'file_data')
+            )
+            if files:
+                return files
+            
             with connection.cursor() as cursor:
                 cursor.execute("""
-                    SELECT DISTINCT o.email, o.fullname
-                    FROM announcement_officer_recipients aor
-                    JOIN officers o ON aor.officer_id = o.officer_id
-                    WHERE aor.announcement_id = %s AND o.email IS NOT NULL AND o.email != ''
-                    
-                    UNION
-                    
-                    SELECT DISTINCT o.email, o.fullname
-                    FROM announcement_recipients ar
-                    JOIN officers o ON ar.coop_id = o.coop_id
-                    WHERE ar.announcement_id = %s AND o.email IS NOT NULL AND o.email != ''
-                """, [announcement_id, announcement_id])
-                
-                recipients = cursor.fetchall()
+                    SELECT attachment, attachment_filename
+                    FROM announcements
+                    WHERE announcement_id = %s AND attachment IS NOT NULL
+                """, [announcement_id])
+                row = cursor.fetchone()
             
-            # Return list of dicts for Brevo API
+            if row and row[0] and row[1]:
+                # Legacy combined blob: filenames are semicolon-separated,
+                # sent as a single attachment under the first name
+                filenames = row[1].split(';')
+                filename = filenames[0].strip() if filenames else 'attachment.bin'
+                return [(filename, row[0])]
+            return []
+        except Exception as e:
+            print(f"Error retrieving announcement attachments: {e}")
+            return []
+    
+    def _get_announcement_recipients(self, announcement_id: int) -> list:
+        """
+        Retrieve the officer e-mail addresses for a given announcement that still
+        need the message, from the delivery ledger.
+        Handles both cooperative-level and officer-level recipients.
+        Returns list of dicts with 'email', 'name' and 'delivery_id' keys.
+        """
+        try:
+            snapshot_recipients(announcement_id, 'e-mail')
             return [
-                {'email': email, 'name': name} 
-                for email, name in recipients 
-                if email
+                {'email': d.address, 'name': d.recipient_name, 'delivery_id': d.delivery_id}
+                for d in get_outstanding_deliveries(announcement_id, 'e-mail')
             ]
             
         except Exception as e:
             print(f"Error retrieving recipients: {e}")
             return []
     
-    def _send_bulk_email(self, subject: str, html_content: str, recipients_list: list, attachment_data: dict = None) -> Tuple[bool, str]:
+    def _send_bulk_email(self, subject: str, html_content: str, recipients_list: list, attachments: list = None) -> Tuple[bool, str]:
         """
         Send email to multiple recipients using Brevo API with embedded header image.
         
         Args:
             subject: Email subject
             html_content: HTML formatted email body
-            recipients_list: List of dicts with 'email' and 'name' keys
-            attachment_data: Optional dict with 'content', 'filenames', 'content_type', 'size'
+            recipients_list: List of dicts with 'email' and 'name' keys, plus an
+                optional 'delivery_id' to record the outcome in the delivery ledger
+            attachments: Optional list of (filename, content) pairs
             
         Returns:
             Tuple of (success: bool, message: str)
@@ -152,97 +200,68 @@ class EmailService:
             'content-type': 'application/json'
         }
         
-        # Prepare header image as inline attachment
-        import base64
-        import os
-        from django.conf import settings as django_settings
+        # Header image (cached per process) and attachments are base64-encoded
+        # and serialized once here; every batch reuses the same body prefix
+        payload = BrevoPayloadBuilder(
+            subject=subject,
+            html_content=html_content,
+            attachments=encode_attachments(attachments or [])
+        )
         
-        header_image_path = os.path.join(django_settings.BASE_DIR, 'static', 'frontend', 'images', 'header.png')
-        inline_attachments = []
+        # Brevo has a limit on recipients per email
+        # We'll send to batches of 50 recipients
+        chunk_size = getattr(settings, 'BREVO_BATCH_SIZE', 50)
+        chunks = [recipients_list[i:i + chunk_size] for i in range(0, len(recipients_list), chunk_size)]
         
-        if os.path.exists(header_image_path):
-            with open(header_image_path, 'rb') as img:
-                encoded_image = base64.b64encode(img.read()).decode('utf-8')
-                inline_attachments.append({
-                    'content': encoded_image,
-                    'name': 'header.png',
-                    'cid': 'header_image'  # This matches cid:header_image in HTML
-                })
+        def post_chunk(session, chunk):
+            # Brevo can handle multiple recipients in 'to' field
+            return session.post(
+                settings.BREVO_API_URL,
+                headers=headers,
+                data=payload.body_for(chunk),
+                timeout=30
+            )
         
-        # Prepare regular attachments for Brevo (base64 encoded)
-        attachments = []
-        if attachment_data and attachment_data.get('content') and attachment_data.get('filenames'):
-            # Get filenames (semicolon-separated)
-            filenames = attachment_data['filenames'].split(';')
-            attachment_bytes = attachment_data['content']
-            
-            # For combined files, we need to send as a single attachment
-            # Using the first filename or a generic name
-            filename = filenames[0].strip() if filenames else 'attachment.bin'
-            
-            # Encode to base64
-            encoded_content = base64.b64encode(attachment_bytes).decode('utf-8')
-            
-            attachments.append({
-                'content': encoded_content,
-                'name': filename
-            })
+        # Chunks go out concurrently over a pooled keep-alive session,
+        # paced by the provider rate limit and retried on 429/5xx.
+        results, stats = get_brevo_sender().send(chunks, post_chunk)
         
-        # Brevo has a limit on recipients per email
-        # We'll send to batches of 50 recipients
-        chunk_size = 50
         total_sent = 0
         errors = []
-        
-        # Split recipients into chunks
-        for i in range(0, len(recipients_list), chunk_size):
-            chunk = recipients_list[i:i + chunk_size]
+        for result in results:
+            chunk = result['batch']
+            response = result['response']
+            delivery_ids = [r['delivery_id'] for r in chunk if r.get('delivery_id')]
             
-            payload = {
-                'sender': {
-                    'name': settings.BREVO_SENDER_NAME,
-                    'email': settings.BREVO_SENDER_EMAIL
-                },
-                'to': chunk,  # Brevo can handle multiple recipients in 'to' field
-                'subject': subject,
-                'htmlContent': html_content
-            }
+            # Brevo returns 201 on success
+            if result['success'] and response.status_code in [200, 201]:
+                total_sent += len(chunk)
+                try:
+                    message_id = response.json().get('messageId')
+                except ValueError:
+                    message_id = None
+                record_batch_result(delivery_ids, result['index'] + 1, True, provider_message_id=message_id)
+                continue
             
-            # Add inline attachments (header image)
-            if inline_attachments:
-                payload['inlineAttachments'] = inline_attachments
+            if response is not None:
+                try:
+                    error_data = response.json()
+                    error_msg = error_data.get('message', response.text)
+                except:
+                    error_msg = response.text
+                error_text = f"Batch error ({response.status_code}): {error_msg}"
+            else:
+                error_text = result['error']
             
-            # Add regular attachments if present
-            if attachments:
-                payload['attachment'] = attachments
-            
-            try:
-                response = requests.post(
-                    settings.BREVO_API_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                
-                # Brevo returns 201 on success
-                if response.status_code in [200, 201]:
-                    total_sent += len(chunk)
-                    print(f"✓ Email batch sent successfully to {len(chunk)} recipients")
-                else:
-                    try:
-                        error_data = response.json()
-                        error_msg = error_data.get('message', response.text)
-                    except:
-                        error_msg = response.text
-                    
-                    error_text = f"Batch error ({response.status_code}): {error_msg}"
-                    errors.append(error_text)
-                    print(f"✗ {error_text}")
-                    
-            except Exception as e:
-                error_text = f"Request error: {str(e)}"
-                errors.append(error_text)
-                print(f"✗ {error_text}")
+            errors.append(error_text)
+            logger.error(f"Brevo batch {result['index'] + 1} ({len(chunk)} recipients): {error_text}")
+            record_batch_result(delivery_ids, result['index'] + 1, False, error=error_text)
+        
+        logger.info(
+            f"Brevo send: {stats['succeeded']}/{stats['batches']} batches in {stats['elapsed']:.2f}s "
+            f"({stats['batches_per_second']:.1f} batches/s, p50 {stats['latency_p50']:.2f}s, "
+            f"p95 {stats['latency_p95']:.2f}s, {stats['retries']} retries)"
+        )
         
         # Determine final result
         if total_sent == len(recipients_list):
@@ -0,0 +1,202 @@
+"""
+Sliding-window login throttling per username and per client IP.
+
+The login view used to read a failure count from the cache, add one and
+write it back, so concurrent attempts lost updates and could run past the
+limit. Here every attempt on a username is counted with the cache's incr()
+before the password is checked (hit()), and the count it returns is the
+gate: the attempt that takes a username over LOGIN_MAX_ATTEMPTS is refused
+without checking the password, however many arrive at once. incr() is atomic
+on Redis, which settings require for the shared cache outside DEBUG. Other
+backends (the database cache in development) read then write, so a burst can
+slip a few attempts through, and reset the key's expiry; _incr() restores it
+with touch() so a count lasts its whole window.
+
+The IP scope counts failed attempts only (fail()). Many users behind one
+address (a cooperative office behind NAT) can log in successfully any number
+of times; once LOGIN_IP_MAX_ATTEMPTS failures, over any usernames, come from
+one address, it is locked.
+
+Counts use a sliding window approximated with two fixed windows: the current
+window's count plus the previous one's, weighted by how much of it still
+overlaps the sliding window. Keys, in the default cache (shared tier):
+
+- login_throttle:<scope>:<id>:<window index> counts attempts in one window.
+- login_throttle:<scope>:<id>:lock holds the epoch second the lockout ends.
+
+check() and hit() read what they need with one get_many() and return a
+ThrottleState.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_PREFIX = 'login_throttle'
+
+# locked: refuse the attempt; until: epoch second the lockout ends (None if not locked);
+# scope: 'user' or 'ip' for the lock that applies; attempts/ip_attempts: counts in the window
+ThrottleState = namedtuple('ThrottleState', 'locked until scope attempts ip_attempts')
+
+
+def _limits(scope):
+    """(max attempts, window seconds, lockout seconds) for 'user' or 'ip'."""
+    if scope == 'user':
+        return (getattr(settings, 'LOGIN_MAX_ATTEMPTS', 5),
+                getattr(settings, 'LOGIN_ATTEMPT_WINDOW_SECONDS', 24 * 3600),
+                getattr(settings, 'LOGIN_LOCKOUT_SECONDS', 3 * 3600))
+    return (getattr(settings, 'LOGIN_IP_MAX_ATTEMPTS', 30),
+            getattr(settings, 'LOGIN_IP_WINDOW_SECONDS', 3600),
+            getattr(settings, 'LOGIN_IP_LOCKOUT_SECONDS', 3600))
+
+
+def max_attempts():
+    return _limits('user')[0]
+
+
+def normalize(username):
+    return str(username).strip().lower()
+
+
+def client_ip(request):
+    """The client's IP; the first X-Forwarded-For hop only with LOGIN_TRUST_X_FORWARDED_FOR."""
+    if getattr(settings, 'LOGIN_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def _lock_key(scope, ident):
+    return f'{KEY_PREFIX}:{scope}:{ident}:lock'
+
+
+def _window_keys(scope, ident, now):
+    """Keys of the current and the previous window."""
+    window = _limits(scope)[1]
+    index = int(now // window)
+    return (f'{KEY_PREFIX}:{scope}:{ident}:{index}',
+            f'{KEY_PREFIX}:{scope}:{ident}:{index - 1}')
+
+
+def _weighted(scope, current, previous, now):
+    window = _limits(scope)[1]
+    overlap = 1 - (now % window) / window
+    return current + int(previous * overlap)
+
+
+def _incr(key, timeout):
+    # add() is a no-op if the key exists, so incr() always has something to increment
+    cache.add(key, 0, timeout)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+    # Only Redis keeps the expiry through incr(); Django's fallback re-sets the key with the default timeout
+    cache.touch(key, timeout)
+    return count
+
+
+def _lock(scope, ident, now):
+    """Lock `ident`; an existing lock is kept, so concurrent lockers don't extend it."""
+    lockout = _limits(scope)[2]
+    until = int(now) + lockout
+    if not cache.add(_lock_key(scope, ident), until, lockout):
+        until = cache.get(_lock_key(scope, ident), until)
+    return until
+
+
+def _scopes(username, ip):
+    scopes = [('user', normalize(username))]
+    if ip:
+        scopes.append(('ip', ip))
+    return scopes
+
+
+def _read(username, ip, now):
+    """Locks and window counts for both scopes in one cache read."""
+    keys = {}
+    for scope, ident in _scopes(username, ip):
+        current, previous = _window_keys(scope, ident, now)
+        keys[scope] = (_lock_key(scope, ident), current, previous)
+    values = cache.get_many([key for scope_keys in keys.values() for key in scope_keys])
+    return {
+        scope: (values.get(lock_key), values.get(current, 0), values.get(previous, 0))
+        for scope, (lock_key, current, previous) in keys.items()
+    }
+
+
+def _active_lock(state, now):
+    for scope in ('user', 'ip'):
+        until = state.get(scope, (None,))[0]
+        if until and until > now:
+            return scope, until
+    return None, None
+
+
+def check(username, ip=None):
+    """Current state without counting an attempt."""
+    now = time.time()
+    state = _read(username, ip, now)
+    scope, until = _active_lock(state, now)
+    counts = {scope_: _weighted(scope_, current, previous, now)
+              for scope_, (_, current, previous) in state.items()}
+    return ThrottleState(bool(until), until, scope, counts['user'], counts.get('ip', 0))
+
+
+def hit(username, ip=None):
+    """
+    Count a login attempt on the username and say whether it may proceed. Call
+    it right before checking the password; an attempt over the limit locks the
+    username. An IP that has reached its failure limit is refused too.
+    """
+    now = time.time()
+    state = _read(username, ip, now)
+    scope, until = _active_lock(state, now)
+    if until:
+        return ThrottleState(True, until, scope, 0, 0)
+
+    ident = normalize(username)
+    current_key, _ = _window_keys('user', ident, now)
+    attempts = _weighted('user', _incr(current_key, 2 * _limits('user')[1]), state['user'][2], now)
+    ip_attempts = _weighted('ip', state['ip'][1], state['ip'][2], now) if ip else 0
+
+    if attempts > _limits('user')[0]:
+        return ThrottleState(True, _lock('user', ident, now), 'user', attempts, ip_attempts)
+    if ip and ip_attempts >= _limits('ip')[0]:
+        return ThrottleState(True, _lock('ip', ip, now), 'ip', attempts, ip_attempts)
+    return ThrottleState(False, None, None, attempts, ip_attempts)
+
+
+def fail(username, ip, state):
+    """
+    Record that the attempt counted by hit() failed: count it against the IP,
+    and lock the username or IP whose count reached its limit. Returns the
+    updated state.
+    """
+    now = time.time()
+    if ip:
+        current_key, previous_key = _window_keys('ip', ip, now)
+        current = _incr(current_key, 2 * _limits('ip')[1])
+        state = state._replace(ip_attempts=_weighted('ip', current, cache.get(previous_key, 0), now))
+
+    if state.attempts >= _limits('user')[0]:
+        return state._replace(locked=True, until=_lock('user', normalize(username), now), scope='user')
+    if ip and state.ip_attempts >= _limits('ip')[0]:
+        return state._replace(locked=True, until=_lock('ip', ip, now), scope='ip')
+    return state
+
+
+def reset(username):
+    """Clear the username's attempts and lockout after a successful login."""
+    ident = normalize(username)
+    cache.delete_many([_lock_key('user', ident), *_window_keys('user', ident, time.time())])
+
+
+def remaining_text(until):
+    """'2h 59m' until `until` (epoch seconds)."""
+    remaining = max(0, int(until - time.time()))
+    return f'{remaining // 3600}h {(remaining % 3600) // 60}m'
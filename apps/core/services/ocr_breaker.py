@@ -0,0 +1,189 @@
+"""
+Shared circuit breaker and latency histograms for the OCR providers.
+
+The state lives in the default cache (its shared tier), not in the OCR
+service instance, so every process sees the same state and, with Redis as the
+shared cache, it survives restarts. Settings refuse a local-memory shared tier
+outside DEBUG; with one (development, tests) each process has its own breaker,
+which is_process_local() reports and the first trip logs as a warning.
+
+- ocr:breaker:<provider> holds tripped_until and the reason. A quota error
+  trips the breaker until local midnight, like the old per-process daily
+  reset. OCR_BREAKER_FAILURE_THRESHOLD consecutive failures trip it for
+  OCR_BREAKER_COOLDOWN_SECONDS.
+- ocr:failures:<provider> counts consecutive failures.
+- ocr:latency:<provider>:<bucket> counts successful calls per latency bucket.
+  latency_percentile() reads this for the hedging delay, and
+  get_provider_stats() exposes it.
+"""
+import logging
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last one catches the rest
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 90, float('inf'))
+PROVIDERS = ('optiic', 'ocr_space', 'tesseract')
+# Histograms are read at most this often per process for hedging decisions
+HISTOGRAM_REFRESH_SECONDS = 30
+# Counters outlive any realistic gap between scans; the cache still bounds them
+COUNTER_TIMEOUT = 30 * 24 * 60 * 60
+
+_histogram_memo = {}
+_warned_process_local = False
+
+
+def _bucket_label(bound):
+    return 'inf' if bound == float('inf') else f'{bound:g}'
+
+
+def _breaker_key(provider):
+    return f'ocr:breaker:{provider}'
+
+
+def _failures_key(provider):
+    return f'ocr:failures:{provider}'
+
+
+def _latency_key(provider, bound):
+    return f'ocr:latency:{provider}:{_bucket_label(bound)}'
+
+
+def _incr(key):
+    # add() is a no-op if the key exists, so incr() always has something to increment
+    cache.add(key, 0, COUNTER_TIMEOUT)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, COUNTER_TIMEOUT)
+        return 1
+    # Only Redis keeps the expiry through incr(); Django's fallback re-sets the key with the default timeout
+    cache.touch(key, COUNTER_TIMEOUT)
+    return count
+
+
+def is_process_local():
+    """Whether the breaker's cache keeps state per process, so other workers never see a trip."""
+    # TieredCache keeps breaker keys on its shared tier only
+    backend = caches['default']
+    return isinstance(getattr(backend, 'shared', backend), (LocMemCache, DummyCache))
+
+
+def is_open(provider):
+    """Whether calls to `provider` should be skipped right now (False if the cache is unreachable)."""
+    try:
+        state = cache.get(_breaker_key(provider))
+    except Exception as e:
+        logger.warning(f"OCR breaker state unavailable for {provider}: {e}")
+        return False
+    return bool(state) and state['tripped_until'] > time.time()
+
+
+def trip(provider, reason, until=None):
+    """Stop calling `provider` until `until` (epoch seconds; default: OCR_BREAKER_COOLDOWN_SECONDS from now)."""
+    until = until or time.time() + getattr(settings, 'OCR_BREAKER_COOLDOWN_SECONDS', 300)
+    cache.set(_breaker_key(provider), {'tripped_until': until, 'reason': reason},
+              max(1, int(until - time.time())))
+    logger.warning(f"OCR breaker for {provider} tripped until "
+                   f"{datetime.fromtimestamp(until, tz=timezone.get_current_timezone()):%Y-%m-%d %H:%M:%S}: {reason}")
+
+    global _warned_process_local
+    if not _warned_process_local and is_process_local():
+        _warned_process_local = True
+        logger.warning("OCR breaker state is kept per process (local-memory cache); other workers will keep "
+                       "calling the provider. Set CACHE_SHARED_BACKEND to Redis.")
+
+
+def trip_until_tomorrow(provider, reason):
+    """Quota exhausted: skip `provider` for the rest of the (local) day."""
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    midnight = timezone.make_aware(datetime.combine(tomorrow, dt_time.min))
+    trip(provider, reason, until=midnight.timestamp())
+
+
+def record(provider, seconds, success):
+    """Record one provider call: latency for successes, consecutive failures otherwise."""
+    try:
+        if success:
+            bound = next(bound for bound in LATENCY_BUCKETS if seconds <= bound)
+            _incr(_latency_key(provider, bound))
+            cache.delete(_failures_key(provider))
+            return
+
+        failures = _incr(_failures_key(provider))
+        if failures >= getattr(settings, 'OCR_BREAKER_FAILURE_THRESHOLD', 5):
+            cache.delete(_failures_key(provider))
+            trip(provider, f"{failures} consecutive failures")
+    except Exception as e:
+        # Bookkeeping only; never fail the OCR request over it
+        logger.warning(f"Could not record OCR call for {provider}: {e}")
+
+
+def get_histogram(provider):
+    """{bucket label: count} of successful call latencies for `provider`."""
+    keys = {_latency_key(provider, bound): _bucket_label(bound) for bound in LATENCY_BUCKETS}
+    counts = cache.get_many(list(keys))
+    return {label: counts.get(key, 0) for key, label in keys.items()}
+
+
+def _percentile_from_histogram(histogram, percentile):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bound in LATENCY_BUCKETS:
+        seen += histogram[_bucket_label(bound)]
+        if seen >= percentile * total:
+            return bound
+    return LATENCY_BUCKETS[-1]
+
+
+def latency_percentile(provider, percentile, min_samples=0):
+    """
+    Upper bucket bound holding the given latency percentile, or None with fewer
+    than `min_samples` recorded calls. Histograms are re-read from the cache at
+    most every HISTOGRAM_REFRESH_SECONDS.
+    """
+    memo = _histogram_memo.get(provider)
+    if memo is None or time.monotonic() - memo[0] > HISTOGRAM_REFRESH_SECONDS:
+        try:
+            memo = (time.monotonic(), get_histogram(provider))
+        except Exception as e:
+            logger.warning(f"OCR latency histogram unavailable for {provider}: {e}")
+            return None
+        _histogram_memo[provider] = memo
+    histogram = memo[1]
+    if sum(histogram.values()) < min_samples:
+        return None
+    return _percentile_from_histogram(histogram, percentile)
+
+
+def get_provider_stats():
+    """Breaker state, consecutive failures, latency histogram and percentiles per provider."""
+    def label(bound):
+        return _bucket_label(bound) if bound is not None else None
+
+    stats = {}
+    for provider in PROVIDERS:
+        histogram = get_histogram(provider)
+        state = cache.get(_breaker_key(provider))
+        open_ = bool(state) and state['tripped_until'] > time.time()
+        stats[provider] = {
+            'breaker_open': open_,
+            'tripped_until': datetime.fromtimestamp(state['tripped_until'], tz=dt_timezone.utc).isoformat() if open_ else None,
+            'reason': state['reason'] if open_ else None,
+            'consecutive_failures': cache.get(_failures_key(provider), 0),
+            'calls': sum(histogram.values()),
+            'latency_histogram': histogram,
+            # Bucket upper bounds in seconds, as labels ('inf' past the last bound)
+            'p50': label(_percentile_from_histogram(histogram, 0.50)),
+            'p95': label(_percentile_from_histogram(histogram, 0.95)),
+        }
+    return stats
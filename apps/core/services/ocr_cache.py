@@ -0,0 +1,187 @@
+"""
+Persistent cache of OCR results (databank.OCRResultCache).
+
+Optiic and OCR.space are paid or quota-limited. Staff often rescan the same
+page or paste the same clipboard image again, so results are keyed by a
+SHA-256 of the normalized image:
+
+- Images Pillow can decode are hashed on mode, size and raw pixel data. A
+  re-encoded or metadata-stripped copy of the same picture therefore hits.
+- Anything else is hashed on its raw bytes.
+
+A 64-bit difference hash is stored alongside. When
+OCR_CACHE_NEAR_DUPLICATE_DISTANCE is above 0, a miss may be answered by an
+entry within that many differing bits. This is off by default: two copies of
+the same form with different handwritten figures can hash very close.
+
+Entries expire after OCR_CACHE_TTL_DAYS. Beyond OCR_CACHE_MAX_ENTRIES the
+least recently used entries are evicted. Cache errors never fail an OCR
+request; they are logged and treated as a miss.
+"""
+import hashlib
+import io
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# At most this many least recently used entries are deleted per store; the rest go on later stores
+EVICT_BATCH = 500
+
+
+def _ttl():
+    return timedelta(days=getattr(settings, 'OCR_CACHE_TTL_DAYS', 30))
+
+
+def _open_image(content):
+    try:
+        from PIL import Image
+        image = Image.open(io.BytesIO(content))
+        image.load()
+        return image
+    except Exception:
+        return None
+
+
+def content_hash(content, image=None):
+    """SHA-256 of the decoded pixels when `content` is an image, else of the raw bytes."""
+    image = image if image is not None else _open_image(content)
+    digest = hashlib.sha256()
+    if image is None:
+        digest.update(b'raw:')
+        digest.update(content)
+    else:
+        digest.update(f'{image.mode}:{image.size[0]}x{image.size[1]}:'.encode())
+        digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def perceptual_hash(image):
+    """64-bit difference hash of an image as a signed integer (fits a BigIntegerField)."""
+    from PIL import Image
+
+    pixels = list(image.convert('L').resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count('1')
+
+
+class CacheKey:
+    """Hashes of one image, computed once per request."""
+
+    def __init__(self, content):
+        image = _open_image(content)
+        self.content_hash = content_hash(content, image)
+        self.perceptual_hash = perceptual_hash(image) if image is not None else None
+
+    def __repr__(self):
+        return f"<CacheKey {self.content_hash[:12]}>"
+
+
+def _to_result(entry, near_duplicate=False):
+    return {
+        'success': True,
+        'text': entry.text,
+        'language': entry.language or 'unknown',
+        'provider': entry.provider,
+        'error': None,
+        'cached': True,
+        'near_duplicate': near_duplicate,
+    }
+
+
+def _find_near_duplicate(fresh, key, max_distance):
+    if key.perceptual_hash is None:
+        return None
+    candidates = fresh.filter(perceptual_hash__isnull=False).values_list('id', 'perceptual_hash')
+    best = None
+    for entry_id, phash in candidates.iterator():
+        distance = hamming_distance(phash, key.perceptual_hash)
+        if distance <= max_distance and (best is None or distance < best[1]):
+            best = (entry_id, distance)
+    return fresh.filter(id=best[0]).first() if best else None
+
+
+def lookup(key):
+    """Cached OCR result for `key`, or None. Records the hit."""
+    from apps.databank.models import OCRResultCache
+
+    try:
+        fresh = OCRResultCache.objects.filter(created_at__gte=timezone.now() - _ttl())
+        entry = fresh.filter(content_hash=key.content_hash).first()
+        near_duplicate = False
+        max_distance = getattr(settings, 'OCR_CACHE_NEAR_DUPLICATE_DISTANCE', 0)
+        if entry is None and max_distance > 0:
+            entry = _find_near_duplicate(fresh, key, max_distance)
+            near_duplicate = entry is not None
+        if entry is None:
+            return None
+        OCRResultCache.objects.filter(id=entry.id).update(hit_count=F('hit_count') + 1, last_hit_at=timezone.now())
+    except DatabaseError as e:
+        logger.warning(f"OCR cache lookup failed for {key!r}: {e}")
+        return None
+
+    logger.info(f"OCR cache hit for {key!r} ({entry.provider}); provider call avoided")
+    return _to_result(entry, near_duplicate)
+
+
+def store(key, result):
+    """Cache a successful OCR result with non-empty text, then evict expired/excess entries."""
+    from apps.databank.models import OCRResultCache
+
+    if not result.get('success') or not (result.get('text') or '').strip():
+        return
+    try:
+        OCRResultCache.objects.update_or_create(
+            content_hash=key.content_hash,
+            defaults={
+                'perceptual_hash': key.perceptual_hash,
+                'text': result['text'],
+                'provider': result.get('provider') or 'unknown',
+                'language': (result.get('language') or '')[:16],
+                'created_at': timezone.now(),
+                'hit_count': 0,
+                'last_hit_at': None,
+            },
+        )
+        evict()
+    except DatabaseError as e:
+        logger.warning(f"OCR cache store failed for {key!r}: {e}")
+
+
+def evict():
+    """Delete expired entries and the least recently used ones beyond OCR_CACHE_MAX_ENTRIES."""
+    from apps.databank.models import OCRResultCache
+
+    expired, _ = OCRResultCache.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    max_entries = getattr(settings, 'OCR_CACHE_MAX_ENTRIES', 5000)
+    excess = list(
+        OCRResultCache.objects
+        .annotate(last_used=Coalesce('last_hit_at', 'created_at'))
+        .order_by('-last_used', '-id')
+        .values_list('id', flat=True)[max_entries:max_entries + EVICT_BATCH]
+    )
+    if excess:
+        OCRResultCache.objects.filter(id__in=excess).delete()
+    if expired or excess:
+        logger.info(f"OCR cache evicted {expired} expired and {len(excess)} least recently used entries")
+
+
+def get_ocr_cache_stats():
+    """Entries cached and provider calls avoided (total hits) so far."""
+    from apps.databank.models import OCRResultCache
+
+    totals = OCRResultCache.objects.aggregate(entries=Count('id'), calls_avoided=Coalesce(Sum('hit_count'), 0))
+    return {'entries': totals['entries'], 'calls_avoided': totals['calls_avoided']}
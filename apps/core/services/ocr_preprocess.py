@@ -0,0 +1,133 @@
+"""
+Preparing uploads for OCR.
+
+Phone photos are several megabytes of colour at far more resolution than OCR
+needs, often stored sideways with an EXIF rotation flag. preprocess_image()
+makes them upright, downscales them to about OCR_TARGET_DPI (or at most
+OCR_MAX_IMAGE_SIDE pixels), converts to grayscale and binarizes with an Otsu
+threshold. The result is a small 1-bit PNG that uploads and is read faster.
+
+split_pdf() breaks a PDF into pages. Pages with a text layer keep their text
+and need no OCR. Scanned pages yield their embedded page image for OCR.
+"""
+import io
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_MAGIC = b'%PDF'
+
+
+def is_pdf(content):
+    return content[:1024].lstrip().startswith(PDF_MAGIC)
+
+
+def _otsu_threshold(histogram):
+    """Gray level that best separates a 256-bin histogram into ink and paper."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def _target_scale(image):
+    scale = 1.0
+    dpi = image.info.get('dpi')
+    target_dpi = getattr(settings, 'OCR_TARGET_DPI', 300)
+    if dpi and dpi[0] and dpi[0] > target_dpi:
+        scale = target_dpi / float(dpi[0])
+    max_side = getattr(settings, 'OCR_MAX_IMAGE_SIDE', 3000)
+    longest = max(image.size) * scale
+    if longest > max_side:
+        scale *= max_side / longest
+    return scale
+
+
+def preprocess_image(content):
+    """
+    Upright, downscaled, grayscale (and binarized, unless OCR_BINARIZE is off)
+    PNG bytes of an image. Content Pillow cannot decode is returned unchanged.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(content))
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        logger.debug(f"OCR preprocessing skipped, not a decodable image: {e}")
+        return content
+
+    original_size = image.size
+    scale = _target_scale(image)
+    if scale < 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.Resampling.LANCZOS)
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Transparent clipboard captures: put them on white paper, not black
+        image = Image.alpha_composite(Image.new('RGBA', image.size, 'white'), image.convert('RGBA'))
+    image = ImageOps.autocontrast(image.convert('L'))
+    if getattr(settings, 'OCR_BINARIZE', True):
+        threshold = _otsu_threshold(image.histogram())
+        image = image.point(lambda level: 255 if level > threshold else 0, mode='1')
+
+    output = io.BytesIO()
+    image.save(output, format='PNG', optimize=True)
+    processed = output.getvalue()
+    logger.info(f"OCR preprocessing: {original_size[0]}x{original_size[1]} {len(content)} bytes -> "
+                f"{image.width}x{image.height} {len(processed)} bytes")
+    return processed
+
+
+class PdfPage:
+    """One PDF page: its text layer, or the scanned image to OCR."""
+
+    def __init__(self, number, text='', image=None):
+        self.number = number
+        self.text = text
+        self.image = image
+
+    def __repr__(self):
+        kind = 'text' if self.text else 'image' if self.image else 'empty'
+        return f"<PdfPage {self.number} ({kind})>"
+
+
+def split_pdf(content, max_pages=None):
+    """
+    Pages of a PDF in order. Raises ValueError if it has more than `max_pages`
+    (OCR_PDF_MAX_PAGES by default).
+    """
+    from PyPDF2 import PdfReader
+
+    max_pages = max_pages or getattr(settings, 'OCR_PDF_MAX_PAGES', 20)
+    reader = PdfReader(io.BytesIO(content))
+    if len(reader.pages) > max_pages:
+        raise ValueError(f"PDF has {len(reader.pages)} pages; at most {max_pages} can be scanned at once")
+
+    pages = []
+    for number, page in enumerate(reader.pages, start=1):
+        text = (page.extract_text() or '').strip()
+        if text:
+            pages.append(PdfPage(number, text=text))
+            continue
+        # A scanned page is normally one full-page image; take the largest if it was split into strips
+        images = page.images
+        image = max(images, key=lambda embedded: len(embedded.data)).data if images else None
+        pages.append(PdfPage(number, image=image))
+    return pages
@@ -2,14 +2,25 @@
 OCR Service: Smart Hybrid Implementation
 Primary: Optiic.dev
 Fallback: OCR.Space
-Optimization: Circuit Breaker with Daily Reset.
+Optimization: Shared circuit breaker with daily reset, plus hedged requests (see ocr_breaker.py).
+Optimization: Content-hash result cache (see ocr_cache.py) for files and base64 images.
+Optimization: Uploads are downscaled/binarized and PDFs split into pages (see ocr_preprocess.py).
+Optional: Local Tesseract tier as primary, fallback or only engine (see tesseract_ocr.py).
 """
 
 import requests
 import base64
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from typing import Dict, Any
 from django.conf import settings
-from django.utils import timezone 
+from django.core.files.base import ContentFile
+from django.db import connection
+
+from apps.core.services import ocr_breaker, ocr_cache, ocr_preprocess
+from apps.core.services.tesseract_ocr import (
+    MODE_FALLBACK, MODE_LOCAL_ONLY, MODE_OFF, MODE_PRIMARY, TesseractEngine, get_tesseract_mode,
+)
 
 class UnifiedOCRService:
     # Optiic Configuration
@@ -21,80 +32,99 @@ class UnifiedOCRService:
     def __init__(self):
         self.optiic_key = getattr(settings, 'OPTIIC_API_KEY', 'test_key')
         self.ocr_space_key = getattr(settings, 'OCR_SPACE_API_KEY', '')
-        
-        # CIRCUIT BREAKER STATE
-        self.optiic_exhausted = False 
-        self.exhausted_date = None # Tracks WHICH day we hit the limit
+        self.tesseract = TesseractEngine()
 
     # ==========================================
-    # INTERNAL: RESET LOGIC
+    # INTERNAL: SHARED CIRCUIT BREAKER (see ocr_breaker.py)
     # ==========================================
-    def _check_and_reset_breaker(self):
+    def _timed(self, provider, call, *args):
+        """Run a provider call and record its latency/outcome in the shared breaker state."""
+        started = time.monotonic()
+        result = call(*args)
+        ocr_breaker.record(provider, time.monotonic() - started, result['success'])
+        if not result['success'] and self._is_limit_reached(result):
+            print(f"{provider} limit reached ({result['error']}). Disabling it for the rest of the day.")
+            ocr_breaker.trip_until_tomorrow(provider, result['error'])
+        return result
+
+    def _call_with_fallback(self, primary, fallback, hedge_delay=None):
         """
-        Checks if we are in a new day since the limit was hit.
-        If so, reset the circuit breaker to try Optiic again.
+        Call `primary`, falling back to `fallback` when Optiic is tripped or
+        over its limit. With a hedge_delay, the fallback is also fired if the
+        primary hasn't answered by then, and the first success wins.
+        `primary`/`fallback` are zero-argument callables returning results.
         """
-        if self.optiic_exhausted and self.exhausted_date:
-            today = timezone.now().date()
-            if today > self.exhausted_date:
-                print(f"New day detected ({today}). Resetting Optiic limit.")
-                self.optiic_exhausted = False
-                self.exhausted_date = None
-
-    def _trigger_circuit_breaker(self, error_msg):
-        """Activates the breaker and records the date"""
-        self.optiic_exhausted = True
-        self.exhausted_date = timezone.now().date()
-        print(f"Optiic Limit Reached ({error_msg}). Disabling Optiic for the rest of {self.exhausted_date}.")
+        if ocr_breaker.is_open('optiic'):
+            print("Optiic breaker open (skipped). Using OCR.Space...")
+            return fallback()
+        if hedge_delay is None or ocr_breaker.is_open('ocr_space'):
+            result = primary()
+            return fallback() if self._is_limit_reached(result) else result
+
+        def in_thread(call):
+            def run():
+                try:
+                    return call()
+                finally:
+                    # Breaker bookkeeping used this thread's own DB connection
+                    connection.close()
+            return run
+
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ocr-hedge')
+        try:
+            primary_future = pool.submit(in_thread(primary))
+            done, _ = wait([primary_future], timeout=hedge_delay)
+            if done:
+                result = primary_future.result()
+                return fallback() if self._is_limit_reached(result) else result
+
+            print(f"Optiic slower than {hedge_delay}s; hedging with OCR.Space")
+            futures = [primary_future, pool.submit(in_thread(fallback))]
+            result = None
+            for future in as_completed(futures):
+                result = future.result()
+                if result['success']:
+                    result['hedged'] = True
+                    return result
+            return result
+        finally:
+            # Don't wait for the losing request; it finishes (and is recorded) in the background
+            pool.shutdown(wait=False)
+
+    def _hedge_delay(self):
+        """Seconds to wait on Optiic before hedging, from its latency percentile; None when hedging is off."""
+        if not getattr(settings, 'OCR_HEDGING_ENABLED', True):
+            return None
+        delay = ocr_breaker.latency_percentile(
+            'optiic',
+            getattr(settings, 'OCR_HEDGE_PERCENTILE', 0.95),
+            min_samples=getattr(settings, 'OCR_HEDGE_MIN_SAMPLES', 20),
+        )
+        if delay is None or delay == float('inf'):
+            delay = getattr(settings, 'OCR_HEDGE_AFTER_SECONDS', 20)
+        return delay
 
     # ==========================================
     # PUBLIC METHODS
     # ==========================================
 
     def process_image_url(self, image_url: str) -> Dict[str, Any]:
-        # 1. Check if it's a new day and reset if needed
-        self._check_and_reset_breaker()
-
-        # 2. Check Circuit Breaker
-        if self.optiic_exhausted:
-            print("Optiic exhausted (skipped). Using OCR.Space...")
-            return self._call_ocr_space_url(image_url)
-
-        # 3. Try Optiic
-        result = self._call_optiic_url(image_url)
-        
-        # 4. Check Limit
-        if self._is_limit_reached(result):
-            self._trigger_circuit_breaker(result['error'])
-            return self._call_ocr_space_url(image_url)
-            
-        return result
+        if get_tesseract_mode() == MODE_LOCAL_ONLY:
+            # Tesseract needs the bytes; fetch the image instead of sending its URL out
+            try:
+                response = requests.get(image_url, timeout=30)
+                response.raise_for_status()
+            except Exception as e:
+                return {'success': False, 'error': f"Could not download image: {e}"}
+            return self.process_bytes(response.content)
+
+        return self._call_with_fallback(
+            lambda: self._timed('optiic', self._call_optiic_url, image_url),
+            lambda: self._timed('ocr_space', self._call_ocr_space_url, image_url),
+        )
 
     def process_image_file(self, image_file) -> Dict[str, Any]:
-        start_pos = image_file.tell() if hasattr(image_file, 'tell') else 0
-
-        # 1. Check/Reset Day
-        self._check_and_reset_breaker()
-
-        # 2. Check Circuit Breaker
-        if self.optiic_exhausted:
-            print("Optiic exhausted (skipped). Using OCR.Space...")
-            return self._call_ocr_space_file(image_file)
-
-        # 3. Try Optiic
-        result = self._call_optiic_file(image_file)
-
-        # 4. Check Limit
-        if self._is_limit_reached(result):
-            self._trigger_circuit_breaker(result['error'])
-            
-            # Reset file pointer
-            if hasattr(image_file, 'seek'):
-                image_file.seek(start_pos)
-            
-            return self._call_ocr_space_file(image_file)
-
-        return result
+        return self.process_bytes(image_file.read())
 
     def process_base64_image(self, base64_data: str) -> Dict[str, Any]:
         if ',' in base64_data:
@@ -102,22 +132,102 @@ class UnifiedOCRService:
         else:
             clean_base64 = base64_data
 
-        # 1. Check/Reset Day
-        self._check_and_reset_breaker()
+        try:
+            content = base64.b64decode(clean_base64)
+        except (ValueError, TypeError):
+            return {'success': False, 'error': 'Invalid base64 image data'}
+        return self.process_bytes(content)
+
+    def process_bytes(self, content: bytes) -> Dict[str, Any]:
+        """OCR an uploaded image or PDF given its raw bytes."""
+        if ocr_preprocess.is_pdf(content):
+            return self.process_pdf(content)
+
+        # 0. Answer rescans of the same image from the cache
+        cache_key = ocr_cache.CacheKey(content)
+        cached = ocr_cache.lookup(cache_key)
+        if cached:
+            return cached
+
+        result = self._process_image(ocr_preprocess.preprocess_image(content))
+        ocr_cache.store(cache_key, result)
+        return result
 
-        # 2. Check Circuit Breaker
-        if self.optiic_exhausted:
-            print("Optiic exhausted (skipped). Using OCR.Space...")
-            return self._call_ocr_space_base64(f"data:image/png;base64,{clean_base64}")
+    def process_pdf(self, content: bytes) -> Dict[str, Any]:
+        """
+        OCR a multi-page PDF. Scanned pages are OCR'd concurrently, at most
+        OCR_PDF_CONCURRENCY at a time to stay within provider limits. Pages
+        with a text layer are used as-is. Text is merged in page order.
+        """
+        try:
+            pages = ocr_preprocess.split_pdf(content)
+        except Exception as e:
+            return {'success': False, 'error': f"Could not read PDF: {e}"}
+        if not pages:
+            return {'success': False, 'error': 'PDF has no pages'}
 
-        # 3. Try Optiic
-        result = self._call_optiic_base64(clean_base64)
+        workers = min(getattr(settings, 'OCR_PDF_CONCURRENCY', 3), len(pages))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-pdf') as pool:
+            page_results = list(pool.map(self._process_pdf_page, pages))
 
-        # 4. Check Limit
-        if self._is_limit_reached(result):
-            self._trigger_circuit_breaker(result['error'])
-            return self._call_ocr_space_base64(f"data:image/png;base64,{clean_base64}")
+        succeeded = [(page, result) for page, result in zip(pages, page_results) if result['success']]
+        if not succeeded:
+            return {'success': False, 'error': page_results[0].get('error') or 'No text found in PDF'}
 
+        providers = sorted({result.get('provider') for _, result in succeeded})
+        return {
+            'success': True,
+            'text': '\n\n'.join(result['text'].strip() for _, result in succeeded if result['text'].strip()),
+            'language': succeeded[0][1].get('language', 'unknown'),
+            'provider': ','.join(providers),
+            'error': None,
+            'pages': [
+                {'page': page.number, 'success': result['success'], 'provider': result.get('provider'),
+                 'error': result.get('error')}
+                for page, result in zip(pages, page_results)
+            ],
+        }
+
+    def _process_pdf_page(self, page) -> Dict[str, Any]:
+        try:
+            if page.text:
+                return {'success': True, 'text': page.text, 'language': 'unknown', 'provider': 'pdf_text', 'error': None}
+            if page.image:
+                return self.process_bytes(page.image)
+            return {'success': False, 'error': f"Page {page.number} has no text or image"}
+        finally:
+            # Runs on a pool thread; don't leave its cache-lookup connection open
+            connection.close()
+
+    def _process_image(self, content: bytes) -> Dict[str, Any]:
+        """
+        OCR one preprocessed image. OCR_TESSERACT_MODE sets where local Tesseract
+        sits relative to Optiic -> OCR.space:
+        - off: not used.
+        - primary: tried first. Remote providers run when it fails or reads nothing.
+        - fallback: used only when the remote providers fail.
+        - local-only: nothing leaves the server.
+        primary and fallback quietly act as off when Tesseract isn't installed.
+        """
+        mode = get_tesseract_mode()
+        if mode == MODE_LOCAL_ONLY:
+            return self._timed('tesseract', self.tesseract.recognize, content)
+        use_local = mode != MODE_OFF and self.tesseract.available() and not ocr_breaker.is_open('tesseract')
+
+        if use_local and mode == MODE_PRIMARY:
+            result = self._timed('tesseract', self.tesseract.recognize, content)
+            if result['success'] and result['text'].strip():
+                return result
+            print(f"Tesseract gave no text ({result.get('error') or 'empty'}). Using remote OCR...")
+
+        result = self._call_with_fallback(
+            lambda: self._timed('optiic', self._call_optiic_file, ContentFile(content)),
+            lambda: self._timed('ocr_space', self._call_ocr_space_file, ContentFile(content)),
+            hedge_delay=self._hedge_delay(),
+        )
+        if use_local and mode == MODE_FALLBACK and not result['success']:
+            print(f"Remote OCR failed ({result.get('error')}). Using local Tesseract...")
+            return self._timed('tesseract', self.tesseract.recognize, content)
         return result
 
     # ==========================================
@@ -164,17 +274,6 @@ class UnifiedOCRService:
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
-    def _call_optiic_base64(self, clean_base64):
-        try:
-            image_content = base64.b64decode(clean_base64)
-            files = {'image': ('clipboard.png', image_content, 'image/png')}
-            data = {'apiKey': self.optiic_key, 'mode': 'ocr'}
-            # <--- CHANGED FROM 30 TO 90
-            resp = requests.post(self.OPTIIC_URL, files=files, data=data, timeout=90)
-            return self._parse_optiic_response(resp)
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
-
     def _parse_optiic_response(self, response):
         if response.status_code == 200:
             data = response.json()
@@ -218,19 +317,6 @@ class UnifiedOCRService:
         except Exception as e:
             return {'success': False, 'error': f"OCR.Space Error: {str(e)}"}
 
-    def _call_ocr_space_base64(self, base64_string):
-        payload = {
-            'base64Image': base64_string,
-            'isOverlayRequired': False,
-            'apikey': self.ocr_space_key,
-            'language': 'eng'
-        }
-        try:
-            resp = requests.post(self.OCR_SPACE_URL, data=payload, timeout=30)
-            return self._parse_ocr_space_response(resp)
-        except Exception as e:
-            return {'success': False, 'error': f"OCR.Space Error: {str(e)}"}
-
     def _parse_ocr_space_response(self, response):
         try:
             res = response.json()
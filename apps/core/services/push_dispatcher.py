@@ -0,0 +1,405 @@
+# apps/core/services/push_dispatcher.py
+"""
+Off-request dispatch of push notifications.
+
+Signal handlers and views don't talk to FCM/Mozilla push services themselves.
+They call enqueue_push_notification() (or enqueue_cooperative_notification()),
+which records a PushIntent and, once the surrounding transaction commits, puts
+it on a bounded in-process queue. A rolled-back save therefore never notifies
+anyone.
+
+A small pool of daemon worker threads drains the queue. For each intent a
+worker resolves the recipients and hands them to notification_utils.fan_out_push,
+which resolves subscriptions in one query, sends concurrently over the shared
+keep-alive webpush session and prunes gone subscriptions. PushMetrics records
+queue wait, send latency and outcomes. get_push_metrics() returns a snapshot,
+and a summary is logged every LOG_EVERY intents.
+
+Intents that carry a topic are coalesced first. A NotificationCoalescer
+buffers them per (recipient, topic) for PUSH_NOTIFICATION_COALESCE_WINDOW
+seconds from the first one, then hands the dispatcher a single intent. A lone
+notification goes out unchanged. A burst goes out as one digest, titled from
+the intent's digest_title ("3 new messages from Ana") with the latest body.
+A burst of message saves or profile edits therefore costs one push per
+recipient per window instead of one per save.
+
+Push notifications are best effort: if the queue is full the intent is
+dropped and counted, never blocking the request.
+"""
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from heapq import heappop, heappush
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from apps.core.notification_utils import (
+    DEFAULT_ICON,
+    build_push_payload,
+    fan_out_push,
+    get_officer_users_by_coop,
+)
+
+logger = logging.getLogger(__name__)
+
+LOG_EVERY = 100
+SHUTDOWN_DRAIN_SECONDS = 5
+
+_STOP = object()
+
+
+class PushIntent:
+    """A notification to send: who gets it and what it says."""
+
+    def __init__(self, title, body, url="/", icon=DEFAULT_ICON, ttl=1000, user_ids=(), coop_id=None,
+                 topic=None, digest_title=None):
+        self.title = title
+        self.body = body
+        self.url = url
+        self.icon = icon
+        self.ttl = ttl
+        self.user_ids = tuple(user_ids)
+        self.coop_id = coop_id
+        # Intents with the same topic for the same recipient are coalesced;
+        # digest_title is the title used when several are ("{count}" is replaced).
+        self.topic = topic
+        self.digest_title = digest_title
+        self.enqueued_at = None
+
+    def __repr__(self):
+        target = f"coop {self.coop_id}" if self.coop_id is not None else f"users {list(self.user_ids)}"
+        return f"<PushIntent {self.title!r} -> {target}>"
+
+    def recipient_keys(self):
+        """One key per recipient the intent is coalesced for: the cooperative, or each user."""
+        if self.coop_id is not None:
+            return [('coop', self.coop_id)]
+        return [('user', user_id) for user_id in self.user_ids]
+
+    def for_recipients(self, keys):
+        """Copy of this intent addressed to a subset of its recipient keys."""
+        if self.coop_id is not None:
+            return self
+        return PushIntent(self.title, self.body, self.url, self.icon, self.ttl,
+                          user_ids=[user_id for _, user_id in keys])
+
+    def digest(self, count):
+        """Intent summarising `count` coalesced intents, of which this is the latest."""
+        title = (self.digest_title or self.title).replace('{count}', str(count))
+        return PushIntent(title, self.body, self.url, self.icon, self.ttl, self.user_ids, self.coop_id)
+
+
+class PushMetrics:
+    """Thread-safe counters plus rolling latency windows for the dispatcher."""
+
+    COUNTERS = ('enqueued', 'coalesced', 'digests', 'dropped', 'dispatched', 'recipients', 'delivered', 'failed',
+                'pruned', 'unsubscribed', 'errors')
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.counters = {name: 0 for name in self.COUNTERS}
+        self.queue_wait = deque(maxlen=window)
+        self.send_latency = deque(maxlen=window)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, series, seconds):
+        with self._lock:
+            getattr(self, series).append(seconds)
+
+    @staticmethod
+    def _percentiles(samples):
+        ordered = sorted(samples)
+        if not ordered:
+            return {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+        return {'p50': percentile(0.50), 'p95': percentile(0.95), 'max': ordered[-1]}
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            queue_wait = list(self.queue_wait)
+            send_latency = list(self.send_latency)
+        return {
+            **counters,
+            'queue_wait': self._percentiles(queue_wait),
+            'send_latency': self._percentiles(send_latency),
+        }
+
+
+class _Pending:
+    """Buffered intents for one (recipient, topic): the latest one and how many arrived."""
+
+    __slots__ = ('latest', 'count')
+
+    def __init__(self, intent):
+        self.latest = intent
+        self.count = 1
+
+
+class NotificationCoalescer:
+    """
+    Buffers topic-tagged intents per (recipient, topic) for `window` seconds
+    from the first one, then passes one intent per buffer to `emit`.
+    A daemon thread flushes buffers as their windows close.
+    """
+
+    def __init__(self, window, emit, metrics=None):
+        self.window = window
+        self.emit = emit
+        self.metrics = metrics or PushMetrics()
+        self._pending = {}
+        self._deadlines = []  # heap of (deadline, seq, key)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def add(self, intent):
+        deadline = time.monotonic() + self.window
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='push-coalescer')
+                self._thread.start()
+            for recipient in intent.recipient_keys():
+                key = (recipient, intent.topic)
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = _Pending(intent)
+                    heappush(self._deadlines, (deadline, next(self._seq), key))
+                else:
+                    pending.latest = intent
+                    pending.count += 1
+                    self.metrics.incr('coalesced')
+            self._cond.notify()
+
+    def flush(self):
+        """Emit everything buffered now, regardless of windows."""
+        with self._cond:
+            due = self._pop_due(float('inf'))
+        self._emit(due)
+
+    def stop(self):
+        self.flush()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _pop_due(self, now):
+        due = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, _, key = heappop(self._deadlines)
+            due.append((key, self._pending.pop(key)))
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                while not self._deadlines or self._deadlines[0][0] > now:
+                    if self._stopped:
+                        return
+                    self._cond.wait(self._deadlines[0][0] - now if self._deadlines else None)
+                    now = time.monotonic()
+                due = self._pop_due(now)
+            self._emit(due)
+
+    def _emit(self, due):
+        # Recipients whose buffer held a single intent share that intent again,
+        # so an uncoalesced multi-user notification stays one fan-out.
+        singles = {}
+        intents = []
+        for (recipient, _topic), pending in due:
+            if pending.count == 1:
+                singles.setdefault(id(pending.latest), (pending.latest, []))[1].append(recipient)
+            else:
+                self.metrics.incr('digests')
+                intents.append(pending.latest.digest(pending.count).for_recipients([recipient]))
+        intents.extend(intent.for_recipients(recipients) for intent, recipients in singles.values())
+
+        for intent in intents:
+            try:
+                self.emit(intent)
+            except Exception as e:
+                self.metrics.incr('errors')
+                logger.error(f"Error flushing coalesced {intent!r}: {e}", exc_info=True)
+
+
+class PushDispatcher:
+    """
+    Bounded queue of PushIntents drained by `workers` daemon threads.
+    Threads are started on the first submit(). Intents with a topic pass
+    through a NotificationCoalescer first unless `coalesce_window` is 0.
+    """
+
+    def __init__(self, workers=None, queue_size=None, send_fn=fan_out_push, coalesce_window=None):
+        self.workers = workers or getattr(settings, 'PUSH_NOTIFICATION_MAX_WORKERS', 4)
+        self.queue = queue.Queue(maxsize=queue_size or getattr(settings, 'PUSH_NOTIFICATION_QUEUE_SIZE', 1000))
+        self.send_fn = send_fn
+        self.metrics = PushMetrics()
+        if coalesce_window is None:
+            coalesce_window = getattr(settings, 'PUSH_NOTIFICATION_COALESCE_WINDOW', 5)
+        self.coalescer = NotificationCoalescer(coalesce_window, self._put, self.metrics) if coalesce_window > 0 else None
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, daemon=True, name=f'push-dispatcher-{i}')
+                thread.start()
+                self.threads.append(thread)
+        logger.info(f"Push dispatcher started with {self.workers} worker(s)")
+
+    def submit(self, intent):
+        """
+        Queue an intent without blocking; returns False if it had to be dropped.
+        Topic intents are buffered by the coalescer and queued when their window closes.
+        """
+        if intent.topic and self.coalescer is not None:
+            self.coalescer.add(intent)
+            return True
+        return self._put(intent)
+
+    def _put(self, intent):
+        self.start()
+        intent.enqueued_at = time.monotonic()
+        try:
+            self.queue.put_nowait(intent)
+        except queue.Full:
+            self.metrics.incr('dropped')
+            logger.warning(f"Push queue full ({self.queue.maxsize}); dropped {intent!r}")
+            return False
+        self.metrics.incr('enqueued')
+        return True
+
+    def drain(self, timeout=None):
+        """
+        Wait until every queued intent has been processed; returns False on timeout.
+        Intents still inside a coalescing window are not waited for.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=SHUTDOWN_DRAIN_SECONDS):
+        """Flush coalesced intents, finish what is queued (up to `timeout`), then stop the workers."""
+        if self.coalescer is not None:
+            self.coalescer.stop()
+        with self._lock:
+            threads, self.threads = self.threads, []
+        if not threads:
+            return
+        self.drain(timeout)
+        for _ in threads:
+            try:
+                self.queue.put_nowait(_STOP)
+            except queue.Full:
+                break
+
+    def _run(self):
+        while True:
+            intent = self.queue.get()
+            try:
+                if intent is _STOP:
+                    return
+                self._dispatch(intent)
+            except Exception as e:
+                self.metrics.incr('errors')
+                logger.error(f"Error dispatching {intent!r}: {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+
+    def _resolve_users(self, intent):
+        from apps.users.models import User
+
+        if intent.coop_id is not None:
+            return get_officer_users_by_coop([intent.coop_id]).get(intent.coop_id, [])
+        return list(User.objects.filter(user_id__in=intent.user_ids))
+
+    def _dispatch(self, intent):
+        self.metrics.observe('queue_wait', time.monotonic() - intent.enqueued_at)
+        close_old_connections()
+        try:
+            users = self._resolve_users(intent)
+            payload = build_push_payload(intent.title, intent.body, intent.url, intent.icon)
+            started = time.perf_counter()
+            summary = self.send_fn(users, payload, intent.ttl)
+            self.metrics.observe('send_latency', time.perf_counter() - started)
+            self.metrics.incr('recipients', summary['users'])
+            self.metrics.incr('delivered', summary['sent'])
+            self.metrics.incr('failed', summary['failed'])
+            self.metrics.incr('pruned', summary['pruned'])
+            self.metrics.incr('unsubscribed', summary['unsubscribed'])
+        finally:
+            close_old_connections()
+
+        self.metrics.incr('dispatched')
+        if self.metrics.counters['dispatched'] % LOG_EVERY == 0:
+            logger.info(f"Push dispatcher metrics: {self.metrics.snapshot()}")
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_push_dispatcher():
+    """Get or create the process-wide dispatcher."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = PushDispatcher()
+            atexit.register(_dispatcher.stop)
+        return _dispatcher
+
+
+def get_push_metrics():
+    """Snapshot of the dispatcher's counters and latency percentiles (seconds)."""
+    dispatcher = get_push_dispatcher()
+    return {**dispatcher.metrics.snapshot(), 'queue_depth': dispatcher.queue.qsize()}
+
+
+def _enqueue_on_commit(intent):
+    transaction.on_commit(lambda: get_push_dispatcher().submit(intent))
+    return intent
+
+
+def enqueue_push_notification(user_ids, title, body, url="/", icon=DEFAULT_ICON, ttl=1000,
+                              topic=None, digest_title=None):
+    """
+    Queue a push notification to the given users (custom User ids), sent by the
+    dispatcher after the current transaction commits.
+
+    With a topic, notifications on that topic to the same user within the
+    coalescing window are sent as one, titled digest_title ("{count}" is
+    replaced by how many were combined).
+    """
+    return _enqueue_on_commit(PushIntent(title, body, url, icon, ttl, user_ids=user_ids,
+                                         topic=topic, digest_title=digest_title))
+
+
+def enqueue_cooperative_notification(coop_id, title, body, url="/", icon=DEFAULT_ICON, ttl=1000,
+                                     topic=None, digest_title=None):
+    """
+    Queue a push notification to every officer of a cooperative (resolved at send
+    time). topic and digest_title coalesce as in enqueue_push_notification().
+    """
+    return _enqueue_on_commit(PushIntent(title, body, url, icon, ttl, coop_id=coop_id,
+                                         topic=topic, digest_title=digest_title))
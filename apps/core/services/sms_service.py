@@ -1,13 +1,52 @@
 # core/services/sms_service.py
 
-import requests
 from django.conf import settings
-from django.db import connection
 import logging
+import threading
+
+from .batch_sender import BatchSender, TokenBucket, get_pooled_session
+from apps.core.utils.phone import normalize_phone_number, to_provider_format
+from apps.communications.delivery_ledger import (
+    get_delivery_summary,
+    get_outstanding_deliveries,
+    mark_invalid,
+    record_batch_result,
+    snapshot_recipients,
+)
 
 # Set up a logger for this service
 logger = logging.getLogger(__name__)
 
+_iprog_rate_limiter = None
+_iprog_rate_limiter_lock = threading.Lock()
+
+
+def get_iprog_setting(name, default):
+    """Read an optional key from settings.IPROG_SMS."""
+    return getattr(settings, 'IPROG_SMS', {}).get(name, default)
+
+
+def get_iprog_sender() -> BatchSender:
+    """
+    Build a BatchSender for the IPROG bulk SMS API.
+    The session and token bucket are shared by every send in this process,
+    so concurrent announcements stay within the provider quota together.
+    """
+    global _iprog_rate_limiter
+    max_workers = get_iprog_setting('MAX_CONCURRENCY', 4)
+
+    with _iprog_rate_limiter_lock:
+        if _iprog_rate_limiter is None:
+            _iprog_rate_limiter = TokenBucket(rate=get_iprog_setting('RATE_LIMIT_PER_SECOND', 5))
+
+    return BatchSender(
+        session=get_pooled_session('iprog', pool_size=max_workers),
+        rate_limiter=_iprog_rate_limiter,
+        max_workers=max_workers,
+        max_retries=get_iprog_setting('MAX_RETRIES', 3)
+    )
+
+
 class SmsService:
     """
     Service to send bulk SMS announcements via the IPROG SMS API.
@@ -24,54 +63,151 @@ class SmsService:
             logger.error("IPROG_SMS settings (API_URL_BULK, API_TOKEN) not found.")
             raise ValueError("IPROG_SMS API credentials are not configured.")
 
-    def _get_recipient_numbers(self, announcement_id):
+        self.chunk_size = get_iprog_setting('BULK_CHUNK_SIZE', 100)
+        self.timeout = (get_iprog_setting('CONNECT_TIMEOUT', 5), get_iprog_setting('READ_TIMEOUT', 30))
+        # Per-chunk outcome of the last send_bulk_announcement call
+        self.chunk_results = []
+
+    def _get_recipient_deliveries(self, announcement_id):
         """
-        Calls the stored procedure to get the comma-separated phone list.
+        Snapshots the announcement's SMS recipients into the delivery ledger
+        (first attempt only) and returns the rows not yet delivered.
         """
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT * FROM sp_get_sms_recipients(%s)", [announcement_id])
-            result = cursor.fetchone()
-            if result and result[0]:
-                return result[0]
-        return None
+        snapshot_recipients(announcement_id, 'sms')
+        return list(get_outstanding_deliveries(announcement_id, 'sms'))
+
+    @staticmethod
+    def _group_by_number(deliveries):
+        """
+        Normalize each ledger address to E.164 and group the rows that share a number,
+        so one officer listed twice (or typed two ways) gets a single message.
+
+        Returns: (ordered dict of e164 -> [delivery_id, ...], [invalid delivery_id, ...])
+        """
+        numbers = {}
+        invalid = []
+        for delivery in deliveries:
+            e164 = normalize_phone_number(delivery.address)
+            if e164:
+                numbers.setdefault(e164, []).append(delivery.delivery_id)
+            else:
+                invalid.append(delivery.delivery_id)
+        return numbers, invalid
 
     def send_bulk_announcement(self, announcement_id, message):
         """
         Fetches recipients and sends the bulk SMS.
-        
+        Numbers are normalized and deduplicated, split into provider-sized chunks
+        and sent concurrently; each chunk is retried on its own and its outcome
+        recorded in the delivery ledger. Numbers already delivered on an earlier
+        attempt are skipped.
+
         Returns: (success, message_or_error)
         """
-        
-        # 1. Get the list of phone numbers from the database
-        phone_numbers_str = self._get_recipient_numbers(announcement_id)
-        
-        if not phone_numbers_str:
+        self.chunk_results = []
+
+        # 1. Get the phone numbers that still need this announcement
+        deliveries = self._get_recipient_deliveries(announcement_id)
+
+        if not deliveries:
+            summary = get_delivery_summary(announcement_id, 'sms')
+            if summary['sent']:
+                return True, f"SMS already delivered to all {summary['sent']} recipient(s)."
             logger.warning(f"No recipients found for announcement_id: {announcement_id}.")
             return False, "No recipients found for this announcement."
 
-        # 2. Prepare and send the SMS via IPROG API
-        payload = {
-            'api_token': self.api_token,
-            'message': message,
-            'phone_number': phone_numbers_str
-        }
+        numbers, invalid_ids = self._group_by_number(deliveries)
+        if invalid_ids:
+            logger.warning(f"Skipping {len(invalid_ids)} invalid mobile number(s) for announcement_id: {announcement_id}.")
+            mark_invalid(invalid_ids, "Invalid mobile number")
+
+        if not numbers:
+            return False, "No valid mobile numbers found for this announcement."
+
+        # 2. Split into provider-sized chunks of (e164, delivery_ids)
+        items = list(numbers.items())
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+
+        def post_chunk(session, chunk):
+            payload = {
+                'api_token': self.api_token,
+                'message': message,
+                'phone_number': ','.join(to_provider_format(number) for number, _ in chunk)
+            }
+            return session.post(self.api_url, data=payload, timeout=self.timeout)
+
+        # 3. Send chunks concurrently over the pooled session, paced by the
+        #    provider rate limit and retried on timeouts, 429 and 5xx
+        results, stats = get_iprog_sender().send(chunks, post_chunk)
+
+        total_sent = 0
+        errors = []
+        for result in results:
+            chunk = result['batch']
+            batch_number = result['index'] + 1
+            delivery_ids = [delivery_id for _, ids in chunk for delivery_id in ids]
+            success, error, message_id = self._parse_chunk_response(result)
+
+            if success:
+                total_sent += len(chunk)
+                record_batch_result(delivery_ids, batch_number, True, provider_message_id=message_id)
+            else:
+                error = f"Chunk {batch_number} ({len(chunk)} numbers): {error}"
+                errors.append(error)
+                logger.error(f"IPROG bulk SMS error for {announcement_id}: {error}")
+                record_batch_result(delivery_ids, batch_number, False, error=error)
+
+            self.chunk_results.append({
+                'chunk': batch_number,
+                'numbers': len(chunk),
+                'success': success,
+                'status_code': result['status_code'],
+                'attempts': result['attempts'],
+                'latency': round(result['latency'], 3),
+                'provider_message_id': message_id,
+                'error': None if success else error,
+            })
+
+        logger.info(
+            f"IPROG send for announcement_id {announcement_id}: {stats['succeeded']}/{stats['batches']} chunks "
+            f"in {stats['elapsed']:.2f}s (p50 {stats['latency_p50']:.2f}s, p95 {stats['latency_p95']:.2f}s, "
+            f"{stats['retries']} retries, {len(invalid_ids)} invalid number(s) skipped)"
+        )
+
+        if total_sent == len(items):
+            return True, f"SMS queued successfully to {total_sent} number(s) in {len(chunks)} chunk(s)."
+        elif total_sent > 0:
+            return True, f"Partially sent to {total_sent}/{len(items)} numbers. Errors: {'; '.join(errors)}"
+        else:
+            return False, f"Failed to send SMS. Errors: {'; '.join(errors)}"
+
+    def _parse_chunk_response(self, result):
+        """
+        IPROG answers HTTP 200 with its own status in the body.
+        Returns (success, error, provider_message_id) for one chunk.
+        """
+        response = result['response']
+        if response is None:
+            return False, result['error'], None
 
         try:
-            response = requests.post(self.api_url, data=payload)
-            response.raise_for_status()  # Raise an error for bad responses (4xx or 5xx)
-            
             response_data = response.json()
-            
-            if response_data.get("status") == 200:
-                logger.info(f"Successfully queued bulk SMS for announcement_id: {announcement_id}.")
-                return True, response_data.get("message", "SMS queued successfully.")
-            else:
-                logger.error(f"IPROG API error for {announcement_id}: {response_data}")
-                return False, response_data.get("message", "An API error occurred.")
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"HTTP Request failed for announcement_id {announcement_id}: {e}")
-            return False, str(e)
-        except Exception as e:
-            logger.error(f"Unexpected error in send_bulk_announcement: {e}")
-            return False, f"An unexpected error occurred: {e}"
\ No newline at end of file
+        except ValueError:
+            if result['success']:
+                return False, f"Unexpected response (HTTP {response.status_code})", None
+            return False, result['error'], None
+
+        if result['success'] and response_data.get("status") == 200:
+            return True, None, self._get_provider_message_id(response_data)
+
+        return False, str(response_data.get("message", result['error'] or "An API error occurred.")), None
+
+    @staticmethod
+    def _get_provider_message_id(response_data):
+        """IPROG returns its message reference under one of these keys, when present."""
+        data = response_data.get('data') if isinstance(response_data.get('data'), dict) else {}
+        for source in (response_data, data):
+            for key in ('message_id', 'id', 'reference'):
+                if source.get(key):
+                    return str(source[key])
+        return None
@@ -0,0 +1,84 @@
+"""
+Local OCR with the Tesseract command-line engine.
+
+Tesseract runs on this server, so it has no quota and no network round trip,
+and it keeps working when Optiic and OCR.space are both down. Each call
+starts a `tesseract stdin stdout` subprocess. A semaphore caps concurrent
+processes at OCR_TESSERACT_WORKERS, and each process is limited to one
+OpenMP thread, so a burst of scans can't oversubscribe the CPU.
+
+The engine is optional. UnifiedOCRService uses it according to
+OCR_TESSERACT_MODE (see ocr_service.py) and only when the binary is
+installed.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = 'off'
+MODE_PRIMARY = 'primary'
+MODE_FALLBACK = 'fallback'
+MODE_LOCAL_ONLY = 'local-only'
+MODES = (MODE_OFF, MODE_PRIMARY, MODE_FALLBACK, MODE_LOCAL_ONLY)
+
+
+class TesseractEngine:
+    """Runs Tesseract subprocesses, at most `workers` at a time."""
+
+    def __init__(self, binary=None, workers=None, timeout=None, lang=None):
+        self.binary = binary or getattr(settings, 'OCR_TESSERACT_CMD', 'tesseract')
+        self.workers = workers or getattr(settings, 'OCR_TESSERACT_WORKERS', None) or os.cpu_count() or 2
+        self.timeout = timeout or getattr(settings, 'OCR_TESSERACT_TIMEOUT', 60)
+        self.lang = lang or getattr(settings, 'OCR_TESSERACT_LANG', 'eng')
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._path = None
+
+    def available(self):
+        """Whether the tesseract binary can be found (looked up once)."""
+        if self._path is None:
+            self._path = shutil.which(self.binary) or ''
+            if not self._path:
+                logger.warning(f"Tesseract binary '{self.binary}' not found; local OCR unavailable")
+        return bool(self._path)
+
+    def recognize(self, content):
+        """OCR image bytes; returns the same result dict shape as the remote providers."""
+        if not self.available():
+            return {'success': False, 'error': f"Tesseract is not installed ('{self.binary}' not found)"}
+
+        command = [self._path, 'stdin', 'stdout', '-l', self.lang, '--psm', '3']
+        env = {**os.environ, 'OMP_THREAD_LIMIT': '1'}
+        with self._slots:
+            try:
+                completed = subprocess.run(command, input=content, capture_output=True,
+                                           timeout=self.timeout, env=env, check=False)
+            except subprocess.TimeoutExpired:
+                return {'success': False, 'error': f"Tesseract timed out after {self.timeout}s"}
+            except OSError as e:
+                return {'success': False, 'error': f"Tesseract could not start: {e}"}
+
+        if completed.returncode != 0:
+            error = completed.stderr.decode('utf-8', 'replace').strip().splitlines()
+            return {'success': False, 'error': f"Tesseract error: {error[-1] if error else completed.returncode}"}
+        return {
+            'success': True,
+            'text': completed.stdout.decode('utf-8', 'replace'),
+            'language': self.lang,
+            'provider': 'tesseract',
+            'error': None,
+        }
+
+
+def get_tesseract_mode():
+    """OCR_TESSERACT_MODE, or 'off' if it isn't one of MODES."""
+    mode = getattr(settings, 'OCR_TESSERACT_MODE', MODE_OFF)
+    if mode not in MODES:
+        logger.warning(f"Unknown OCR_TESSERACT_MODE {mode!r}; local OCR disabled")
+        return MODE_OFF
+    return mode
@@ -0,0 +1,111 @@
+"""
+Write-coalescing, cache-fronted database sessions.
+
+With SESSION_SAVE_EVERY_REQUEST the plain db backend UPDATEs django_session
+on every request, including each XHR a page fires, only to push
+expire_date and last_activity forward. This backend keeps every session in
+the SESSION_CACHE_ALIAS cache and refreshes it there on every save. It writes
+through to the database only when:
+
+- the session is created, or its data changes (ignoring VOLATILE_KEYS, which
+  only track activity), or
+- the expiry stored in the database has fallen more than
+  SESSION_DB_WRITE_THRESHOLD seconds behind the real one.
+
+Idle timeout stays exact: the cache entry carries the exact expiry and lives
+exactly until it. Only if the cache entry is lost (eviction, restart) does
+the session fall back to the database row. That row can be up to the
+threshold behind, so the session may then expire up to that much early, but
+never late.
+
+Like Django's cached_db backend, SESSION_CACHE_ALIAS must point at a cache
+shared by all server processes when more than one is running: the shared
+tier, which is Redis outside DEBUG. Settings refuse a database cache for it,
+since refreshing the cache entry would then write cache_table on every
+request, more queries than the plain db backend's single UPDATE.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'kooptimizer.sessions.coalesced'
+
+# Keys rewritten on (almost) every request that don't count as a data change
+VOLATILE_KEYS = frozenset({'last_activity', '_auth_user_snapshot'})
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        # Digest of the data and the expiry last written to the database
+        self._db_digest = None
+        self._db_expiry = None
+
+    @staticmethod
+    def _digest(data):
+        stable = {key: value for key, value in data.items() if key not in VOLATILE_KEYS}
+        return hashlib.sha1(json.dumps(stable, sort_keys=True, default=str).encode()).hexdigest()
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Some backends raise on invalid keys; fall back to the database
+            entry = None
+
+        if entry is not None and entry['expiry'] > timezone.now():
+            self._db_digest = entry['db_digest']
+            self._db_expiry = entry['db_expiry']
+            return entry['data']
+
+        s = self._get_session_from_db()
+        if not s:
+            return {}
+        data = self.decode(s.session_data)
+        self._db_digest = self._digest(data)
+        self._db_expiry = s.expire_date
+        self._cache_entry(data, s.expire_date)
+        return data
+
+    def _cache_entry(self, data, expiry):
+        try:
+            self._cache.set(self.cache_key, {
+                'data': data,
+                'expiry': expiry,
+                'db_digest': self._db_digest,
+                'db_expiry': self._db_expiry,
+            }, self.get_expiry_age(expiry=expiry))
+        except Exception:
+            logger.exception("Error saving session to cache (%s)", self._cache)
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        expiry = self.get_expiry_date()
+        digest = self._digest(data)
+        threshold = timedelta(seconds=getattr(settings, 'SESSION_DB_WRITE_THRESHOLD', 60))
+
+        if (must_create or digest != self._db_digest or self._db_expiry is None
+                or expiry - self._db_expiry > threshold):
+            DBStore.save(self, must_create)
+            self._db_digest = digest
+            self._db_expiry = expiry
+        self._cache_entry(data, expiry)
+
+    async def aload(self):
+        return await sync_to_async(self.load)()
+
+    async def asave(self, must_create=False):
+        return await sync_to_async(self.save)(must_create)
@@ -0,0 +1,135 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import MagicMock, patch
+
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.core.middleware.auth_middleware import USER_SNAPSHOT_KEY, AuthenticationMiddleware
+
+USER_ROW = {'user_id': 1, 'role': 'admin', 'is_active': True,
+            'updated_at': datetime(2026, 3, 2, 8, 0, tzinfo=dt_timezone.utc)}
+
+
+class AuthenticationMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.middleware = AuthenticationMiddleware(lambda request: HttpResponse('ok'))
+        self.user_model = MagicMock()
+        self.user_model.objects.filter.return_value.values.return_value.first.return_value = dict(USER_ROW)
+        self.middleware.user_model = self.user_model
+        self.session = SessionStore()
+        self.session.update({'user_id': 1, 'role': 'admin', 'last_activity': time.time()})
+
+    def get(self, path='/dashboard/admin/'):
+        request = RequestFactory().get(path)
+        request.session = self.session
+        request._messages = MagicMock()
+        self.session.modified = False
+        return self.middleware(request), request
+
+    def lookups(self):
+        return self.user_model.objects.filter.call_count
+
+    def test_user_is_looked_up_once_and_cached_in_the_session(self):
+        response, _ = self.get()
+        self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.lookups(), 1)
+        self.assertEqual(self.session[USER_SNAPSHOT_KEY]['version'], '2026-03-02T08:00:00+00:00')
+
+    @override_settings(AUTH_USER_RECHECK_SECONDS=60)
+    def test_deactivation_is_picked_up_on_recheck(self):
+        self.get()
+        self.session[USER_SNAPSHOT_KEY]['checked_at'] -= 61
+        self.user_model.objects.filter.return_value.values.return_value.first.return_value = {
+            **USER_ROW, 'is_active': False}
+        response, _ = self.get()
+        self.assertEqual(response.url, '/access-denied/')
+        self.assertNotIn('user_id', self.session)
+
+    def test_deleted_user_is_logged_out(self):
+        self.user_model.objects.filter.return_value.values.return_value.first.return_value = None
+        response, _ = self.get()
+        self.assertEqual(response.url, '/login/')
+
+    def test_request_user_is_loaded_lazily(self):
+        _, request = self.get()
+        self.user_model.objects.get.assert_not_called()
+        self.user_model.objects.get.return_value = MagicMock(is_authenticated=True)
+        self.assertTrue(request.user.is_authenticated)
+        self.user_model.objects.get.assert_called_once_with(user_id=1)
+
+    @override_settings(AUTH_ACTIVITY_WRITE_SECONDS=60)
+    def test_session_is_only_modified_when_something_changed(self):
+        self.get('/dashboard/admin/')
+        self.get('/dashboard/admin/')
+        self.assertFalse(self.session.modified)
+        self.get('/databank/databank/')
+        self.assertTrue(self.session.modified)
+        self.session['last_activity'] -= 61
+        self.get('/databank/databank/')
+        self.assertTrue(self.session.modified)
+
+    def test_inactive_session_expires(self):
+        self.session['last_activity'] = time.time() - 901
+        response, _ = self.get()
+        self.assertEqual(response.url, '/login/')
+        self.assertEqual(self.lookups(), 0)
+
+    def test_url_classification_is_cached_per_path(self):
+        self.session.clear()
+        response, _ = self.get('/databank/api/ocr/jobs/')
+        self.assertEqual(response.status_code, 403)
+        self.get('/databank/api/ocr/jobs/')
+        self.assertEqual(self.middleware.classify.cache_info().hits, 1)
+        url = self.middleware.classify('/communications/api/message/attachment/5/convert-pdf/')
+        self.assertTrue(url.is_file_endpoint and url.is_conversion_endpoint and url.is_api_endpoint)
+        self.assertTrue(self.middleware.classify('/login/').is_public_url)
+        self.assertTrue(self.middleware.classify('/static/css/app.css').is_public_prefix)
+
+
+class AuthenticationMiddlewareQueryTest(SimpleTestCase):
+    """Counts the SQL the middleware runs against the real User model (no database needed)."""
+
+    def setUp(self):
+        self.queries = []
+
+        def fetch_all(queryset):
+            if queryset._result_cache is None:
+                self.queries.append(str(queryset.query))
+                queryset._result_cache = [dict(USER_ROW)]
+
+        patcher = patch.object(QuerySet, '_fetch_all', autospec=True, side_effect=fetch_all)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = AuthenticationMiddleware(lambda request: HttpResponse('ok'))
+        self.session = SessionStore()
+        self.session.update({'user_id': 1, 'role': 'admin', 'last_activity': time.time()})
+
+    def get(self, path):
+        request = RequestFactory().get(path)
+        request.session = self.session
+        request._messages = MagicMock()
+        return self.middleware(request)
+
+    @override_settings(AUTH_USER_RECHECK_SECONDS=60)
+    def test_one_user_query_per_recheck_window(self):
+        for path in ['/dashboard/admin/', '/databank/databank/'] * 10:
+            self.assertNotEqual(self.get(path).status_code, 302)
+
+        self.assertEqual(len(self.queries), 1)
+        self.assertIn('"users"."is_active"', self.queries[0])
+        self.assertNotIn('"users"."password_hash"', self.queries[0])
+
+        self.session[USER_SNAPSHOT_KEY]['checked_at'] -= 61
+        self.get('/dashboard/admin/')
+        self.get('/dashboard/admin/')
+        self.assertEqual(len(self.queries), 2)
+
+    def test_last_activity_is_refreshed_every_request_by_default(self):
+        self.session['last_activity'] -= 5
+        before = self.session['last_activity']
+        self.get('/dashboard/admin/')
+        self.assertGreater(self.session['last_activity'], before)
@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.services import email_service
+from apps.core.services.batch_sender import BatchSender, TokenBucket, get_pooled_session
+from apps.core.services.email_service import EmailService
+
+
+class FakeBrevoServer:
+    """
+    Minimal local stand-in for the Brevo /v3/smtp/email endpoint.
+    Records every payload and the client port it arrived on (one port per
+    keep-alive connection), can delay responses and fail the first N calls.
+    """
+
+    def __init__(self, latency=0.0, fail_first=0, fail_status=429):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.payloads = []
+        self.client_ports = set()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                with fake.lock:
+                    fake.calls += 1
+                    call_number = fake.calls
+                    fake.client_ports.add(self.client_address[1])
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+
+                time.sleep(fake.latency)
+
+                if call_number <= fake.fail_first:
+                    status, reply = fake.fail_status, {'message': 'Too many requests'}
+                else:
+                    status, reply = 201, {'messageId': f'<msg-{call_number}@fake>'}
+                    with fake.lock:
+                        fake.payloads.append(json.loads(body))
+
+                with fake.lock:
+                    fake.in_flight -= 1
+
+                data = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v3/smtp/email"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_recipients(count):
+    return [{'email': f'officer{i}@coop.test', 'name': f'Officer {i}'} for i in range(count)]
+
+
+class TokenBucketTest(SimpleTestCase):
+    def test_acquire_waits_for_refill(self):
+        now = [0.0]
+        slept = []
+
+        def fake_sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=fake_sleep)
+        for _ in range(4):
+            bucket.acquire()
+
+        # Two tokens burst immediately, the next two wait 0.5s each
+        self.assertAlmostEqual(sum(slept), 1.0, places=6)
+
+
+@override_settings(
+    BREVO_API_KEY='test-key',
+    BREVO_SENDER_EMAIL='noreply@coop.test',
+    BREVO_SENDER_NAME='Kooptimizer',
+    BREVO_BATCH_SIZE=50,
+    BREVO_MAX_CONCURRENCY=4,
+    BREVO_RATE_LIMIT_PER_SECOND=1000,
+    BREVO_MAX_RETRIES=3,
+)
+class BrevoBatchSendTest(SimpleTestCase):
+    def setUp(self):
+        email_service._brevo_rate_limiter = None
+
+    def send(self, server, recipient_count):
+        with self.settings(BREVO_API_URL=server.url):
+            return EmailService()._send_bulk_email(
+                subject='Test', html_content='<p>Hi</p>', recipients_list=make_recipients(recipient_count)
+            )
+
+    def test_all_chunks_delivered_with_bounded_concurrency(self):
+        with FakeBrevoServer(latency=0.02) as server:
+            success, message = self.send(server, 420)
+
+        self.assertTrue(success, message)
+        self.assertEqual(len(server.payloads), 9)
+        delivered = sorted(r['email'] for p in server.payloads for r in p['to'])
+        self.assertEqual(delivered, sorted(r['email'] for r in make_recipients(420)))
+        self.assertLessEqual(server.max_in_flight, 4)
+
+    def test_rate_limited_chunks_are_retried(self):
+        with FakeBrevoServer(fail_first=2, fail_status=429) as server:
+            success, message = self.send(server, 100)
+
+        self.assertTrue(success, message)
+        self.assertEqual(server.calls, 4)
+        self.assertEqual(len(server.payloads), 2)
+
+    def test_non_retryable_error_is_reported(self):
+        with FakeBrevoServer(fail_first=100, fail_status=400) as server:
+            success, message = self.send(server, 60)
+
+        self.assertFalse(success)
+        self.assertIn('Batch error (400)', message)
+        self.assertEqual(server.calls, 2)
+
+    def test_concurrent_send_overlaps_requests_and_reuses_connections(self):
+        batches = [make_recipients(50) for _ in range(12)]
+
+        def send(server, workers):
+            def post(session, batch):
+                return session.post(server.url, json={'to': batch}, timeout=5)
+
+            sender = BatchSender(get_pooled_session(f'fake-brevo-{workers}', workers), max_workers=workers)
+            return sender.send(batches, post)[1]
+
+        with FakeBrevoServer(latency=0.05) as sequential:
+            seq_stats = send(sequential, 1)
+        with FakeBrevoServer(latency=0.05) as concurrent:
+            par_stats = send(concurrent, 4)
+
+        self.assertEqual((seq_stats['succeeded'], par_stats['succeeded']), (12, 12))
+        self.assertEqual(sequential.max_in_flight, 1)
+        self.assertGreater(concurrent.max_in_flight, 1)
+        self.assertLessEqual(concurrent.max_in_flight, 4)
+        # Keep-alive: 12 requests each over one pooled connection per worker
+        self.assertEqual(len(sequential.client_ports), 1)
+        self.assertLessEqual(len(concurrent.client_ports), 4)
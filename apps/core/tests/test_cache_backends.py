@@ -0,0 +1,106 @@
+import threading
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+TIERED = {
+    'default': {
+        'BACKEND': 'apps.core.cache_backends.TieredCache',
+        'LOCATION': 'tiered-tests',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_PREFIXES': ['directory:'], 'LOCAL_TIMEOUT': 30,
+                    'LOCAL_MAX_ENTRIES': 2},
+    },
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tiered-shared-tests'},
+}
+
+
+@override_settings(CACHES=TIERED)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.shared = caches['shared']
+        self.cache.clear()
+        store = self.cache._store
+        store.local_hits = store.shared_hits = store.misses = 0
+
+    def test_local_prefix_served_from_process_after_first_read(self):
+        self.shared.set('directory:coops:1', ['a'])
+
+        self.assertEqual(self.cache.get('directory:coops:1'), ['a'])
+        with patch.object(type(self.shared), 'get', side_effect=AssertionError('shared read')):
+            self.assertEqual(self.cache.get('directory:coops:1'), ['a'])
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['local_hits'], stats['shared_hits'], stats['misses']), (1, 1, 0))
+        self.assertEqual(stats['hit_ratio'], 1.0)
+
+    def test_other_keys_always_read_shared_tier(self):
+        self.cache.set('otp_user_1', '123456', 300)
+        self.shared.set('otp_user_1', '654321', 300)
+
+        self.assertEqual(self.cache.get('otp_user_1'), '654321')
+        self.assertEqual(self.cache.stats()['local_entries'], 0)
+
+    def test_writes_and_deletes_update_both_tiers(self):
+        self.cache.set('directory:users:1', 'old')
+        self.cache.set('directory:users:1', 'new')
+        self.assertEqual(self.shared.get('directory:users:1'), 'new')
+        self.assertEqual(self.cache.get('directory:users:1'), 'new')
+
+        self.cache.delete('directory:users:1')
+        self.assertIsNone(self.cache.get('directory:users:1'))
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_local_tier_evicts_least_recently_used(self):
+        for key in ('directory:a', 'directory:b'):
+            self.cache.set(key, key)
+        self.cache.get('directory:a')
+        self.cache.set('directory:c', 'directory:c')
+
+        self.assertEqual(list(self.cache._store.entries),
+                         [self.cache.make_key('directory:a'), self.cache.make_key('directory:c')])
+
+    def test_local_entry_never_outlives_its_timeout(self):
+        self.cache.set('directory:short', 'x', 0)
+        self.assertIsNone(self.cache.get('directory:short'))
+
+    def test_get_many_mixes_tiers(self):
+        self.cache.set('directory:a', 1)
+        self.shared.set('counter', 2)
+
+        self.assertEqual(self.cache.get_many(['directory:a', 'counter', 'missing']),
+                         {'directory:a': 1, 'counter': 2})
+        stats = self.cache.stats()
+        self.assertEqual((stats['local_hits'], stats['shared_hits'], stats['misses']), (1, 1, 1))
+
+    def test_incr_is_atomic_across_threads(self):
+        self.cache.set('login_attempts_alice', 0, 300)
+
+        def hit():
+            for _ in range(50):
+                self.cache.incr('login_attempts_alice')
+
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.cache.get('login_attempts_alice'), 400)
+        self.assertEqual(self.cache.decr('login_attempts_alice', 10), 390)
+
+    def test_incr_missing_key_raises(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('login_attempts_nobody')
+
+    def test_add_respects_existing_value(self):
+        self.assertTrue(self.cache.add('directory:lock', 'first'))
+        self.assertFalse(self.cache.add('directory:lock', 'second'))
+        self.assertEqual(self.cache.get('directory:lock'), 'first')
+
+    def test_instances_for_same_location_share_local_tier(self):
+        other = caches.create_connection('default')
+        self.cache.set('directory:shared', 'x')
+
+        self.assertIs(other._store, self.cache._store)
@@ -0,0 +1,67 @@
+import base64
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.services import email_payload, email_service
+from apps.core.services.email_payload import (
+    BrevoPayloadBuilder,
+    encode_attachments,
+    get_header_inline_attachment,
+)
+
+
+def make_recipients(count):
+    return [{'email': f'officer{i}@coop.test', 'name': f'Officer {i}'} for i in range(count)]
+
+
+@override_settings(BREVO_SENDER_NAME='Kooptimizer', BREVO_SENDER_EMAIL='noreply@coop.test')
+class BrevoPayloadBuilderTest(SimpleTestCase):
+    def test_header_image_is_encoded_once_per_process(self):
+        self.assertIs(get_header_inline_attachment(), get_header_inline_attachment())
+
+    def test_body_matches_full_payload(self):
+        files = [('minutes.pdf', b'%PDF-1.4 first'), ('budget.xlsx', b'PK second')]
+        builder = BrevoPayloadBuilder('Meeting', '<p>Hi</p>', attachments=encode_attachments(files))
+        recipients = make_recipients(3)
+
+        body = json.loads(builder.body_for(recipients))
+
+        self.assertEqual(body['to'], recipients)
+        self.assertEqual(body['subject'], 'Meeting')
+        self.assertEqual([a['name'] for a in body['attachment']], ['minutes.pdf', 'budget.xlsx'])
+        self.assertEqual(base64.b64decode(body['attachment'][1]['content']), b'PK second')
+        self.assertEqual(body['inlineAttachments'][0]['cid'], 'header_image')
+
+    @patch.object(email_service, 'record_batch_result')
+    def test_attachments_are_encoded_once_per_send(self, mock_record):
+        files = [('scan1.pdf', b'%PDF-1.4 first'), ('scan2.pdf', b'%PDF-1.4 second')]
+        bodies = []
+
+        def post(url, headers, data, timeout):
+            bodies.append(json.loads(data))
+            return SimpleNamespace(status_code=201, json=lambda: {'messageId': '<msg@fake>'})
+
+        def send(chunks, post_chunk):
+            session = SimpleNamespace(post=post)
+            results = [{'index': i, 'batch': chunk, 'success': True, 'response': post_chunk(session, chunk)}
+                       for i, chunk in enumerate(chunks)]
+            return results, {'succeeded': len(results), 'batches': len(results), 'elapsed': 0.0,
+                             'batches_per_second': 0.0, 'latency_p50': 0.0, 'latency_p95': 0.0, 'retries': 0}
+
+        get_header_inline_attachment()
+        with self.settings(BREVO_BATCH_SIZE=50), \
+                patch.object(email_service, 'get_brevo_sender', return_value=SimpleNamespace(send=send)), \
+                patch.object(email_payload.base64, 'b64encode', wraps=base64.b64encode) as b64encode:
+            for _ in range(2):
+                success, message = email_service.EmailService()._send_bulk_email(
+                    'Annual General Assembly', '<p>Notice</p>', make_recipients(2000), attachments=files)
+                self.assertTrue(success, message)
+
+        # One encode per attachment per send; the header image is already cached
+        self.assertEqual(b64encode.call_count, 2 * len(files))
+        self.assertEqual(len(bodies), 80)
+        self.assertEqual(bodies[-1]['to'][-1]['email'], 'officer1999@coop.test')
+        self.assertTrue(all([a['name'] for a in body['attachment']] == ['scan1.pdf', 'scan2.pdf'] for body in bodies))
@@ -0,0 +1,167 @@
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.core.services import login_throttle
+from apps.users import views as user_views
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'login-throttle-tests'}}
+LIMITS = dict(CACHES=LOCMEM, LOGIN_MAX_ATTEMPTS=3, LOGIN_ATTEMPT_WINDOW_SECONDS=3600, LOGIN_LOCKOUT_SECONDS=600,
+              LOGIN_IP_MAX_ATTEMPTS=5, LOGIN_IP_WINDOW_SECONDS=3600, LOGIN_IP_LOCKOUT_SECONDS=300)
+
+
+@override_settings(**LIMITS)
+class LoginThrottleTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def fail(self, username, ip='10.0.0.1'):
+        state = login_throttle.hit(username, ip)
+        return state if state.locked else login_throttle.fail(username, ip, state)
+
+    def test_locks_username_when_failures_reach_limit(self):
+        self.assertFalse(self.fail('Alice').locked)
+        self.assertFalse(self.fail('alice').locked)
+        state = self.fail('ALICE ')
+
+        self.assertTrue(state.locked)
+        self.assertEqual(state.scope, 'user')
+        self.assertTrue(login_throttle.check('alice').locked)
+        self.assertTrue(login_throttle.hit('alice', '10.0.0.2').locked)
+
+    def test_reset_clears_username_count_and_lock(self):
+        for _ in range(3):
+            self.fail('alice')
+        login_throttle.reset('Alice')
+
+        state = login_throttle.check('alice')
+        self.assertFalse(state.locked)
+        self.assertEqual(state.attempts, 0)
+
+    def test_locks_ip_across_usernames(self):
+        for name in ('a', 'b', 'c', 'd'):
+            self.assertFalse(self.fail(name).locked)
+        state = self.fail('e')
+
+        self.assertEqual((state.locked, state.scope), (True, 'ip'))
+        self.assertTrue(login_throttle.check('someone-else', '10.0.0.1').locked)
+        self.assertFalse(login_throttle.check('someone-else', '10.0.0.9').locked)
+
+    def test_successful_logins_do_not_count_against_ip(self):
+        for i in range(20):
+            self.assertFalse(login_throttle.hit(f'member{i}', '10.0.0.1').locked)
+            login_throttle.reset(f'member{i}')
+
+        state = login_throttle.check('member0', '10.0.0.1')
+        self.assertEqual((state.locked, state.ip_attempts), (False, 0))
+        self.assertFalse(self.fail('member0').locked)
+
+    def test_concurrent_attempts_never_exceed_limit(self):
+        allowed = []
+
+        def attempt():
+            if not login_throttle.hit('bob', None).locked:
+                allowed.append(1)
+
+        threads = [threading.Thread(target=attempt) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(allowed), 3)
+        self.assertTrue(login_throttle.check('bob').locked)
+
+    def test_previous_window_counts_by_overlap(self):
+        with patch('apps.core.services.login_throttle.time.time', return_value=3600 * 10 + 900):
+            self.fail('carol', None)
+            self.fail('carol', None)
+        # Half way into the next window half of the previous count still applies
+        with patch('apps.core.services.login_throttle.time.time', return_value=3600 * 11 + 1800):
+            self.assertEqual(login_throttle.check('carol').attempts, 1)
+        with patch('apps.core.services.login_throttle.time.time', return_value=3600 * 12 + 1800):
+            self.assertEqual(login_throttle.check('carol').attempts, 0)
+
+    def test_client_ip_ignores_forwarded_for_unless_trusted(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4, 10.0.0.1')
+        self.assertEqual(login_throttle.client_ip(request), '10.0.0.1')
+        with self.settings(LOGIN_TRUST_X_FORWARDED_FOR=True):
+            self.assertEqual(login_throttle.client_ip(request), '1.2.3.4')
+
+
+@override_settings(**{**LIMITS, 'CACHES': {'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'login_throttle_test_cache'}}})
+class DatabaseCacheLoginThrottleTest(TestCase):
+    """The database cache's incr() is a get then a set with the default timeout; counts must keep their window."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('createcachetable', verbosity=0)
+
+    def test_counts_lock_and_outlive_the_default_timeout(self):
+        for _ in range(2):
+            state = login_throttle.hit('alice', '10.0.0.1')
+            self.assertFalse(login_throttle.fail('alice', '10.0.0.1', state).locked)
+        state = login_throttle.hit('alice', '10.0.0.1')
+        self.assertTrue(login_throttle.fail('alice', '10.0.0.1', state).locked)
+
+        # Past the 300 s default timeout the counts are still there (they last 2 x their window)
+        later = timezone.now() + timedelta(seconds=400)
+        with patch('django.core.cache.backends.db.tz_now', return_value=later):
+            state = login_throttle.check('alice', '10.0.0.1')
+        self.assertEqual((state.attempts, state.ip_attempts), (3, 3))
+
+
+@override_settings(**LIMITS, RECAPTCHA_SECRET_KEY='secret')
+@patch.object(user_views, 'render', side_effect=lambda request, template, context=None: HttpResponse(template))
+@patch.object(user_views.requests, 'post', return_value=SimpleNamespace(
+    raise_for_status=lambda: None, json=lambda: {'success': True}))
+class LoginViewTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def login(self, password='wrong'):
+        request = RequestFactory().post('/login/', {'username': 'Alice', 'password': password,
+                                                    'g-recaptcha-response': 'token'})
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return request, user_views.login_view(request)
+
+    def test_lockout_after_failures_blocks_correct_password(self, *mocks):
+        with patch.object(user_views.User, 'login_user', return_value=None):
+            for _ in range(2):
+                _, response = self.login()
+                self.assertEqual(response.status_code, 200)
+            request, response = self.login()
+        self.assertEqual(response.url, '/access-denied/')
+        self.assertEqual(request.session['locked_out_username'], 'alice')
+
+        with patch.object(user_views.User, 'login_user') as login_user:
+            _, response = self.login(password='right')
+        login_user.assert_not_called()
+        self.assertEqual(response.url, '/access-denied/')
+
+    def test_success_loads_user_once_and_resets_attempts(self, *mocks):
+        result = {'status': 'SUCCESS', 'user_id': 7, 'role': 'admin', 'verification_status': 'verified',
+                  'is_first_login': False}
+        user = SimpleNamespace(username='alice', is_active=True)
+        with patch.object(user_views.User, 'login_user', return_value=None):
+            self.login()
+        with patch.object(user_views.User, 'login_user', return_value=result), \
+                patch.object(user_views.User, 'objects') as objects, \
+                patch.object(user_views, 'set_session_username'):
+            objects.get.return_value = user
+            request, response = self.login(password='right')
+
+        objects.get.assert_called_once_with(pk=7)
+        self.assertEqual(request.session['user_id'], 7)
+        self.assertEqual(login_throttle.check('alice').attempts, 0)
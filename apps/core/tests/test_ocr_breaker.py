@@ -0,0 +1,120 @@
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.services import ocr_breaker, ocr_cache
+from apps.core.services.ocr_service import UnifiedOCRService
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ocr-breaker-tests'}}
+
+OK = {'success': True, 'text': 'Total Assets', 'language': 'eng', 'provider': 'optiic', 'error': None}
+FALLBACK_OK = {'success': True, 'text': 'Total Assets', 'language': 'eng', 'provider': 'ocr_space', 'error': None}
+QUOTA = {'success': False, 'error': 'Optiic API error: 429 - limit exceeded'}
+
+
+@override_settings(CACHES=LOCMEM)
+class BreakerStateTest(SimpleTestCase):
+    def setUp(self):
+        ocr_breaker.cache.clear()
+        ocr_breaker._histogram_memo.clear()
+
+    def test_latencies_are_bucketed_and_percentiles_read_back(self):
+        for seconds in [0.3] * 8 + [4, 45]:
+            ocr_breaker.record('optiic', seconds, True)
+        histogram = ocr_breaker.get_histogram('optiic')
+        self.assertEqual((histogram['0.5'], histogram['5'], histogram['60']), (8, 1, 1))
+        self.assertEqual(ocr_breaker.latency_percentile('optiic', 0.5), 0.5)
+        self.assertEqual(ocr_breaker.latency_percentile('optiic', 0.95), 60)
+        self.assertIsNone(ocr_breaker.latency_percentile('ocr_space', 0.95, min_samples=1))
+
+    @override_settings(OCR_BREAKER_FAILURE_THRESHOLD=3)
+    def test_consecutive_failures_trip_and_success_resets(self):
+        ocr_breaker.record('optiic', 1, False)
+        ocr_breaker.record('optiic', 1, False)
+        ocr_breaker.record('optiic', 1, True)
+        ocr_breaker.record('optiic', 1, False)
+        self.assertFalse(ocr_breaker.is_open('optiic'))
+        ocr_breaker.record('optiic', 1, False)
+        ocr_breaker.record('optiic', 1, False)
+        self.assertTrue(ocr_breaker.is_open('optiic'))
+        self.assertIn('3 consecutive failures', ocr_breaker.get_provider_stats()['optiic']['reason'])
+
+    def test_quota_trip_lasts_until_midnight(self):
+        ocr_breaker.trip_until_tomorrow('optiic', 'limit exceeded')
+        stats = ocr_breaker.get_provider_stats()['optiic']
+        self.assertTrue(stats['breaker_open'])
+        self.assertIsNotNone(stats['tripped_until'])
+
+    def test_local_memory_state_is_reported_and_warned_once(self):
+        with patch.object(ocr_breaker, '_warned_process_local', False), \
+                self.assertLogs('apps.core.services.ocr_breaker', 'WARNING') as logs:
+            ocr_breaker.trip('optiic', 'down')
+            ocr_breaker.trip('ocr_space', 'down')
+        self.assertTrue(ocr_breaker.is_process_local())
+        self.assertEqual(sum('kept per process' in line for line in logs.output), 1)
+
+        tiered = {
+            'default': {'BACKEND': 'apps.core.cache_backends.TieredCache', 'LOCATION': 'ocr-breaker-tiered'},
+            'shared': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache_table'},
+        }
+        with self.settings(CACHES=tiered):
+            self.assertFalse(ocr_breaker.is_process_local())
+
+
+@override_settings(CACHES=LOCMEM, OCR_HEDGING_ENABLED=False)
+@patch.object(ocr_cache, 'store')
+@patch.object(ocr_cache, 'lookup', return_value=None)
+class SharedBreakerServiceTest(SimpleTestCase):
+    def setUp(self):
+        ocr_breaker.cache.clear()
+
+    def test_quota_error_is_seen_by_other_workers(self, mock_lookup, mock_store):
+        first, second = UnifiedOCRService(), UnifiedOCRService()
+        with patch.object(first, '_call_optiic_file', return_value=QUOTA), \
+                patch.object(first, '_call_ocr_space_file', return_value=FALLBACK_OK):
+            self.assertEqual(first.process_bytes(b'scan-1')['provider'], 'ocr_space')
+
+        # A different instance (another gunicorn worker) skips Optiic without trying it
+        with patch.object(second, '_call_optiic_file') as mock_optiic, \
+                patch.object(second, '_call_ocr_space_file', return_value=FALLBACK_OK):
+            self.assertEqual(second.process_bytes(b'scan-2')['provider'], 'ocr_space')
+        mock_optiic.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM)
+class HedgingTest(SimpleTestCase):
+    def setUp(self):
+        ocr_breaker.cache.clear()
+        self.service = UnifiedOCRService()
+
+    def slow(self, result, seconds):
+        def call(*args):
+            time.sleep(seconds)
+            return dict(result)
+        return call
+
+    def test_slow_primary_is_hedged_and_fastest_success_wins(self):
+        primary = lambda: self.service._timed('optiic', self.slow(OK, 0.5))
+        fallback = lambda: self.service._timed('ocr_space', self.slow(FALLBACK_OK, 0.01))
+        started = time.monotonic()
+        result = self.service._call_with_fallback(primary, fallback, hedge_delay=0.05)
+        self.assertEqual(result['provider'], 'ocr_space')
+        self.assertTrue(result['hedged'])
+        self.assertLess(time.monotonic() - started, 0.4)
+
+    def test_fast_primary_is_not_hedged(self):
+        calls = []
+        fallback = lambda: calls.append('fallback') or FALLBACK_OK
+        result = self.service._call_with_fallback(lambda: dict(OK), fallback, hedge_delay=1)
+        self.assertEqual(result['provider'], 'optiic')
+        self.assertEqual(calls, [])
+
+    @override_settings(OCR_HEDGE_MIN_SAMPLES=5, OCR_HEDGE_PERCENTILE=0.9)
+    def test_hedge_delay_follows_recorded_latency(self):
+        ocr_breaker._histogram_memo.clear()
+        self.assertEqual(self.service._hedge_delay(), 20)
+        for _ in range(10):
+            ocr_breaker.record('optiic', 1.5, True)
+        ocr_breaker._histogram_memo.clear()
+        self.assertEqual(self.service._hedge_delay(), 2)
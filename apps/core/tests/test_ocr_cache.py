@@ -0,0 +1,87 @@
+import base64
+import io
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+from PIL import Image, ImageDraw
+
+from apps.core.services import ocr_cache
+from apps.core.services.ocr_service import UnifiedOCRService
+
+
+def make_png(text='Total Assets 1,250,000', size=(240, 80), **save_kwargs):
+    image = Image.new('RGB', size, 'white')
+    ImageDraw.Draw(image).text((10, 30), text, fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', **save_kwargs)
+    return buffer.getvalue()
+
+
+OCR_RESULT = {'success': True, 'text': 'Total Assets 1,250,000', 'language': 'eng', 'provider': 'optiic', 'error': None}
+
+
+class CacheKeyTest(SimpleTestCase):
+    def test_reencoded_image_has_the_same_key(self):
+        original = ocr_cache.CacheKey(make_png())
+        reencoded = ocr_cache.CacheKey(make_png(compress_level=0))
+        self.assertEqual(original.content_hash, reencoded.content_hash)
+
+    def test_different_image_has_a_different_key(self):
+        self.assertNotEqual(ocr_cache.CacheKey(make_png()).content_hash,
+                            ocr_cache.CacheKey(make_png('Net Surplus 90,000')).content_hash)
+
+    def test_non_images_are_hashed_on_raw_bytes(self):
+        key = ocr_cache.CacheKey(b'%PDF-1.4 not an image')
+        self.assertEqual(len(key.content_hash), 64)
+        self.assertIsNone(key.perceptual_hash)
+
+    def test_perceptual_hash_is_close_for_a_resized_copy(self):
+        image = Image.open(io.BytesIO(make_png()))
+        resized = image.resize((480, 160))
+        distance = ocr_cache.hamming_distance(ocr_cache.perceptual_hash(image), ocr_cache.perceptual_hash(resized))
+        self.assertLessEqual(distance, 6)
+        self.assertLess(ocr_cache.perceptual_hash(image), 1 << 63)
+
+
+@patch.object(ocr_cache, 'store')
+class CachedOCRServiceTest(SimpleTestCase):
+    def setUp(self):
+        self.service = UnifiedOCRService()
+
+    def test_cache_hit_skips_the_providers(self, mock_store):
+        cached = dict(OCR_RESULT, cached=True)
+        with patch.object(ocr_cache, 'lookup', return_value=cached), \
+                patch.object(self.service, '_call_optiic_file') as mock_optiic:
+            result = self.service.process_image_file(ContentFile(make_png()))
+        self.assertIs(result, cached)
+        mock_optiic.assert_not_called()
+        mock_store.assert_not_called()
+
+    def test_miss_calls_the_provider_and_stores_the_result(self, mock_store):
+        upload = ContentFile(make_png())
+        with patch.object(ocr_cache, 'lookup', return_value=None), \
+                patch.object(self.service, '_call_optiic_file', return_value=OCR_RESULT) as mock_optiic:
+            result = self.service.process_image_file(upload)
+        self.assertEqual(result, OCR_RESULT)
+        self.assertEqual(mock_optiic.call_args.args[0].tell(), 0)
+        key, stored = mock_store.call_args.args
+        self.assertEqual(key.content_hash, ocr_cache.CacheKey(make_png()).content_hash)
+        self.assertIs(stored, OCR_RESULT)
+
+    def test_clipboard_image_uses_the_same_key_as_the_upload(self, mock_store):
+        data_url = 'data:image/png;base64,' + base64.b64encode(make_png()).decode()
+        with patch.object(ocr_cache, 'lookup', return_value=None) as mock_lookup, \
+                patch.object(self.service, '_call_optiic_file', return_value=OCR_RESULT):
+            self.service.process_base64_image(data_url)
+        self.assertEqual(mock_lookup.call_args.args[0].content_hash,
+                         ocr_cache.CacheKey(make_png()).content_hash)
+
+
+class StoreTest(SimpleTestCase):
+    @patch('apps.databank.models.OCRResultCache.objects')
+    def test_failed_or_empty_results_are_not_cached(self, mock_objects):
+        key = ocr_cache.CacheKey(make_png())
+        ocr_cache.store(key, {'success': False, 'error': 'Optiic API error: 429'})
+        ocr_cache.store(key, dict(OCR_RESULT, text='  '))
+        mock_objects.update_or_create.assert_not_called()
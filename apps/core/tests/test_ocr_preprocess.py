@@ -0,0 +1,119 @@
+import io
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image, ImageDraw
+
+from apps.core.services import ocr_cache, ocr_preprocess
+from apps.core.services.ocr_service import UnifiedOCRService
+
+
+def make_photo(size=(4000, 3000), text='Total Assets', exif_orientation=None, dpi=None):
+    image = Image.new('RGB', size, (200, 190, 170))
+    ImageDraw.Draw(image).text((100, 100), text, fill=(40, 40, 40))
+    buffer = io.BytesIO()
+    kwargs = {'dpi': dpi} if dpi else {}
+    if exif_orientation:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        kwargs['exif'] = exif
+    image.save(buffer, format='JPEG', quality=90, **kwargs)
+    return buffer.getvalue()
+
+
+def make_pdf(*texts):
+    pages = []
+    for number, text in enumerate(texts, start=1):
+        page = Image.new('RGB', (100 * number, 120), 'white')
+        ImageDraw.Draw(page).text((10, 50), text, fill='black')
+        pages.append(page)
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+
+class PreprocessImageTest(SimpleTestCase):
+    @override_settings(OCR_MAX_IMAGE_SIDE=2000)
+    def test_photo_is_downscaled_and_binarized(self):
+        processed = ocr_preprocess.preprocess_image(make_photo())
+        image = Image.open(io.BytesIO(processed))
+        self.assertEqual((image.format, image.mode, image.size), ('PNG', '1', (2000, 1500)))
+
+    def test_exif_rotation_is_applied(self):
+        processed = ocr_preprocess.preprocess_image(make_photo(size=(400, 300), exif_orientation=6))
+        self.assertEqual(Image.open(io.BytesIO(processed)).size, (300, 400))
+
+    def test_high_dpi_scans_are_reduced_to_the_target_dpi(self):
+        processed = ocr_preprocess.preprocess_image(make_photo(size=(1200, 600), dpi=(600, 600)))
+        self.assertEqual(Image.open(io.BytesIO(processed)).size, (600, 300))
+
+    @override_settings(OCR_BINARIZE=False)
+    def test_binarization_can_be_disabled(self):
+        processed = ocr_preprocess.preprocess_image(make_photo(size=(400, 300)))
+        self.assertEqual(Image.open(io.BytesIO(processed)).mode, 'L')
+
+    def test_undecodable_content_is_returned_unchanged(self):
+        self.assertEqual(ocr_preprocess.preprocess_image(b'not an image'), b'not an image')
+
+    def test_otsu_threshold_splits_ink_from_paper(self):
+        histogram = [0] * 256
+        histogram[30], histogram[220] = 100, 900
+        self.assertTrue(30 <= ocr_preprocess._otsu_threshold(histogram) < 220)
+
+
+class SplitPdfTest(SimpleTestCase):
+    def test_scanned_pages_yield_their_images_in_order(self):
+        pages = ocr_preprocess.split_pdf(make_pdf('one', 'two', 'three'))
+        self.assertEqual([page.number for page in pages], [1, 2, 3])
+        self.assertTrue(all(page.image and not page.text for page in pages))
+
+    def test_page_limit(self):
+        with self.assertRaises(ValueError):
+            ocr_preprocess.split_pdf(make_pdf('one', 'two'), max_pages=1)
+
+
+@patch.object(ocr_cache, 'store')
+@patch.object(ocr_cache, 'lookup', return_value=None)
+class PdfOCRTest(SimpleTestCase):
+    def test_pages_are_ocrd_concurrently_and_merged_in_order(self, mock_lookup, mock_store):
+        service = UnifiedOCRService()
+        in_flight = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def fake_ocr(content):
+            width = Image.open(io.BytesIO(content)).size[0]
+            with lock:
+                in_flight['now'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            # Later (wider) pages finish first
+            time.sleep(9 / width)
+            with lock:
+                in_flight['now'] -= 1
+            return {'success': True, 'text': f'page width {width}', 'language': 'eng', 'provider': 'optiic',
+                    'error': None}
+
+        with patch.object(service, '_process_image', side_effect=fake_ocr):
+            result = service.process_bytes(make_pdf('one', 'two', 'three'))
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['text'], 'page width 100\n\npage width 200\n\npage width 300')
+        self.assertEqual([page['page'] for page in result['pages']], [1, 2, 3])
+        self.assertGreater(in_flight['max'], 1)
+
+    def test_text_pages_skip_ocr(self, mock_lookup, mock_store):
+        service = UnifiedOCRService()
+        pages = [ocr_preprocess.PdfPage(1, text='Balance Sheet'), ocr_preprocess.PdfPage(2, image=b'img')]
+        with patch.object(ocr_preprocess, 'split_pdf', return_value=pages), \
+                patch.object(service, 'process_bytes', wraps=service.process_bytes) as mock_process, \
+                patch.object(service, '_process_image', return_value={'success': True, 'text': 'Net Surplus',
+                                                                      'provider': 'optiic'}):
+            result = service.process_pdf(b'%PDF-1.4')
+        self.assertEqual(result['text'], 'Balance Sheet\n\nNet Surplus')
+        self.assertEqual(result['provider'], 'optiic,pdf_text')
+        mock_process.assert_called_once_with(b'img')
+
+    def test_unreadable_pdf_is_an_error(self, mock_lookup, mock_store):
+        result = UnifiedOCRService().process_bytes(b'%PDF-1.4 truncated')
+        self.assertFalse(result['success'])
@@ -0,0 +1,255 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from pywebpush import WebPushException
+
+from apps.core import notification_utils
+from apps.core.services import push_dispatcher
+from apps.core.services.push_dispatcher import NotificationCoalescer, PushDispatcher, PushIntent
+
+
+def make_users(*user_ids):
+    return [SimpleNamespace(user_id=user_id, username=f'user{user_id}') for user_id in user_ids]
+
+
+def make_summary(users, sent, failed=0, pruned=0, unsubscribed=0):
+    return {'users': len(users), 'subscriptions': sent + failed + pruned, 'sent': sent, 'failed': failed,
+            'pruned': pruned, 'unsubscribed': unsubscribed, 'delivered_user_ids': set()}
+
+
+def message_intent(body, user_ids=(1,), sender='Ana'):
+    return PushIntent(f'New message from {sender}', body, user_ids=user_ids, topic=f'message:{sender}',
+                      digest_title=f'{{count}} new messages from {sender}')
+
+
+class PushDispatcherTest(SimpleTestCase):
+    def make_dispatcher(self, send_fn, **kwargs):
+        dispatcher = PushDispatcher(workers=kwargs.pop('workers', 2), send_fn=send_fn, **kwargs)
+        dispatcher._resolve_users = lambda intent: make_users(*intent.user_ids)
+        self.addCleanup(dispatcher.stop, 1)
+        return dispatcher
+
+    def test_intents_are_sent_by_workers_and_measured(self):
+        sent = []
+        lock = threading.Lock()
+
+        def send_fn(users, payload, ttl):
+            with lock:
+                sent.extend((user.user_id, payload['head']) for user in users)
+            return make_summary(users, sent=4, failed=1, pruned=1, unsubscribed=1)
+
+        dispatcher = self.make_dispatcher(send_fn)
+        for i in range(5):
+            dispatcher.submit(PushIntent(f'Title {i}', 'Body', user_ids=[1, 2, 3]))
+        self.assertTrue(dispatcher.drain(timeout=5))
+
+        self.assertEqual(len(sent), 15)
+        metrics = dispatcher.metrics.snapshot()
+        self.assertEqual(metrics['enqueued'], 5)
+        self.assertEqual(metrics['dispatched'], 5)
+        self.assertEqual(metrics['recipients'], 15)
+        self.assertEqual(metrics['delivered'], 20)
+        self.assertEqual(metrics['failed'], 5)
+        self.assertEqual(metrics['pruned'], 5)
+        self.assertEqual(metrics['unsubscribed'], 5)
+        self.assertGreaterEqual(metrics['send_latency']['max'], 0.0)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        release = threading.Event()
+        dispatcher = self.make_dispatcher(lambda users, *args: release.wait(5) and make_summary(users, 1), workers=1, queue_size=1)
+        self.addCleanup(release.set)
+
+        results = [dispatcher.submit(PushIntent('Title', 'Body', user_ids=[1])) for _ in range(5)]
+
+        self.assertIn(False, results)
+        self.assertGreaterEqual(dispatcher.metrics.snapshot()['dropped'], 3)
+        release.set()
+        self.assertTrue(dispatcher.drain(timeout=5))
+
+    def test_send_errors_are_counted_and_workers_keep_running(self):
+        calls = []
+
+        def send_fn(users, payload, ttl):
+            calls.append(users)
+            if len(calls) == 1:
+                raise RuntimeError('push service exploded')
+            return make_summary(users, sent=1)
+
+        dispatcher = self.make_dispatcher(send_fn, workers=1)
+        dispatcher.submit(PushIntent('Title', 'Body', user_ids=[1]))
+        dispatcher.submit(PushIntent('Title', 'Body', user_ids=[2]))
+        self.assertTrue(dispatcher.drain(timeout=5))
+
+        metrics = dispatcher.metrics.snapshot()
+        self.assertEqual(metrics['errors'], 1)
+        self.assertEqual(metrics['delivered'], 1)
+
+    def test_topic_intents_are_coalesced_before_sending(self):
+        sent = []
+        dispatcher = self.make_dispatcher(lambda users, payload, ttl: sent.append(payload) or make_summary(users, 1))
+        for i in range(5):
+            dispatcher.submit(message_intent(f'message {i}'))
+        dispatcher.submit(PushIntent('Untagged', 'Body', user_ids=[1]))
+        dispatcher.coalescer.flush()
+        self.assertTrue(dispatcher.drain(timeout=5))
+
+        self.assertEqual(sorted(payload['head'] for payload in sent), ['5 new messages from Ana', 'Untagged'])
+        self.assertEqual(dispatcher.metrics.snapshot()['enqueued'], 2)
+
+    def test_zero_window_disables_coalescing(self):
+        sent = []
+        dispatcher = self.make_dispatcher(lambda users, payload, ttl: sent.append(payload) or make_summary(users, 1),
+                                          coalesce_window=0)
+        for i in range(3):
+            dispatcher.submit(message_intent(f'message {i}'))
+        self.assertTrue(dispatcher.drain(timeout=5))
+        self.assertEqual(len(sent), 3)
+
+
+class NotificationCoalescerTest(SimpleTestCase):
+    def make_coalescer(self, window=60):
+        emitted = []
+        coalescer = NotificationCoalescer(window, emitted.append)
+        self.addCleanup(coalescer.stop)
+        return coalescer, emitted
+
+    def test_burst_per_user_and_topic_becomes_one_digest(self):
+        coalescer, emitted = self.make_coalescer()
+        for body in ('one', 'two', 'three'):
+            coalescer.add(message_intent(body))
+        coalescer.add(message_intent('hello', user_ids=[2]))
+        coalescer.add(message_intent('from ben', sender='Ben'))
+        coalescer.flush()
+
+        sent = sorted((intent.user_ids, intent.title, intent.body) for intent in emitted)
+        self.assertEqual(sent, [((1,), '3 new messages from Ana', 'three'),
+                                ((1,), 'New message from Ben', 'from ben'),
+                                ((2,), 'New message from Ana', 'hello')])
+        snapshot = coalescer.metrics.snapshot()
+        self.assertEqual((snapshot['coalesced'], snapshot['digests']), (2, 1))
+
+    def test_uncoalesced_multi_user_intent_stays_one_fan_out(self):
+        coalescer, emitted = self.make_coalescer()
+        intent = message_intent('hi', user_ids=[1, 2, 3])
+        coalescer.add(intent)
+        coalescer.add(message_intent('again', user_ids=[3]))
+        coalescer.flush()
+
+        self.assertEqual(sorted(i.user_ids for i in emitted), [(1, 2), (3,)])
+
+    def test_buffers_are_flushed_when_the_window_closes(self):
+        flushed = threading.Event()
+        coalescer = NotificationCoalescer(0.05, lambda intent: flushed.set())
+        self.addCleanup(coalescer.stop)
+        coalescer.add(message_intent('hi'))
+        self.assertTrue(flushed.wait(2))
+
+
+class EnqueueOnCommitTest(SimpleTestCase):
+    @patch.object(push_dispatcher, 'get_push_dispatcher')
+    @patch.object(push_dispatcher.transaction, 'on_commit')
+    def test_intent_is_submitted_only_when_the_transaction_commits(self, mock_on_commit, mock_get_dispatcher):
+        intent = push_dispatcher.enqueue_cooperative_notification(7, 'Profile Updated', 'Body')
+
+        mock_get_dispatcher.return_value.submit.assert_not_called()
+        mock_on_commit.call_args.args[0]()
+        mock_get_dispatcher.return_value.submit.assert_called_once_with(intent)
+        self.assertEqual(intent.coop_id, 7)
+
+
+def make_subscription(subscription_id=5):
+    return SimpleNamespace(id=subscription_id, endpoint=f'https://fcm.example/send/{subscription_id}',
+                           p256dh='key', auth='secret')
+
+
+class SendToSubscriptionTest(SimpleTestCase):
+    def make_subscription(self):
+        return make_subscription()
+
+    @patch.object(notification_utils, 'webpush')
+    def test_sends_over_the_pooled_session(self, mock_webpush):
+        self.assertTrue(notification_utils.send_to_subscription(self.make_subscription(), {'head': 'Hi'}))
+        kwargs = mock_webpush.call_args.kwargs
+        self.assertIs(kwargs['requests_session'], notification_utils.get_pooled_session('webpush'))
+        self.assertEqual(kwargs['subscription_info']['keys'], {'p256dh': 'key', 'auth': 'secret'})
+        self.assertIn('timeout', kwargs)
+
+    @patch.object(notification_utils, 'prune_subscriptions')
+    @patch.object(notification_utils, 'webpush')
+    def test_expired_subscription_is_deleted(self, mock_webpush, mock_prune):
+        mock_webpush.side_effect = WebPushException('Gone', response=SimpleNamespace(status_code=410))
+        self.assertFalse(notification_utils.send_to_subscription(self.make_subscription(), {'head': 'Hi'}))
+        mock_prune.assert_called_once_with([5])
+
+
+def fake_webpush(statuses, in_flight):
+    """webpush stand-in answering per endpoint; records peak concurrency."""
+    lock = threading.Lock()
+
+    def send(subscription_info, **kwargs):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        try:
+            time.sleep(0.02)
+            status = statuses.get(subscription_info['endpoint'], 201)
+            if status >= 400:
+                raise WebPushException('Push failed', response=SimpleNamespace(status_code=status))
+        finally:
+            with lock:
+                in_flight['now'] -= 1
+
+    return send
+
+
+class FanOutPushTest(SimpleTestCase):
+    def test_subscriptions_are_sent_concurrently_and_gone_ones_pruned(self):
+        users = make_users(1, 2, 3)
+        subscriptions = {1: [make_subscription(10), make_subscription(11)], 2: [make_subscription(20)]}
+        statuses = {'https://fcm.example/send/11': 410, 'https://fcm.example/send/20': 404,
+                    'https://fcm.example/send/99': 500}
+        subscriptions[2].append(make_subscription(99))
+        in_flight = {'now': 0, 'max': 0}
+
+        with patch.object(notification_utils, 'resolve_push_subscriptions', return_value=subscriptions) as mock_resolve, \
+                patch.object(notification_utils, 'webpush', side_effect=fake_webpush(statuses, in_flight)), \
+                patch.object(notification_utils, 'prune_subscriptions', side_effect=len) as mock_prune:
+            summary = notification_utils.fan_out_push(users, {'head': 'Hi'}, max_workers=4)
+
+        mock_resolve.assert_called_once_with(users)
+        mock_prune.assert_called_once_with([11, 20])
+        self.assertEqual((summary['subscriptions'], summary['sent'], summary['failed'], summary['pruned']), (4, 1, 1, 2))
+        self.assertEqual(summary['unsubscribed'], 1)
+        self.assertEqual(summary['delivered_user_ids'], {1})
+        self.assertGreater(in_flight['max'], 1)
+
+    def test_nobody_subscribed_sends_nothing(self):
+        with patch.object(notification_utils, 'resolve_push_subscriptions', return_value={}), \
+                patch.object(notification_utils, 'webpush') as mock_webpush:
+            summary = notification_utils.fan_out_push(make_users(1, 2), {'head': 'Hi'})
+        mock_webpush.assert_not_called()
+        self.assertEqual((summary['sent'], summary['pruned'], summary['unsubscribed']), (0, 0, 2))
+
+
+class ResolvePushSubscriptionsTest(SimpleTestCase):
+    @patch('apps.users.models.PushSubscription.objects')
+    def test_subscriptions_are_looked_up_by_user_id(self, mock_objects):
+        rows = [SimpleNamespace(user_id=1, subscription=make_subscription(10)),
+                SimpleNamespace(user_id=1, subscription=make_subscription(11)),
+                SimpleNamespace(user_id=2, subscription=make_subscription(20))]
+        mock_objects.filter.return_value.select_related.return_value = rows
+
+        result = notification_utils.resolve_push_subscriptions(make_users(1, 2, 3))
+
+        mock_objects.filter.assert_called_once_with(user_id__in={1, 2, 3})
+        self.assertEqual({user_id: [s.id for s in subs] for user_id, subs in result.items()}, {1: [10, 11], 2: [20]})
+
+    def test_lookup_is_a_single_indexed_query(self):
+        from apps.users.models import PushSubscription
+
+        sql = str(PushSubscription.objects.filter(user_id__in=[1, 2]).select_related('subscription').query)
+        self.assertIn('"user_push_subscriptions"."user_id" IN', sql)
+        self.assertNotIn('auth_user', sql)
@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from apps.core.session_backend import SessionStore
+
+LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'session-default-tests'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'session-tests'},
+}
+
+
+@override_settings(CACHES=LOCMEM, SESSION_CACHE_ALIAS='sessions', SESSION_COOKIE_AGE=900,
+                   SESSION_DB_WRITE_THRESHOLD=60)
+@patch.object(DBStore, 'exists', return_value=False)
+@patch.object(DBStore, '_get_session_from_db', return_value=None)
+@patch.object(DBStore, 'save')
+class CoalescingSessionStoreTest(SimpleTestCase):
+    def setUp(self):
+        caches['sessions'].clear()
+
+    def login(self):
+        store = SessionStore()
+        store['user_id'] = 1
+        store['last_activity'] = time.time()
+        store.save()
+        return store.session_key
+
+    def request(self, session_key, **changes):
+        store = SessionStore(session_key)
+        store.update(changes)
+        store.save()
+        return store
+
+    def test_activity_only_requests_stay_in_the_cache(self, mock_db_save, mock_db_get, mock_exists):
+        key = self.login()
+        self.assertEqual(mock_db_save.call_count, 1)
+        for _ in range(10):
+            store = self.request(key, last_activity=time.time())
+        self.assertEqual(mock_db_save.call_count, 1)
+        self.assertEqual(store['user_id'], 1)
+        mock_db_get.assert_not_called()
+
+    def test_data_changes_are_written_through(self, mock_db_save, mock_db_get, mock_exists):
+        key = self.login()
+        self.request(key, current_page='/databank/databank/')
+        self.request(key, current_page='/databank/databank/')
+        self.assertEqual(mock_db_save.call_count, 2)
+
+    def test_expiry_drift_beyond_threshold_is_written(self, mock_db_save, mock_db_get, mock_exists):
+        key = self.login()
+        later = timezone.now() + timedelta(seconds=61)
+        with patch('django.contrib.sessions.backends.base.timezone.now', return_value=later), \
+                patch('apps.core.session_backend.timezone.now', return_value=later):
+            self.request(key, last_activity=time.time() + 61)
+        self.assertEqual(mock_db_save.call_count, 2)
+
+    def test_idle_timeout_is_exact(self, mock_db_save, mock_db_get, mock_exists):
+        key = self.login()
+        late = timezone.now() + timedelta(seconds=901)
+        with patch('apps.core.session_backend.timezone.now', return_value=late):
+            store = SessionStore(key)
+            self.assertNotIn('user_id', store)
+        mock_db_get.assert_called_once()
+
+    def test_cache_miss_falls_back_to_the_database(self, mock_db_save, mock_db_get, mock_exists):
+        key = self.login()
+        caches['sessions'].clear()
+        store = SessionStore(key)
+        mock_db_get.return_value = SimpleNamespace(session_data=store.encode({'user_id': 1, 'role': 'admin'}),
+                                                   expire_date=timezone.now() + timedelta(seconds=880))
+        self.assertEqual(store['role'], 'admin')
+        # Reloaded into the cache with what the database holds, so nothing new to write
+        store['last_activity'] = time.time()
+        store.save()
+        self.assertEqual(mock_db_save.call_count, 1)
+        self.assertEqual(SessionStore(key)['role'], 'admin')
+        mock_db_get.assert_called_once()
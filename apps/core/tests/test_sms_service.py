@@ -0,0 +1,191 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from apps.core.services import sms_service
+from apps.core.services.sms_service import SmsService
+from apps.core.utils.phone import normalize_phone_number, to_provider_format
+
+
+class FakeIprogServer:
+    """
+    Minimal local stand-in for the IPROG send_bulk endpoint.
+    Records the numbers of every accepted call; can delay responses, fail the
+    first N calls with an HTTP status, or answer HTTP 200 with an error body.
+    """
+
+    def __init__(self, latency=0.0, fail_first=0, fail_status=503, body_status=200):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.body_status = body_status
+        self.chunks = []
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                form = parse_qs(body)
+                with fake.lock:
+                    fake.calls += 1
+                    call_number = fake.calls
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+
+                time.sleep(fake.latency)
+
+                if call_number <= fake.fail_first:
+                    status, reply = fake.fail_status, {'message': 'Service unavailable'}
+                else:
+                    status = 200
+                    reply = {'status': fake.body_status, 'message': 'SMS queued', 'message_id': f'iprog-{call_number}'}
+                    if fake.body_status == 200:
+                        with fake.lock:
+                            fake.chunks.append(form['phone_number'][0].split(','))
+
+                with fake.lock:
+                    fake.in_flight -= 1
+
+                data = json.dumps(reply).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (read timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1/sms_messages/send_bulk"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class NormalizePhoneNumberTest(SimpleTestCase):
+    def test_local_formats_normalize_to_e164(self):
+        for raw in ('09171234567', '0917 123 4567', '9171234567', '639171234567',
+                    '+63 917-123-4567', '(0917) 123.4567', '0063 917 123 4567'):
+            self.assertEqual(normalize_phone_number(raw), '+639171234567', raw)
+
+    def test_unusable_numbers_are_rejected(self):
+        for raw in (None, '', 'n/a', '12345', '0917123456', '028123456', '+63 2 8123 4567'):
+            self.assertIsNone(normalize_phone_number(raw), raw)
+
+    def test_foreign_numbers_keep_their_country_code(self):
+        self.assertEqual(normalize_phone_number('+1 (415) 555-0100'), '+14155550100')
+
+    def test_provider_format_drops_plus(self):
+        self.assertEqual(to_provider_format('+639171234567'), '639171234567')
+
+
+def make_deliveries(count):
+    """Ledger-like rows: each number appears twice in different formats, plus one bad number."""
+    rows = []
+    for i in range(count):
+        rows.append(SimpleNamespace(delivery_id=2 * i + 1, address=f'0917{i:07d}'))
+        rows.append(SimpleNamespace(delivery_id=2 * i + 2, address=f'+63 917 {i:07d}'))
+    rows.append(SimpleNamespace(delivery_id=9999, address='not a number'))
+    return rows
+
+
+@patch.object(sms_service, 'snapshot_recipients')
+@patch.object(sms_service, 'mark_invalid')
+@patch.object(sms_service, 'record_batch_result')
+class SmsBulkSendTest(SimpleTestCase):
+    def setUp(self):
+        sms_service._iprog_rate_limiter = None
+
+    def send(self, server, deliveries, **overrides):
+        iprog = dict(
+            settings.IPROG_SMS, API_URL_BULK=server.url, API_TOKEN='test-token',
+            BULK_CHUNK_SIZE=100, MAX_CONCURRENCY=4, RATE_LIMIT_PER_SECOND=1000, MAX_RETRIES=2,
+            CONNECT_TIMEOUT=1, READ_TIMEOUT=2,
+        )
+        iprog.update(overrides)
+        with self.settings(IPROG_SMS=iprog), \
+                patch.object(sms_service, 'get_outstanding_deliveries', return_value=deliveries), \
+                patch('apps.core.services.batch_sender.random.uniform', return_value=0):
+            service = SmsService()
+            return service, service.send_bulk_announcement(1, 'General assembly on Friday')
+
+    def test_numbers_are_deduped_chunked_and_sent_concurrently(self, mock_record, mock_invalid, mock_snapshot):
+        with FakeIprogServer(latency=0.05) as server:
+            service, (success, message) = self.send(server, make_deliveries(250))
+
+        self.assertTrue(success, message)
+        self.assertEqual(sorted(len(c) for c in server.chunks), [50, 100, 100])
+        sent = [n for c in server.chunks for n in c]
+        self.assertEqual(len(sent), len(set(sent)))
+        self.assertTrue(all(n.startswith('639') and len(n) == 12 for n in sent))
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 4)
+
+        mock_invalid.assert_called_once_with([9999], 'Invalid mobile number')
+        # Both ledger rows of a duplicated number are marked with the chunk outcome
+        recorded = sorted(i for call in mock_record.call_args_list for i in call.args[0])
+        self.assertEqual(recorded, list(range(1, 501)))
+        self.assertEqual([r['chunk'] for r in service.chunk_results], [1, 2, 3])
+        self.assertTrue(all(r['success'] and r['provider_message_id'] for r in service.chunk_results))
+
+    def test_failed_chunk_is_retried(self, mock_record, mock_invalid, mock_snapshot):
+        with FakeIprogServer(fail_first=1, fail_status=503) as server:
+            service, (success, message) = self.send(server, make_deliveries(10))
+
+        self.assertTrue(success, message)
+        self.assertEqual(server.calls, 2)
+        self.assertEqual(service.chunk_results[0]['attempts'], 2)
+
+    def test_slow_provider_times_out_instead_of_hanging(self, mock_record, mock_invalid, mock_snapshot):
+        started = time.perf_counter()
+        with FakeIprogServer(latency=1.0) as server:
+            service, (success, message) = self.send(server, make_deliveries(5), READ_TIMEOUT=0.2, MAX_RETRIES=1)
+        elapsed = time.perf_counter() - started
+
+        self.assertFalse(success)
+        self.assertIn('Chunk 1 (5 numbers)', message)
+        self.assertEqual(service.chunk_results[0]['attempts'], 2)
+        self.assertLess(elapsed, 3)
+        self.assertFalse(mock_record.call_args.args[2])
+
+    def test_error_body_marks_chunk_failed(self, mock_record, mock_invalid, mock_snapshot):
+        with FakeIprogServer(body_status=500) as server:
+            service, (success, message) = self.send(server, make_deliveries(3))
+
+        self.assertFalse(success)
+        self.assertFalse(service.chunk_results[0]['success'])
+        self.assertEqual(server.calls, 1)
+
+    def test_nothing_outstanding_reports_earlier_outcome(self, mock_record, mock_invalid, mock_snapshot):
+        summaries = ({'total': 3, 'sent': 0, 'invalid': 3}, {'total': 3, 'sent': 2, 'invalid': 1})
+        for summary, expected in zip(summaries, (False, True)):
+            with self.subTest(summary=summary), \
+                    patch.object(sms_service, 'get_outstanding_deliveries', return_value=[]), \
+                    patch.object(sms_service, 'get_delivery_summary', return_value=summary):
+                success, message = SmsService().send_bulk_announcement(1, 'General assembly on Friday')
+            self.assertEqual(success, expected, message)
@@ -0,0 +1,100 @@
+import subprocess
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.core.services import ocr_breaker, tesseract_ocr
+from apps.core.services.ocr_service import UnifiedOCRService
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tesseract-tests'}}
+
+LOCAL_OK = {'success': True, 'text': 'Total Assets', 'language': 'eng', 'provider': 'tesseract', 'error': None}
+LOCAL_EMPTY = {'success': True, 'text': '  \n', 'language': 'eng', 'provider': 'tesseract', 'error': None}
+REMOTE_OK = {'success': True, 'text': 'Total Assets', 'language': 'eng', 'provider': 'optiic', 'error': None}
+REMOTE_FAIL = {'success': False, 'error': 'Optiic API error: 500'}
+
+
+@patch.object(tesseract_ocr.shutil, 'which', return_value='/usr/bin/tesseract')
+class TesseractEngineTest(SimpleTestCase):
+    def test_stdout_becomes_the_text(self, mock_which):
+        completed = subprocess.CompletedProcess([], 0, stdout=b'Net Surplus\n', stderr=b'')
+        with patch.object(tesseract_ocr.subprocess, 'run', return_value=completed) as mock_run:
+            result = tesseract_ocr.TesseractEngine(lang='eng+fil').recognize(b'png')
+        self.assertEqual((result['success'], result['text'], result['provider']), (True, 'Net Surplus\n', 'tesseract'))
+        command = mock_run.call_args.args[0]
+        self.assertEqual(command[:3], ['/usr/bin/tesseract', 'stdin', 'stdout'])
+        self.assertIn('eng+fil', command)
+        self.assertEqual(mock_run.call_args.kwargs['input'], b'png')
+        self.assertEqual(mock_run.call_args.kwargs['env']['OMP_THREAD_LIMIT'], '1')
+
+    def test_errors_and_timeouts_are_failed_results(self, mock_which):
+        engine = tesseract_ocr.TesseractEngine(timeout=5)
+        failed = subprocess.CompletedProcess([], 1, stdout=b'', stderr=b'Warning\nError in pixReadMem\n')
+        with patch.object(tesseract_ocr.subprocess, 'run', return_value=failed):
+            self.assertEqual(engine.recognize(b'x')['error'], 'Tesseract error: Error in pixReadMem')
+        with patch.object(tesseract_ocr.subprocess, 'run', side_effect=subprocess.TimeoutExpired('tesseract', 5)):
+            self.assertEqual(engine.recognize(b'x')['error'], 'Tesseract timed out after 5s')
+
+    def test_missing_binary_is_reported_without_running(self, mock_which):
+        mock_which.return_value = None
+        with patch.object(tesseract_ocr.subprocess, 'run') as mock_run:
+            result = tesseract_ocr.TesseractEngine().recognize(b'x')
+        self.assertFalse(result['success'])
+        mock_run.assert_not_called()
+
+    @override_settings(OCR_TESSERACT_MODE='sometimes')
+    def test_unknown_mode_is_off(self, mock_which):
+        self.assertEqual(tesseract_ocr.get_tesseract_mode(), tesseract_ocr.MODE_OFF)
+
+
+@override_settings(CACHES=LOCMEM, OCR_HEDGING_ENABLED=False)
+class TesseractModeRoutingTest(SimpleTestCase):
+    def setUp(self):
+        ocr_breaker.cache.clear()
+        self.service = UnifiedOCRService()
+        self.service.tesseract = MagicMock(**{'available.return_value': True, 'recognize.return_value': LOCAL_OK})
+
+    def run_ocr(self, remote=REMOTE_OK):
+        with patch.object(self.service, '_call_optiic_file', return_value=remote) as mock_optiic, \
+                patch.object(self.service, '_call_ocr_space_file', return_value=remote):
+            return self.service._process_image(b'png'), mock_optiic
+
+    @override_settings(OCR_TESSERACT_MODE='off')
+    def test_off_uses_remote_only(self):
+        result, _ = self.run_ocr()
+        self.assertEqual(result['provider'], 'optiic')
+        self.service.tesseract.recognize.assert_not_called()
+
+    @override_settings(OCR_TESSERACT_MODE='primary')
+    def test_primary_skips_remote_when_local_reads_text(self):
+        result, mock_optiic = self.run_ocr()
+        self.assertEqual(result['provider'], 'tesseract')
+        mock_optiic.assert_not_called()
+
+    @override_settings(OCR_TESSERACT_MODE='primary')
+    def test_primary_falls_through_to_remote_on_empty_text(self):
+        self.service.tesseract.recognize.return_value = LOCAL_EMPTY
+        result, _ = self.run_ocr()
+        self.assertEqual(result['provider'], 'optiic')
+
+    @override_settings(OCR_TESSERACT_MODE='primary')
+    def test_primary_without_binary_behaves_as_off(self):
+        self.service.tesseract.available.return_value = False
+        result, _ = self.run_ocr()
+        self.assertEqual(result['provider'], 'optiic')
+        self.service.tesseract.recognize.assert_not_called()
+
+    @override_settings(OCR_TESSERACT_MODE='fallback')
+    def test_fallback_runs_only_after_remote_fails(self):
+        result, _ = self.run_ocr()
+        self.assertEqual(result['provider'], 'optiic')
+        self.service.tesseract.recognize.assert_not_called()
+        result, _ = self.run_ocr(remote=REMOTE_FAIL)
+        self.assertEqual(result['provider'], 'tesseract')
+
+    @override_settings(OCR_TESSERACT_MODE='local-only')
+    def test_local_only_never_calls_remote(self):
+        self.service.tesseract.recognize.return_value = {'success': False, 'error': 'Tesseract is not installed'}
+        result, mock_optiic = self.run_ocr()
+        self.assertFalse(result['success'])
+        mock_optiic.assert_not_called()
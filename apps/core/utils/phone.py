@@ -0,0 +1,62 @@
+# apps/core/utils/phone.py
+"""
+Mobile number normalization for SMS sends.
+
+Officer numbers are typed in by hand in every shape ("0917 123 4567",
+"9171234567", "+63-917-123-4567", "639171234567"), so they are normalized to
+E.164 (+639171234567) before sending. That lets duplicates collapse to one
+message and obviously bad numbers be skipped instead of failing a whole batch.
+"""
+import re
+
+DEFAULT_COUNTRY_CODE = '63'  # Philippines
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone_number(raw, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Normalize a phone number to E.164 ('+' followed by 8-15 digits).
+
+    Local numbers are assumed to belong to `country_code`; for the Philippines
+    only mobile numbers (+63 9XX XXX XXXX) are accepted since landlines
+    cannot receive SMS.
+
+    Returns:
+        The E.164 string, or None if the number is not usable.
+    """
+    if not raw:
+        return None
+
+    raw = str(raw).strip()
+    digits = _NON_DIGITS.sub('', raw)
+    if not digits:
+        return None
+
+    if raw.startswith('+'):
+        candidate = digits
+    elif digits.startswith('00'):
+        # International dialing prefix
+        candidate = digits[2:]
+    elif digits.startswith(country_code):
+        candidate = digits
+    elif digits.startswith('0'):
+        candidate = country_code + digits[1:]
+    elif country_code == DEFAULT_COUNTRY_CODE and len(digits) == 10 and digits.startswith('9'):
+        # Mobile number typed without the leading 0
+        candidate = country_code + digits
+    else:
+        return None
+
+    if candidate.startswith(DEFAULT_COUNTRY_CODE):
+        if len(candidate) != 12 or candidate[2] != '9':
+            return None
+    elif not 8 <= len(candidate) <= 15:
+        return None
+
+    return '+' + candidate
+
+
+def to_provider_format(e164_number):
+    """IPROG expects international numbers without the leading '+' (639XXXXXXXXX)."""
+    return e164_number[1:] if e164_number.startswith('+') else e164_number
@@ -1,5 +1,9 @@
 from django.shortcuts import render
 from django.core.cache import cache
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from apps.core.services import login_throttle
 
 
 def download_view(request):
@@ -17,17 +21,15 @@ def access_denied_view(request):
     import time
     now = int(time.time())
     
-    # Check for account-based lockout in cache (works across all browsers)
+    # Check for an account or IP lockout (works across all browsers)
     locked_out_username = request.session.get('locked_out_username')
     is_locked_out = False
     lockout_until = None
     
     if locked_out_username:
-        # Normalize username to lowercase for consistent cache key lookup
-        username_normalized = locked_out_username.lower() if isinstance(locked_out_username, str) else str(locked_out_username).lower()
-        lockout_cache_key = f'login_lockout_{username_normalized}'
-        lockout_until = cache.get(lockout_cache_key)
-        is_locked_out = lockout_until and now < lockout_until
+        throttle = login_throttle.check(locked_out_username, login_throttle.client_ip(request))
+        is_locked_out = throttle.locked
+        lockout_until = throttle.until
         
         # If lockout expired, clear the session variable
         if not is_locked_out:
@@ -41,4 +43,11 @@ def access_denied_view(request):
     return render(request, 'access_denied.html', context, status=403)
 
 
+@require_http_methods(["GET"])
+def cache_stats_view(request):
+    """Hit ratios of the default cache's local and shared tiers in this process (admin only)."""
+    if request.session.get('role') != 'admin':
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
 
+    stats = cache.stats() if hasattr(cache, 'stats') else None
+    return JsonResponse({'success': True, 'cache': stats})
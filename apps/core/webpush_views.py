@@ -8,8 +8,8 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.db import transaction
-from webpush.models import PushInformation, SubscriptionInfo, Group
-from apps.users.models import User as CustomUser
+from webpush.models import SubscriptionInfo
+from apps.users.models import PushSubscription, User as CustomUser
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +31,6 @@ def save_webpush_info(request):
         
         status_type = data.get('status_type')
         subscription_data = data.get('subscription')
-        group_name = data.get('group', None)
         
         # Validate status_type
         if not status_type:
@@ -129,62 +128,14 @@ def save_webpush_info(request):
             logger.error(f"Error creating SubscriptionInfo: {e}", exc_info=True)
             return JsonResponse({'error': f'Failed to save subscription information: {str(e)}'}, status=500)
         
-        # Get or create group if provided
-        group = None
-        if group_name:
-            group, _ = Group.objects.get_or_create(name=group_name)
-        
         # Handle subscribe/unsubscribe
+        # Subscriptions are mapped straight to the custom user_id (user_push_subscriptions);
+        # no shadow django.contrib.auth User or PushInformation row is needed.
         if status_type == 'subscribe':
-            # Create PushInformation record
-            # We need to map custom user to Django's User model
-            # Since webpush expects django.contrib.auth.models.User,
-            # we'll use the user_id as a workaround by creating a temporary mapping
-            # or we can modify the approach
-            
-            # Actually, the issue is that PushInformation has a ForeignKey to User
-            # We need to either:
-            # 1. Create a Django User for each custom User (not ideal)
-            # 2. Modify webpush to work with custom User (complex)
-            # 3. Store user_id separately and handle lookups manually
-            
-            # Map custom User to Django User for webpush compatibility
-            # Webpush's PushInformation model requires django.contrib.auth.models.User
-            from django.contrib.auth.models import User as DjangoUser
-            
-            # Get or create a Django User that corresponds to our custom user
-            # We use username as the mapping key
             try:
-                django_user = None
-                try:
-                    django_user = DjangoUser.objects.get(username=custom_user.username)
-                    # Update existing Django User to match custom user's active status
-                    if django_user.is_active != getattr(custom_user, 'is_active', True):
-                        django_user.is_active = getattr(custom_user, 'is_active', True)
-                        django_user.save()
-                except DjangoUser.DoesNotExist:
-                    # Create new Django User with unusable password
-                    email = getattr(custom_user, 'email', '') or f'{custom_user.username}@kooptimizer.local'
-                    django_user = DjangoUser(
-                        username=custom_user.username,
-                        email=email,
-                        is_active=getattr(custom_user, 'is_active', True)
-                    )
-                    django_user.set_unusable_password()  # Set unusable password before saving
-                    django_user.save()
-                    logger.info(f"Created Django User mapping for {custom_user.username}")
-                    
-            except Exception as e:
-                logger.error(f"Error creating/getting Django User for {custom_user.username}: {e}", exc_info=True)
-                return JsonResponse({'error': f'Failed to set up user account for notifications: {str(e)}'}, status=500)
-            
-            # Now create PushInformation with Django User
-            # Note: PushInformation model only has: user, subscription, group fields
-            try:
-                push_info, created = PushInformation.objects.get_or_create(
-                    user=django_user,
-                    subscription=subscription_info,
-                    group=group
+                _, created = PushSubscription.objects.get_or_create(
+                    user_id=custom_user.user_id,
+                    subscription=subscription_info
                 )
                 
                 if created:
@@ -194,24 +145,17 @@ def save_webpush_info(request):
                 
                 return JsonResponse({'status': 'subscribed', 'message': 'Push notifications enabled successfully'}, status=201)
             except Exception as e:
-                logger.error(f"Error creating PushInformation for user {custom_user.username}: {e}", exc_info=True)
+                logger.error(f"Error saving push subscription for user {custom_user.username}: {e}", exc_info=True)
                 return JsonResponse({'error': 'Failed to save push notification subscription'}, status=500)
             
         elif status_type == 'unsubscribe':
-            # Delete PushInformation
-            from django.contrib.auth.models import User as DjangoUser
-            try:
-                django_user = DjangoUser.objects.get(username=custom_user.username)
-                deleted_count = PushInformation.objects.filter(
-                    user=django_user,
-                    subscription=subscription_info
-                ).delete()[0]
-                if deleted_count > 0:
-                    logger.info(f"User {custom_user.username} unsubscribed from push notifications")
-                return JsonResponse({'status': 'unsubscribed'}, status=200)
-            except DjangoUser.DoesNotExist:
-                logger.debug(f"User {custom_user.username} was not subscribed (Django User not found)")
-                return JsonResponse({'status': 'unsubscribed'}, status=200)
+            deleted_count = PushSubscription.objects.filter(
+                user_id=custom_user.user_id,
+                subscription=subscription_info
+            ).delete()[0]
+            if deleted_count > 0:
+                logger.info(f"User {custom_user.username} unsubscribed from push notifications")
+            return JsonResponse({'status': 'unsubscribed'}, status=200)
         else:
             return JsonResponse({'error': 'Invalid status_type'}, status=400)
             
@@ -12,9 +12,7 @@ from django.conf import settings
 
 from apps.account_management.models import Users, Staff as AccountStaff, Cooperatives, Officers, Admin
 from apps.cooperatives.models import ProfileData, FinancialData, Member, Staff as CoopStaff, Officer, ActivityLog
-from apps.users.models import User
-from django.contrib.auth.models import User as DjangoUser
-from webpush.models import PushInformation
+from apps.users.models import PushSubscription
 
 def login_required(view_func):
     @wraps(view_func)
@@ -1117,20 +1115,8 @@ def dashboard_check_push_subscription_api(request):
         if not user_id or not role:
             return JsonResponse({'error': 'Unauthorized'}, status=401)
         
-        # Get custom user
-        try:
-            custom_user = User.objects.get(user_id=user_id)
-        except User.DoesNotExist:
-            return JsonResponse({'has_subscription': False})
-        
-        # Check if there's a Django User mapped to this custom user
-        try:
-            django_user = DjangoUser.objects.get(username=custom_user.username)
-            # Check if user has any push subscriptions
-            has_subscription = PushInformation.objects.filter(user=django_user).exists()
-            return JsonResponse({'has_subscription': has_subscription})
-        except DjangoUser.DoesNotExist:
-            return JsonResponse({'has_subscription': False})
+        has_subscription = PushSubscription.objects.filter(user_id=user_id).exists()
+        return JsonResponse({'has_subscription': has_subscription})
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
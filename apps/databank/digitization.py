@@ -0,0 +1,401 @@
+"""
+Batch digitization of scanned cooperative records.
+
+Onboarding a cooperative means typing in years of paper profiles and
+financial statements, and the OCR modal handles one image at a time. A batch
+takes a folder or zip of scans (images or PDFs), OCRs them DIGITIZATION_CONCURRENCY
+at a time through the usual provider chain (cache, breaker, fallback and
+hedging all apply), and parses each text into ProfileData/FinancialData field
+candidates. The candidates are stored as drafts on DigitizationScan for staff
+to review; nothing is written to profile_data or financial_data here.
+
+A run claims scans as it has room for them, DIGITIZATION_CONCURRENCY at a
+time: claim_scans() marks them processing under the run's id with
+select_for_update(skip_locked=True), like the announcement delivery queue.
+Only the run holding a claim records its result, so two runs of one batch
+(the command and the endpoint, or two workers) never OCR or count a scan
+twice. Every scan is committed as soon as it finishes. Ctrl-C stops a run
+after the scans in flight; a crashed run's claims are taken over once they
+are DIGITIZATION_LEASE_SECONDS old. Either way the batch is resumed by running
+it again (`manage.py digitize_records --resume <id>` or the resume endpoint).
+Throughput is reported as OCR'd pages per minute.
+"""
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.account_management.models import Cooperatives
+from apps.core.services.ocr_service import optiic_service
+from apps.databank.models import DigitizationBatch, DigitizationScan
+
+logger = logging.getLogger(__name__)
+
+SCAN_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff', '.bmp', '.webp', '.pdf'}
+
+DATE_FORMATS = ('%B %d, %Y', '%b %d, %Y', '%B %d %Y', '%m/%d/%Y', '%m-%d-%Y', '%Y-%m-%d', '%d %B %Y')
+
+# (field, pattern) pairs; the first group is the value. Labels follow the CDA
+# profile and audited financial statement forms used by the cooperatives.
+PROFILE_PATTERNS = [
+    ('address', r'(?:business\s+)?address[\s:]+([^\n]+)'),
+    ('mobile_number', r'(?:contact|phone|mobile|tel)[^\n\d+]*(\+?[\d][\d\s\-()]{6,}\d)'),
+    ('email_address', r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})'),
+    ('cda_registration_number', r'(?:cda\s+)?reg(?:istration)?\.?\s*(?:no\.?|number)[\s:]*([A-Z0-9][A-Z0-9\-]{4,})'),
+    ('cda_registration_date', r'(?:date\s+of\s+registration|registration\s+date|date\s+registered)[\s:]*([^\n]+)'),
+    ('operation_area', r'(?:area\s+of\s+operation|operation\s+area)[\s:]+([^\n]+)'),
+    ('business_activity', r'(?:business\s+activity|type\s+of\s+business)[\s:]+([^\n]+)'),
+    ('board_of_directors_count', r'(?:board\s+of\s+directors|no\.?\s+of\s+directors)[^\n\d]*(\d{1,3})\b'),
+    ('salaried_employees_count', r'(?:salaried\s+employees|no\.?\s+of\s+employees|employees)[^\n\d]*(\d{1,5})\b'),
+]
+
+AMOUNT = r'[^\n\d\-]*?(\(?-?[\d,]+(?:\.\d{1,2})?\)?)'
+FINANCIAL_PATTERNS = [
+    ('assets', r'total\s+assets' + AMOUNT),
+    ('paid_up_capital', r'paid[\s\-]*up\s+(?:share\s+)?capital' + AMOUNT),
+    ('net_surplus', r'net\s+surplus(?:\s*\(loss\))?' + AMOUNT),
+]
+
+COOP_NAME_PATTERN = r'^([^\n]*\bcooperative\b[^\n]*)$'
+YEAR_PATTERN = r'(?:for\s+the\s+year|year\s+ended|as\s+of|report(?:ing)?\s+year|fiscal\s+year|calendar\s+year|\bcy|\bfy)[^\n]{0,30}?\b((?:19|20)\d{2})\b'
+
+
+def _parse_date(value):
+    value = re.sub(r'\s+', ' ', value).strip(' .,')
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amount(value):
+    negative = value.startswith('(') or value.startswith('-')
+    try:
+        amount = Decimal(value.strip('()-').replace(',', ''))
+    except InvalidOperation:
+        return None
+    return str(-amount if negative else amount)
+
+
+def parse_record_text(text):
+    """
+    Pull ProfileData/FinancialData field candidates out of OCR text.
+
+    Returns {'cooperative_name', 'report_year', 'profile': {...}, 'financial':
+    {...}} with only the fields that were found. Dates are ISO strings and
+    amounts decimal strings, so the result is JSON-serializable as is.
+    """
+    profile = {}
+    for field, pattern in PROFILE_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if not match:
+            continue
+        value = match.group(1).strip()
+        if field == 'cda_registration_date':
+            value = _parse_date(value)
+        elif field.endswith('_count'):
+            value = int(value)
+        elif field == 'mobile_number':
+            value = re.sub(r'[\s\-()]', '', value)
+        if value not in (None, ''):
+            profile[field] = value
+
+    financial = {}
+    for field, pattern in FINANCIAL_PATTERNS:
+        match = re.search(pattern, text, re.IGNORECASE)
+        amount = match and _parse_amount(match.group(1))
+        if amount is not None:
+            financial[field] = amount
+
+    name = re.search(COOP_NAME_PATTERN, text, re.IGNORECASE | re.MULTILINE)
+    year = re.search(YEAR_PATTERN, text, re.IGNORECASE)
+    return {
+        'cooperative_name': re.sub(r'\s+', ' ', name.group(1)).strip() if name else None,
+        'report_year': int(year.group(1)) if year else None,
+        'profile': profile,
+        'financial': financial,
+    }
+
+
+def match_cooperative(name):
+    """coop_id of the cooperative with this name (exact, then unique partial match), or None."""
+    if not name:
+        return None
+    coop_id = Cooperatives.objects.filter(cooperative_name__iexact=name).values_list('coop_id', flat=True).first()
+    if coop_id:
+        return coop_id
+    candidates = list(Cooperatives.objects.filter(cooperative_name__icontains=name).values_list('coop_id', flat=True)[:2])
+    return candidates[0] if len(candidates) == 1 else None
+
+
+class UploadTooLarge(ValueError):
+    """An upload over DIGITIZATION_MAX_UPLOAD_FILES scans or DIGITIZATION_MAX_UPLOAD_BYTES."""
+
+
+def check_upload_size(sizes):
+    """Raise UploadTooLarge if the scans of one upload, given their sizes in bytes, are over the limits."""
+    sizes = list(sizes)
+    max_files = getattr(settings, 'DIGITIZATION_MAX_UPLOAD_FILES', 2000)
+    max_bytes = getattr(settings, 'DIGITIZATION_MAX_UPLOAD_BYTES', 1024 * 1024 * 1024)
+    if len(sizes) > max_files:
+        raise UploadTooLarge(f"{len(sizes)} scans is over the limit of {max_files} per upload")
+    if sum(sizes) > max_bytes:
+        raise UploadTooLarge(f"{sum(sizes) // (1024 * 1024)} MB of scans is over the limit of "
+                             f"{max_bytes // (1024 * 1024)} MB per upload")
+
+
+def iter_scans(source, check_limits=False):
+    """
+    Yield (name, bytes) for each scan in a folder (searched recursively) or a
+    zip archive (path or file object), in name order, reading one at a time.
+    Other files and files over DIGITIZATION_MAX_FILE_BYTES are skipped. With
+    check_limits the scans are checked against the upload limits from their
+    sizes before any is read (UploadTooLarge).
+    """
+    max_bytes = getattr(settings, 'DIGITIZATION_MAX_FILE_BYTES', 25 * 1024 * 1024)
+    if not hasattr(source, 'read') and Path(source).is_dir():
+        root = Path(source)
+        paths = []
+        for path in sorted(p for p in root.rglob('*') if p.is_file() and p.suffix.lower() in SCAN_EXTENSIONS):
+            size = path.stat().st_size
+            if size > max_bytes:
+                logger.warning(f"Skipping {path}: {size} bytes is over the limit")
+                continue
+            paths.append((path, size))
+        if check_limits:
+            check_upload_size(size for _, size in paths)
+        for path, _ in paths:
+            yield path.relative_to(root).as_posix(), path.read_bytes()
+        return
+
+    with zipfile.ZipFile(source) as archive:
+        entries = []
+        for info in sorted(archive.infolist(), key=lambda info: info.filename):
+            name = PurePosixPath(info.filename)
+            if info.is_dir() or name.parts[0] == '__MACOSX' or name.suffix.lower() not in SCAN_EXTENSIONS:
+                continue
+            if info.file_size > max_bytes:
+                logger.warning(f"Skipping {info.filename}: {info.file_size} bytes is over the limit")
+                continue
+            entries.append(info)
+        if check_limits:
+            check_upload_size(info.file_size for info in entries)
+        for info in entries:
+            yield info.filename, archive.read(info)
+
+
+def create_batch(user_id, name, scans):
+    """
+    Store the scans from iter_scans() (any iterable of (name, bytes), read as
+    it goes) as a pending batch; duplicate names are skipped. A batch with no
+    scans is still created: check scans_total.
+    """
+    with transaction.atomic():
+        batch = DigitizationBatch.objects.create(user_id=user_id, name=name[:255])
+        seen = set()
+        for filename, content in scans:
+            filename = filename[-255:]
+            if filename in seen:
+                continue
+            seen.add(filename)
+            DigitizationScan.objects.create(
+                batch=batch,
+                filename=filename,
+                file=ContentFile(content, name=PurePosixPath(filename).name),
+            )
+        batch.scans_total = len(seen)
+        batch.save(update_fields=['scans_total'])
+    logger.info(f"Created digitization batch {batch.id} ({batch.scans_total} scans) for user {user_id}")
+    return batch
+
+
+def claim_scans(batch_id, run_id, limit, retry_failed_before=None):
+    """
+    Atomically claim up to `limit` scans of the batch for this run, in filename
+    order: pending ones, failed ones processed before `retry_failed_before`
+    (if given) and processing ones whose claim is older than
+    DIGITIZATION_LEASE_SECONDS (their run died). Scans locked by another run's
+    claim are skipped rather than waited on. Returns the claimed scan ids.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'DIGITIZATION_LEASE_SECONDS', 600))
+    claimable = (Q(status=DigitizationScan.STATUS_PENDING) |
+                 Q(status=DigitizationScan.STATUS_PROCESSING, locked_at__lt=stale_before))
+    if retry_failed_before:
+        claimable |= Q(status=DigitizationScan.STATUS_FAILED, processed_at__lt=retry_failed_before)
+
+    with transaction.atomic():
+        scan_ids = list(
+            DigitizationScan.objects
+            .select_for_update(skip_locked=True)
+            .filter(claimable, batch_id=batch_id)
+            .order_by('filename')
+            .values_list('id', flat=True)[:limit]
+        )
+        if scan_ids:
+            DigitizationScan.objects.filter(id__in=scan_ids).update(
+                status=DigitizationScan.STATUS_PROCESSING, locked_by=run_id, locked_at=now)
+    return scan_ids
+
+
+def process_scan(scan_id, run_id):
+    """
+    OCR one scan claimed by `run_id`, parse the draft fields and record the
+    outcome; returns the pages OCR'd. Nothing is recorded if another run has
+    taken the claim over meanwhile.
+    """
+    close_old_connections()
+    try:
+        scan = DigitizationScan.objects.get(id=scan_id)
+        try:
+            with scan.file.open('rb') as f:
+                result = optiic_service.process_bytes(f.read())
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        update = {'provider': result.get('provider') or '', 'processed_at': timezone.now(),
+                  'locked_by': '', 'locked_at': None}
+        if result.get('success'):
+            parsed = parse_record_text(result.get('text', ''))
+            update.update(
+                status=DigitizationScan.STATUS_DONE,
+                text=result.get('text', ''),
+                error='',
+                page_count=len(result.get('pages') or [None]),
+                coop_id=match_cooperative(parsed['cooperative_name']),
+                report_year=parsed['report_year'],
+                profile_fields=parsed['profile'],
+                financial_fields=parsed['financial'],
+            )
+        else:
+            update.update(status=DigitizationScan.STATUS_FAILED, error=result.get('error') or 'Unknown error')
+        recorded = DigitizationScan.objects.filter(
+            id=scan_id, status=DigitizationScan.STATUS_PROCESSING, locked_by=run_id).update(**update)
+        if not recorded:
+            logger.warning(f"Digitization scan {scan_id} was taken over by another run; result dropped")
+            return 0
+
+        counters = {'updated_at': timezone.now()}
+        if update['status'] == DigitizationScan.STATUS_DONE:
+            counters['scans_done'] = F('scans_done') + 1
+            counters['pages_processed'] = F('pages_processed') + update['page_count']
+        # A retried scan that failed before (only failed scans keep an error) is already in the failed count
+        failed_delta = (update['status'] == DigitizationScan.STATUS_FAILED) - bool(scan.error)
+        if failed_delta:
+            counters['scans_failed'] = F('scans_failed') + failed_delta
+        DigitizationBatch.objects.filter(id=scan.batch_id).update(**counters)
+        return update.get('page_count', 0)
+    finally:
+        close_old_connections()
+
+
+def pages_per_minute(pages, seconds):
+    return round(pages * 60 / seconds, 1) if seconds > 0 else 0.0
+
+
+def run_batch(batch_id, concurrency=None, retry_failed=False, progress=None):
+    """
+    Process the batch's pending scans (and failed ones with retry_failed),
+    claiming at most `concurrency` at a time. `progress(scan_id, pages)` is
+    called as each scan finishes. Returns {'scans', 'pages', 'seconds',
+    'pages_per_minute'} for this run.
+    """
+    concurrency = concurrency or getattr(settings, 'DIGITIZATION_CONCURRENCY', 4)
+    run_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    # Failed scans are retried once per run: only those that failed before it started
+    retry_failed_before = timezone.now() if retry_failed else None
+
+    DigitizationBatch.objects.filter(id=batch_id).update(status=DigitizationBatch.STATUS_RUNNING,
+                                                         updated_at=timezone.now())
+    started = time.monotonic()
+    scans = pages = 0
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='digitize') as executor:
+            # Only claimed scans are submitted, so Ctrl-C waits for at most `concurrency` of them
+            while True:
+                if len(in_flight) < concurrency:
+                    for scan_id in claim_scans(batch_id, run_id, concurrency - len(in_flight), retry_failed_before):
+                        in_flight[executor.submit(process_scan, scan_id, run_id)] = scan_id
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scan_id = in_flight.pop(future)
+                    try:
+                        scan_pages = future.result()
+                    except Exception as e:
+                        logger.error(f"Digitization scan {scan_id} crashed: {e}", exc_info=True)
+                        scan_pages = 0
+                    scans += 1
+                    pages += scan_pages
+                    if progress:
+                        progress(scan_id, scan_pages)
+    finally:
+        seconds = time.monotonic() - started
+        outstanding = set(DigitizationScan.objects.filter(
+            batch_id=batch_id,
+            status__in=[DigitizationScan.STATUS_PENDING, DigitizationScan.STATUS_PROCESSING],
+        ).values_list('status', flat=True).distinct())
+        if DigitizationScan.STATUS_PROCESSING in outstanding:
+            # Another run still holds scans of this batch
+            status = DigitizationBatch.STATUS_RUNNING
+        elif outstanding:
+            status = DigitizationBatch.STATUS_PENDING
+        else:
+            status = DigitizationBatch.STATUS_DONE
+        DigitizationBatch.objects.filter(id=batch_id).update(
+            status=status,
+            processing_seconds=F('processing_seconds') + seconds,
+            updated_at=timezone.now(),
+        )
+
+    logger.info(f"Digitization batch {batch_id}: {scans} scans, {pages} pages in {seconds:.1f}s "
+                f"({pages_per_minute(pages, seconds)} pages/min)")
+    return {'scans': scans, 'pages': pages, 'seconds': seconds,
+            'pages_per_minute': pages_per_minute(pages, seconds)}
+
+
+_running = set()
+_running_lock = threading.Lock()
+
+
+def start_batch(batch_id, retry_failed=False):
+    """
+    Run a batch in a background thread of this process once the current
+    transaction commits. Returns False if it is already running here; runs in
+    other processes are kept apart by the scan claims.
+    """
+    with _running_lock:
+        if batch_id in _running:
+            return False
+        _running.add(batch_id)
+
+    def run():
+        try:
+            run_batch(batch_id, retry_failed=retry_failed)
+        except Exception as e:
+            logger.error(f"Digitization batch {batch_id} crashed: {e}", exc_info=True)
+        finally:
+            with _running_lock:
+                _running.discard(batch_id)
+            close_old_connections()
+
+    transaction.on_commit(lambda: threading.Thread(target=run, name=f'digitize-{batch_id}', daemon=True).start())
+    return True
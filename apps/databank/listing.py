@@ -0,0 +1,178 @@
+"""
+Paginated, filterable list of submitted cooperative profiles for the databank.
+
+The databank page used to load every ProfileData row of every visible
+cooperative, including the CoC/CoTe attachment bytes, and render them all.
+profile_page() returns one page of only the columns the table shows:
+
+- Visibility: admins see the profiles of every active cooperative and staff
+  those of the active cooperatives assigned to them (visible_cooperatives()).
+- Filters: year, status (approval status), category, district, staff
+  (admins only) and q, a case-insensitive search on the cooperative name,
+  address, email and CDA registration number.
+- Sort: one of SORT_FIELDS, '-' for descending. The profile id breaks ties.
+- Keyset pagination: each page ends with an opaque cursor holding the last
+  row's sort value and id. The next page starts strictly after it, so deep
+  pages cost the same as the first one and rows added meanwhile don't shift
+  pages. The profile_data keyset indexes cover the year and submitted sorts.
+"""
+import base64
+import json
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from apps.account_management.models import Cooperatives, Staff
+from apps.cooperatives.models import ProfileData
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Sort name -> expression; report_year is nullable, so years sort with NULL as 0
+SORT_FIELDS = {
+    'report_year': Coalesce('report_year', Value(0)),
+    'created_at': F('created_at'),
+    'cooperative_name': F('coop__cooperative_name'),
+}
+DEFAULT_SORT = '-report_year'
+
+# Only what the profiles table shows
+COLUMNS = (
+    'profile_id', 'coop_id', 'report_year', 'address', 'mobile_number', 'email_address',
+    'cda_registration_number', 'cda_registration_date', 'lccdc_membership', 'lccdc_membership_date',
+    'operation_area', 'business_activity', 'board_of_directors_count', 'salaried_employees_count',
+    'approval_status', 'created_at',
+)
+
+
+class InvalidQuery(ValueError):
+    """A filter, sort or cursor the list can't use."""
+
+
+def visible_cooperatives(user_id, role):
+    """Active cooperatives whose profiles `role` may list, or an empty queryset."""
+    active = Cooperatives.objects.filter(Q(is_active__isnull=True) | Q(is_active=True))
+    if role == 'admin':
+        return active
+    if role == 'staff':
+        staff_id = Staff.objects.filter(user_id=user_id).values_list('staff_id', flat=True).first()
+        if staff_id is not None:
+            return active.filter(staff_id=staff_id)
+    return Cooperatives.objects.none()
+
+
+def _int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidQuery(f"'{name}' must be a number")
+
+
+def _filtered(coops, params, role):
+    profiles = ProfileData.objects.filter(coop__in=coops)
+    year = _int(params, 'year')
+    if year is not None:
+        profiles = profiles.filter(report_year=year)
+    if params.get('status'):
+        profiles = profiles.filter(approval_status=params['status'])
+    if params.get('category'):
+        profiles = profiles.filter(coop__category__iexact=params['category'])
+    if params.get('district'):
+        profiles = profiles.filter(coop__district__iexact=params['district'])
+    staff_id = _int(params, 'staff')
+    if staff_id is not None and role == 'admin':
+        profiles = profiles.filter(coop__staff_id=staff_id)
+    q = (params.get('q') or '').strip()
+    if q:
+        profiles = profiles.filter(
+            Q(coop__cooperative_name__icontains=q) | Q(address__icontains=q) |
+            Q(email_address__icontains=q) | Q(cda_registration_number__icontains=q)
+        )
+    return profiles
+
+
+def encode_cursor(sort_value, profile_id):
+    if hasattr(sort_value, 'isoformat'):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, profile_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_name):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_value, profile_id = json.loads(raw)
+        if not isinstance(profile_id, int):
+            raise ValueError
+        if sort_name == 'created_at':
+            sort_value = parse_datetime(sort_value)
+            if sort_value is None:
+                raise ValueError
+        elif sort_name == 'report_year' and not isinstance(sort_value, int):
+            raise ValueError
+        elif sort_name == 'cooperative_name' and not isinstance(sort_value, str):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise InvalidQuery('Invalid cursor')
+    return sort_value, profile_id
+
+
+def profile_page(coops, params, role):
+    """
+    One page of profiles of `coops` for the query parameters `params`.
+
+    Returns {'profiles': [...], 'next_cursor': str or None, 'sort': ...}; the
+    first page (no cursor) also has 'total' and the 'filters' choices. Raises
+    InvalidQuery for bad parameters.
+    """
+    sort = params.get('sort') or DEFAULT_SORT
+    descending = sort.startswith('-')
+    sort_name = sort.lstrip('-')
+    if sort_name not in SORT_FIELDS:
+        raise InvalidQuery(f"Can't sort by '{sort_name}'")
+    limit = min(max(_int(params, 'limit') or PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+    profiles = _filtered(coops, params, role).annotate(sort_value=SORT_FIELDS[sort_name])
+    cursor = params.get('cursor')
+    page = {'sort': sort}
+    if cursor:
+        after_value, after_id = decode_cursor(cursor, sort_name)
+        if descending:
+            profiles = profiles.filter(Q(sort_value__lt=after_value) |
+                                       Q(sort_value=after_value, profile_id__lt=after_id))
+        else:
+            profiles = profiles.filter(Q(sort_value__gt=after_value) |
+                                       Q(sort_value=after_value, profile_id__gt=after_id))
+    else:
+        page['total'] = profiles.count()
+        page['filters'] = filter_choices(coops)
+
+    order = ('-sort_value', '-profile_id') if descending else ('sort_value', 'profile_id')
+    rows = list(profiles.order_by(*order)
+                .values(*COLUMNS, 'sort_value', cooperative_name=F('coop__cooperative_name'))[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    page['next_cursor'] = encode_cursor(rows[-1]['sort_value'], rows[-1]['profile_id']) if has_more else None
+    for row in rows:
+        del row['sort_value']
+    page['profiles'] = rows
+    return page
+
+
+def filter_choices(coops):
+    """Years, statuses, categories and districts present among the profiles of `coops`."""
+    profiles = ProfileData.objects.filter(coop__in=coops)
+    return {
+        'years': list(profiles.exclude(report_year__isnull=True).order_by('-report_year')
+                      .values_list('report_year', flat=True).distinct()),
+        'statuses': list(profiles.order_by('approval_status').values_list('approval_status', flat=True).distinct()),
+        'categories': list(coops.exclude(category__isnull=True).exclude(category='').order_by('category')
+                           .values_list('category', flat=True).distinct()),
+        'districts': list(coops.exclude(district__isnull=True).exclude(district='').order_by('district')
+                          .values_list('district', flat=True).distinct()),
+    }
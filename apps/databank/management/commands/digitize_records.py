@@ -0,0 +1,120 @@
+"""
+Django management command to digitize a backlog of scanned cooperative records.
+
+This command will:
+1. Store every image/PDF in a folder or zip as a digitization batch
+2. OCR the scans with bounded concurrency through the usual provider chain
+3. Save ProfileData/FinancialData field candidates as drafts for review
+4. Report throughput in pages per minute
+
+Interrupted batches (Ctrl-C, crash) keep every finished scan; resume them
+with --resume.
+
+Usage:
+    python manage.py digitize_records /path/to/scans --user-id 1
+    python manage.py digitize_records backlog.zip --user-id 1 --name "Coop X 2015-2020"
+    python manage.py digitize_records --resume 12  # Continue batch 12
+    python manage.py digitize_records --resume 12 --retry-failed
+    python manage.py digitize_records scans/ --user-id 1 --concurrency 8
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.databank import digitization
+from apps.databank.models import DigitizationBatch, DigitizationScan
+
+
+class Command(BaseCommand):
+    help = 'OCR a folder or zip of scanned records into reviewable profile/financial drafts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            nargs='?',
+            help='Folder or .zip of scans (images or PDFs)',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='User the batch is recorded under (required for a new batch)',
+        )
+        parser.add_argument(
+            '--name',
+            help='Batch name (default: the folder or zip name)',
+        )
+        parser.add_argument(
+            '--resume',
+            type=int,
+            metavar='BATCH_ID',
+            help='Continue an existing batch instead of creating one',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also re-run scans that failed',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            help='Scans OCR\'d at once (default: DIGITIZATION_CONCURRENCY)',
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            try:
+                batch = DigitizationBatch.objects.get(id=options['resume'])
+            except DigitizationBatch.DoesNotExist:
+                raise CommandError(f"Batch {options['resume']} does not exist")
+            self.stdout.write(f'Resuming batch {batch.id} "{batch.name}": '
+                              f'{batch.scans_done}/{batch.scans_total} scans done')
+        else:
+            batch = self._create_batch(options)
+
+        pending = batch.scans.filter(status=DigitizationScan.STATUS_PENDING).count()
+        if options['retry_failed']:
+            pending += batch.scans.filter(status=DigitizationScan.STATUS_FAILED).count()
+        finished = 0
+
+        def progress(scan_id, pages):
+            nonlocal finished
+            finished += 1
+            self.stdout.write(f'  [{finished}/{pending}] scan {scan_id}: '
+                              f'{f"{pages} page(s)" if pages else "failed"}')
+
+        try:
+            stats = digitization.run_batch(batch.id, concurrency=options['concurrency'],
+                                           retry_failed=options['retry_failed'], progress=progress)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f'\nInterrupted. Finished scans are saved; resume with --resume {batch.id}'))
+            return
+
+        batch.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f"\nBatch {batch.id}: {stats['pages']} pages in {stats['seconds']:.1f}s "
+            f"({stats['pages_per_minute']} pages/min)"))
+        self.stdout.write(f'  Scans: {batch.scans_done} done, {batch.scans_failed} failed, '
+                          f'{batch.scans_total - batch.scans_done - batch.scans_failed} pending '
+                          f'of {batch.scans_total}')
+        if batch.scans_failed:
+            self.stdout.write(self.style.WARNING(f'  Re-run failed scans with --resume {batch.id} --retry-failed'))
+
+    def _create_batch(self, options):
+        if not options['source']:
+            raise CommandError('Give a folder or zip of scans, or --resume BATCH_ID')
+        if not options['user_id']:
+            raise CommandError('--user-id is required for a new batch')
+        source = Path(options['source'])
+        if not source.exists():
+            raise CommandError(f'{source} does not exist')
+
+        # Scans are read one at a time while the batch is stored
+        batch = digitization.create_batch(options['user_id'], options['name'] or source.name,
+                                          digitization.iter_scans(source))
+        if not batch.scans_total:
+            batch.delete()
+            raise CommandError(f'No images or PDFs found in {source}')
+        self.stdout.write(f'Created batch {batch.id} "{batch.name}" with {batch.scans_total} scans')
+        return batch
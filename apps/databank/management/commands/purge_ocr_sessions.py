@@ -0,0 +1,49 @@
+"""
+Django management command to purge expired OCR scan sessions and their images.
+
+The announcement scheduler already runs this every
+ANNOUNCEMENT_SCHEDULER['OCR_PURGE_MINUTES']; use the command for cron setups
+or to check disk usage.
+
+Usage:
+    python manage.py purge_ocr_sessions
+    python manage.py purge_ocr_sessions --dry-run  # Report without deleting
+    python manage.py purge_ocr_sessions --batch-size 500
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.databank.ocr_cleanup import purge_expired_ocr_sessions
+
+
+def _mb(size):
+    return f'{size / 1024 / 1024:.1f} MB'
+
+
+class Command(BaseCommand):
+    help = 'Delete expired OCR scan sessions and their image files, and report disk usage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be purged without deleting',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Sessions deleted per batch (default: OCR_PURGE_BATCH_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        stats = purge_expired_ocr_sessions(batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        self.stdout.write(f"temp_ocr_scans/ before: {stats['files_before']} files, {_mb(stats['bytes_before'])}")
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Would delete {stats['sessions_deleted']} expired session(s)"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['sessions_deleted']} session(s) and {stats['files_deleted']} file(s), "
+            f"freed {_mb(stats['bytes_freed'])}"))
+        self.stdout.write(f"temp_ocr_scans/ after: {stats['files_after']} files, {_mb(stats['bytes_after'])}")
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('databank', '0003_add_user_id_column'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRResultCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('perceptual_hash', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('text', models.TextField()),
+                ('provider', models.CharField(max_length=32)),
+                ('language', models.CharField(blank=True, default='', max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'databank_ocr_result_cache',
+            },
+        ),
+    ]
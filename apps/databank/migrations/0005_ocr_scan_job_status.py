@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('databank', '0004_ocr_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ocrscansession',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='ocrscansession',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrscansession',
+            name='provider',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='ocrscansession',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ocrscansession',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='done', max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='ocrscansession',
+            name='extracted_text',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
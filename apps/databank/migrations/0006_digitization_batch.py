@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('databank', '0005_ocr_scan_job_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigitizationBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField(db_index=True)),
+                ('name', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done')], default='pending', max_length=12)),
+                ('scans_total', models.PositiveIntegerField(default=0)),
+                ('scans_done', models.PositiveIntegerField(default=0)),
+                ('scans_failed', models.PositiveIntegerField(default=0)),
+                ('pages_processed', models.PositiveIntegerField(default=0)),
+                ('processing_seconds', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'databank_digitization_batch',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DigitizationScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('file', models.FileField(upload_to='digitization_batches/')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=12)),
+                ('text', models.TextField(blank=True, default='')),
+                ('provider', models.CharField(blank=True, default='', max_length=64)),
+                ('error', models.TextField(blank=True, default='')),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('coop_id', models.IntegerField(blank=True, null=True)),
+                ('report_year', models.IntegerField(blank=True, null=True)),
+                ('profile_fields', models.JSONField(blank=True, default=dict)),
+                ('financial_fields', models.JSONField(blank=True, default=dict)),
+                ('review_status', models.CharField(choices=[('pending', 'Pending review'), ('accepted', 'Accepted'), ('rejected', 'Rejected')], default='pending', max_length=12)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scans', to='databank.digitizationbatch')),
+            ],
+            options={
+                'db_table': 'databank_digitization_scan',
+                'ordering': ['filename'],
+                'unique_together': {('batch', 'filename')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('databank', '0006_digitization_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digitizationscan',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='digitizationscan',
+            name='locked_by',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='digitizationscan',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=12),
+        ),
+    ]
@@ -3,12 +3,147 @@ from django.db import models
 from django.conf import settings
 
 class OCRScanSession(models.Model):
+    """
+    A scanned image and its OCR text. Sessions submitted through the OCR job
+    API (apps/databank/ocr_jobs.py) start queued and are filled in by a worker.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
     user_id = models.IntegerField(db_index=True)  # Store user_id directly instead of ForeignKey
     image = models.ImageField(upload_to='temp_ocr_scans/', null=True, blank=True)
-    extracted_text = models.TextField()
+    extracted_text = models.TextField(blank=True, default='')
     created_at = models.DateTimeField(auto_now_add=True)
     is_consumed = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=12,
+        choices=[
+            (STATUS_QUEUED, 'Queued'),
+            (STATUS_PROCESSING, 'Processing'),
+            (STATUS_DONE, 'Done'),
+            (STATUS_FAILED, 'Failed'),
+        ],
+        default=STATUS_DONE,
+    )
+    provider = models.CharField(max_length=32, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ['created_at']
-        db_table = 'databank_ocrscansession'
\ No newline at end of file
+        db_table = 'databank_ocrscansession'
+
+class OCRResultCache(models.Model):
+    """
+    OCR text already paid for, keyed by the SHA-256 of the normalized image
+    (apps/core/services/ocr_cache.py). Rescans of the same page are answered
+    from here instead of calling Optiic/OCR.space again.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    # 64-bit difference hash (stored signed) for optional near-duplicate matching
+    perceptual_hash = models.BigIntegerField(null=True, blank=True, db_index=True)
+    text = models.TextField()
+    provider = models.CharField(max_length=32)
+    language = models.CharField(max_length=16, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+    hit_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'databank_ocr_result_cache'
+
+
+
+class DigitizationBatch(models.Model):
+    """
+    A folder or zip of scanned paper records being digitized in bulk (see
+    apps/databank/digitization.py). Counters are updated as each scan
+    finishes, so an interrupted batch can be resumed where it stopped.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+
+    user_id = models.IntegerField(db_index=True)
+    name = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=12,
+        choices=[
+            (STATUS_PENDING, 'Pending'),
+            (STATUS_RUNNING, 'Running'),
+            (STATUS_DONE, 'Done'),
+        ],
+        default=STATUS_PENDING,
+    )
+    scans_total = models.PositiveIntegerField(default=0)
+    scans_done = models.PositiveIntegerField(default=0)
+    scans_failed = models.PositiveIntegerField(default=0)
+    # OCR'd pages (a PDF scan has several) and run time, summed across resumes
+    pages_processed = models.PositiveIntegerField(default=0)
+    processing_seconds = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'databank_digitization_batch'
+
+
+class DigitizationScan(models.Model):
+    """
+    One file in a DigitizationBatch and the draft it produced: the OCR text
+    and ProfileData/FinancialData field candidates parsed from it. Drafts are
+    reviewed by staff before anything is written to the real tables.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    REVIEW_PENDING = 'pending'
+    REVIEW_ACCEPTED = 'accepted'
+    REVIEW_REJECTED = 'rejected'
+
+    batch = models.ForeignKey(DigitizationBatch, on_delete=models.CASCADE, related_name='scans')
+    filename = models.CharField(max_length=255)
+    file = models.FileField(upload_to='digitization_batches/')
+    status = models.CharField(
+        max_length=12,
+        choices=[
+            (STATUS_PENDING, 'Pending'),
+            (STATUS_PROCESSING, 'Processing'),
+            (STATUS_DONE, 'Done'),
+            (STATUS_FAILED, 'Failed'),
+        ],
+        default=STATUS_PENDING,
+    )
+    # Run holding a processing scan, and when it claimed it (see digitization.claim_scans)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    text = models.TextField(blank=True, default='')
+    provider = models.CharField(max_length=64, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    page_count = models.PositiveIntegerField(default=0)
+    # Cooperative matched by name, if any
+    coop_id = models.IntegerField(null=True, blank=True)
+    report_year = models.IntegerField(null=True, blank=True)
+    profile_fields = models.JSONField(default=dict, blank=True)
+    financial_fields = models.JSONField(default=dict, blank=True)
+    review_status = models.CharField(
+        max_length=12,
+        choices=[
+            (REVIEW_PENDING, 'Pending review'),
+            (REVIEW_ACCEPTED, 'Accepted'),
+            (REVIEW_REJECTED, 'Rejected'),
+        ],
+        default=REVIEW_PENDING,
+    )
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['filename']
+        db_table = 'databank_digitization_scan'
+        unique_together = [['batch', 'filename']]
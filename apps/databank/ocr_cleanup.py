@@ -0,0 +1,154 @@
+"""
+Purge of expired OCR scan sessions and their images.
+
+The OCR drawer only shows unconsumed sessions from the last
+OCR_SESSION_TTL_MINUTES, and deleting rows never removed their files from
+MEDIA_ROOT/temp_ocr_scans/. purge_expired_ocr_sessions() deletes, in batches
+of OCR_PURGE_BATCH_SIZE:
+
+- finished sessions nobody consumed within OCR_SESSION_TTL_MINUTES,
+- every session (consumed, or a job that never finished) older than
+  OCR_SESSION_RETENTION_HOURS,
+
+together with their images. It then removes files in temp_ocr_scans/ that no
+session references, such as images left over from the old delete-on-read
+cleanup. The announcement scheduler runs it every
+ANNOUNCEMENT_SCHEDULER['OCR_PURGE_MINUTES'], and `manage.py purge_ocr_sessions`
+runs it on demand. Both report disk usage before and after.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.databank.models import OCRScanSession
+
+logger = logging.getLogger(__name__)
+
+SCAN_DIR = 'temp_ocr_scans'
+
+
+def get_session_ttl_minutes():
+    return getattr(settings, 'OCR_SESSION_TTL_MINUTES', 5)
+
+
+def _storage():
+    return OCRScanSession._meta.get_field('image').storage
+
+
+def expired_sessions(now=None):
+    """Sessions due for deletion."""
+    now = now or timezone.now()
+    retention = timedelta(hours=getattr(settings, 'OCR_SESSION_RETENTION_HOURS', 24))
+    return OCRScanSession.objects.filter(
+        Q(is_consumed=False,
+          status__in=[OCRScanSession.STATUS_DONE, OCRScanSession.STATUS_FAILED],
+          created_at__lt=now - timedelta(minutes=get_session_ttl_minutes())) |
+        Q(created_at__lt=now - retention)
+    )
+
+
+def disk_usage():
+    """(files, bytes) currently in temp_ocr_scans/."""
+    storage = _storage()
+    try:
+        _, files = storage.listdir(SCAN_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return 0, 0
+    total = 0
+    for name in files:
+        try:
+            total += storage.size(f'{SCAN_DIR}/{name}')
+        except OSError:
+            continue
+    return len(files), total
+
+
+def _delete_file(storage, name):
+    """Delete a stored file; returns the bytes freed (0 if it was already gone)."""
+    try:
+        size = storage.size(name)
+        storage.delete(name)
+        return size
+    except (FileNotFoundError, OSError):
+        return 0
+
+
+def purge_orphaned_files(min_age=None, batch_size=None):
+    """
+    Delete files in temp_ocr_scans/ that no session references and that are
+    older than `min_age` (so an upload being saved right now is left alone).
+    Returns (files deleted, bytes freed).
+    """
+    storage = _storage()
+    batch_size = batch_size or getattr(settings, 'OCR_PURGE_BATCH_SIZE', 200)
+    min_age = min_age or timedelta(hours=1)
+    try:
+        _, files = storage.listdir(SCAN_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return 0, 0
+
+    cutoff = timezone.now() - min_age
+    deleted = freed = 0
+    for start in range(0, len(files), batch_size):
+        names = [f'{SCAN_DIR}/{name}' for name in files[start:start + batch_size]]
+        referenced = set(OCRScanSession.objects.filter(image__in=names).values_list('image', flat=True))
+        for name in names:
+            if name in referenced:
+                continue
+            try:
+                if storage.get_modified_time(name) > cutoff:
+                    continue
+            except (FileNotFoundError, OSError, NotImplementedError):
+                continue
+            freed += _delete_file(storage, name)
+            deleted += 1
+    return deleted, freed
+
+
+def purge_expired_ocr_sessions(batch_size=None, dry_run=False):
+    """
+    Delete expired sessions and their images in batches, then orphaned files.
+
+    Returns a dict with sessions_deleted, files_deleted, bytes_freed and the
+    disk usage of temp_ocr_scans/ before and after (files_before/bytes_before,
+    files_after/bytes_after). With dry_run only the counts are reported.
+    """
+    batch_size = batch_size or getattr(settings, 'OCR_PURGE_BATCH_SIZE', 200)
+    storage = _storage()
+    files_before, bytes_before = disk_usage()
+    stats = {'sessions_deleted': 0, 'files_deleted': 0, 'bytes_freed': 0,
+             'files_before': files_before, 'bytes_before': bytes_before}
+
+    if dry_run:
+        stats['sessions_deleted'] = expired_sessions().count()
+        stats['files_after'], stats['bytes_after'] = files_before, bytes_before
+        return stats
+
+    now = timezone.now()
+    while True:
+        batch = list(expired_sessions(now).order_by('id').values_list('id', 'image')[:batch_size])
+        if not batch:
+            break
+        # Rows go first: a file whose delete fails is picked up as an orphan next time
+        OCRScanSession.objects.filter(id__in=[session_id for session_id, _ in batch]).delete()
+        stats['sessions_deleted'] += len(batch)
+        for _, name in batch:
+            if name:
+                stats['bytes_freed'] += _delete_file(storage, name)
+                stats['files_deleted'] += 1
+
+    orphans, orphan_bytes = purge_orphaned_files(batch_size=batch_size)
+    stats['files_deleted'] += orphans
+    stats['bytes_freed'] += orphan_bytes
+    stats['files_after'], stats['bytes_after'] = disk_usage()
+
+    if stats['sessions_deleted'] or stats['files_deleted']:
+        logger.info(
+            f"Purged {stats['sessions_deleted']} OCR session(s) and {stats['files_deleted']} file(s), "
+            f"freed {stats['bytes_freed'] / 1024 / 1024:.1f} MB; temp_ocr_scans/ now holds "
+            f"{stats['files_after']} file(s), {stats['bytes_after'] / 1024 / 1024:.1f} MB"
+        )
+    return stats
@@ -0,0 +1,150 @@
+"""
+Asynchronous OCR jobs.
+
+process_ocr holds a request worker for as long as Optiic (up to 90 s) and the
+OCR.space fallback (30 s) take, so a few staff scanning at once can starve the
+site. The job API stores the upload as a queued OCRScanSession and returns its
+id at once. A bounded in-process pool (OCR_JOB_WORKERS threads) runs the OCR
+and fills in the session, and the browser polls the job status endpoint.
+
+Jobs are claimed with a conditional UPDATE, so a job is processed once even if
+several processes pick it up. A job can be left queued: the pool was full
+(OCR_JOB_QUEUE_SIZE), or the process restarted before running it. It is
+resubmitted when its status is polled after OCR_JOB_REQUEUE_SECONDS. A job
+stuck processing past OCR_JOB_LEASE_SECONDS (its worker died) is resubmitted
+the same way.
+
+Results arrive by polling rather than server-sent events. An SSE stream would
+hold a WSGI worker for the whole scan, which is what this module avoids.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.services.ocr_service import optiic_service
+from apps.databank.models import OCRScanSession
+
+logger = logging.getLogger(__name__)
+
+
+class OCRJobPool:
+    """
+    ThreadPoolExecutor that refuses work beyond `queue_size` pending jobs
+    instead of queueing without bound, and holds each job id at most once.
+    """
+
+    def __init__(self, workers=None, queue_size=None, run_fn=None):
+        self.workers = workers or getattr(settings, 'OCR_JOB_WORKERS', 2)
+        self.queue_size = queue_size or getattr(settings, 'OCR_JOB_QUEUE_SIZE', 20)
+        self.run_fn = run_fn or run_job
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ocr-job')
+        self.pending = set()
+        self._lock = threading.Lock()
+
+    def submit(self, job_id):
+        """Schedule a job; returns False (job stays queued) if it is already pending or the pool is full."""
+        with self._lock:
+            if job_id in self.pending:
+                return False
+            if len(self.pending) >= self.workers + self.queue_size:
+                logger.warning(f"OCR job pool full; job {job_id} stays queued until polled")
+                return False
+            self.pending.add(job_id)
+        self.executor.submit(self._run, job_id)
+        return True
+
+    def _run(self, job_id):
+        try:
+            self.run_fn(job_id)
+        except Exception as e:
+            logger.error(f"OCR job {job_id} crashed: {e}", exc_info=True)
+        finally:
+            with self._lock:
+                self.pending.discard(job_id)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_job_pool():
+    """Get or create the process-wide OCR job pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OCRJobPool()
+        return _pool
+
+
+def submit_ocr_job(user_id, content, filename='ocr_scan.jpg'):
+    """
+    Store an upload (bytes, or an uploaded File streamed to storage as is) as
+    a queued OCRScanSession and schedule it once the transaction commits.
+    Returns the session (its id is the job id).
+    """
+    image = content if isinstance(content, File) else ContentFile(content, name=filename)
+    session = OCRScanSession.objects.create(
+        user_id=user_id,
+        image=image,
+        status=OCRScanSession.STATUS_QUEUED,
+    )
+    transaction.on_commit(lambda: get_ocr_job_pool().submit(session.id))
+    logger.info(f"Queued OCR job {session.id} for user {user_id} ({image.size} bytes)")
+    return session
+
+
+def claim_job(job_id):
+    """Mark a queued (or abandoned) job as processing; returns False if someone else has it."""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'OCR_JOB_LEASE_SECONDS', 300))
+    return OCRScanSession.objects.filter(
+        Q(status=OCRScanSession.STATUS_QUEUED) |
+        Q(status=OCRScanSession.STATUS_PROCESSING, started_at__lt=stale_before),
+        id=job_id,
+    ).update(status=OCRScanSession.STATUS_PROCESSING, started_at=now) == 1
+
+
+def run_job(job_id):
+    """Claim a job, OCR its stored image and record the outcome on the session."""
+    close_old_connections()
+    try:
+        if not claim_job(job_id):
+            return
+        session = OCRScanSession.objects.get(id=job_id)
+        try:
+            with session.image.open('rb') as image:
+                result = optiic_service.process_bytes(image.read())
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        OCRScanSession.objects.filter(id=job_id).update(
+            status=OCRScanSession.STATUS_DONE if result.get('success') else OCRScanSession.STATUS_FAILED,
+            extracted_text=result.get('text', '') if result.get('success') else '',
+            provider=result.get('provider') or '',
+            error='' if result.get('success') else (result.get('error') or 'Unknown error'),
+            finished_at=timezone.now(),
+        )
+        logger.info(f"OCR job {job_id} finished: success={result.get('success')} provider={result.get('provider')}")
+    finally:
+        close_old_connections()
+
+
+def resume_if_stale(session):
+    """Resubmit a job left queued or abandoned mid-run; returns True if it was resubmitted."""
+    now = timezone.now()
+    if session.status == OCRScanSession.STATUS_QUEUED:
+        waited = now - session.created_at
+        stale = waited > timedelta(seconds=getattr(settings, 'OCR_JOB_REQUEUE_SECONDS', 30))
+    elif session.status == OCRScanSession.STATUS_PROCESSING:
+        stale = session.started_at and now - session.started_at > timedelta(
+            seconds=getattr(settings, 'OCR_JOB_LEASE_SECONDS', 300))
+    else:
+        stale = False
+    return bool(stale) and get_ocr_job_pool().submit(session.id)
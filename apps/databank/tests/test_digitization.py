@@ -0,0 +1,309 @@
+import io
+import json
+import tempfile
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.databank import digitization, views
+from apps.databank.models import DigitizationBatch, DigitizationScan
+
+PROFILE_PAGE = """REPUBLIC OF THE PHILIPPINES
+San Isidro Multi-Purpose Cooperative
+Cooperative Profile for the year 2019
+Business Address: Brgy. San Isidro, Lucena City
+Contact No.: 0917 123 4567
+Email: sanisidro.mpc@gmail.com
+CDA Registration No.: 9520-04012345
+Date of Registration: March 15, 2010
+Area of Operation: Lucena City
+Business Activity: Consumer and credit
+No. of Board of Directors: 7
+Salaried Employees: 12
+"""
+
+FINANCIAL_PAGE = """Statement of Financial Condition
+As of December 31, 2021
+Total Assets ........ P 12,345,678.90
+Paid-up Share Capital   3,200,000.00
+Net Surplus (Loss)     (45,000.50)
+"""
+
+
+class ParseRecordTextTest(SimpleTestCase):
+    def test_profile_fields(self):
+        parsed = digitization.parse_record_text(PROFILE_PAGE)
+        self.assertEqual(parsed['cooperative_name'], 'San Isidro Multi-Purpose Cooperative')
+        self.assertEqual(parsed['report_year'], 2019)
+        self.assertEqual(parsed['profile'], {
+            'address': 'Brgy. San Isidro, Lucena City',
+            'mobile_number': '09171234567',
+            'email_address': 'sanisidro.mpc@gmail.com',
+            'cda_registration_number': '9520-04012345',
+            'cda_registration_date': '2010-03-15',
+            'operation_area': 'Lucena City',
+            'business_activity': 'Consumer and credit',
+            'board_of_directors_count': 7,
+            'salaried_employees_count': 12,
+        })
+        self.assertEqual(parsed['financial'], {})
+
+    def test_financial_fields(self):
+        parsed = digitization.parse_record_text(FINANCIAL_PAGE)
+        self.assertEqual(parsed['report_year'], 2021)
+        self.assertEqual(parsed['financial'], {
+            'assets': '12345678.90',
+            'paid_up_capital': '3200000.00',
+            'net_surplus': '-45000.50',
+        })
+
+    def test_unreadable_text_yields_no_candidates(self):
+        parsed = digitization.parse_record_text('~~ smudge ~~')
+        self.assertEqual((parsed['cooperative_name'], parsed['report_year'], parsed['profile'], parsed['financial']),
+                         (None, None, {}, {}))
+
+
+class IterScansTest(SimpleTestCase):
+    def test_zip_entries_are_filtered_and_sorted(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('2020/b.jpg', b'b')
+            archive.writestr('2020/a.pdf', b'a')
+            archive.writestr('notes.txt', b'x')
+            archive.writestr('__MACOSX/2020/._a.pdf', b'x')
+        buffer.seek(0)
+        self.assertEqual(list(digitization.iter_scans(buffer)), [('2020/a.pdf', b'a'), ('2020/b.jpg', b'b')])
+
+    def test_folder_is_searched_recursively(self):
+        with tempfile.TemporaryDirectory() as root:
+            (Path(root) / 'sub').mkdir()
+            (Path(root) / 'sub' / 'page.PNG').write_bytes(b'p')
+            (Path(root) / 'readme.md').write_bytes(b'x')
+            self.assertEqual(list(digitization.iter_scans(root)), [('sub/page.PNG', b'p')])
+
+    def test_upload_limits_are_checked_before_reading(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('a.jpg', b'a' * 600)
+            archive.writestr('b.jpg', b'b' * 600)
+            archive.writestr('notes.txt', b'x' * 600)
+        buffer.seek(0)
+        scans = digitization.iter_scans(buffer, check_limits=True)
+        with self.settings(DIGITIZATION_MAX_UPLOAD_BYTES=1000), \
+                patch.object(zipfile.ZipFile, 'read') as mock_read:
+            with self.assertRaises(digitization.UploadTooLarge):
+                next(scans)
+        mock_read.assert_not_called()
+
+
+@patch.object(digitization, 'close_old_connections')
+@patch.object(digitization, 'match_cooperative', return_value=3)
+class ProcessScanTest(SimpleTestCase):
+    def run_scan(self, ocr_result, previous_error='', recorded=1):
+        scan = SimpleNamespace(batch_id=9, error=previous_error,
+                               file=MagicMock(**{'open.return_value': io.BytesIO(b'scan')}))
+        scans = MagicMock(**{'get.return_value': scan})
+        scans.filter.return_value.update.return_value = recorded
+        batches = MagicMock()
+        with patch.object(DigitizationScan, 'objects', scans), patch.object(DigitizationBatch, 'objects', batches), \
+                patch.object(digitization.optiic_service, 'process_bytes', return_value=ocr_result):
+            pages = digitization.process_scan(5, 'run-1')
+        scans.filter.assert_called_once_with(id=5, status=DigitizationScan.STATUS_PROCESSING, locked_by='run-1')
+        counters = batches.filter.return_value.update.call_args
+        return pages, scans.filter.return_value.update.call_args.kwargs, counters and counters.kwargs
+
+    def test_draft_fields_are_saved_and_counted(self, mock_match, mock_close):
+        result = {'success': True, 'text': FINANCIAL_PAGE, 'provider': 'optiic', 'pages': [{}, {}]}
+        pages, scan_update, counters = self.run_scan(result)
+        self.assertEqual(pages, 2)
+        self.assertEqual((scan_update['status'], scan_update['coop_id'], scan_update['report_year']),
+                         (DigitizationScan.STATUS_DONE, 3, 2021))
+        self.assertEqual((scan_update['locked_by'], scan_update['locked_at']), ('', None))
+        self.assertEqual(scan_update['financial_fields']['assets'], '12345678.90')
+        self.assertIn('scans_done', counters)
+        self.assertNotIn('scans_failed', counters)
+
+    def test_failure_is_recorded(self, mock_match, mock_close):
+        pages, scan_update, counters = self.run_scan({'success': False, 'error': 'Optiic API error: 500'})
+        self.assertEqual((pages, scan_update['status']), (0, DigitizationScan.STATUS_FAILED))
+        self.assertIn('scans_failed', counters)
+
+    def test_retried_scan_leaves_the_failed_count(self, mock_match, mock_close):
+        result = {'success': True, 'text': 'x', 'provider': 'optiic'}
+        _, _, counters = self.run_scan(result, previous_error='Optiic API error: 500')
+        self.assertIn('scans_failed', counters)
+        _, _, counters = self.run_scan({'success': False, 'error': 'e'}, previous_error='Optiic API error: 500')
+        self.assertNotIn('scans_failed', counters)
+
+    def test_result_of_a_lost_claim_is_not_counted(self, mock_match, mock_close):
+        pages, _, counters = self.run_scan({'success': True, 'text': 'x', 'provider': 'optiic'}, recorded=0)
+        self.assertEqual((pages, counters), (0, None))
+
+
+class RunBatchTest(SimpleTestCase):
+    def run_batch(self, scan_ids, outstanding=(), **kwargs):
+        queue = list(scan_ids)
+        limits = []
+
+        def claim(batch_id, run_id, limit, retry_failed_before):
+            limits.append(limit)
+            claimed, queue[:] = queue[:limit], queue[limit:]
+            return claimed
+
+        scans = MagicMock()
+        scans.filter.return_value.values_list.return_value.distinct.return_value = list(outstanding)
+        batches = MagicMock()
+        finished = []
+        with patch.object(DigitizationScan, 'objects', scans), patch.object(DigitizationBatch, 'objects', batches), \
+                patch.object(digitization, 'claim_scans', side_effect=claim) as claim_scans, \
+                patch.object(digitization, 'process_scan', side_effect=lambda scan_id, run_id: scan_id):
+            stats = digitization.run_batch(9, progress=lambda scan_id, pages: finished.append(scan_id), **kwargs)
+        return stats, finished, limits, claim_scans, batches.filter.return_value.update.call_args.kwargs
+
+    def test_scans_are_claimed_as_slots_free_up(self):
+        stats, finished, limits, claim_scans, batch_update = self.run_batch([1, 2, 3, 4, 5], concurrency=2)
+
+        self.assertEqual((stats['scans'], stats['pages'], sorted(finished)), (5, 15, [1, 2, 3, 4, 5]))
+        self.assertEqual(limits[0], 2)
+        self.assertTrue(all(1 <= limit <= 2 for limit in limits))
+        self.assertIsNone(claim_scans.call_args.args[3])
+        self.assertEqual(batch_update['status'], DigitizationBatch.STATUS_DONE)
+
+    def test_retry_failed_only_retries_scans_that_failed_before_the_run(self):
+        _, _, _, claim_scans, _ = self.run_batch([1], concurrency=2, retry_failed=True)
+        self.assertLessEqual(claim_scans.call_args.args[3], timezone.now())
+
+    def test_batch_stays_running_while_another_run_holds_scans(self):
+        *_, batch_update = self.run_batch([], outstanding=[DigitizationScan.STATUS_PROCESSING])
+        self.assertEqual(batch_update['status'], DigitizationBatch.STATUS_RUNNING)
+
+    def test_interrupt_waits_only_for_scans_in_flight(self):
+        submitted = []
+
+        def process(scan_id, run_id):
+            submitted.append(scan_id)
+            return 1
+
+        def progress(scan_id, pages):
+            raise KeyboardInterrupt
+
+        with patch.object(DigitizationScan, 'objects', MagicMock()), \
+                patch.object(DigitizationBatch, 'objects', MagicMock()), \
+                patch.object(digitization, 'claim_scans', side_effect=lambda b, r, limit, before: list(range(limit))), \
+                patch.object(digitization, 'process_scan', side_effect=process), \
+                self.assertRaises(KeyboardInterrupt):
+            digitization.run_batch(9, concurrency=3, progress=progress)
+        self.assertEqual(len(submitted), 3)
+
+    def test_pages_per_minute(self):
+        self.assertEqual(digitization.pages_per_minute(30, 90), 20.0)
+        self.assertEqual(digitization.pages_per_minute(5, 0), 0.0)
+
+
+class DigitizationViewTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def request(self, method, path, role='staff', **kwargs):
+        request = getattr(self.factory, method)(path, **kwargs)
+        request.session = {'user_id': 1, 'role': role}
+        return request
+
+    @patch.object(digitization, 'start_batch')
+    @patch.object(digitization, 'create_batch')
+    def test_zip_upload_starts_a_batch(self, mock_create, mock_start):
+        mock_create.return_value = DigitizationBatch(id=4, name='backlog.zip', scans_total=1, created_at=timezone.now())
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('scan.jpg', b'jpg')
+        upload = SimpleUploadedFile('backlog.zip', buffer.getvalue(), content_type='application/zip')
+        response = views.submit_digitization_batch(self.request('post', '/api/digitization/batches/',
+                                                                data={'archive': upload}))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.content)['batch_id'], 4)
+        user_id, name, scans = mock_create.call_args.args
+        self.assertEqual((user_id, name, list(scans)), (1, 'backlog.zip', [('scan.jpg', b'jpg')]))
+        mock_start.assert_called_once_with(4)
+
+    @patch.object(digitization, 'start_batch')
+    @patch.object(digitization, 'create_batch')
+    def test_upload_without_scans_is_rejected(self, mock_create, mock_start):
+        mock_create.return_value = batch = MagicMock(scans_total=0)
+        upload = SimpleUploadedFile('notes.txt', b'x')
+        response = views.submit_digitization_batch(self.request('post', '/api/digitization/batches/',
+                                                                data={'files': [upload]}))
+        self.assertEqual(response.status_code, 400)
+        batch.delete.assert_called_once_with()
+        mock_start.assert_not_called()
+
+    @patch.object(digitization, 'create_batch')
+    def test_upload_over_the_limits_is_rejected(self, mock_create):
+        uploads = [SimpleUploadedFile(f'{n}.jpg', b'jpg') for n in 'ab']
+        with self.settings(DIGITIZATION_MAX_UPLOAD_FILES=1):
+            response = views.submit_digitization_batch(self.request('post', '/api/digitization/batches/',
+                                                                    data={'files': uploads}))
+        self.assertEqual(response.status_code, 413)
+        mock_create.assert_not_called()
+
+    @patch.object(digitization, 'create_batch', side_effect=lambda user_id, name, scans: list(scans))
+    def test_invalid_zip_is_rejected(self, mock_create):
+        upload = SimpleUploadedFile('backlog.zip', b'not a zip')
+        response = views.submit_digitization_batch(self.request('post', '/api/digitization/batches/',
+                                                                data={'archive': upload}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_officers_cannot_start_batches(self):
+        response = views.submit_digitization_batch(self.request('post', '/api/digitization/batches/', role='officer'))
+        self.assertEqual(response.status_code, 403)
+
+
+class ClaimScansTest(TestCase):
+    """Runs against the database: claims must keep two runs of one batch apart."""
+
+    def setUp(self):
+        self.batch = DigitizationBatch.objects.create(user_id=1, name='backlog', scans_total=3)
+        self.scans = [DigitizationScan.objects.create(batch=self.batch, filename=f'{n}.jpg',
+                                                      file=f'digitization_batches/{n}.jpg') for n in 'abc']
+
+    def test_runs_claim_disjoint_scans_and_take_over_stale_claims(self):
+        first = digitization.claim_scans(self.batch.id, 'run-1', 2)
+        second = digitization.claim_scans(self.batch.id, 'run-2', 2)
+
+        self.assertEqual(first, [self.scans[0].id, self.scans[1].id])
+        self.assertEqual(second, [self.scans[2].id])
+        self.assertEqual(digitization.claim_scans(self.batch.id, 'run-3', 2), [])
+
+        DigitizationScan.objects.filter(id=first[0]).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(digitization.claim_scans(self.batch.id, 'run-3', 2), [first[0]])
+
+    @patch.object(digitization, 'close_old_connections')
+    @patch.object(digitization.optiic_service, 'process_bytes', return_value={'success': False, 'error': 'e'})
+    def test_only_the_claim_holder_records_a_result(self, mock_ocr, mock_close):
+        scan_id = digitization.claim_scans(self.batch.id, 'run-1', 1)[0]
+        DigitizationScan.objects.filter(id=scan_id).update(locked_by='run-2')
+
+        digitization.process_scan(scan_id, 'run-1')
+        self.batch.refresh_from_db()
+        self.assertEqual((self.batch.scans_done, self.batch.scans_failed), (0, 0))
+
+        digitization.process_scan(scan_id, 'run-2')
+        self.batch.refresh_from_db()
+        self.assertEqual(self.batch.scans_failed, 1)
+        self.assertEqual(DigitizationScan.objects.get(id=scan_id).status, DigitizationScan.STATUS_FAILED)
+
+    def test_failed_scans_are_retried_once_per_run(self):
+        DigitizationScan.objects.filter(id=self.scans[0].id).update(
+            status=DigitizationScan.STATUS_FAILED, error='e', processed_at=timezone.now() - timedelta(minutes=5))
+        DigitizationScan.objects.filter(id=self.scans[1].id).update(
+            status=DigitizationScan.STATUS_FAILED, error='e', processed_at=timezone.now() + timedelta(minutes=5))
+        DigitizationScan.objects.filter(id=self.scans[2].id).update(status=DigitizationScan.STATUS_DONE)
+
+        self.assertEqual(digitization.claim_scans(self.batch.id, 'run-1', 5), [])
+        self.assertEqual(digitization.claim_scans(self.batch.id, 'run-1', 5, retry_failed_before=timezone.now()),
+                         [self.scans[0].id])
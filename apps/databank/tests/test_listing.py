@@ -0,0 +1,108 @@
+import json
+from datetime import datetime, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.db.models.query import QuerySet
+from django.test import RequestFactory, SimpleTestCase
+
+from apps.account_management.models import Cooperatives
+from apps.databank import listing, views
+
+
+def row(profile_id, year, name='Coop'):
+    return {'profile_id': profile_id, 'coop_id': 1, 'report_year': year, 'sort_value': year or 0,
+            'cooperative_name': name, 'approval_status': 'pending'}
+
+
+class ProfilePageTest(SimpleTestCase):
+    def setUp(self):
+        self.queries = []
+        self.rows = []
+
+        def fetch_all(queryset):
+            if queryset._result_cache is None:
+                self.queries.append(str(queryset.query))
+                queryset._result_cache = list(self.rows)
+
+        for target, kwargs in ((QuerySet, {'attribute': '_fetch_all', 'autospec': True, 'side_effect': fetch_all}),
+                               (QuerySet, {'attribute': 'count', 'return_value': 120}),
+                               (listing, {'attribute': 'filter_choices', 'return_value': {'years': [2024]}})):
+            patcher = patch.object(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.coops = Cooperatives.objects.all()
+
+    def test_first_page_has_total_filters_and_cursor(self):
+        self.rows = [row(10, 2024), row(9, 2024), row(8, 2023)]
+
+        page = listing.profile_page(self.coops, {'limit': '2'}, 'admin')
+
+        self.assertEqual([p['profile_id'] for p in page['profiles']], [10, 9])
+        self.assertNotIn('sort_value', page['profiles'][0])
+        self.assertEqual((page['total'], page['filters']), (120, {'years': [2024]}))
+        self.assertEqual(listing.decode_cursor(page['next_cursor'], 'report_year'), (2024, 9))
+
+    def test_page_selects_only_table_columns(self):
+        listing.profile_page(self.coops, {}, 'admin')
+
+        sql = self.queries[-1]
+        self.assertNotIn('attachment', sql)
+        self.assertIn('"cooperative_name"', sql)
+        self.assertIn('LIMIT 51', sql)
+
+    def test_next_page_starts_after_cursor(self):
+        self.rows = [row(7, 2023)]
+        cursor = listing.encode_cursor(2024, 9)
+
+        page = listing.profile_page(self.coops, {'cursor': cursor, 'year': '2023', 'status': 'approved',
+                                                 'district': 'North', 'staff': '4'}, 'admin')
+
+        sql = self.queries[-1]
+        self.assertIn('COALESCE("profile_data"."report_year", 0) < 2024', sql)
+        self.assertIn('"profile_data"."profile_id" < 9', sql)
+        self.assertIn('"profile_data"."report_year" = 2023', sql)
+        self.assertIn('"cooperatives"."staff_id" = 4', sql)
+        self.assertNotIn('total', page)
+        self.assertIsNone(page['next_cursor'])
+
+    def test_ascending_sort_and_staff_filter_ignored_for_staff(self):
+        cursor = listing.encode_cursor(datetime(2024, 1, 2, tzinfo=dt_timezone.utc), 5)
+
+        listing.profile_page(self.coops, {'sort': 'created_at', 'cursor': cursor, 'staff': '4'}, 'staff')
+
+        sql = self.queries[-1]
+        self.assertIn('"profile_data"."created_at" > 2024-01-02', sql)
+        self.assertNotIn('"cooperatives"."staff_id" = 4', sql)
+        self.assertTrue(sql.rstrip().endswith('ASC LIMIT 51'))
+
+    def test_invalid_parameters(self):
+        for params in ({'sort': 'password'}, {'year': 'last'}, {'cursor': 'garbage'},
+                       {'sort': 'created_at', 'cursor': listing.encode_cursor(2024, 1)}):
+            with self.subTest(params=params), self.assertRaises(listing.InvalidQuery):
+                listing.profile_page(self.coops, params, 'admin')
+
+
+class ProfileDataViewTest(SimpleTestCase):
+    def get(self, role='staff', **params):
+        request = RequestFactory().get('/databank/api/profile-data/', params)
+        request.session = {'user_id': 3, 'role': role}
+        return views.get_profile_data(request)
+
+    @patch.object(listing, 'visible_cooperatives')
+    @patch.object(listing, 'profile_page', return_value={'profiles': [], 'next_cursor': None, 'sort': '-report_year'})
+    def test_returns_page_for_visible_cooperatives(self, profile_page, visible_cooperatives):
+        response = self.get(year='2024')
+
+        visible_cooperatives.assert_called_once_with(3, 'staff')
+        self.assertEqual(profile_page.call_args.args[1]['year'], '2024')
+        self.assertEqual(json.loads(response.content)['success'], True)
+
+    def test_officers_are_denied(self):
+        self.assertEqual(self.get(role='officer').status_code, 403)
+
+    @patch.object(listing, 'visible_cooperatives')
+    def test_bad_query_is_400(self, visible_cooperatives):
+        response = self.get(sort='password')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['success'], False)
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.databank import ocr_cleanup, views
+from apps.databank.models import OCRScanSession
+
+
+class PurgeTest(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media_root = tmp.name
+        os.makedirs(os.path.join(self.media_root, 'temp_ocr_scans'))
+        override = override_settings(MEDIA_ROOT=self.media_root, OCR_PURGE_BATCH_SIZE=2)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_scan(self, name, size=1000, age=0):
+        path = os.path.join(self.media_root, 'temp_ocr_scans', name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        if age:
+            os.utime(path, (time.time() - age, time.time() - age))
+        return f'temp_ocr_scans/{name}'
+
+    def test_expired_sessions_and_their_files_are_deleted_in_batches(self):
+        expired = [(1, self.write_scan('a.jpg')), (2, self.write_scan('b.jpg')), (3, '')]
+        kept = self.write_scan('c.jpg')
+        objects = MagicMock()
+        objects.filter.return_value.order_by.return_value.values_list.return_value.__getitem__.side_effect = [
+            expired[:2], expired[2:], []]
+        objects.filter.return_value.values_list.return_value = [kept]
+
+        with patch.object(OCRScanSession, 'objects', objects):
+            stats = ocr_cleanup.purge_expired_ocr_sessions()
+
+        self.assertEqual((stats['sessions_deleted'], stats['files_deleted'], stats['bytes_freed']), (3, 2, 2000))
+        self.assertEqual((stats['files_before'], stats['bytes_before']), (3, 3000))
+        self.assertEqual((stats['files_after'], stats['bytes_after']), (1, 1000))
+        objects.filter.assert_any_call(id__in=[1, 2])
+        self.assertEqual(objects.filter.return_value.delete.call_count, 2)
+
+    def test_only_old_unreferenced_files_are_orphans(self):
+        referenced = self.write_scan('in_use.jpg', age=7200)
+        self.write_scan('orphan.jpg', age=7200)
+        self.write_scan('just_uploaded.jpg')
+        objects = MagicMock()
+        objects.filter.return_value.values_list.return_value = [referenced]
+
+        with patch.object(OCRScanSession, 'objects', objects):
+            deleted, freed = ocr_cleanup.purge_orphaned_files()
+
+        self.assertEqual((deleted, freed), (1, 1000))
+        self.assertEqual(sorted(os.listdir(os.path.join(self.media_root, 'temp_ocr_scans'))),
+                         ['in_use.jpg', 'just_uploaded.jpg'])
+
+    def test_dry_run_deletes_nothing(self):
+        self.write_scan('a.jpg')
+        objects = MagicMock(**{'filter.return_value.count.return_value': 4})
+        with patch.object(OCRScanSession, 'objects', objects):
+            stats = ocr_cleanup.purge_expired_ocr_sessions(dry_run=True)
+        self.assertEqual((stats['sessions_deleted'], stats['files_after']), (4, 1))
+        objects.filter.return_value.delete.assert_not_called()
+
+
+class OCRUploadTest(SimpleTestCase):
+    @patch.object(views.optiic_service, 'process_bytes')
+    @patch.object(OCRScanSession, 'objects')
+    def test_stored_file_is_what_gets_ocrd(self, mock_objects, mock_ocr):
+        stored = MagicMock()
+        stored.open.return_value.__enter__.return_value.read.return_value = b'stored-bytes'
+        stored.url = '/media/temp_ocr_scans/scan.jpg'
+        mock_objects.create.return_value = MagicMock(id=5, image=stored)
+        mock_ocr.return_value = {'success': True, 'text': 'Total Assets', 'provider': 'optiic'}
+
+        request = RequestFactory().post('/api/ocr/process/', data={'base64': 'aGVsbG8='})
+        request.session = {'user_id': 1}
+        with patch.object(views, '_ocr_upload', wraps=views._ocr_upload) as mock_upload:
+            response = views.process_ocr(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_upload.call_args.args[1].read(), b'hello')
+        self.assertIs(mock_objects.create.call_args.kwargs['image'], mock_upload.call_args.args[1])
+        mock_ocr.assert_called_once_with(b'stored-bytes')
+        update = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual((update['status'], update['extracted_text']), (OCRScanSession.STATUS_DONE, 'Total Assets'))
@@ -0,0 +1,126 @@
+import io
+import json
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import RequestFactory, SimpleTestCase
+from django.utils import timezone
+
+from apps.databank import ocr_jobs, views
+from apps.databank.models import OCRScanSession
+
+
+def make_session(status=OCRScanSession.STATUS_QUEUED, age=0, started_age=None, **fields):
+    now = timezone.now()
+    session = OCRScanSession(id=7, user_id=1, status=status, created_at=now - timedelta(seconds=age), **fields)
+    if started_age is not None:
+        session.started_at = now - timedelta(seconds=started_age)
+    return session
+
+
+class OCRJobPoolTest(SimpleTestCase):
+    def test_pool_is_bounded_and_holds_each_job_once(self):
+        release = threading.Event()
+        ran = []
+        pool = ocr_jobs.OCRJobPool(workers=1, queue_size=1, run_fn=lambda job_id: release.wait(5) and ran.append(job_id))
+        self.addCleanup(release.set)
+
+        self.assertTrue(pool.submit(1))
+        self.assertFalse(pool.submit(1))
+        self.assertTrue(pool.submit(2))
+        self.assertFalse(pool.submit(3))
+
+        release.set()
+        pool.executor.shutdown(wait=True)
+        self.assertEqual(sorted(ran), [1, 2])
+        self.assertEqual(pool.pending, set())
+
+
+@patch.object(ocr_jobs, 'close_old_connections')
+class RunJobTest(SimpleTestCase):
+    def run_with(self, ocr_result, claimed=True):
+        session = SimpleNamespace(image=MagicMock(**{'open.return_value': io.BytesIO(b'png-bytes')}))
+        objects = MagicMock(**{'get.return_value': session})
+        with patch.object(ocr_jobs, 'claim_job', return_value=claimed), \
+                patch.object(OCRScanSession, 'objects', objects), \
+                patch.object(ocr_jobs.optiic_service, 'process_bytes', return_value=ocr_result) as mock_ocr:
+            ocr_jobs.run_job(7)
+        return objects, mock_ocr
+
+    def test_successful_job_is_marked_done_with_text(self, mock_close):
+        objects, mock_ocr = self.run_with({'success': True, 'text': 'Total Assets', 'provider': 'optiic'})
+        mock_ocr.assert_called_once_with(b'png-bytes')
+        update = objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual((update['status'], update['extracted_text'], update['provider'], update['error']),
+                         (OCRScanSession.STATUS_DONE, 'Total Assets', 'optiic', ''))
+
+    def test_failed_ocr_is_recorded(self, mock_close):
+        objects, _ = self.run_with({'success': False, 'error': 'Optiic API error: 500'})
+        update = objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual((update['status'], update['error']), (OCRScanSession.STATUS_FAILED, 'Optiic API error: 500'))
+
+    def test_job_claimed_elsewhere_is_skipped(self, mock_close):
+        objects, mock_ocr = self.run_with({'success': True, 'text': ''}, claimed=False)
+        mock_ocr.assert_not_called()
+        objects.get.assert_not_called()
+
+
+@patch.object(ocr_jobs, 'get_ocr_job_pool')
+class ResumeIfStaleTest(SimpleTestCase):
+    def test_fresh_jobs_are_left_alone(self, mock_pool):
+        self.assertFalse(ocr_jobs.resume_if_stale(make_session(age=5)))
+        self.assertFalse(ocr_jobs.resume_if_stale(make_session(OCRScanSession.STATUS_PROCESSING, age=60, started_age=60)))
+        self.assertFalse(ocr_jobs.resume_if_stale(make_session(OCRScanSession.STATUS_DONE, age=3600)))
+        mock_pool.return_value.submit.assert_not_called()
+
+    def test_orphaned_and_abandoned_jobs_are_resubmitted(self, mock_pool):
+        ocr_jobs.resume_if_stale(make_session(age=120))
+        ocr_jobs.resume_if_stale(make_session(OCRScanSession.STATUS_PROCESSING, age=900, started_age=600))
+        self.assertEqual(mock_pool.return_value.submit.call_count, 2)
+
+
+class OCRJobViewTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def request(self, method, path, user_id=1, **kwargs):
+        request = getattr(self.factory, method)(path, **kwargs)
+        request.session = {'user_id': user_id} if user_id else {}
+        return request
+
+    @patch.object(ocr_jobs, 'submit_ocr_job')
+    def test_submit_returns_job_id_immediately(self, mock_submit):
+        mock_submit.return_value = make_session()
+        body = json.dumps({'base64': 'data:image/png;base64,aGVsbG8='})
+        response = views.submit_ocr_job(self.request('post', '/api/ocr/jobs/', data=body,
+                                                     content_type='application/json'))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.content)['job_id'], 7)
+        mock_submit.assert_called_once_with(1, b'hello', 'ocr_scan.jpg')
+
+    def test_submit_without_image_is_rejected(self):
+        response = views.submit_ocr_job(self.request('post', '/api/ocr/jobs/', data={}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_submit_requires_login(self):
+        response = views.submit_ocr_job(self.request('post', '/api/ocr/jobs/', user_id=None, data={}))
+        self.assertEqual(response.status_code, 401)
+
+    @patch.object(ocr_jobs, 'resume_if_stale')
+    @patch.object(OCRScanSession, 'objects')
+    def test_status_reports_text_when_done(self, mock_objects, mock_resume):
+        mock_objects.get.return_value = make_session(OCRScanSession.STATUS_DONE, extracted_text='Net Surplus',
+                                                     provider='optiic', finished_at=timezone.now())
+        response = views.get_ocr_job(self.request('get', '/api/ocr/jobs/7/'), 7)
+        data = json.loads(response.content)
+        self.assertEqual((data['status'], data['text'], data['provider']), ('done', 'Net Surplus', 'optiic'))
+        mock_objects.get.assert_called_once_with(id=7, user_id=1)
+        self.assertEqual(response['Cache-Control'], 'no-store')
+
+    @patch.object(OCRScanSession, 'objects')
+    def test_other_users_jobs_are_not_found(self, mock_objects):
+        mock_objects.get.side_effect = OCRScanSession.DoesNotExist
+        response = views.get_ocr_job(self.request('get', '/api/ocr/jobs/7/', user_id=2), 7)
+        self.assertEqual(response.status_code, 404)
@@ -6,8 +6,14 @@ app_name = 'databank'
 urlpatterns = [
     path('databank/', views.databank_management_view, name='databank_management'),
     path('api/ocr/process/', views.process_ocr, name='process_ocr'),
+    path('api/ocr/jobs/', views.submit_ocr_job, name='submit_ocr_job'),
+    path('api/ocr/jobs/<int:job_id>/', views.get_ocr_job, name='get_ocr_job'),
+    path('api/ocr/stats/', views.get_ocr_provider_stats, name='get_ocr_provider_stats'),
     path('api/ocr/sessions/', views.get_ocr_sessions, name='get_ocr_sessions'),
     path('api/ocr/sessions/<int:session_id>/consume/', views.mark_ocr_session_consumed, name='mark_ocr_session_consumed'),
+    path('api/digitization/batches/', views.submit_digitization_batch, name='submit_digitization_batch'),
+    path('api/digitization/batches/<int:batch_id>/', views.get_digitization_batch, name='get_digitization_batch'),
+    path('api/digitization/batches/<int:batch_id>/resume/', views.resume_digitization_batch, name='resume_digitization_batch'),
     
     # Cooperative CRUD endpoints
     path('api/cooperative/add/', views.add_cooperative, name='add_cooperative'),
@@ -17,11 +17,15 @@ from functools import wraps
 import json
 import base64
 import io
+import os
+import zipfile
 from apps.core.services.ocr_service import optiic_service
+from apps.core.services import ocr_breaker, ocr_cache
 from apps.users.models import User
 from apps.account_management.models import Staff, Cooperatives, Users
 from apps.cooperatives.models import ProfileData, FinancialData, Officer, Member
-from apps.databank.models import OCRScanSession
+from apps.databank.models import OCRScanSession, DigitizationBatch
+from apps.databank import digitization, listing, ocr_cleanup, ocr_jobs
 from django.contrib.auth.hashers import check_password
 
 # Helper decorator for session-based authentication
@@ -83,7 +87,7 @@ def databank_management_view(request):
                 # Admin sees all cooperatives with staff info
                 if coop_filter == 'active':
                     cursor.execute("""
-                        SELECT c.*, s.fullname as staff_name, s.staff_id
+                        SELECT c.coop_id, c.cooperative_name, c.category, c.district, c.is_active, s.fullname as staff_name, s.staff_id
                         FROM cooperatives c
                         LEFT JOIN staff s ON c.staff_id = s.staff_id
                         WHERE c.is_active IS NULL OR c.is_active = TRUE
@@ -91,7 +95,7 @@ def databank_management_view(request):
                     """)
                 elif coop_filter == 'deactivated':
                     cursor.execute("""
-                        SELECT c.*, s.fullname as staff_name, s.staff_id
+                        SELECT c.coop_id, c.cooperative_name, c.category, c.district, c.is_active, s.fullname as staff_name, s.staff_id
                         FROM cooperatives c
                         LEFT JOIN staff s ON c.staff_id = s.staff_id
                         WHERE c.is_active = FALSE
@@ -99,7 +103,7 @@ def databank_management_view(request):
                     """)
                 else:  # 'all'
                     cursor.execute("""
-                        SELECT c.*, s.fullname as staff_name, s.staff_id
+                        SELECT c.coop_id, c.cooperative_name, c.category, c.district, c.is_active, s.fullname as staff_name, s.staff_id
                         FROM cooperatives c
                         LEFT JOIN staff s ON c.staff_id = s.staff_id
                         ORDER BY c.cooperative_name
@@ -109,7 +113,7 @@ def databank_management_view(request):
                 try:
                     staff = Staff.objects.get(user_id=user.user_id)
                     cursor.execute("""
-                        SELECT c.*, s.fullname as staff_name, s.staff_id
+                        SELECT c.coop_id, c.cooperative_name, c.category, c.district, c.is_active, s.fullname as staff_name, s.staff_id
                         FROM cooperatives c
                         LEFT JOIN staff s ON c.staff_id = s.staff_id
                         WHERE c.staff_id = %s AND (c.is_active IS NULL OR c.is_active = TRUE)
@@ -139,49 +143,27 @@ def databank_management_view(request):
         if user_role == 'admin':
             staff_list = list(Staff.objects.all().values('staff_id', 'fullname', 'user_id'))
         
-        # Get profile data for bottom table
-        # Admin sees all profiles, staff sees only profiles for their cooperatives
-        profiles = []
-        coop_ids = [c.get('coop_id') for c in cooperatives if c.get('coop_id')]
-        
-        if coop_ids:
-            try:
-                profile_queryset = ProfileData.objects.filter(coop_id__in=coop_ids).select_related('coop').order_by('-report_year', '-created_at')
-                for profile in profile_queryset:
-                    profiles.append({
-                        'profile_id': profile.profile_id,
-                        'coop_id': profile.coop_id,
-                        'cooperative_name': profile.coop.cooperative_name if profile.coop else 'N/A',
-                        'report_year': profile.report_year,
-                        'address': profile.address,
-                        'mobile_number': profile.mobile_number,
-                        'email_address': profile.email_address,
-                        'cda_registration_number': profile.cda_registration_number,
-                        'cda_registration_date': profile.cda_registration_date,
-                        'lccdc_membership': profile.lccdc_membership,
-                        'lccdc_membership_date': profile.lccdc_membership_date,
-                        'operation_area': profile.operation_area,
-                        'business_activity': profile.business_activity,
-                        'board_of_directors_count': profile.board_of_directors_count,
-                        'salaried_employees_count': profile.salaried_employees_count,
-                        'approval_status': profile.approval_status,
-                        'created_at': profile.created_at,
-                        'updated_at': profile.updated_at,
-                    })
-            except Exception as e:
-                print(f"Error loading profiles: {e}")
-                import traceback
-                traceback.print_exc()
+        # First page of the profiles table; the rest is fetched from get_profile_data as the user
+        # scrolls, filters or sorts
+        try:
+            profile_page = listing.profile_page(listing.visible_cooperatives(user.user_id, user_role), {}, user_role)
+        except Exception as e:
+            print(f"Error loading profiles: {e}")
+            import traceback
+            traceback.print_exc()
+            profile_page = {'profiles': [], 'total': 0, 'next_cursor': None, 'filters': {}}
 
         context = {
             'cooperatives': cooperatives,
             'deactivated_cooperatives': deactivated_cooperatives,
-            'profiles': profiles,
+            'profiles': profile_page['profiles'],
+            'profile_next_cursor': profile_page['next_cursor'],
+            'profile_filters': profile_page['filters'],
             'staff_list': staff_list,
             'user_role': user_role,
             'total_count': len(cooperatives),
             'deactivated_count': len(deactivated_cooperatives),
-            'profile_count': len(profiles),
+            'profile_count': profile_page['total'],
             'current_filter': coop_filter
         }
         return render(request, 'databank/databank_management.html', context)
@@ -248,95 +230,32 @@ def process_ocr(request):
                     # Skip reading body in this case
                     pass
         
-        # Convert base64 to file if needed (before OCR processing)
-        image_file_for_save = None
-        if not image_file and base64_data:
-            try:
-                # Remove data URL prefix if present
-                clean_base64 = base64_data.split(',', 1)[1] if ',' in base64_data else base64_data
-                
-                # Decode base64
-                image_data = base64.b64decode(clean_base64)
-                
-                # Create file objects for both OCR processing and saving
-                image_file = ContentFile(image_data, name='ocr_scan.jpg')
-                image_file_for_save = ContentFile(image_data, name='ocr_scan.jpg')  # Create a copy for saving
-            except Exception as e:
-                print(f"Error converting base64 to file: {e}")
-        
-        # Store original image file for saving (before OCR processing consumes it)
-        if image_file and not image_file_for_save:
-            # If it's a ContentFile, create a copy
-            if isinstance(image_file, ContentFile):
-                # Read the content and create a new ContentFile for saving
-                image_file.seek(0)
-                image_data = image_file.read()
-                image_file_for_save = ContentFile(image_data, name='ocr_scan.jpg')
-                image_file.seek(0)  # Reset for OCR processing
-            else:
-                # For uploaded files, read and create a copy
-                image_file.seek(0)
-                image_data = image_file.read()
-                image_file_for_save = ContentFile(image_data, name=image_file.name if hasattr(image_file, 'name') else 'ocr_scan.jpg')
-                image_file.seek(0)  # Reset for OCR processing
-        
-        # Process OCR if not already processed
         if result is None:
-            if image_file:
-                # Reset file pointer for OCR processing
-                if hasattr(image_file, 'seek'):
-                    image_file.seek(0)
-                result = optiic_service.process_image_file(image_file)
-            elif base64_data:
-                result = optiic_service.process_base64_image(base64_data)
-                # Ensure we have image_file_for_save from base64
-                if not image_file_for_save and base64_data:
-                    try:
-                        clean_base64 = base64_data.split(',', 1)[1] if ',' in base64_data else base64_data
-                        image_data = base64.b64decode(clean_base64)
-                        image_file_for_save = ContentFile(image_data, name='ocr_scan.jpg')
-                    except Exception as e:
-                        print(f"Error creating file from base64 for saving: {e}")
-            else:
-                return JsonResponse({'success': False, 'error': 'No image data provided'}, status=400)
-        
-        # Save to database (save image even if OCR fails)
-        try:
-            extracted_text = result.get('text', '') if result.get('success') else ''
-            
-            # Debug log
-            print(f"Creating OCR session for user_id: {user_id}, has image: {bool(image_file_for_save)}")
-            
-            # Save the session with the preserved image file (use user_id directly)
-            ocr_session = OCRScanSession.objects.create(
-                user_id=user_id,
-                image=image_file_for_save if image_file_for_save else None,
-                extracted_text=extracted_text,
-                is_consumed=False
-            )
-            
-            # Generate the image URL
-            image_url = None
-            if ocr_session.image:
+            # Decode base64 once; uploads are used as-is
+            if not image_file and base64_data:
                 try:
-                    image_url = ocr_session.image.url
-                except Exception as url_error:
-                    print(f"Error getting image URL: {url_error}")
-                    # Try to construct URL manually
-                    if hasattr(ocr_session.image, 'name'):
-                        from django.conf import settings
-                        image_url = f"{settings.MEDIA_URL}{ocr_session.image.name}"
-            
-            result['session_id'] = ocr_session.id
-            result['image_url'] = image_url
-            
-            print(f"✅ Successfully saved OCR session {ocr_session.id} with image: {bool(ocr_session.image)}, image_url: {image_url}")
-        except Exception as db_error:
-            import traceback
-            print(f"❌ Error saving OCR session: {db_error}")
-            print(traceback.format_exc())
-            # Continue even if save fails
-        
+                    clean_base64 = base64_data.split(',', 1)[1] if ',' in base64_data else base64_data
+                    image_file = ContentFile(base64.b64decode(clean_base64), name='ocr_scan.jpg')
+                except (ValueError, TypeError) as e:
+                    print(f"Error decoding base64 image: {e}")
+                    return JsonResponse({'success': False, 'error': 'Invalid base64 image data'}, status=400)
+            if not image_file:
+                return JsonResponse({'success': False, 'error': 'No image data provided'}, status=400)
+            result = _ocr_upload(user_id, image_file)
+        else:
+            # URL scans have no image to keep; save the text for the OCR drawer
+            try:
+                ocr_session = OCRScanSession.objects.create(
+                    user_id=user_id,
+                    extracted_text=result.get('text', '') if result.get('success') else '',
+                    provider=result.get('provider') or '',
+                    is_consumed=False
+                )
+                result['session_id'] = ocr_session.id
+                result['image_url'] = None
+            except Exception as db_error:
+                print(f"❌ Error saving OCR session: {db_error}")
+
         return JsonResponse(result)
     except Exception as e:
         import traceback
@@ -344,9 +263,244 @@ def process_ocr(request):
         print(traceback.format_exc())
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+def _ocr_upload(user_id, image_file):
+    """
+    Stream an upload into storage as an OCRScanSession, then OCR the stored
+    file. The upload is copied once (to storage) and read once (for OCR),
+    instead of being duplicated in memory for saving and for each provider.
+    If the session can't be saved, the upload is OCR'd directly.
+    """
+    ocr_session = None
+    try:
+        ocr_session = OCRScanSession.objects.create(
+            user_id=user_id,
+            image=image_file,
+            status=OCRScanSession.STATUS_PROCESSING,
+            started_at=timezone.now(),
+            is_consumed=False
+        )
+    except Exception as db_error:
+        import traceback
+        print(f"❌ Error saving OCR session: {db_error}")
+        print(traceback.format_exc())
+
+    source = ocr_session.image if ocr_session else image_file
+    with source.open('rb') as f:
+        result = optiic_service.process_bytes(f.read())
+    if ocr_session is None:
+        return result
+
+    # Saved as done even if OCR failed, so the image stays in the OCR drawer
+    OCRScanSession.objects.filter(id=ocr_session.id).update(
+        status=OCRScanSession.STATUS_DONE,
+        extracted_text=result.get('text', '') if result.get('success') else '',
+        provider=result.get('provider') or '',
+        error='' if result.get('success') else (result.get('error') or ''),
+        finished_at=timezone.now(),
+    )
+    result['session_id'] = ocr_session.id
+    result['image_url'] = _ocr_session_image_url(ocr_session)
+    print(f"✅ Saved OCR session {ocr_session.id} ({ocr_session.image.name})")
+    return result
+
+
+def _ocr_session_image_url(session):
+    if not session.image:
+        return None
+    try:
+        return session.image.url
+    except Exception:
+        from django.conf import settings
+        return f"{settings.MEDIA_URL}{session.image.name}"
+
+
+def _ocr_job_payload(session):
+    return {
+        'job_id': session.id,
+        'session_id': session.id,
+        'status': session.status,
+        'text': session.extracted_text if session.status == OCRScanSession.STATUS_DONE else '',
+        'provider': session.provider or None,
+        'error': session.error or None,
+        'image_url': _ocr_session_image_url(session),
+        'created_at': session.created_at.isoformat(),
+        'finished_at': session.finished_at.isoformat() if session.finished_at else None,
+    }
+
+
+@require_http_methods(["POST"])
+def submit_ocr_job(request):
+    """
+    Queue an image (multipart 'image', or 'base64' as form field or JSON) for
+    OCR and return its job id immediately (202). Poll get_ocr_job for the result.
+    """
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'User not authenticated'}, status=401)
+
+    filename = 'ocr_scan.jpg'
+    if 'image' in request.FILES:
+        # Streamed to storage as is, without reading it into memory here
+        content = request.FILES['image']
+        filename = content.name or filename
+    else:
+        base64_data = request.POST.get('base64')
+        if base64_data is None and 'application/json' in request.META.get('CONTENT_TYPE', ''):
+            try:
+                base64_data = json.loads(request.body).get('base64')
+            except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                base64_data = None
+        if not base64_data:
+            return JsonResponse({'success': False, 'error': 'No image data provided'}, status=400)
+        try:
+            content = base64.b64decode(base64_data.split(',', 1)[1] if ',' in base64_data else base64_data)
+        except (ValueError, TypeError):
+            return JsonResponse({'success': False, 'error': 'Invalid base64 image data'}, status=400)
+
+    if not len(content):
+        return JsonResponse({'success': False, 'error': 'No image data provided'}, status=400)
+
+    session = ocr_jobs.submit_ocr_job(user_id, content, filename)
+    return JsonResponse({'success': True, **_ocr_job_payload(session)}, status=202)
+
+
+@require_http_methods(["GET"])
+def get_ocr_job(request, job_id):
+    """Status of an OCR job; once 'done' it carries the extracted text."""
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'User not authenticated'}, status=401)
+
+    try:
+        session = OCRScanSession.objects.get(id=job_id, user_id=user_id)
+    except OCRScanSession.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+
+    ocr_jobs.resume_if_stale(session)
+    response = JsonResponse({'success': True, **_ocr_job_payload(session)})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_http_methods(["GET"])
+def get_ocr_provider_stats(request):
+    """Shared OCR breaker state, provider latency histograms and result-cache savings (admin/staff)."""
+    if request.session.get('role') not in ['admin', 'staff']:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    return JsonResponse({
+        'success': True,
+        'providers': ocr_breaker.get_provider_stats(),
+        # False when the breaker lives in local memory and each process trips its own
+        'breaker_shared': not ocr_breaker.is_process_local(),
+        'cache': ocr_cache.get_ocr_cache_stats(),
+    })
+
+
+def _digitization_batch_payload(batch, include_scans=False):
+    payload = {
+        'batch_id': batch.id,
+        'name': batch.name,
+        'status': batch.status,
+        'scans_total': batch.scans_total,
+        'scans_done': batch.scans_done,
+        'scans_failed': batch.scans_failed,
+        'pages_processed': batch.pages_processed,
+        'pages_per_minute': digitization.pages_per_minute(batch.pages_processed, batch.processing_seconds),
+        'created_at': batch.created_at.isoformat(),
+    }
+    if include_scans:
+        payload['scans'] = [{
+            'scan_id': scan.id,
+            'filename': scan.filename,
+            'status': scan.status,
+            'provider': scan.provider or None,
+            'error': scan.error or None,
+            'pages': scan.page_count,
+            'coop_id': scan.coop_id,
+            'report_year': scan.report_year,
+            'profile_fields': scan.profile_fields,
+            'financial_fields': scan.financial_fields,
+            'review_status': scan.review_status,
+        } for scan in batch.scans.defer('text')]
+    return payload
+
+
+@require_http_methods(["POST"])
+def submit_digitization_batch(request):
+    """
+    Start digitizing a backlog of scans (admin/staff): a zip as 'archive' or
+    several 'files'. Returns the batch id immediately (202); poll
+    get_digitization_batch for progress and the draft fields.
+    """
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'User not authenticated'}, status=401)
+    if request.session.get('role') not in ['admin', 'staff']:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    # Scans are read one at a time while the batch is stored, never all at once
+    try:
+        if 'archive' in request.FILES:
+            archive = request.FILES['archive']
+            scans = digitization.iter_scans(archive, check_limits=True)
+            name = request.POST.get('name') or archive.name
+        else:
+            uploads = [upload for upload in request.FILES.getlist('files')
+                       if os.path.splitext(upload.name)[1].lower() in digitization.SCAN_EXTENSIONS]
+            digitization.check_upload_size(upload.size for upload in uploads)
+            scans = ((upload.name, upload.read()) for upload in uploads)
+            name = request.POST.get('name') or f"Upload {timezone.localtime():%Y-%m-%d %H:%M}"
+        batch = digitization.create_batch(user_id, name, scans)
+    except zipfile.BadZipFile:
+        return JsonResponse({'success': False, 'error': 'Archive is not a valid zip file'}, status=400)
+    except digitization.UploadTooLarge as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=413)
+
+    if not batch.scans_total:
+        batch.delete()
+        return JsonResponse({'success': False, 'error': 'No scans (images or PDFs) found'}, status=400)
+
+    digitization.start_batch(batch.id)
+    return JsonResponse({'success': True, **_digitization_batch_payload(batch)}, status=202)
+
+
+@require_http_methods(["GET"])
+def get_digitization_batch(request, batch_id):
+    """Progress, throughput and per-scan draft fields of a digitization batch."""
+    if request.session.get('role') not in ['admin', 'staff']:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        batch = DigitizationBatch.objects.get(id=batch_id)
+    except DigitizationBatch.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Batch not found'}, status=404)
+
+    response = JsonResponse({'success': True, **_digitization_batch_payload(batch, include_scans=True)})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_http_methods(["POST"])
+def resume_digitization_batch(request, batch_id):
+    """Continue an interrupted batch; 'retry_failed' also re-runs scans that failed."""
+    if request.session.get('role') not in ['admin', 'staff']:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
+    try:
+        batch = DigitizationBatch.objects.get(id=batch_id)
+    except DigitizationBatch.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Batch not found'}, status=404)
+
+    retry_failed = request.POST.get('retry_failed') in ('1', 'true', 'on')
+    if not digitization.start_batch(batch.id, retry_failed=retry_failed):
+        return JsonResponse({'success': False, 'error': 'Batch is already running'}, status=409)
+    return JsonResponse({'success': True, **_digitization_batch_payload(batch)}, status=202)
+
+
 @require_http_methods(["GET"])
 def get_ocr_sessions(request):
-    """Fetch OCR sessions for the logged-in user and auto-delete old ones"""
+    """Fetch the logged-in user's unconsumed OCR sessions from the last few minutes"""
     try:
         user_id = request.session.get('user_id')
         if not user_id:
@@ -355,21 +509,13 @@ def get_ocr_sessions(request):
         
         print(f"✅ Getting OCR sessions for user_id: {user_id}")
         
-        # Auto-delete unconsumed sessions older than 5 minutes
-        five_minutes_ago = timezone.now() - timedelta(minutes=5)
-        deleted_count = OCRScanSession.objects.filter(
-            user_id=user_id,
-            created_at__lt=five_minutes_ago,
-            is_consumed=False  # Only delete unconsumed sessions
-        ).delete()[0]
-        
-        if deleted_count > 0:
-            print(f"🗑️ Auto-deleted {deleted_count} unconsumed OCR session(s) older than 5 minutes for user {user_id}")
-        
-        # Get recent OCR sessions (not consumed, ordered by newest first)
+        # Get recent OCR sessions (not consumed, ordered by newest first). Older
+        # ones are hidden here and deleted, with their images, by ocr_cleanup.
         sessions = OCRScanSession.objects.filter(
             user_id=user_id,
-            is_consumed=False
+            is_consumed=False,
+            status=OCRScanSession.STATUS_DONE,
+            created_at__gte=timezone.now() - timedelta(minutes=ocr_cleanup.get_session_ttl_minutes()),
         ).order_by('-created_at')
         
         print(f"📊 Found {sessions.count()} OCR sessions for user {user_id}")
@@ -696,72 +842,29 @@ def verify_password_view(request):
 
 @require_http_methods(["GET"])
 def get_profile_data(request):
-    """Get profile data for the bottom table"""
+    """
+    One page of the profiles table (admin/staff). Query parameters: year, status,
+    category, district, staff, q, sort, limit and the cursor of the previous page.
+    """
+    user_id = request.session.get('user_id')
+    user_role = request.session.get('role')
+
+    if not user_id:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    if user_role not in ['admin', 'staff']:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+
     try:
-        user_id = request.session.get('user_id')
-        user_role = request.session.get('role')
-        
-        if not user_id:
-            return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
-        
-        # Get cooperatives based on role
-        coop_ids = []
-        if user_role == 'admin':
-            # Get all active cooperatives
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT coop_id FROM cooperatives WHERE is_active IS NULL OR is_active = TRUE")
-                coop_ids = [row[0] for row in cursor.fetchall()]
-        elif user_role == 'staff':
-            try:
-                if isinstance(user_id, str):
-                    try:
-                        user_id = int(user_id)
-                    except ValueError:
-                        pass
-                staff = Staff.objects.get(user_id=user_id)
-                with connection.cursor() as cursor:
-                    cursor.execute("""
-                        SELECT coop_id FROM cooperatives 
-                        WHERE staff_id = %s AND (is_active IS NULL OR is_active = TRUE)
-                    """, [staff.staff_id])
-                    coop_ids = [row[0] for row in cursor.fetchall()]
-            except Staff.DoesNotExist:
-                pass
-        
-        if not coop_ids:
-            return JsonResponse({'success': True, 'profiles': []})
-        
-        profiles = ProfileData.objects.filter(coop_id__in=coop_ids).select_related('coop').order_by('-report_year', '-created_at')
-        
-        profile_list = []
-        for profile in profiles:
-            profile_list.append({
-                'profile_id': profile.profile_id,
-                'coop_id': profile.coop_id,
-                'cooperative_name': profile.coop.cooperative_name if profile.coop else 'N/A',
-                'report_year': profile.report_year,
-                'address': profile.address,
-                'mobile_number': profile.mobile_number,
-                'email_address': profile.email_address,
-                'cda_registration_number': profile.cda_registration_number,
-                'cda_registration_date': profile.cda_registration_date.strftime('%Y-%m-%d') if profile.cda_registration_date else None,
-                'lccdc_membership': profile.lccdc_membership,
-                'lccdc_membership_date': profile.lccdc_membership_date.strftime('%Y-%m-%d') if profile.lccdc_membership_date else None,
-                'operation_area': profile.operation_area,
-                'business_activity': profile.business_activity,
-                'board_of_directors_count': profile.board_of_directors_count,
-                'salaried_employees_count': profile.salaried_employees_count,
-                'approval_status': profile.approval_status,
-                'created_at': profile.created_at.strftime('%Y-%m-%d %H:%M:%S') if profile.created_at else None,
-                'updated_at': profile.updated_at.strftime('%Y-%m-%d %H:%M:%S') if profile.updated_at else None,
-            })
-        
-        return JsonResponse({'success': True, 'profiles': profile_list})
+        page = listing.profile_page(listing.visible_cooperatives(user_id, user_role), request.GET, user_role)
+    except listing.InvalidQuery as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
+    return JsonResponse({'success': True, **page})
+
 @require_http_methods(["GET"])
 def get_profile_details(request, profile_id):
     """Get full profile details for modal display"""
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_event'),
+        ('webpush', '0005_auto_20230614_1529'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PushSubscription',
+            fields=[
+                ('push_subscription_id', models.AutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_subscriptions', to='webpush.subscriptioninfo')),
+                ('user', models.ForeignKey(db_column='user_id', on_delete=django.db.models.deletion.CASCADE, related_name='push_subscriptions', to='users.user')),
+            ],
+            options={
+                'db_table': 'user_push_subscriptions',
+                'unique_together': {('user', 'subscription')},
+            },
+        ),
+        # Carry over existing subscriptions, which were linked through an auth User
+        # with the same username as the custom user.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO user_push_subscriptions (user_id, subscription_id, created_at)
+                SELECT DISTINCT u.user_id, pi.subscription_id, NOW()
+                FROM webpush_pushinformation pi
+                JOIN auth_user au ON au.id = pi.user_id
+                JOIN users u ON u.username = au.username
+                ON CONFLICT (user_id, subscription_id) DO NOTHING;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -89,6 +89,27 @@ class User(models.Model):
                 return result[0]  # Return the mobile number
                 
         return None
+
+
+class PushSubscription(models.Model):
+    """
+    A browser push subscription of a user, keyed by the custom user_id.
+    Endpoint and keys stay in django-webpush's SubscriptionInfo (deleting an
+    expired subscription removes its rows here too). This table replaces the
+    username-matched auth User + PushInformation mapping for lookups.
+    """
+    push_subscription_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_column='user_id', related_name='push_subscriptions')
+    subscription = models.ForeignKey('webpush.SubscriptionInfo', on_delete=models.CASCADE, related_name='user_subscriptions')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'user_push_subscriptions'
+        unique_together = ('user', 'subscription')
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.subscription_id}"
+
     
 class Event(models.Model):
     # We MUST keep this relationship, otherwise the calendar breaks
@@ -6,6 +6,7 @@ from psycopg2 import OperationalError, ProgrammingError, InternalError
 from django.contrib.auth.hashers import make_password
 from .models import User
 import requests
+from apps.core.services import login_throttle
 from apps.core.services.otp_service import OTPService
 import random
 import time
@@ -17,7 +18,6 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from .models import Event
-from django.core.cache import cache
 
 # Google API imports with error handling
 try:
@@ -32,27 +32,13 @@ except ImportError as e:
     build = None
 
 import os
-from django.shortcuts import render, redirect
-from django.contrib import messages
 from django.core.mail import send_mail
-from django.conf import settings
 from django.core.mail import EmailMessage
-from .models import User
-from apps.account_management.models import Admin, Staff, Officers
-from django.conf import settings
-from django.shortcuts import render, redirect
-from django.contrib import messages
-from django.db import connection
-from django.contrib.auth.hashers import make_password
-from .models import User
-import requests
-from apps.core.services.otp_service import OTPService
-import random
+from apps.account_management.models import Staff, Officers
 # Import Custom Token Generator (From the fix we made earlier)
 from .tokens import custom_token_generator as default_token_generator
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.core.mail import send_mail
 from django.urls import reverse
 
 # Import models for getting user email
@@ -151,11 +137,7 @@ def login_view(request):
         else:
             return redirect('home')
     
-    import time
     now = int(time.time())
-    
-    # For GET requests, we can't check username-specific lockout without username
-    # So we'll check it in POST and redirect from access_denied if needed
 
     if request.method == 'POST':
         username = request.POST.get('username', '').strip()
@@ -165,33 +147,13 @@ def login_view(request):
             messages.error(request, 'Username is required.')
             return render(request, 'login.html')
 
-        # --- LOGIN ATTEMPT LIMITING (Account-based, not session-based) ---
-        max_attempts = 5
-        lockout_hours = 3  # 3 hours lockout
-        
-        # Normalize username to lowercase for consistent cache keys
-        username_normalized = username.lower()
-        
-        # Check cache for account-based lockout (works across all browsers/devices)
-        lockout_cache_key = f'login_lockout_{username_normalized}'
-        attempts_cache_key = f'login_attempts_{username_normalized}'
-        
-        lockout_until = cache.get(lockout_cache_key)
-        failed_attempts = cache.get(attempts_cache_key, 0)
-        
-        # Recalculate lockout status with current time
-        now = int(time.time())
-        is_locked_out = lockout_until and now < lockout_until
-
-        if is_locked_out:
-            # Still locked out - account is locked across all browsers/devices
-            remaining_seconds = lockout_until - now
-            remaining_hours = remaining_seconds // 3600
-            remaining_minutes = (remaining_seconds % 3600) // 60
-            # Store username in session so access_denied can check cache
-            request.session['locked_out_username'] = username_normalized
-            messages.error(request, f'Too many failed login attempts. Please wait {remaining_hours}h {remaining_minutes}m before trying again.')
-            return redirect('access_denied')
+        # --- LOGIN ATTEMPT LIMITING (per account and per IP, across all browsers/devices) ---
+        username_normalized = login_throttle.normalize(username)
+        ip = login_throttle.client_ip(request)
+        throttle = login_throttle.check(username_normalized, ip)
+        if throttle.locked:
+            return _locked_out(request, username_normalized, throttle,
+                               'Too many failed login attempts. Please wait {} before trying again.')
 
         recaptcha_response = request.POST.get('g-recaptcha-response')
         if not recaptcha_response:
@@ -255,112 +217,59 @@ def login_view(request):
             messages.error(request, 'Invalid reCAPTCHA. Please try again.')
             return render(request, 'login.html')
 
+        # Counts this attempt atomically; refuses it once the username or IP is over its limit
+        throttle = login_throttle.hit(username_normalized, ip)
+        if throttle.locked:
+            return _locked_out(request, username_normalized, throttle,
+                               'Too many failed login attempts. Please wait {} before trying again.')
+
         try:
             login_result = User.login_user(username, password)
         except Exception as e:
             messages.error(request, 'Login service unavailable. Please try again later.')
             return render(request, 'login.html')
 
-        if not login_result:
-            failed_attempts += 1
-            # Store failed attempts in cache (account-based)
-            cache.set(attempts_cache_key, failed_attempts, 3600 * 24)  # Keep for 24 hours
-            
-            if failed_attempts >= max_attempts:
-                lockout_until = now + lockout_hours * 3600
-                # Store lockout in cache (account-based, works across all browsers)
-                # Use a longer timeout than lockout duration to ensure it persists
-                cache.set(lockout_cache_key, lockout_until, (lockout_hours * 3600) + 3600)  # Add 1 hour buffer
-                # Store username in session so access_denied can check cache
-                request.session['locked_out_username'] = username_normalized
-                messages.error(request, f'Too many failed login attempts. Please wait {lockout_hours} hours before trying again.')
-                return redirect('access_denied')
-            messages.error(request, f'Invalid login attempt. ({failed_attempts}/{max_attempts})')
-            return render(request, 'login.html')
-
-        status_code = login_result['status']
-        user_id = login_result['user_id']
-        role = login_result['role']
-        verification_status = login_result['verification_status']
-        is_first_login = login_result['is_first_login']
+        status_code = login_result['status'] if login_result else 'INVALID_USERNAME_OR_PASSWORD'
 
         if status_code == 'SUCCESS':
-            # CRITICAL: Check lockout status again right before allowing login
-            # This prevents bypassing lockout with correct credentials
-            # Use normalized username to check cache (must match how we stored it)
-            lockout_cache_key_check = f'login_lockout_{username_normalized}'
-            lockout_until = cache.get(lockout_cache_key_check)
-            now = int(time.time())
-            is_locked_out = lockout_until and now < lockout_until
-            
-            # Also check with the username from the login result to be safe
-            # Get username from database to ensure exact match
-            try:
-                user_obj = User.objects.get(pk=user_id)
-                username_from_db = user_obj.username.lower()  # Normalize to lowercase
-                if username_from_db != username_normalized:
-                    # Username mismatch - check lockout with DB username too
-                    lockout_cache_key_db = f'login_lockout_{username_from_db}'
-                    lockout_until_db = cache.get(lockout_cache_key_db)
-                    if lockout_until_db and now < lockout_until_db:
-                        is_locked_out = True
-                        lockout_until = lockout_until_db
-                        username_normalized = username_from_db  # Use DB username for consistency
-            except User.DoesNotExist:
-                pass
-            
-            if is_locked_out:
-                # Account is locked - block login even with correct credentials
-                remaining_seconds = lockout_until - now
-                remaining_hours = remaining_seconds // 3600
-                remaining_minutes = (remaining_seconds % 3600) // 60
-                request.session['locked_out_username'] = username_normalized
-                messages.error(request, f'Account is locked due to too many failed login attempts. Please wait {remaining_hours}h {remaining_minutes}m before trying again.')
-                return redirect('access_denied')
+            user_id = login_result['user_id']
+            role = login_result['role']
+            verification_status = login_result['verification_status']
+            is_first_login = login_result['is_first_login']
 
             try:
-                user_check = User.objects.get(pk=user_id)
-                
-                if not user_check.is_active:
-                    # User is deactivated - Block access immediately
-                    messages.error(request, 'Your account has been deactivated. Please contact the administrator.')
-                    return redirect('access_denied')
-                    
+                user = User.objects.get(pk=user_id)
             except User.DoesNotExist:
                 messages.error(request, 'Please check your credentials and try again.')
                 return render(request, 'login.html')
-            
 
-            # Reset failed attempts and lockout on successful login (clear from cache)
-            # Use normalized username to ensure we clear the correct cache entries
-            cache.delete(attempts_cache_key)
-            cache.delete(lockout_cache_key)
-            # Also clear any potential case variations
-            try:
-                user_obj = User.objects.get(pk=user_id)
-                username_from_db_normalized = user_obj.username.lower()
-                if username_from_db_normalized != username_normalized:
-                    cache.delete(f'login_attempts_{username_from_db_normalized}')
-                    cache.delete(f'login_lockout_{username_from_db_normalized}')
-            except User.DoesNotExist:
-                pass
-            request.session['failed_login_attempts'] = 0
-            request.session['login_lockout_until'] = None
-            request.session.pop('locked_out_username', None)  # Clear locked out username from session
+            # The account may be locked under its stored spelling of the username
+            username_from_db = login_throttle.normalize(user.username)
+            if username_from_db != username_normalized:
+                db_throttle = login_throttle.check(username_from_db)
+                if db_throttle.locked:
+                    return _locked_out(request, username_from_db, db_throttle,
+                                       'Account is locked due to too many failed login attempts. Please wait {} before trying again.')
+
+            if not user.is_active:
+                # User is deactivated - Block access immediately
+                messages.error(request, 'Your account has been deactivated. Please contact the administrator.')
+                return redirect('access_denied')
+
+            login_throttle.reset(username_normalized)
+            if username_from_db != username_normalized:
+                login_throttle.reset(username_from_db)
+            request.session.pop('locked_out_username', None)
+
             if is_first_login or verification_status == 'pending':
                 request.session['pending_verification_user_id'] = user_id
                 request.session['pending_verification_role'] = role
                 request.session.pop('user_id', None)
                 request.session.pop('role', None)
-                try:
-                    user = User.objects.get(pk=user_id)
-                    full_mobile_number = user.mobile_number
-                    masked_number = ""
-                    if full_mobile_number and len(full_mobile_number) > 4:
-                        masked_number = f"{full_mobile_number[:3]}********{full_mobile_number[-2:]}"
-                except User.DoesNotExist:
-                    messages.error(request, 'User account not found.')
-                    return render(request, 'login.html')
+                full_mobile_number = user.mobile_number
+                masked_number = ""
+                if full_mobile_number and len(full_mobile_number) > 4:
+                    masked_number = f"{full_mobile_number[:3]}********{full_mobile_number[-2:]}"
                 context = {
                     'show_verification_flow': True,
                     'verification_step': 'start',
@@ -369,18 +278,6 @@ def login_view(request):
                 messages.info(request, 'Please complete your account verification to continue.')
                 return render(request, 'login.html', context)
 
-            # FINAL CHECK: Verify lockout one more time before setting session
-            # This is the absolute last check before allowing login
-            final_lockout_check = cache.get(lockout_cache_key_check)
-            if final_lockout_check and now < final_lockout_check:
-                # Lockout was set between checks - block login
-                remaining_seconds = final_lockout_check - now
-                remaining_hours = remaining_seconds // 3600
-                remaining_minutes = (remaining_seconds % 3600) // 60
-                request.session['locked_out_username'] = username_normalized
-                messages.error(request, f'Account is locked due to too many failed login attempts. Please wait {remaining_hours}h {remaining_minutes}m before trying again.')
-                return redirect('access_denied')
-            
             request.session['user_id'] = user_id
             request.session['role'] = role
             request.session['last_activity'] = time.time()
@@ -400,20 +297,11 @@ def login_view(request):
                 return redirect('login')
 
         elif status_code == 'INVALID_USERNAME_OR_PASSWORD':
-            failed_attempts += 1
-            # Store failed attempts in cache (account-based)
-            cache.set(attempts_cache_key, failed_attempts, 3600 * 24)  # Keep for 24 hours
-            
-            if failed_attempts >= max_attempts:
-                lockout_until = now + lockout_hours * 3600
-                # Store lockout in cache (account-based, works across all browsers)
-                # Use a longer timeout than lockout duration to ensure it persists
-                cache.set(lockout_cache_key, lockout_until, (lockout_hours * 3600) + 3600)  # Add 1 hour buffer
-                # Store username in session so access_denied can check cache
-                request.session['locked_out_username'] = username_normalized
-                messages.error(request, f'Too many failed login attempts. Please wait {lockout_hours} hours before trying again.')
-                return redirect('access_denied')
-            messages.error(request, f'Invalid Username or Password. ({failed_attempts}/{max_attempts})')
+            throttle = login_throttle.fail(username_normalized, ip, throttle)
+            if throttle.locked:
+                return _locked_out(request, username_normalized, throttle,
+                                   'Too many failed login attempts. Please wait {} before trying again.')
+            messages.error(request, f'Invalid Username or Password. ({throttle.attempts}/{login_throttle.max_attempts()})')
         else:
             messages.error(request, 'An internal error occurred. Please contact support.')
 
@@ -421,6 +309,14 @@ def login_view(request):
     context = {'now': now}
     return render(request, 'login.html', context)
 
+
+def _locked_out(request, username_normalized, throttle, message):
+    """Send a throttled login to the access denied page, which shows the lockout countdown."""
+    # Store username in session so access_denied can look the lockout up
+    request.session['locked_out_username'] = username_normalized
+    messages.error(request, message.format(login_throttle.remaining_text(throttle.until)))
+    return redirect('access_denied')
+
 def logout_view(request):
     request.session.flush()
     
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kooptimizer.settings')
 
 application = get_asgi_application()
+
+# Every server worker runs the announcement scheduler thread; a Postgres advisory
+# lock elects one leader. Set ANNOUNCEMENT_SCHEDULER_AUTOSTART=False when running
+# `manage.py run_announcement_scheduler` as its own process instead.
+from apps.communications.scheduler import start_scheduler  # noqa: E402
+
+start_scheduler()
@@ -12,7 +12,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -110,14 +113,42 @@ DATABASES = {
     }
 }
 
-# Cache configuration for account lockout (persists across server restarts)
+# Cache configuration (OTPs, login attempts and lockouts, OCR breaker, sessions, app caches). The
+# default cache is two-tiered (apps/core/cache_backends.py): every read and write goes to the
+# 'shared' cache, and keys starting with CACHE_LOCAL_PREFIXES are also kept in a small per-process
+# LRU for up to CACHE_LOCAL_TIMEOUT seconds. The shared cache must be shared by every process (web
+# workers, process_announcement_jobs, the scheduler) and increment counters atomically without
+# losing their expiry, so outside DJANGO_DEBUG it must be Redis (CACHE_SHARED_LOCATION, default
+# redis://127.0.0.1:6379/1). With DJANGO_DEBUG it defaults to local memory, which is per process;
+# the database cache is never used for sessions (every request would write cache_table).
+SHARED_CACHE_BACKENDS = ('django.core.cache.backends.redis.RedisCache',)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
-        'LOCATION': 'cache_table',
-    }
+        'BACKEND': 'apps.core.cache_backends.TieredCache',
+        'LOCATION': 'kooptimizer-local',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            # Versioned or safely stale keys only; counters and OTPs must never be served locally
+            'LOCAL_PREFIXES': config('CACHE_LOCAL_PREFIXES', default='recipient_directory:,events_', cast=Csv()),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=30, cast=int),
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=1000, cast=int),
+        },
+    },
+    'shared': {
+        'BACKEND': config('CACHE_SHARED_BACKEND', default=(
+            'django.core.cache.backends.locmem.LocMemCache' if DEBUG else SHARED_CACHE_BACKENDS[0])),
+        'LOCATION': config('CACHE_SHARED_LOCATION', default=(
+            'kooptimizer-shared' if DEBUG else 'redis://127.0.0.1:6379/1')),
+    },
 }
-
+if CACHES['shared']['BACKEND'] not in SHARED_CACHE_BACKENDS:
+    # Redis evicts by its own maxmemory policy; the others cull at MAX_ENTRIES
+    CACHES['shared']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+    if not DEBUG:
+        raise ImproperlyConfigured(
+            'CACHE_SHARED_BACKEND must be Redis (django.core.cache.backends.redis.RedisCache): it is '
+            'shared across processes and increments atomically. Other backends need DJANGO_DEBUG=True'
+        )
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -190,9 +221,40 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # CSRF protection
 
 # Force session expiration on browser close by not persisting cookies
 SESSION_COOKIE_NAME = 'sessionid'  # Default name
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Use database sessions
+# Database sessions behind a cache; the database is written only when session data changes
+# or the stored expiry drifts more than SESSION_DB_WRITE_THRESHOLD seconds (idle timeout stays exact)
+SESSION_ENGINE = 'apps.core.session_backend'
+SESSION_CACHE_ALIAS = 'shared'
+if CACHES[SESSION_CACHE_ALIAS]['BACKEND'] == 'django.core.cache.backends.db.DatabaseCache':
+    raise ImproperlyConfigured(
+        'SESSION_CACHE_ALIAS must not be a database cache: the session backend refreshes its cache '
+        'entry on every request, which would write cache_table on every request'
+    )
+SESSION_DB_WRITE_THRESHOLD = config('SESSION_DB_WRITE_THRESHOLD', default=60, cast=int)
 CSRF_COOKIE_SECURE = config('CSRF_COOKIE_SECURE', default=False, cast=bool)  # Enable in production with HTTPS
 
+# AuthenticationMiddleware keeps a snapshot of the user (role, is_active) in the session and
+# re-reads it from the users table at most every AUTH_USER_RECHECK_SECONDS, so a deactivated
+# account is locked out within that window. last_activity is refreshed at most every
+# AUTH_ACTIVITY_WRITE_SECONDS. The default, 0, refreshes it on every request, which keeps the
+# inactivity timeout exact; the session backend coalesces those writes, so they don't reach the
+# database.
+AUTH_USER_RECHECK_SECONDS = config('AUTH_USER_RECHECK_SECONDS', default=60, cast=int)
+AUTH_ACTIVITY_WRITE_SECONDS = config('AUTH_ACTIVITY_WRITE_SECONDS', default=0, cast=int)
+
+# Login throttling (apps/core/services/login_throttle.py). Every login attempt counts against a
+# sliding window per username, and failed attempts also per client IP; a successful login clears
+# the username's count. Going over LOGIN_MAX_ATTEMPTS within LOGIN_ATTEMPT_WINDOW_SECONDS locks the
+# account for LOGIN_LOCKOUT_SECONDS, and LOGIN_IP_MAX_ATTEMPTS failures (any usernames) lock the IP
+# for LOGIN_IP_LOCKOUT_SECONDS. Only trust X-Forwarded-For behind a proxy that sets it.
+LOGIN_MAX_ATTEMPTS = config('LOGIN_MAX_ATTEMPTS', default=5, cast=int)
+LOGIN_ATTEMPT_WINDOW_SECONDS = config('LOGIN_ATTEMPT_WINDOW_SECONDS', default=24 * 3600, cast=int)
+LOGIN_LOCKOUT_SECONDS = config('LOGIN_LOCKOUT_SECONDS', default=3 * 3600, cast=int)
+LOGIN_IP_MAX_ATTEMPTS = config('LOGIN_IP_MAX_ATTEMPTS', default=30, cast=int)
+LOGIN_IP_WINDOW_SECONDS = config('LOGIN_IP_WINDOW_SECONDS', default=3600, cast=int)
+LOGIN_IP_LOCKOUT_SECONDS = config('LOGIN_IP_LOCKOUT_SECONDS', default=3600, cast=int)
+LOGIN_TRUST_X_FORWARDED_FOR = config('LOGIN_TRUST_X_FORWARDED_FOR', default=False, cast=bool)
+
 # HTTPS/SSL Settings (for production)
 SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=False, cast=bool)
 SECURE_HSTS_SECONDS = config('SECURE_HSTS_SECONDS', default=0, cast=int)
@@ -203,6 +265,11 @@ SECURE_HSTS_PRELOAD = config('SECURE_HSTS_PRELOAD', default=False, cast=bool)
 #  LOGGING CONFIGURATION
 # ====================================================================
 
+# Test runs log to a temporary directory instead of the real logs/ folder
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+LOG_DIR = Path(tempfile.gettempdir()) / 'kooptimizer-test-logs' if TESTING else Path(config('LOG_DIR', default=str(BASE_DIR / 'logs')))
+LOG_DIR.mkdir(parents=True, exist_ok=True)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -219,7 +286,7 @@ LOGGING = {
         },
         'file': {
             'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'logs' / 'scheduler.log',
+            'filename': LOG_DIR / 'scheduler.log',
             'formatter': 'verbose',
         },
     },
@@ -256,7 +323,14 @@ RECAPTCHA_SECRET_KEY = config('RECAPTCHA_SECRET_KEY')
 IPROG_SMS = {
     'API_TOKEN': config('IPROG_SMS_API_TOKEN'),
     'API_URL': config('IPROG_SMS_API_URL', default='https://sms.iprogtech.com/api/v1/sms_messages'),
-    'API_URL_BULK': config('IPROG_SMS_API_URL_BULK', default='https://sms.iprogtech.com/api/v1/sms_messages/send_bulk')
+    'API_URL_BULK': config('IPROG_SMS_API_URL_BULK', default='https://sms.iprogtech.com/api/v1/sms_messages/send_bulk'),
+    # Bulk sending: numbers per API call, parallel calls, request quota, retries and timeouts (seconds)
+    'BULK_CHUNK_SIZE': config('IPROG_SMS_BULK_CHUNK_SIZE', default=100, cast=int),
+    'MAX_CONCURRENCY': config('IPROG_SMS_MAX_CONCURRENCY', default=4, cast=int),
+    'RATE_LIMIT_PER_SECOND': config('IPROG_SMS_RATE_LIMIT_PER_SECOND', default=5, cast=float),
+    'MAX_RETRIES': config('IPROG_SMS_MAX_RETRIES', default=3, cast=int),
+    'CONNECT_TIMEOUT': config('IPROG_SMS_CONNECT_TIMEOUT', default=5, cast=float),
+    'READ_TIMEOUT': config('IPROG_SMS_READ_TIMEOUT', default=30, cast=float),
 }
 
 # ====================================================================
@@ -266,6 +340,36 @@ BREVO_API_KEY = config('BREVO_API_KEY')
 BREVO_API_URL = config('BREVO_API_URL', default='https://api.brevo.com/v3/smtp/email')
 BREVO_SENDER_EMAIL = config('BREVO_SENDER_EMAIL')
 BREVO_SENDER_NAME = config('BREVO_SENDER_NAME', default='Kooptimizer')
+# Bulk sending: recipients per API call, parallel calls, and the account's request quota
+BREVO_BATCH_SIZE = config('BREVO_BATCH_SIZE', default=50, cast=int)
+BREVO_MAX_CONCURRENCY = config('BREVO_MAX_CONCURRENCY', default=4, cast=int)
+BREVO_RATE_LIMIT_PER_SECOND = config('BREVO_RATE_LIMIT_PER_SECOND', default=10, cast=float)
+BREVO_MAX_RETRIES = config('BREVO_MAX_RETRIES', default=3, cast=int)
+
+# ====================================================================
+#  ANNOUNCEMENT DELIVERY QUEUE
+# ====================================================================
+# Sends are queued in announcement_delivery_jobs and drained by
+# `python manage.py process_announcement_jobs` worker processes.
+ANNOUNCEMENT_DELIVERY = {
+    'MAX_ATTEMPTS': config('ANNOUNCEMENT_DELIVERY_MAX_ATTEMPTS', default=5, cast=int),
+    'BACKOFF_BASE_SECONDS': config('ANNOUNCEMENT_DELIVERY_BACKOFF_BASE', default=30, cast=int),
+    'BACKOFF_MAX_SECONDS': config('ANNOUNCEMENT_DELIVERY_BACKOFF_MAX', default=3600, cast=int),
+    'LEASE_SECONDS': config('ANNOUNCEMENT_DELIVERY_LEASE_SECONDS', default=900, cast=int),
+    'BATCH_SIZE': config('ANNOUNCEMENT_DELIVERY_BATCH_SIZE', default=5, cast=int),
+    'POLL_INTERVAL_SECONDS': config('ANNOUNCEMENT_DELIVERY_POLL_INTERVAL', default=5, cast=int),
+}
+
+# Scheduled announcements: run in each web process (leader-elected) unless
+# AUTOSTART is off and `manage.py run_announcement_scheduler` runs separately
+ANNOUNCEMENT_SCHEDULER = {
+    'AUTOSTART': config('ANNOUNCEMENT_SCHEDULER_AUTOSTART', default=True, cast=bool),
+    'MAX_SLEEP_SECONDS': config('ANNOUNCEMENT_SCHEDULER_MAX_SLEEP', default=300, cast=int),
+    'LEADER_RETRY_SECONDS': config('ANNOUNCEMENT_SCHEDULER_LEADER_RETRY', default=30, cast=int),
+    'PROFILE_CHECK_HOURS': config('ANNOUNCEMENT_SCHEDULER_PROFILE_CHECK_HOURS', default=24, cast=int),
+    # How often the leader purges expired OCR scan sessions and their images
+    'OCR_PURGE_MINUTES': config('ANNOUNCEMENT_SCHEDULER_OCR_PURGE_MINUTES', default=60, cast=int),
+}
 
 # ====================================================================
 #  TICKETMASTER API CONFIGURATION
@@ -280,6 +384,58 @@ OPTIIC_API_URL = config('OPTIIC_API_URL', default='https://api.optiic.dev/proces
 #-------FALLBACK  OCR SERVICE
 OCR_SPACE_API_KEY = config('OCR_SPACE_API_KEY')
 OCR_SPACE_API_URL = config('OCR_SPACE_API_URL', default='https://api.ocr.space/parse/image')
+# OCR result cache (apps/core/services/ocr_cache.py): days an entry is reused, entries kept
+# before least recently used ones are evicted, and the max differing bits of the perceptual
+# hash accepted as the same page (0 = exact matches only).
+OCR_CACHE_TTL_DAYS = config('OCR_CACHE_TTL_DAYS', default=30, cast=int)
+OCR_CACHE_MAX_ENTRIES = config('OCR_CACHE_MAX_ENTRIES', default=5000, cast=int)
+OCR_CACHE_NEAR_DUPLICATE_DISTANCE = config('OCR_CACHE_NEAR_DUPLICATE_DISTANCE', default=0, cast=int)
+# OCR preprocessing (apps/core/services/ocr_preprocess.py): uploads are downscaled to about
+# OCR_TARGET_DPI and at most OCR_MAX_IMAGE_SIDE pixels, grayscaled and (optionally) binarized.
+# PDFs may have up to OCR_PDF_MAX_PAGES pages, OCR'd OCR_PDF_CONCURRENCY at a time.
+OCR_TARGET_DPI = config('OCR_TARGET_DPI', default=300, cast=int)
+OCR_MAX_IMAGE_SIDE = config('OCR_MAX_IMAGE_SIDE', default=3000, cast=int)
+OCR_BINARIZE = config('OCR_BINARIZE', default=True, cast=bool)
+OCR_PDF_MAX_PAGES = config('OCR_PDF_MAX_PAGES', default=20, cast=int)
+OCR_PDF_CONCURRENCY = config('OCR_PDF_CONCURRENCY', default=3, cast=int)
+# Async OCR jobs (apps/databank/ocr_jobs.py): worker threads and jobs waiting for one per
+# process, seconds before a still-queued job is resubmitted when polled, and seconds after
+# which a job stuck processing is considered abandoned.
+OCR_JOB_WORKERS = config('OCR_JOB_WORKERS', default=2, cast=int)
+OCR_JOB_QUEUE_SIZE = config('OCR_JOB_QUEUE_SIZE', default=20, cast=int)
+OCR_JOB_REQUEUE_SECONDS = config('OCR_JOB_REQUEUE_SECONDS', default=30, cast=int)
+OCR_JOB_LEASE_SECONDS = config('OCR_JOB_LEASE_SECONDS', default=300, cast=int)
+# OCR scan session cleanup (apps/databank/ocr_cleanup.py): unconsumed sessions leave the OCR
+# drawer after OCR_SESSION_TTL_MINUTES and every session is deleted, with its image, after
+# OCR_SESSION_RETENTION_HOURS. Rows are purged OCR_PURGE_BATCH_SIZE at a time.
+OCR_SESSION_TTL_MINUTES = config('OCR_SESSION_TTL_MINUTES', default=5, cast=int)
+OCR_SESSION_RETENTION_HOURS = config('OCR_SESSION_RETENTION_HOURS', default=24, cast=int)
+OCR_PURGE_BATCH_SIZE = config('OCR_PURGE_BATCH_SIZE', default=200, cast=int)
+# Shared OCR provider breaker (apps/core/services/ocr_breaker.py): consecutive failures that
+# trip a provider and for how long (quota errors trip it until midnight). Hedging fires
+# OCR.space when Optiic hasn't answered within its OCR_HEDGE_PERCENTILE latency (once
+# OCR_HEDGE_MIN_SAMPLES calls are recorded; OCR_HEDGE_AFTER_SECONDS until then).
+OCR_BREAKER_FAILURE_THRESHOLD = config('OCR_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+OCR_BREAKER_COOLDOWN_SECONDS = config('OCR_BREAKER_COOLDOWN_SECONDS', default=300, cast=int)
+OCR_HEDGING_ENABLED = config('OCR_HEDGING_ENABLED', default=True, cast=bool)
+OCR_HEDGE_PERCENTILE = config('OCR_HEDGE_PERCENTILE', default=0.95, cast=float)
+OCR_HEDGE_MIN_SAMPLES = config('OCR_HEDGE_MIN_SAMPLES', default=20, cast=int)
+OCR_HEDGE_AFTER_SECONDS = config('OCR_HEDGE_AFTER_SECONDS', default=20, cast=float)
+# Local Tesseract OCR (apps/core/services/tesseract_ocr.py): 'off', 'primary' (before Optiic),
+# 'fallback' (after OCR.space) or 'local-only'. Concurrent tesseract processes default to the CPU count.
+OCR_TESSERACT_MODE = config('OCR_TESSERACT_MODE', default='off')
+OCR_TESSERACT_CMD = config('OCR_TESSERACT_CMD', default='tesseract')
+OCR_TESSERACT_LANG = config('OCR_TESSERACT_LANG', default='eng')
+OCR_TESSERACT_WORKERS = config('OCR_TESSERACT_WORKERS', default=0, cast=int) or None
+OCR_TESSERACT_TIMEOUT = config('OCR_TESSERACT_TIMEOUT', default=60, cast=int)
+# Batch digitization (apps/databank/digitization.py): scans OCR'd at once per batch, how long a
+# run's claim on a scan lasts before another run may take it over (the first run died), the
+# largest scan accepted, and the most scans and (uncompressed) bytes one upload may hold.
+DIGITIZATION_CONCURRENCY = config('DIGITIZATION_CONCURRENCY', default=4, cast=int)
+DIGITIZATION_LEASE_SECONDS = config('DIGITIZATION_LEASE_SECONDS', default=600, cast=int)
+DIGITIZATION_MAX_FILE_BYTES = config('DIGITIZATION_MAX_FILE_BYTES', default=25 * 1024 * 1024, cast=int)
+DIGITIZATION_MAX_UPLOAD_FILES = config('DIGITIZATION_MAX_UPLOAD_FILES', default=2000, cast=int)
+DIGITIZATION_MAX_UPLOAD_BYTES = config('DIGITIZATION_MAX_UPLOAD_BYTES', default=1024 * 1024 * 1024, cast=int)
 
 
 WEBPUSH_SETTINGS = {
@@ -287,6 +443,19 @@ WEBPUSH_SETTINGS = {
     "VAPID_PRIVATE_KEY": config('VAPID_PRIVATE_KEY'),
     "VAPID_ADMIN_EMAIL": config('VAPID_ADMIN_EMAIL')
 }
+# Bulk push fan-out (e.g. yearly profile reminders): users per subscription lookup, and dispatcher worker threads
+PUSH_NOTIFICATION_BATCH_SIZE = config('PUSH_NOTIFICATION_BATCH_SIZE', default=50, cast=int)
+PUSH_NOTIFICATION_MAX_WORKERS = config('PUSH_NOTIFICATION_MAX_WORKERS', default=4, cast=int)
+# Off-request push dispatcher (apps/core/services/push_dispatcher.py): pending intents kept
+# in memory before new ones are dropped, and per-request timeout to the push services (seconds).
+# Its worker count is PUSH_NOTIFICATION_MAX_WORKERS.
+PUSH_NOTIFICATION_QUEUE_SIZE = config('PUSH_NOTIFICATION_QUEUE_SIZE', default=1000, cast=int)
+PUSH_NOTIFICATION_TIMEOUT = config('PUSH_NOTIFICATION_TIMEOUT', default=10, cast=int)
+# Concurrent requests to the push services within one fan-out (also the keep-alive pool size)
+PUSH_NOTIFICATION_SEND_CONCURRENCY = config('PUSH_NOTIFICATION_SEND_CONCURRENCY', default=8, cast=int)
+# Seconds topic-tagged notifications (new messages, profile saves) to the same user are
+# buffered and sent as one digest; 0 sends each immediately.
+PUSH_NOTIFICATION_COALESCE_WINDOW = config('PUSH_NOTIFICATION_COALESCE_WINDOW', default=5, cast=float)
 
 
 # Email Configuration
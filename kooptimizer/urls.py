@@ -20,6 +20,7 @@ urlpatterns = [
     path('about/', core_views.about_view, name='about'),
     path('contact/', user_views.contact_view, name='contact'),
     path('access-denied/', core_views.access_denied_view, name='access_denied'),  # Access denied page
+    path('api/cache/stats/', core_views.cache_stats_view, name='cache_stats'),
     path('communications/', include('apps.communications.urls', namespace='communications')),
     path('account_management/', include('apps.account_management.urls', namespace='account_management')),
     path('cooperatives/', include('apps.cooperatives.urls', namespace='cooperatives')),
@@ -0,0 +1,7 @@
+@echo off
+REM Batch file to run the announcement delivery worker
+REM Keep this running alongside the web server (or run with --once every minute)
+
+cd /d "C:\Users\Noe Gonzales\Downloads\System\Kooptimizer"
+call .venv\Scripts\activate.bat
+python manage.py process_announcement_jobs >> logs\announcement_delivery.log 2>&1
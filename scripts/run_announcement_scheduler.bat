@@ -0,0 +1,7 @@
+@echo off
+REM Batch file to run the scheduled-announcement scheduler as its own process
+REM Set ANNOUNCEMENT_SCHEDULER_AUTOSTART=False in .env when using this
+
+cd /d "C:\Users\Noe Gonzales\Downloads\System\Kooptimizer"
+call .venv\Scripts\activate.bat
+python manage.py run_announcement_scheduler >> logs\scheduler.log 2>&1